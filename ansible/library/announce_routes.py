@@ -3,7 +3,6 @@
 import itertools
 import math
 import os
-import yaml
 import re
 import requests
 import ipaddress
@@ -17,6 +16,7 @@ from multiprocessing.pool import ThreadPool
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.debug_utils import config_module_logging
 from ansible.module_utils.multi_servers_utils import MultiServersUtils
+from ansible.module_utils.topo_utils import load_topo
 
 if sys.version_info.major == 3:
     UNICODE_TYPE = str
@@ -169,8 +169,7 @@ def read_topo(topo_name, path):
     topo_file_path = os.path.join(
         path, TOPO_FILE_FOLDER, TOPO_FILENAME_TEMPLATE.format(topo_name))
     try:
-        with open(topo_file_path) as f:
-            return yaml.safe_load(f)
+        return load_topo(topo_file_path)
     except IOError:
         return {}
 
@@ -1,16 +1,17 @@
 from ansible.module_utils.basic import AnsibleModule
 import os
-import yaml
 import traceback
 from collections import defaultdict
 
 try:
     from ansible.module_utils.dualtor_utils import generate_mux_cable_facts
+    from ansible.module_utils.topo_utils import load_topo
 except ImportError:
     # Add parent dir for using outside Ansible
     import sys
     sys.path.append('..')
     from ansible.module_utils.dualtor_utils import generate_mux_cable_facts
+    from ansible.module_utils.topo_utils import load_topo
 
 
 def load_topo_file(topo_name):
@@ -18,8 +19,7 @@ def load_topo_file(topo_name):
     topo_file = "../ansible/vars/topo_%s.yml" % topo_name
     if not os.path.exists(topo_file):
         raise ValueError("Topo file %s not exists" % topo_file)
-    with open(topo_file) as fd:
-        return yaml.safe_load(fd)
+    return load_topo(topo_file)
 
 
 class DualTorParser:
@@ -3,6 +3,8 @@
 from ansible.module_utils.basic import AnsibleModule
 from functools import cmp_to_key
 import datetime
+import io
+import json
 import traceback
 import logging.handlers
 import logging
@@ -42,6 +44,13 @@ Options:
       required: True
       Default: None
 
+    - option-name: state_file
+      description: a marker state file written by loganalyzer.py (--state_file) when the start marker
+                   was placed. If it has the position of 'start_string', the extraction seeks straight
+                   to it instead of scanning the log files. Without usable state the files are scanned.
+      required: False
+      Default: None
+
 '''
 
 EXAMPLES = '''
@@ -58,6 +67,14 @@ EXAMPLES = '''
     dest: '/tmp/'
     flat: yes
 
+- name: Extract syslog entries since the loganalyzer start marker, using the recorded marker position
+  extract_log:
+    directory: '/var/log'
+    file_prefix: 'syslog'
+    start_string: 'start-LogAnalyzer-test_bgp.2024-01-01-00:00:00'
+    target_filename: '/tmp/syslog'
+    state_file: '/tmp/loganalyzer_markers.json'
+
 - name: Extract all sairedis.rec entries since the last reboot
   extract_log:
     directory: '/var/log/swss'
@@ -285,9 +302,138 @@ def combine_logs_and_save(directory, filenames, start_string, target_string, tar
                 path, line_processed, line_copied))
 
 
-def extract_log(directory, prefixname, target_string, target_filename):
+def open_log(path):
+    """Opens a log file in binary mode, rotated files may be gzipped"""
+    if 'gz' in path:
+        return gzip.open(path, mode='rb')
+    return open(path, 'rb')
+
+
+def get_file_head_md5(file, head_size):
+    m = hashlib.md5()
+    m.update(file.read(head_size))
+    return m.hexdigest()
+
+
+def load_marker_position(state_file, directory, prefixname, start_string):
+    """Returns the position recorded by loganalyzer.py for @start_string in a log file
+    from @directory starting with @prefixname, None if there is no such record.
+    A corrupted state file is handled like a missing one, the log is scanned as usual."""
+    if not state_file or not os.path.isfile(state_file):
+        return None
+
+    try:
+        with open(state_file) as f:
+            state = json.load(f)
+    except (IOError, ValueError):
+        return None
+    positions = state.get(start_string) if isinstance(state, dict) else None
+    if not isinstance(positions, dict):
+        return None
+
+    for path, position in positions.items():
+        if os.path.dirname(path) == directory and os.path.basename(path).startswith(prefixname):
+            return position if isinstance(position, dict) else None
+    return None
+
+
+def find_file_with_position(directory, filenames, position):
+    """Finds the file the recorded @position refers to. Logrotate renames the log file,
+    so an uncompressed file keeps its inode. A compressed file is a new file, it is
+    identified by the content of its head, which does not change while the log grows.
+    The head is checked for uncompressed files as well, as inodes are reused."""
+    for filename in filenames:
+        path = os.path.join(directory, filename)
+        if 'gz' not in path and os.stat(path).st_ino != position['inode']:
+            continue
+        if 'gz' in path and position['head_size'] == 0:
+            continue
+        with open_log(path) as file:
+            if get_file_head_md5(file, position['head_size']) == position['head_md5']:
+                return filename
+    return None
+
+
+def find_first_line_with_string(directory, filenames, offset, start_string):
+    """Scans @filenames (from older to newer) starting at @offset of the first file for the
+    first line with @start_string which is not logged by extract_log. Returns the file and the
+    offset of the first line with @start_string in that file, the line combine_logs_and_save
+    starts copying from. Returns None if the string was not found."""
+    needle = start_string.encode('utf-8')
+    for filename in filenames:
+        copy_offset = None
+        with open_log(os.path.join(directory, filename)) as file:
+            file.seek(offset)
+            for line in file:
+                if needle in line:
+                    if copy_offset is None:
+                        copy_offset = offset
+                    if b'extract_log' not in line:
+                        return filename, copy_offset
+                offset += len(line)
+        offset = 0
+    return None
+
+
+def combine_logs_from_position(directory, filenames, offset, target_string, target_filename):
+    """Copies @filenames (from older to newer) into @target_filename starting at @offset of
+    the first file. Returns False if @target_string is found in more than one line, the
+    latest one has to be found by extract_latest_line_with_string then."""
+    found = 0
+    line_copied = 0
+    with open(target_filename, 'w') as fp:
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            with open_log(path) as file:
+                file.seek(offset)
+                for line in io.TextIOWrapper(file):
+                    if target_string in line and 'extract_log' not in line:
+                        found += 1
+                        if found > 1:
+                            return False
+                    fp.write(line)
+                    line_copied += 1
+            offset = 0
+
+    logger.debug("extract_log combine_logs from position, {} lines copied".format(line_copied))
+    return found == 1
+
+
+def extract_log_from_position(directory, prefixname, target_string, target_filename, state_file):
+    """Extracts the log using the marker position recorded in @state_file. Only the log
+    files written after the marker are read. Returns False if the position is unknown or does
+    not match the log files, the log has to be extracted by scanning the files then."""
+    position = load_marker_position(state_file, directory, prefixname, target_string)
+    if position is None:
+        logger.debug("extract_log no recorded position for start string")
+        return False
+
+    filenames = list_files(directory, prefixname)
+    file_with_position = find_file_with_position(directory, filenames, position)
+    if file_with_position is None:
+        logger.debug("extract_log file with recorded position not found in {}".format(filenames))
+        return False
+
+    # From older to newer, starting with the file the position was recorded in
+    files_to_scan = list(reversed(calculate_files_to_copy(filenames, file_with_position)))
+    first_line = find_first_line_with_string(directory, files_to_scan, position['offset'], target_string)
+    if first_line is None:
+        logger.debug("extract_log start string not found after recorded position")
+        return False
+
+    file_with_line, offset = first_line
+    logger.debug("extract_log start file {} offset {} from recorded position in {}".format(
+        file_with_line, offset, file_with_position))
+    files_to_copy = files_to_scan[files_to_scan.index(file_with_line):]
+    return combine_logs_from_position(directory, files_to_copy, offset, target_string, target_filename)
+
+
+def extract_log(directory, prefixname, target_string, target_filename, state_file=None):
     logger.debug("extract_log for start string {}".format(
         target_string.replace("start-", "")))
+    if state_file and extract_log_from_position(directory, prefixname, target_string, target_filename, state_file):
+        return
+
     filenames = list_files(directory, prefixname)
     logger.debug("extract_log from files {}".format(filenames))
     file_with_latest_line, file_create_time, latest_line, file_size = extract_latest_line_with_string(
@@ -311,6 +457,7 @@ def main():
             file_prefix=dict(required=True, type='str'),
             start_string=dict(required=True, type='str'),
             target_filename=dict(required=True, type='str'),
+            state_file=dict(required=False, type='str', default=None),
         ),
         supports_check_mode=False)
 
@@ -322,7 +469,7 @@ def main():
 
     try:
         extract_log(p['directory'], p['file_prefix'],
-                    p['start_string'], p['target_filename'])
+                    p['start_string'], p['target_filename'], state_file=p['state_file'])
     except Exception:
         tb = traceback.format_exc()
         module.fail_json(msg=tb)
@@ -2,16 +2,17 @@
 import os.path
 import sys
 import traceback
-import yaml
 
 from ansible.module_utils.basic import AnsibleModule
 
 try:
     from ansible.module_utils.dualtor_utils import generate_mux_cable_facts
+    from ansible.module_utils.topo_utils import load_topo
 except ImportError:
     # Add parent dir for using outside Ansible
     sys.path.append('..')
     from ansible.module_utils.dualtor_utils import generate_mux_cable_facts
+    from ansible.module_utils.topo_utils import load_topo
 
 
 DOCUMENTATION = """
@@ -33,8 +34,7 @@ def load_topo_file(topo_name):
     topo_file = "../ansible/vars/topo_%s.yml" % topo_name
     if not os.path.exists(topo_file):
         raise ValueError("Topo file %s not exists" % topo_file)
-    with open(topo_file) as fd:
-        return yaml.safe_load(fd)
+    return load_topo(topo_file)
 
 
 def main():
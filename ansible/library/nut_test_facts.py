@@ -3,6 +3,7 @@
 import os
 from typing import Any
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.topo_utils import load_topo
 import traceback
 import yaml
 
@@ -158,10 +159,9 @@ def load_topo_info(testbed: dict):
         topo_dir = LEGACY_TOPO_DIR
         topo_name = "topo_" + topo_name
 
-    with open(os.path.join(topo_dir, topo_name + '.yml')) as f:
-        topo_data = yaml.safe_load(f)
-        topo = {"name": topo_name, "type": "nut", "properties": topo_data}
-        testbed["topo"] = topo
+    topo_data = load_topo(os.path.join(topo_dir, topo_name + '.yml'))
+    topo = {"name": topo_name, "type": "nut", "properties": topo_data}
+    testbed["topo"] = topo
 
 
 def main():
@@ -1,6 +1,7 @@
 #!/usr/bin/python
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.multi_servers_utils import MultiServersUtils
+from ansible.module_utils.topo_utils import load_topo
 import re
 import yaml
 import traceback
@@ -93,8 +94,7 @@ class TestbedVMFacts:
 
     def get_neighbor_eos(self):
         eos = {}
-        with open(self.topofile) as f:
-            vm_topology = yaml.safe_load(f)
+        vm_topology = load_topo(self.topofile)
         self.topoall = vm_topology
         self.topo_is_multi_vrf = self.topoall.get("topo_is_multi_vrf", False)
 
@@ -129,8 +129,7 @@ class TestbedVMFacts:
 
     def get_neighbor_dpu(self):
         dpu = {}
-        with open(self.topofile) as f:
-            vm_topology = yaml.safe_load(f)
+        vm_topology = load_topo(self.topofile)
         self.topoall = vm_topology
 
         if len(self.base_vm) > 2:
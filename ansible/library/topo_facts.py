@@ -3,9 +3,9 @@ import os
 import traceback
 import ipaddress
 import sys
-import yaml
 import re
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.topo_utils import load_topo
 import itertools
 
 DOCUMENTATION = '''
@@ -291,14 +291,12 @@ class ParseTestbedTopoinfo():
             raise Exception(
                 "cannot find topology definition file under ../ansible/vars/topo_%s.yml file!" % topo_name)
         else:
-            with open(topo_filename) as f:
-                topo_definition = yaml.safe_load(f)
+            topo_definition = load_topo(topo_filename)
 
         if not asic_topo_filename:
             slot_definition = {}
         else:
-            with open(asic_topo_filename) as f:
-                slot_definition = yaml.safe_load(f)
+            slot_definition = load_topo(asic_topo_filename)
 
         # parse topo file specified in vars/ to reverse as dut config
         dut_num = 1
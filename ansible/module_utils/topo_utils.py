@@ -0,0 +1,165 @@
+"""
+Loading of the topology files (ansible/vars/topo_*.yml).
+
+The biggest topology files take seconds to parse with the pure python yaml loader. load_topo parses a topology
+file with the C yaml loader when available, and keeps the result as a compiled artifact (pickle) keyed by the
+hash of the content of the topology file. The later loads of the same content, from any process, read the
+artifact instead of parsing the yaml file. An artifact is refreshed as soon as the topology file changes, because
+its content hash changes.
+
+The artifacts are stored under SONIC_MGMT_TOPO_CACHE_DIR, default is the per user ~/.cache/sonic-mgmt/topo. Set it to
+an empty string to disable the artifacts. Unpickling an artifact can run code, so the directory is created with mode
+0700 and the artifacts are only used when the directory and the artifact belong to the current user and the
+directory is not accessible by the other users. Otherwise the topology files are parsed every time.
+
+The artifacts of all the topology files can be compiled in advance:
+
+    python3 ansible/module_utils/topo_utils.py ansible/vars
+
+This file is also used by tests/common/topo_utils.py (symlink).
+"""
+import glob
+import hashlib
+import os
+import pickle
+import stat
+import sys
+import tempfile
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+TOPO_CACHE_DIR_ENV = "SONIC_MGMT_TOPO_CACHE_DIR"
+DEFAULT_TOPO_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "sonic-mgmt", "topo")
+# Bump when the format of the artifacts changes
+TOPO_ARTIFACT_VERSION = 1
+
+
+def get_topo_cache_dir():
+    return os.environ.get(TOPO_CACHE_DIR_ENV, DEFAULT_TOPO_CACHE_DIR)
+
+
+def _is_private(st):
+    """Whether a file or directory belongs to the current user and is not writable by the other users."""
+    return st.st_uid == os.getuid() and not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def _check_cache_dir(cache_dir):
+    """Create the directory of the artifacts with mode 0700 if missing.
+
+    Returns:
+        bool: Whether the directory is a directory of the current user, not accessible by the other users.
+    """
+    try:
+        os.makedirs(cache_dir, 0o700)
+    except OSError:
+        # Existing, or created by another process meanwhile
+        pass
+    try:
+        st = os.lstat(cache_dir)
+    except OSError:
+        return False
+    return stat.S_ISDIR(st.st_mode) and _is_private(st) and not st.st_mode & (stat.S_IRWXG | stat.S_IRWXO)
+
+
+def _read_artifact(artifact):
+    """Read an artifact of the current user, None if it is missing, corrupted or not owned by the current user."""
+    try:
+        fd = os.open(artifact, os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0))
+    except OSError:
+        return None
+    with os.fdopen(fd, "rb") as f:
+        st = os.fstat(f.fileno())
+        if not stat.S_ISREG(st.st_mode) or not _is_private(st):
+            return None
+        try:
+            return pickle.load(f)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+
+def _artifact_path(cache_dir, topo_file, content):
+    digest = hashlib.sha256(content)
+    digest.update("{} {}".format(TOPO_ARTIFACT_VERSION, SafeLoader.__name__).encode())
+    name = os.path.splitext(os.path.basename(topo_file))[0]
+    return os.path.join(cache_dir, "{}.{}.pickle".format(name, digest.hexdigest()[:32]))
+
+
+def _write_artifact(artifact, topo):
+    """Write an artifact atomically, and remove the artifacts of the previous contents of the topology file."""
+    cache_dir = os.path.dirname(artifact)
+    fd, tmp_file = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(topo, f, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp_file, artifact)
+    except Exception:
+        os.remove(tmp_file)
+        raise
+
+    prefix = os.path.basename(artifact).rsplit(".", 2)[0]
+    for old_artifact in glob.glob(os.path.join(cache_dir, prefix + ".*.pickle")):
+        if old_artifact != artifact and os.path.basename(old_artifact).rsplit(".", 2)[0] == prefix:
+            try:
+                os.remove(old_artifact)
+            except OSError:
+                pass
+
+
+def load_topo(topo_file, cache_dir=None):
+    """Load a topology file.
+
+    Args:
+        topo_file (str): Path of the topology file.
+        cache_dir (str): Directory of the compiled artifacts, default is get_topo_cache_dir(). The artifacts are
+            not used if it is empty, or if it is not a directory of the current user with mode 0700.
+
+    Returns:
+        The content of the topology file, a new object owned by the caller.
+
+    Raises:
+        IOError: if the topology file can not be read.
+        yaml.YAMLError: if the topology file is not valid yaml.
+    """
+    with open(topo_file, "rb") as f:
+        content = f.read()
+
+    if cache_dir is None:
+        cache_dir = get_topo_cache_dir()
+    if not cache_dir or not _check_cache_dir(cache_dir):
+        return yaml.load(content, Loader=SafeLoader)
+
+    artifact = _artifact_path(cache_dir, topo_file, content)
+    topo = _read_artifact(artifact)
+    if topo is not None:
+        return topo
+
+    topo = yaml.load(content, Loader=SafeLoader)
+    try:
+        _write_artifact(artifact, topo)
+    except (IOError, OSError, pickle.PicklingError):
+        # The artifact is only an optimization
+        pass
+    return topo
+
+
+def compile_topos(vars_dir, cache_dir=None):
+    """Compile the artifacts of all the topology files of a directory.
+
+    Returns:
+        list: Paths of the compiled topology files.
+    """
+    topo_files = sorted(glob.glob(os.path.join(vars_dir, "topo_*.yml")))
+    for topo_file in topo_files:
+        load_topo(topo_file, cache_dir=cache_dir)
+    return topo_files
+
+
+if __name__ == "__main__":
+    vars_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), "..", "vars")
+    compiled = compile_topos(vars_dir)
+    print("Compiled {} topology files into {}".format(len(compiled), get_topo_cache_dir()))
@@ -25,6 +25,7 @@ import time
 import json
 import itertools
 import fib
+from probe_batch import ProbeBatch
 
 import ptf
 import ptf.packet as scapy
@@ -116,6 +117,9 @@ class FibTest(BaseTest):
          - dst_vid                vlan tag id of dst pkts. Default: None(untag)
          - ignore_ttl:            mask the ttl field in the expected packet
          - single_fib_for_duts:   have a single fib file for all DUTs in multi-dut case. Default: False
+         - batch_mode:            build all the pkts of a route set, send them in bursts and match the rcvd pkts
+                                  by a signature in their payload. Default: False(one pkt at a time)
+         - batch_size:            number of pkts of a burst in batch mode, --qlen must hold a burst for each port
         '''
         self.dataplane = ptf.dataplane_instance
         self.asic_type = self.test_params.get('asic_type')
@@ -179,6 +183,10 @@ class FibTest(BaseTest):
         self.single_fib = self.test_params.get(
             'single_fib_for_duts', "multiple-fib")
         self.topo_type = self.test_params.get('topo_type', None)
+        self.batch_mode = self.test_params.get('batch_mode', False)
+        self.exp_pkt_masks = {}
+        self.batch_size = self.test_params.get(
+            'batch_size', ProbeBatch.DEFAULT_BURST_SIZE)
 
     def check_ip_ranges(self, ipv4=True):
         for dut_index, dut_fib in enumerate(self.fibs):
@@ -194,9 +202,12 @@ class FibTest(BaseTest):
             else:
                 covered_ip_ranges = ip_ranges[:]
 
+            batch = self.create_probe_batch() if self.batch_mode else None
             for ip_range in covered_ip_ranges:
                 if ip_range.get_first_ip() in dut_fib:
-                    self.check_ip_range(ip_range, dut_index, ipv4)
+                    self.check_ip_range(ip_range, dut_index, ipv4, batch)
+            if batch:
+                self.run_probe_batch(batch)
 
             random.shuffle(covered_ip_ranges)
             self.check_balancing(covered_ip_ranges, dut_index, ipv4)
@@ -239,7 +250,7 @@ class FibTest(BaseTest):
                 break
         return src_port, exp_port_lists, next_hops
 
-    def check_ip_range(self, ip_range, dut_index, ipv4=True):
+    def check_ip_range(self, ip_range, dut_index, ipv4=True, batch=None):
 
         dst_ips = []
         dst_ips.append(ip_range.get_first_ip())
@@ -263,7 +274,10 @@ class FibTest(BaseTest):
                     return
             logging.info('Checking ip range {}, src_port={}, exp_port_lists={}, dst_ip={}, dut_index={}'
                          .format(ip_range, src_port, exp_port_lists, dst_ip, dut_index))
-            self.check_ip_route(src_port, dst_ip, exp_port_lists, ipv4)
+            if batch:
+                self.add_probe(batch, src_port, dst_ip, exp_port_lists, ipv4)
+            else:
+                self.check_ip_route(src_port, dst_ip, exp_port_lists, ipv4)
 
     def check_balancing(self, ip_ranges, dut_index, ipv4=True):
         # Test traffic balancing across ECMP/LAG members
@@ -297,11 +311,18 @@ class FibTest(BaseTest):
                 # Change balancing_test_times according to number of next hop groups
                 logging.info('Checking ip range balancing {}, src_port={}, exp_ports={}, dst_ip={}, dut_index={}'
                              .format(ip_range, src_port, exp_port_lists, dst_ip, dut_index))
-                for i in range(0, self.balancing_test_times*len(list(itertools.chain(*exp_port_lists)))):
-                    (matched_port, _) = self.check_ip_route(
-                        src_port, dst_ip, exp_port_lists, ipv4)
-                    hit_count_map[matched_port] = hit_count_map.get(
-                        matched_port, 0) + 1
+                if self.batch_mode:
+                    batch = self.create_probe_batch()
+                    for i in range(0, self.balancing_test_times*len(list(itertools.chain(*exp_port_lists)))):
+                        self.add_probe(batch, src_port, dst_ip, exp_port_lists, ipv4)
+                    self.run_probe_batch(batch)
+                    hit_count_map = batch.hit_count_map()
+                else:
+                    for i in range(0, self.balancing_test_times*len(list(itertools.chain(*exp_port_lists)))):
+                        (matched_port, _) = self.check_ip_route(
+                            src_port, dst_ip, exp_port_lists, ipv4)
+                        hit_count_map[matched_port] = hit_count_map.get(
+                            matched_port, 0) + 1
                 for next_hop in next_hops:
                     # only check balance on a DUT
                     self.check_hit_count_map(
@@ -328,12 +349,32 @@ class FibTest(BaseTest):
 
         return (matched_port, received)
 
-    def check_ipv4_route(self, src_port, dst_ip_addr, dst_port_lists):
+    def mask_exp_pkt(self, exp_pkt, masked_fields):
         '''
-        @summary: Check IPv4 route works.
+        @summary: Mask the fields of an expected packet.
+        The offsets of the fields are computed by building the packet, so the mask is cached by the layers and
+        the size of the packet. The other headers of the packets, like the ip options, are set by the test params.
+        @param exp_pkt: expected packet
+        @param masked_fields: list of (header type, field name) to mask
+        @return Mask
+        '''
+        masked_exp_pkt = Mask(exp_pkt)
+        key = (tuple(exp_pkt.layers()), masked_exp_pkt.size, tuple(masked_fields))
+        mask = self.exp_pkt_masks.get(key)
+        if mask is None:
+            for hdr_type, field_name in masked_fields:
+                masked_exp_pkt.set_do_not_care_scapy(hdr_type, field_name)
+            self.exp_pkt_masks[key] = list(masked_exp_pkt.mask)
+        else:
+            masked_exp_pkt.mask = list(mask)
+        return masked_exp_pkt
+
+    def create_ipv4_pkts(self, src_port, dst_ip_addr):
+        '''
+        @summary: Create an IPv4 packet to send to the switch and its masked expected packet.
         @param src_port: index of port to use for sending packet to switch
         @param dest_ip_addr: destination IP to build packet with.
-        @param dst_port_lists: list of ports on which to expect packet to come back from the switch
+        @return (pkt, masked_exp_pkt)
         '''
         sport = random.randint(0, 65535)
         dport = random.randint(0, 65535)
@@ -365,15 +406,25 @@ class FibTest(BaseTest):
             ip_options=self.ip_options,
             dl_vlan_enable=self.dst_vid is not None,
             vlan_vid=self.dst_vid or 0)
-        masked_exp_pkt = Mask(exp_pkt)
-        masked_exp_pkt.set_do_not_care_scapy(scapy.Ether, "dst")
-        masked_exp_pkt.set_do_not_care_scapy(scapy.Ether, "src")
+        masked_fields = [(scapy.Ether, "dst"), (scapy.Ether, "src")]
 
         # mask the chksum also if masking the ttl
         if self.ignore_ttl:
-            masked_exp_pkt.set_do_not_care_scapy(scapy.IP, "ttl")
-            masked_exp_pkt.set_do_not_care_scapy(scapy.IP, "chksum")
-            masked_exp_pkt.set_do_not_care_scapy(scapy.TCP, "chksum")
+            masked_fields += [(scapy.IP, "ttl"), (scapy.IP, "chksum"), (scapy.TCP, "chksum")]
+        return pkt, self.mask_exp_pkt(exp_pkt, masked_fields)
+
+    def check_ipv4_route(self, src_port, dst_ip_addr, dst_port_lists):
+        '''
+        @summary: Check IPv4 route works.
+        @param src_port: index of port to use for sending packet to switch
+        @param dest_ip_addr: destination IP to build packet with.
+        @param dst_port_lists: list of ports on which to expect packet to come back from the switch
+        '''
+        pkt, masked_exp_pkt = self.create_ipv4_pkts(src_port, dst_ip_addr)
+        ip_src = pkt['IP'].src
+        ip_dst = dst_ip_addr
+        sport = pkt['TCP'].sport
+        dport = pkt['TCP'].dport
 
         send_packet(self, src_port, pkt)
         logging.info('Sent Ether(src={}, dst={})/IP(src={}, dst={})/TCP(sport={}, dport={}) on port {}'
@@ -414,36 +465,18 @@ class FibTest(BaseTest):
                 rcvd_port, len_rcvd_pkt))
             logging.info(
                 'Recieved packet with length of {}'.format(len_rcvd_pkt))
-            exp_src_mac = None
-            if len(self.ptf_test_port_map[str(rcvd_port)]["target_src_mac"]) > 1:
-                # active-active dualtor, the packet could be received from either ToR, so use the received
-                # port to find the corresponding ToR
-                for dut_index, port_list in enumerate(dst_port_lists):
-                    if rcvd_port in port_list:
-                        exp_src_mac = self.ptf_test_port_map[str(
-                            rcvd_port)]["target_src_mac"][dut_index]
-            else:
-                exp_src_mac = self.ptf_test_port_map[str(
-                    rcvd_port)]["target_src_mac"][0]
-            actual_src_mac = scapy.Ether(rcvd_pkt).src
-            if exp_src_mac != actual_src_mac:
-                raise Exception(
-                    "Pkt sent from {} to {} on port {} was rcvd pkt on {} which is one of the expected ports, "
-                    "but the src mac doesn't match, expected {}, got {}".
-                    format(ip_src, ip_dst, src_port, rcvd_port, exp_src_mac, actual_src_mac))
-            return (rcvd_port, rcvd_pkt)
+            return self.get_validated_packet(rcvd_port, rcvd_pkt, dst_port_lists, ip_src, ip_dst, src_port)
         elif self.pkt_action == self.ACTION_DROP:
             verify_no_packet_any(self, masked_exp_pkt, dst_ports)
             return (None, None)
     # ---------------------------------------------------------------------
 
-    def check_ipv6_route(self, src_port, dst_ip_addr, dst_port_lists):
+    def create_ipv6_pkts(self, src_port, dst_ip_addr):
         '''
-        @summary: Check IPv6 route works.
-        @param source_port_index: index of port to use for sending packet to switch
+        @summary: Create an IPv6 packet to send to the switch and its masked expected packet.
+        @param src_port: index of port to use for sending packet to switch
         @param dest_ip_addr: destination IP to build packet with.
-        @param dst_port_lists: list of ports on which to expect packet to come back from the switch
-        @return Boolean
+        @return (pkt, masked_exp_pkt)
         '''
         sport = random.randint(0, 65535)
         dport = random.randint(0, 65535)
@@ -473,14 +506,26 @@ class FibTest(BaseTest):
             ipv6_hlim=max(self.ttl-1, 0),
             dl_vlan_enable=self.dst_vid is not None,
             vlan_vid=self.dst_vid or 0)
-        masked_exp_pkt = Mask(exp_pkt)
-        masked_exp_pkt.set_do_not_care_scapy(scapy.Ether, "dst")
-        masked_exp_pkt.set_do_not_care_scapy(scapy.Ether, "src")
+        masked_fields = [(scapy.Ether, "dst"), (scapy.Ether, "src")]
 
         # mask the chksum also if masking the ttl
         if self.ignore_ttl:
-            masked_exp_pkt.set_do_not_care_scapy(scapy.IPv6, "hlim")
-            masked_exp_pkt.set_do_not_care_scapy(scapy.TCP, "chksum")
+            masked_fields += [(scapy.IPv6, "hlim"), (scapy.TCP, "chksum")]
+        return pkt, self.mask_exp_pkt(exp_pkt, masked_fields)
+
+    def check_ipv6_route(self, src_port, dst_ip_addr, dst_port_lists):
+        '''
+        @summary: Check IPv6 route works.
+        @param source_port_index: index of port to use for sending packet to switch
+        @param dest_ip_addr: destination IP to build packet with.
+        @param dst_port_lists: list of ports on which to expect packet to come back from the switch
+        @return Boolean
+        '''
+        pkt, masked_exp_pkt = self.create_ipv6_pkts(src_port, dst_ip_addr)
+        ip_src = pkt['IPv6'].src
+        ip_dst = dst_ip_addr
+        sport = pkt['TCP'].sport
+        dport = pkt['TCP'].dport
 
         send_packet(self, src_port, pkt)
         logging.info('Sent Ether(src={}, dst={})/IPv6(src={}, dst={})/TCP(sport={}, dport={}) on port {}'
@@ -522,28 +567,63 @@ class FibTest(BaseTest):
                 rcvd_port, len_rcvd_pkt))
             logging.info(
                 'Recieved packet with length of {}'.format(len_rcvd_pkt))
-            exp_src_mac = None
-            if len(self.ptf_test_port_map[str(rcvd_port)]["target_src_mac"]) > 1:
-                # active-active dualtor, the packet could be received from either ToR, so use the received
-                # port to find the corresponding ToR
-                for dut_index, port_list in enumerate(dst_port_lists):
-                    if rcvd_port in port_list:
-                        exp_src_mac = self.ptf_test_port_map[str(
-                            rcvd_port)]["target_src_mac"][dut_index]
-            else:
-                exp_src_mac = self.ptf_test_port_map[str(
-                    rcvd_port)]["target_src_mac"][0]
-            actual_src_mac = scapy.Ether(rcvd_pkt).src
-            if exp_src_mac != actual_src_mac:
-                raise Exception(
-                    "Pkt sent from {} to {} on port {} was rcvd pkt on {} which is one of the expected ports, "
-                    "but the src mac doesn't match, expected {}, got {}".
-                    format(ip_src, ip_dst, src_port, rcvd_port, exp_src_mac, actual_src_mac))
-            return (rcvd_port, rcvd_pkt)
+            return self.get_validated_packet(rcvd_port, rcvd_pkt, dst_port_lists, ip_src, ip_dst, src_port)
         elif self.pkt_action == self.ACTION_DROP:
             verify_no_packet_any(self, masked_exp_pkt, dst_ports)
             return (None, None)
 
+    def get_validated_packet(self, rcvd_port, rcvd_pkt, dst_port_lists, ip_src, ip_dst, src_port):
+        '''
+        @summary: Check the src mac of a packet received on one of the expected ports
+        @return (rcvd_port, rcvd_pkt)
+        '''
+        exp_src_mac = None
+        if len(self.ptf_test_port_map[str(rcvd_port)]["target_src_mac"]) > 1:
+            # active-active dualtor, the packet could be received from either ToR, so use the received
+            # port to find the corresponding ToR
+            for dut_index, port_list in enumerate(dst_port_lists):
+                if rcvd_port in port_list:
+                    exp_src_mac = self.ptf_test_port_map[str(
+                        rcvd_port)]["target_src_mac"][dut_index]
+        else:
+            exp_src_mac = self.ptf_test_port_map[str(
+                rcvd_port)]["target_src_mac"][0]
+        actual_src_mac = scapy.Ether(rcvd_pkt).src
+        if exp_src_mac != actual_src_mac:
+            raise Exception(
+                "Pkt sent from {} to {} on port {} was rcvd pkt on {} which is one of the expected ports, "
+                "but the src mac doesn't match, expected {}, got {}".
+                format(ip_src, ip_dst, src_port, rcvd_port, exp_src_mac, actual_src_mac))
+        return (rcvd_port, rcvd_pkt)
+
+    def create_probe_batch(self):
+        return ProbeBatch(self, burst_size=self.batch_size, timeout=self.PTF_TIMEOUT)
+
+    def add_probe(self, batch, src_port, dst_ip_addr, dst_port_lists, ipv4=True):
+        '''
+        @summary: Add the packet of a route check to a batch, see check_ip_route
+        '''
+        if ipv4:
+            pkt, masked_exp_pkt = self.create_ipv4_pkts(src_port, dst_ip_addr)
+            ip_src = pkt['IP'].src
+        else:
+            pkt, masked_exp_pkt = self.create_ipv6_pkts(src_port, dst_ip_addr)
+            ip_src = pkt['IPv6'].src
+        batch.add(src_port, pkt, masked_exp_pkt, itertools.chain(*dst_port_lists),
+                  context=(dst_port_lists, ip_src, dst_ip_addr))
+
+    def run_probe_batch(self, batch):
+        '''
+        @summary: Send the packets of a batch and check them like check_ip_route, without waiting between packets
+        '''
+        if self.pkt_action == self.ACTION_DROP:
+            batch.run(expect_received=False)
+            return
+        for probe in batch.run():
+            dst_port_lists, ip_src, ip_dst = probe.context
+            self.get_validated_packet(probe.rcvd_port, probe.rcvd_pkt, dst_port_lists, ip_src, ip_dst,
+                                      probe.src_port)
+
     def check_within_expected_range(self, actual, expected):
         '''
         @summary: Check if the actual number is within the accepted range of the expected number
@@ -0,0 +1,248 @@
+'''
+Description:    Pipelined send and verify of probe packets for the PTF tests, like fib_test and hash_test.
+
+                All the probe packets are built up front, each one carrying a signature in its innermost
+                payload, then sent in bursts. The packets received on any port are matched back to their
+                probe by the signature and verified against the expected packet of the probe, so the
+                packets in flight do not have to be verified one at a time.
+
+Usage:          batch = ProbeBatch(self, burst_size=128, timeout=30)
+                for dst_ip in dst_ips:
+                    batch.add(src_port, pkt, masked_exp_pkt, exp_ports)
+                batch.run()
+                hit_count_map = batch.hit_count_map()
+'''
+import logging
+import os
+import struct
+import time
+
+from ptf.mask import Mask
+from ptf.testutils import send_packet
+from scapy.packet import NoPayload, Raw
+
+# The signature is the magic, a tag of the batch and the index of the probe in the batch
+SIGNATURE_MAGIC = b'\xb7PRB'
+SIGNATURE_TAG_SIZE = 8
+SIGNATURE_SIZE = 12
+
+
+def stamp_signature(pkt, signature):
+    '''
+    @summary: Write a signature at the beginning of the innermost payload of a packet, keeping its length
+    @param pkt: scapy packet, with a Raw payload at least as long as the signature
+    @param signature: bytes
+    '''
+    payload = None
+    layer = pkt
+    while not isinstance(layer, NoPayload):
+        if isinstance(layer, Raw):
+            payload = layer
+        layer = layer.payload
+    if payload is None or len(payload.load) < len(signature):
+        raise ValueError("No payload of at least {} bytes to sign in packet {}".format(
+            len(signature), pkt.summary()))
+    payload.load = signature + payload.load[len(signature):]
+
+
+class Probe(object):
+    '''
+    @summary: A probe packet of a batch and its result
+    '''
+
+    def __init__(self, index, src_port, pkt, exp_pkt, exp_ports, context=None):
+        self.index = index
+        self.src_port = src_port
+        self.pkt = pkt
+        self.exp_pkt = exp_pkt
+        self.exp_ports = exp_ports
+        self.context = context
+        self.raw = bytes(pkt)
+        self.sent = 0
+        self.rcvd_port = None
+        self.rcvd_pkt = None
+
+        # The expected packet is compared as integers, like Mask.pkt_match compares each byte
+        if isinstance(exp_pkt, Mask):
+            exp_raw = bytes(exp_pkt.exp_pkt)
+            care = bytes(exp_pkt.mask)
+            self.ignore_extra_bytes = exp_pkt.ignore_extra_bytes
+        else:
+            exp_raw = bytes(exp_pkt)
+            care = b'\xff' * len(exp_raw)
+            self.ignore_extra_bytes = False
+        self.size = len(exp_raw)
+        self.care = int.from_bytes(care, 'big')
+        self.value = int.from_bytes(exp_raw, 'big') & self.care
+
+    def match(self, pkt):
+        if len(pkt) < self.size or (len(pkt) != self.size and not self.ignore_extra_bytes):
+            return False
+        return int.from_bytes(pkt[:self.size], 'big') & self.care == self.value
+
+    def __str__(self):
+        return 'probe {} sent on port {} expected on ports {}: {}'.format(
+            self.index, self.src_port, self.exp_ports, self.pkt.summary())
+
+
+class ProbeBatch(object):
+    '''
+    @summary: Send the probe packets in bursts and match the received packets back to the probes
+
+    The number of probes in flight is bounded by the burst size, so the receive queues of the dataplane
+    (the --qlen option of ptf) must hold at least a burst for each port.
+    '''
+    DEFAULT_BURST_SIZE = 128
+    DEFAULT_TIMEOUT = 10
+    DEFAULT_NEGATIVE_TIMEOUT = 1
+    DEFAULT_RETRIES = 1
+    MAX_REPORTED_PROBES = 10
+
+    def __init__(self, test, burst_size=DEFAULT_BURST_SIZE, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES,
+                 negative_timeout=DEFAULT_NEGATIVE_TIMEOUT):
+        '''
+        @param test: the PTF test, sending the packets on its dataplane
+        @param burst_size: number of probes sent at once
+        @param timeout: seconds without any probe received before the probes in flight are given up
+        @param retries: number of times the probes which were not received are sent again
+        @param negative_timeout: seconds to wait for the probes which are expected to be dropped
+        '''
+        self.test = test
+        self.dataplane = test.dataplane
+        self.burst_size = burst_size
+        self.timeout = timeout
+        self.retries = retries
+        self.negative_timeout = negative_timeout
+        self.tag = SIGNATURE_MAGIC + os.urandom(SIGNATURE_TAG_SIZE - len(SIGNATURE_MAGIC))
+        self.probes = []
+        self.duplicates = 0
+        self.unexpected = []
+
+    def add(self, src_port, pkt, exp_pkt, exp_ports, context=None):
+        '''
+        @summary: Sign a probe packet and its expected packet, and add them to the batch
+        @param src_port: port to send the packet on
+        @param pkt: scapy packet to send
+        @param exp_pkt: expected packet, a Mask or a scapy packet, with the same payload as the packet
+        @param exp_ports: list of ports on which the packet is expected
+        @param context: anything the test needs to validate the received packet
+        @return: the Probe
+        '''
+        index = len(self.probes)
+        signature = self.tag + struct.pack('!I', index)
+        stamp_signature(pkt, signature)
+        stamp_signature(exp_pkt.exp_pkt if isinstance(exp_pkt, Mask) else exp_pkt, signature)
+        probe = Probe(index, src_port, pkt, exp_pkt, list(exp_ports), context)
+        self.probes.append(probe)
+        return probe
+
+    def run(self, expect_received=True):
+        '''
+        @summary: Send the probes and verify them
+        @param expect_received: the probes are expected on one of their ports, otherwise they are expected to be
+                                dropped and are sent once
+        @return: the list of probes, with the port and the packet they were received with
+        '''
+        start = time.time()
+        self._collect(set())
+        attempts = 1 + self.retries if expect_received else 1
+        for attempt in range(attempts):
+            pending = [probe for probe in self.probes if probe.rcvd_port is None]
+            if not pending:
+                break
+            if attempt:
+                logging.warning("{} probes were not received, sending them again".format(len(pending)))
+            self._send(pending, self.timeout if expect_received else self.negative_timeout, expect_received)
+        elapsed = time.time() - start
+        received = [probe for probe in self.probes if probe.rcvd_port is not None]
+        logging.info("Sent {} probes, {} received in {:.2f}s, {} duplicates, {} unexpected".format(
+            len(self.probes), len(received), elapsed, self.duplicates, len(self.unexpected)))
+        for probe, port, _ in self.unexpected[:self.MAX_REPORTED_PROBES]:
+            logging.warning("Unexpected packet on port {} for {}".format(port, probe))
+
+        if expect_received:
+            missing = [probe for probe in self.probes if probe.rcvd_port is None]
+            if missing:
+                raise AssertionError("{} of {} probes were not received on their expected ports, {}".format(
+                    len(missing), len(self.probes),
+                    "; ".join(str(probe) for probe in missing[:self.MAX_REPORTED_PROBES])))
+        elif received:
+            raise AssertionError("{} of {} probes were received while expected to be dropped, {}".format(
+                len(received), len(self.probes),
+                "; ".join("{} received on port {}".format(probe, probe.rcvd_port)
+                          for probe in received[:self.MAX_REPORTED_PROBES])))
+        return self.probes
+
+    def hit_count_map(self):
+        '''
+        @summary: Number of probes received on each port
+        '''
+        hit_count_map = {}
+        for probe in self.probes:
+            if probe.rcvd_port is not None:
+                hit_count_map[probe.rcvd_port] = hit_count_map.get(probe.rcvd_port, 0) + 1
+        return hit_count_map
+
+    def _send(self, probes, timeout, bounded):
+        in_flight = set()
+        for start in range(0, len(probes), self.burst_size):
+            if bounded:
+                # Bound the probes in flight, so the receive queues of the dataplane do not overflow
+                self._wait(in_flight, self.burst_size, timeout)
+            for probe in probes[start:start + self.burst_size]:
+                send_packet(self.test, probe.src_port, probe.raw)
+                probe.sent += 1
+                in_flight.add(probe.index)
+            self._collect(in_flight)
+        self._wait(in_flight, 0, timeout)
+
+    def _wait(self, in_flight, limit, timeout):
+        deadline = time.time() + timeout
+        while len(in_flight) > limit:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                # Lost probes, they are sent again by the next attempt
+                in_flight.clear()
+                return
+            if self._collect(in_flight, remaining):
+                deadline = time.time() + timeout
+
+    def _collect(self, in_flight, timeout=0):
+        '''
+        @summary: Take the packets from the receive queues of the dataplane and match them to the probes
+        @return: number of probe packets received
+        '''
+        received = []
+        with self.dataplane.cvar:
+            if timeout and not any(self.dataplane.packet_queues.values()):
+                self.dataplane.cvar.wait(timeout)
+            for (_, port), queue in self.dataplane.packet_queues.items():
+                if queue:
+                    received.extend((port, pkt) for pkt, _ in queue)
+                    del queue[:]
+
+        count = 0
+        for port, pkt in received:
+            probe = self._find_probe(pkt)
+            # The sockets of the ports may capture the packets sent on them
+            if probe is None or (port == probe.src_port and pkt == probe.raw):
+                continue
+            count += 1
+            in_flight.discard(probe.index)
+            if probe.rcvd_port is not None:
+                self.duplicates += 1
+            elif port in probe.exp_ports and probe.match(pkt):
+                probe.rcvd_port = port
+                probe.rcvd_pkt = pkt
+            else:
+                self.unexpected.append((probe, port, pkt))
+        return count
+
+    def _find_probe(self, pkt):
+        offset = pkt.find(self.tag)
+        if offset < 0 or offset + SIGNATURE_SIZE > len(pkt):
+            return None
+        index = struct.unpack_from('!I', pkt, offset + SIGNATURE_TAG_SIZE)[0]
+        if index >= len(self.probes):
+            return None
+        return self.probes[index]
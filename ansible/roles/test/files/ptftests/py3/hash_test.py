@@ -32,6 +32,7 @@ from ptf.testutils import simple_nvgre_packet
 import fib
 import lpm
 import macsec  # noqa F401
+from probe_batch import ProbeBatch
 
 
 class HashTest(BaseTest):
@@ -114,6 +115,10 @@ class HashTest(BaseTest):
         self.base_mac = self.dataplane.get_mac(
             *random.choice(list(self.dataplane.ports.keys())))
         self.vxlan_dest_port = int(self.test_params.get('vxlan_dest_port', 0))
+        # batch_mode sends the packets of a hash key in bursts and matches the received packets by a signature
+        # in their payload, instead of one packet at a time. It is used by check_hash of HashTest.
+        self.batch_mode = self.test_params.get('batch_mode', False)
+        self.batch_size = self.test_params.get('batch_size', ProbeBatch.DEFAULT_BURST_SIZE)
 
     def _get_nexthops(self, src_port, dst_ip):
         active_dut_indexes = [0]
@@ -217,6 +222,16 @@ class HashTest(BaseTest):
             # in the hit count map.
             assert len(hit_count_map.keys()) == len(
                 self.ptf_test_port_map[str(ingress_port)]["target_dut"])
+        elif self.batch_mode:
+            logging.info('Checking hash key {} in batch mode, src_port={}, exp_ports={}, dst_ip={}'
+                         .format(hash_key, src_port, exp_port_lists, dst_ip))
+            hit_count_map = self.check_ip_routes_in_batch(
+                hash_key, src_port, dst_ip, exp_port_lists,
+                self.balancing_test_times * len(list(itertools.chain(*exp_port_lists))))
+            logging.info("hash_key={}, hit count map: {}".format(
+                hash_key, hit_count_map))
+            for next_hop in next_hops:
+                self.check_balancing(next_hop.get_next_hop(), hit_count_map, src_port, hash_key)
         else:
             for _ in range(0, self.balancing_test_times * len(list(itertools.chain(*exp_port_lists)))):
                 logging.info('Checking hash key {}, src_port={}, exp_ports={}, dst_ip={}'
@@ -243,6 +258,24 @@ class HashTest(BaseTest):
         time.sleep(0.02)
         return (matched_port, received)
 
+    def check_ip_routes_in_batch(self, hash_key, src_port, dst_ip, dst_port_lists, count):
+        '''
+        @summary: Check count packets like check_ip_route, sent in bursts without waiting between packets
+        @return: a dict that records the number of packets each port received
+        '''
+        batch = ProbeBatch(self, burst_size=self.batch_size)
+        if ip_network(six.text_type(dst_ip)).version == 4:
+            create_pkts = self.create_ipv4_pkts
+        else:
+            create_pkts = self.create_ipv6_pkts
+        for _ in range(count):
+            pkt, masked_exp_pkt, _, ip_src, ip_dst = create_pkts(hash_key, src_port)
+            batch.add(src_port, pkt, masked_exp_pkt, itertools.chain(*dst_port_lists), context=(ip_src, ip_dst))
+        for probe in batch.run():
+            ip_src, ip_dst = probe.context
+            self.get_validated_packet(probe.rcvd_port, probe.rcvd_pkt, dst_port_lists, ip_src, ip_dst, src_port)
+        return batch.hit_count_map()
+
     def _get_ip_proto(self, ipv6=False):
         # ip_proto 2 is IGMP, should not be forwarded by router
         # ip_proto 4, 41 and 47 are encapsulation protocol, ip payload will be malformat
@@ -397,12 +430,11 @@ class HashTest(BaseTest):
                 pkt['IPv6'].nh = ip_proto
                 exp_pkt['IPv6'].nh = ip_proto
 
-    def check_ipv4_route(self, hash_key, src_port, dst_port_lists, outer_sport=None, outer_dst_ip=None,
-                         outer_src_ip=None):
+    def create_ipv4_pkts(self, hash_key, src_port, outer_sport=None, outer_dst_ip=None, outer_src_ip=None):
         '''
-        @summary: Check IPv4 route works.
+        @summary: Create an IPv4 packet with the field of the hash key randomized, and its masked expected packet.
+        @return: (pkt, masked_exp_pkt, logs, ip_src, ip_dst)
         '''
-        class_name = self.__class__.__name__
         ip_src = self.src_ip_interval.get_random_ip(
         ) if hash_key == 'src-ip' else self.src_ip_interval.get_first_ip()
         ip_dst = self.dst_ip_interval.get_random_ip(
@@ -451,6 +483,16 @@ class HashTest(BaseTest):
             ip_dst=ip_dst,
             ip_proto=ip_proto
         )
+        return pkt, masked_exp_pkt, logs, ip_src, ip_dst
+
+    def check_ipv4_route(self, hash_key, src_port, dst_port_lists, outer_sport=None, outer_dst_ip=None,
+                         outer_src_ip=None):
+        '''
+        @summary: Check IPv4 route works.
+        '''
+        class_name = self.__class__.__name__
+        pkt, masked_exp_pkt, logs, ip_src, ip_dst = self.create_ipv4_pkts(
+            hash_key, src_port, outer_sport=outer_sport, outer_dst_ip=outer_dst_ip, outer_src_ip=outer_src_ip)
         if class_name == 'HashTest':
             rcvd_port, rcvd_pkt = retry_call(
                 self.send_and_verify_packets,
@@ -462,11 +504,11 @@ class HashTest(BaseTest):
             rcvd_port, rcvd_pkt = self.send_and_verify_packets(src_port, pkt, masked_exp_pkt, dst_port_lists, logs=logs)
         return self.get_validated_packet(rcvd_port, rcvd_pkt, dst_port_lists, ip_src, ip_dst, src_port)
 
-    def check_ipv6_route(self, hash_key, src_port, dst_port_lists, outer_src_ip=None, outer_dst_ip=None):
+    def create_ipv6_pkts(self, hash_key, src_port, outer_src_ip=None, outer_dst_ip=None):
         '''
-        @summary: Check IPv6 route works.
+        @summary: Create an IPv6 packet with the field of the hash key randomized, and its masked expected packet.
+        @return: (pkt, masked_exp_pkt, logs, ip_src, ip_dst)
         '''
-        class_name = self.__class__.__name__
         ip_src = self.src_ip_interval.get_random_ip(
         ) if hash_key == 'src-ip' else self.src_ip_interval.get_first_ip()
         ip_dst = self.dst_ip_interval.get_random_ip(
@@ -517,6 +559,15 @@ class HashTest(BaseTest):
             ip_proto=ip_proto,
             version='IPv6'
         )
+        return pkt, masked_exp_pkt, logs, ip_src, ip_dst
+
+    def check_ipv6_route(self, hash_key, src_port, dst_port_lists, outer_src_ip=None, outer_dst_ip=None):
+        '''
+        @summary: Check IPv6 route works.
+        '''
+        class_name = self.__class__.__name__
+        pkt, masked_exp_pkt, logs, ip_src, ip_dst = self.create_ipv6_pkts(
+            hash_key, src_port, outer_src_ip=outer_src_ip, outer_dst_ip=outer_dst_ip)
         if class_name == 'HashTest':
             rcvd_port, rcvd_pkt = retry_call(
                 self.send_and_verify_packets,
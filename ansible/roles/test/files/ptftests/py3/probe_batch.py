@@ -0,0 +1 @@
+../probe_batch.py
\ No newline at end of file
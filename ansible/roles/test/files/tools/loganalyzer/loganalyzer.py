@@ -25,6 +25,11 @@ Usage:          Examples of how to use log analyzer
 
 import sys
 import getopt
+import hashlib
+import io
+import json
+import locale
+import mmap
 import re
 import os
 import os.path
@@ -34,6 +39,13 @@ import logging
 import logging.handlers
 from datetime import datetime
 
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:
+    import sre_parse
+    import sre_constants
+
 # ---------------------------------------------------------------------
 # Global variables
 # ---------------------------------------------------------------------
@@ -50,12 +62,313 @@ err_invalid_string_format = -5
 err_invalid_input = -6
 err_end_ignore_marker = -7
 err_start_ignore_marker = -8
+err_no_rules_file = -9
+
+# Number of bytes at the head of a log file recorded in the marker state file. They
+# identify the log file after it was rotated and compressed.
+MARKER_STATE_HEAD_SIZE = 4096
+# Maximum number of markers kept in the marker state file
+MARKER_STATE_MAX_MARKERS = 64
 
 # -- Max log message length
 # The default maximum length of a single log message. Any line longer than MAX_LOG_MESSAGE_LENGTH
 # will not be picked up by the analyzer.
 MAX_LOG_MESSAGE_LENGTH = 1000
 
+# Size of the blocks read by the streaming analyzer. Only the lines inside the analysis
+# range are read and decoded, one block at a time, so memory use does not depend on file size.
+STREAM_BLOCK_SIZE = 1024 * 1024
+
+
+class ByteRangeReader(io.RawIOBase):
+    '''
+    @summary: Raw reader which exposes the [start, end) byte range of an open binary file.
+
+    Used to stream a single analysis range of a log file through io.TextIOWrapper, which
+    provides the same universal newline and decoding behavior as open(log_file_path, 'r').
+    '''
+
+    def __init__(self, raw_file, start, end):
+        self.raw_file = raw_file
+        self.position = start
+        self.end = end
+
+    def readable(self):
+        return True
+
+    def readinto(self, buf):
+        size = min(len(buf), self.end - self.position)
+        if size <= 0:
+            return 0
+        self.raw_file.seek(self.position)
+        data = self.raw_file.read(size)
+        buf[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+# Required literals shorter than this are not selective enough to be used by the prefilter,
+# rules without a longer literal are run on every line.
+MIN_PREFILTER_LITERAL_LENGTH = 3
+
+# Repeat and group opcodes which are not available in all python versions
+REPEAT_OPCODES = [getattr(sre_constants, name) for name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT')
+                  if hasattr(sre_constants, name)]
+ATOMIC_GROUP_OPCODE = getattr(sre_constants, 'ATOMIC_GROUP', None)
+
+
+class MessageClassifier:
+    '''
+    @summary: Single pass classifier for the match, ignore and expect rule sets.
+
+    Every rule is compiled on its own. From every rule a set of literal strings is extracted,
+    at least one of which is present in any line the rule can match. All literals are combined
+    into a single trie shaped regular expression (the prefilter), which reports every literal
+    present in a line in one scan, in the spirit of Aho-Corasick. Only the rules whose literals
+    were found, and the rules without a usable literal, are then run on the line.
+
+    The classifier counts hits per rule, so the expected messages which were not found are
+    a lookup (get_unused_expect_regexes) instead of another search over the expected lines.
+    '''
+
+    MATCH = 'match'
+    IGNORE = 'ignore'
+    EXPECT = 'expect'
+
+    def __init__(self, match_regexes, ignore_regexes, expect_regexes, expect_match_start=False):
+        '''
+        @param match_regexes: List of regular expressions of messages to be reported.
+        @param ignore_regexes: List of regular expressions of messages to be ignored.
+        @param expect_regexes: List of regular expressions of messages expected in the log.
+        @param expect_match_start: Expect rules have to match at the beginning of the line,
+            see AnsibleLogAnalyzer.line_is_expected().
+        '''
+        self.expect_match_start = expect_match_start
+        self.regexes = {
+            self.MATCH: list(match_regexes or []),
+            self.IGNORE: list(ignore_regexes or []),
+            self.EXPECT: list(expect_regexes or []),
+        }
+        self.hit_counts = dict((kind, [0] * len(regexes)) for kind, regexes in self.regexes.items())
+        self.search_regexes = dict((kind, [self.compile_for_search(regex) for regex in regexes])
+                                   for kind, regexes in self.regexes.items())
+        self.match_start_regexes = [re.compile(regex) for regex in self.regexes[self.EXPECT]]
+
+        # -- literal -> set of (kind, rule id) of the rules requiring it
+        literal_rules = {}
+        self.always_rules = dict((kind, set()) for kind in self.regexes)
+        for kind, regexes in self.regexes.items():
+            for rule_id, regex in enumerate(regexes):
+                literals = self.get_required_literals(regex)
+                if not literals:
+                    self.always_rules[kind].add(rule_id)
+                    continue
+                for literal in literals:
+                    literal_rules.setdefault(literal, set()).add((kind, rule_id))
+
+        # -- The prefilter reports the longest literal starting at each position, so a found
+        # -- literal also selects the rules of all literals it contains.
+        self.prefilter_rules = {}
+        for literal in literal_rules:
+            rules = dict((kind, set()) for kind in self.regexes)
+            for other, other_rules in literal_rules.items():
+                if other in literal:
+                    for kind, rule_id in other_rules:
+                        rules[kind].add(rule_id)
+            self.prefilter_rules[literal] = rules
+
+        if literal_rules:
+            self.prefilter = re.compile('(?=(%s))' % self.build_trie_regex(literal_rules))
+        else:
+            self.prefilter = None
+    # ---------------------------------------------------------------------
+
+    @staticmethod
+    def compile_for_search(regex):
+        '''
+        @summary: Compile regex to be used with search().
+
+        A leading '.*' never changes whether search() finds a match, but makes every attempt
+        scan to the end of the line, so it is dropped.
+        '''
+        stripped = regex
+        if regex.startswith('.*?'):
+            stripped = regex[3:]
+        elif regex.startswith('.*') and not regex.startswith('.*+'):
+            stripped = regex[2:]
+
+        if stripped != regex:
+            try:
+                return re.compile(stripped)
+            except re.error:
+                pass
+        return re.compile(regex)
+    # ---------------------------------------------------------------------
+
+    @staticmethod
+    def best_requirement(requirements):
+        '''
+        @summary: Pick the most selective requirement, the one with the longest shortest literal.
+        @return: List of literals or None if no requirement is selective enough.
+        '''
+        best = None
+        for literals in requirements:
+            if min(len(literal) for literal in literals) < MIN_PREFILTER_LITERAL_LENGTH:
+                continue
+            if best is None or min(len(literal) for literal in literals) > min(len(literal) for literal in best):
+                best = literals
+        return best
+    # ---------------------------------------------------------------------
+
+    @staticmethod
+    def collect_requirements(items):
+        '''
+        @summary: Collect the requirements of a parsed regular expression.
+        @return: List of requirements, each one is a list of literals at least one of
+                 which is present in any string matched by the expression.
+        '''
+        requirements = []
+        run = []
+        for op, av in items:
+            if op == sre_constants.LITERAL:
+                run.append(chr(av))
+                continue
+
+            if run:
+                requirements.append([''.join(run)])
+                run = []
+
+            if op == sre_constants.SUBPATTERN:
+                add_flags = av[1] if len(av) == 4 else 0
+                if not add_flags & sre_constants.SRE_FLAG_IGNORECASE:
+                    requirements.extend(MessageClassifier.collect_requirements(av[-1]))
+            elif op in REPEAT_OPCODES and av[0] >= 1:
+                requirements.extend(MessageClassifier.collect_requirements(av[2]))
+            elif ATOMIC_GROUP_OPCODE is not None and op == ATOMIC_GROUP_OPCODE:
+                requirements.extend(MessageClassifier.collect_requirements(av))
+            elif op == sre_constants.BRANCH:
+                alternatives = []
+                for branch in av[1]:
+                    best = MessageClassifier.best_requirement(MessageClassifier.collect_requirements(branch))
+                    if best is None:
+                        alternatives = None
+                        break
+                    alternatives.extend(best)
+                if alternatives:
+                    requirements.append(alternatives)
+
+        if run:
+            requirements.append([''.join(run)])
+        return requirements
+    # ---------------------------------------------------------------------
+
+    @staticmethod
+    def get_required_literals(regex):
+        '''
+        @summary: Find literals, at least one of which is present in any line matched by regex.
+        @return: List of literals, or None if the rule has to be run on every line.
+        '''
+        try:
+            parsed = sre_parse.parse(regex)
+        except Exception:
+            return None
+
+        state = getattr(parsed, 'state', None) or getattr(parsed, 'pattern', None)
+        if state is None or state.flags & sre_constants.SRE_FLAG_IGNORECASE:
+            return None
+
+        best = MessageClassifier.best_requirement(MessageClassifier.collect_requirements(parsed))
+        return sorted(set(best)) if best else None
+    # ---------------------------------------------------------------------
+
+    @staticmethod
+    def build_trie_regex(literals):
+        '''
+        @summary: Build a regular expression matching any of the literals, factored as a trie.
+                  Alternatives are tried longest first, so the longest literal starting at a
+                  position is the one reported.
+        '''
+        trie = {}
+        for literal in literals:
+            node = trie
+            for char in literal:
+                node = node.setdefault(char, {})
+            node[''] = True
+
+        def build(node):
+            alternatives = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char != '']
+            if not alternatives:
+                return ''
+            if len(alternatives) == 1:
+                pattern = alternatives[0]
+            else:
+                pattern = '(?:%s)' % '|'.join(alternatives)
+            if '' in node:
+                pattern = '(?:%s)?' % pattern
+            return pattern
+
+        return build(trie)
+    # ---------------------------------------------------------------------
+
+    def search_rules(self, kind, line, candidates):
+        '''
+        @summary: Run the candidate rules of given kind on line.
+        @return: Sorted list of IDs of the rules found in line.
+        '''
+        regexes = self.search_regexes[kind]
+        return [rule_id for rule_id in sorted(candidates[kind]) if regexes[rule_id].search(line)]
+    # ---------------------------------------------------------------------
+
+    def count_hits(self, kind, rule_ids):
+        hit_counts = self.hit_counts[kind]
+        for rule_id in rule_ids:
+            hit_counts[rule_id] += 1
+    # ---------------------------------------------------------------------
+
+    def classify(self, line):
+        '''
+        @summary: Classify a log line against the expect, match and ignore rules.
+
+        The rule sets are checked in the order used by the analyzer: a line with expect rule
+        hits is an expected line and is not checked further, ignore rules are only checked
+        for lines with match rule hits. Hit counts are updated for the returned rules.
+
+        @param line: Log line to classify.
+
+        @return: Tuple (expect_ids, match_ids, ignore_ids) of lists of IDs (indexes in the
+                 corresponding regex lists) of the rules found in the line.
+        '''
+        candidates = dict((kind, set(rule_ids)) for kind, rule_ids in self.always_rules.items())
+        if self.prefilter is not None:
+            for literal in set(self.prefilter.findall(line)):
+                for kind, rule_ids in self.prefilter_rules[literal].items():
+                    candidates[kind].update(rule_ids)
+
+        expect_ids = self.search_rules(self.EXPECT, line, candidates)
+        if expect_ids and self.expect_match_start:
+            if not any(self.match_start_regexes[rule_id].match(line) for rule_id in expect_ids):
+                expect_ids = []
+        if expect_ids:
+            self.count_hits(self.EXPECT, expect_ids)
+            return expect_ids, [], []
+
+        match_ids = self.search_rules(self.MATCH, line, candidates)
+        if not match_ids:
+            return [], [], []
+        self.count_hits(self.MATCH, match_ids)
+
+        ignore_ids = self.search_rules(self.IGNORE, line, candidates)
+        self.count_hits(self.IGNORE, ignore_ids)
+        return [], match_ids, ignore_ids
+    # ---------------------------------------------------------------------
+
+    def get_unused_expect_regexes(self):
+        '''
+        @summary: Get the expect rules which were not found in any expected line.
+        '''
+        return [regex for regex, hits in zip(self.regexes[self.EXPECT], self.hit_counts[self.EXPECT]) if not hits]
+    # ---------------------------------------------------------------------
+
 
 class AnsibleLogAnalyzer:
     '''
@@ -98,10 +411,14 @@ class AnsibleLogAnalyzer:
         return logger
     # ---------------------------------------------------------------------
 
-    def __init__(self, run_id, verbose, start_marker=None):
+    def __init__(self, run_id, verbose, start_marker=None, streaming=True, state_file=None):
         self.run_id = run_id
         self.verbose = verbose
         self.start_marker = start_marker
+        # -- File to record marker positions in, used by the extract_log module
+        self.state_file = state_file
+        # -- Use analyze_file_streaming() instead of reading the whole file into memory
+        self.streaming = streaming
     # ---------------------------------------------------------------------
 
     def print_diagnostic_message(self, message):
@@ -248,6 +565,50 @@ class AnsibleLogAnalyzer:
 
         return False
 
+    def record_marker_position(self, log_file, marker):
+        '''
+        @summary: Record the position of a marker which is about to be placed into log file.
+
+        The current size of the log file is recorded with its inode and a checksum of its head.
+        The marker is written at or after this offset, so the extract_log module can seek to it
+        instead of scanning all the rotated log files. The head checksum identifies the file
+        after it was rotated and compressed.
+
+        @param log_file: Path of the log file the marker is placed into.
+        @param marker:   Marker to be placed into log file.
+        '''
+        if not os.path.isfile(log_file):
+            return
+
+        with open(log_file, 'rb') as f:
+            file_stat = os.fstat(f.fileno())
+            head_size = min(file_stat.st_size, MARKER_STATE_HEAD_SIZE)
+            head_md5 = hashlib.md5(f.read(head_size)).hexdigest()
+
+        state = {}
+        if os.path.isfile(self.state_file):
+            try:
+                with open(self.state_file) as f:
+                    state = json.load(f)
+            except (IOError, ValueError):
+                state = None
+            # -- A corrupted state file is reset, like the extract_log module ignores it
+            if not isinstance(state, dict) or not all(isinstance(positions, dict) for positions in state.values()):
+                self.print_diagnostic_message('Ignore corrupted state file {}'.format(self.state_file))
+                state = {}
+
+        positions = state.pop(marker, {})
+        positions[log_file] = {'inode': file_stat.st_ino, 'offset': file_stat.st_size,
+                               'head_size': head_size, 'head_md5': head_md5}
+        # -- Keep the most recent markers only, the last one is the newest
+        state = dict(list(state.items())[-(MARKER_STATE_MAX_MARKERS - 1):])
+        state[marker] = positions
+
+        tmp_state_file = self.state_file + '.tmp'
+        with open(tmp_state_file, 'w') as f:
+            json.dump(state, f)
+        os.rename(tmp_state_file, self.state_file)
+
     def place_marker(self, log_file_list, marker, wait_for_marker=False):
         '''
         @summary: Place marker into '/dev/log' and each log file specified.
@@ -256,8 +617,12 @@ class AnsibleLogAnalyzer:
         '''
 
         for log_file in log_file_list:
+            if self.state_file:
+                self.record_marker_position(log_file, marker)
             self.place_marker_to_file(log_file, marker)
 
+        if self.state_file:
+            self.record_marker_position(system_log_file, marker)
         self.place_marker_to_syslog(marker)
         if wait_for_marker:
             if self.wait_for_marker(marker) is False:
@@ -418,6 +783,15 @@ class AnsibleLogAnalyzer:
 
         return ret_code
 
+    def create_classifier(self, match_messages, ignore_messages, expect_messages):
+        '''
+        @summary: Create a MessageClassifier for the lists of regular expressions, with the same
+                  expect matching rules as line_is_expected().
+        '''
+        return MessageClassifier(match_messages, ignore_messages, expect_messages,
+                                 expect_match_start=self.run_id.startswith("test_advanced_reboot_test_"))
+    # ---------------------------------------------------------------------
+
     def analyze_file(self, log_file_path, match_messages_regex, ignore_messages_regex, expect_messages_regex,
                      maximum_log_length=None):
         '''
@@ -543,8 +917,215 @@ class AnsibleLogAnalyzer:
         return matching_lines, expected_lines
     # ---------------------------------------------------------------------
 
+    def find_line_end(self, log_map, pos):
+        '''
+        @summary: Find the end offset of the line containing byte offset pos.
+                  The returned offset includes the line terminator ('\\n', '\\r' or '\\r\\n').
+        '''
+        ends = [end for end in (log_map.find(b'\n', pos), log_map.find(b'\r', pos)) if end != -1]
+        if not ends:
+            return len(log_map)
+
+        end = min(ends)
+        if log_map[end:end + 2] == b'\r\n':
+            return end + 2
+        return end + 1
+    # ---------------------------------------------------------------------
+
+    def build_marker_index(self, log_map, markers, encoding):
+        '''
+        @summary: Build a byte-offset index of the lines containing any of the markers.
+
+        @param log_map: mmap (or bytes) object with the content of the log file.
+
+        @param markers: List of marker strings to look for.
+
+        @param encoding: Encoding of the log file.
+
+        @return: Sorted list of (line_start, line_end) byte offsets of the marker lines.
+        '''
+        marker_lines = {}
+        for marker in markers:
+            needle = marker.encode(encoding)
+            pos = log_map.find(needle)
+            while pos != -1:
+                line_start = max(log_map.rfind(b'\n', 0, pos), log_map.rfind(b'\r', 0, pos)) + 1
+                if line_start not in marker_lines:
+                    marker_lines[line_start] = self.find_line_end(log_map, pos)
+                pos = log_map.find(needle, marker_lines[line_start])
+
+        return sorted(marker_lines.items())
+    # ---------------------------------------------------------------------
+
+    def get_analysis_ranges(self, log_map, check_marker, encoding):
+        '''
+        @summary: Find the byte ranges of the log file which have to be analyzed.
+
+        The marker lines are replayed from the end of the file to the beginning with the same
+        rules (and the same errors) as analyze_file(), so the ranges cover exactly the lines
+        analyze_file() would classify.
+
+        @param log_map: mmap (or bytes) object with the content of the log file.
+
+        @param check_marker: Whether the default start/end markers are required for this file.
+
+        @param encoding: Encoding of the log file.
+
+        @return: List of (start, end) byte offsets, ordered from the beginning of the file.
+        '''
+        in_analysis_range = not check_marker
+        found_start_marker = False
+        found_end_marker = False
+        start_marker = self.create_start_marker()
+        end_marker = self.create_end_marker()
+
+        markers = [end_marker, self.end_ignore_marker_prefix, self.start_ignore_marker_prefix, start_marker]
+        marker_lines = self.build_marker_index(log_map, markers, encoding)
+
+        ranges = []
+        range_end = len(log_map)
+        ignore_marker_run_ids = []
+        reached_start_marker = False
+        for line_start, line_end in reversed(marker_lines):
+            # -- Same newline translation as reading the file in text mode
+            rev_line = log_map[line_start:line_end].decode(encoding)
+            rev_line = rev_line.replace('\r\n', '\n').replace('\r', '\n')
+
+            if end_marker in rev_line:
+                self.print_diagnostic_message(
+                    'found end marker: %s' % end_marker)
+                if (found_end_marker):
+                    print('ERROR: duplicate end marker found')
+                    sys.exit(err_duplicate_end_marker)
+                found_end_marker = True
+                next_in_analysis_range = True
+            elif self.end_ignore_marker_prefix in rev_line:
+                marker_run_id = rev_line.split(
+                    self.end_ignore_marker_prefix)[1]
+                ignore_marker_run_ids.append(marker_run_id)
+                self.print_diagnostic_message('found end ignore marker: %s'
+                                              % rev_line[rev_line.index(self.end_ignore_marker_prefix):])
+                if not in_analysis_range:
+                    print('ERROR: duplicate end ignore marker found')
+                    sys.exit(err_end_ignore_marker)
+                next_in_analysis_range = False
+            elif self.start_ignore_marker_prefix in rev_line:
+                marker_run_id = ignore_marker_run_ids.pop()
+                self.print_diagnostic_message('found start ignore marker: %s'
+                                              % rev_line[rev_line.index(self.start_ignore_marker_prefix):])
+                if in_analysis_range or marker_run_id not in rev_line:
+                    print('ERROR: unexpected start ignore marker found')
+                    sys.exit(err_start_ignore_marker)
+                next_in_analysis_range = True
+            elif rev_line.find(start_marker) != -1 and 'extract_log' not in rev_line:
+                self.print_diagnostic_message(
+                    'found start marker: %s' % start_marker)
+                found_start_marker = True
+
+                if (not in_analysis_range):
+                    print(
+                        ('ERROR: found start marker:%s without corresponding end marker' % rev_line))
+                    sys.exit(err_no_end_marker)
+                reached_start_marker = True
+                next_in_analysis_range = False
+            else:
+                # -- Not a marker line (e.g. start marker logged by extract_log), analyzed as usual
+                continue
+
+            if in_analysis_range and line_end < range_end:
+                ranges.append((line_end, range_end))
+            range_end = line_start
+            in_analysis_range = next_in_analysis_range
+            if reached_start_marker:
+                break
+
+        if in_analysis_range and range_end > 0:
+            ranges.append((0, range_end))
+
+        # care about the markers only if no need to check start marker
+        if check_marker:
+            if (not found_start_marker):
+                print('ERROR: start marker was not found')
+                sys.exit(err_no_start_marker)
+
+            if (not found_end_marker):
+                print('ERROR: end marker was not found')
+                sys.exit(err_no_end_marker)
+
+        ranges.reverse()
+        return ranges
+    # ---------------------------------------------------------------------
+
+    def analyze_file_streaming(self, log_file_path, match_messages_regex, ignore_messages_regex,
+                               expect_messages_regex, maximum_log_length=None, classifier=None):
+        '''
+        @summary: Streaming version of analyze_file().
+
+        Instead of reading the whole file into memory and walking it backwards, the file is
+        mapped and the marker lines are located with a byte-offset index. Only the lines inside
+        the analysis range are then read forward, in blocks of STREAM_BLOCK_SIZE bytes, and
+        classified. Memory use is bounded by the block size and the number of reported lines.
+
+        Parameters and return value are the same as for analyze_file(), including the order
+        of the returned lists (last line first).
+
+        @param classifier: MessageClassifier instance, if given it is used to classify the lines
+            instead of the match/ignore/expect regular expressions.
+        '''
+
+        self.print_diagnostic_message('analyzing file: %s' % log_file_path)
+
+        check_marker = self.require_marker_check(log_file_path)
+        if maximum_log_length is None:
+            maximum_log_length = MAX_LOG_MESSAGE_LENGTH
+        matching_lines = []
+        expected_lines = []
+
+        def classify(lines):
+            for line in lines:
+                # Skip long logs in sairedis recording, see analyze_file()
+                if not check_marker and len(line) > maximum_log_length:
+                    continue
+
+                if classifier is not None:
+                    expect_ids, match_ids, ignore_ids = classifier.classify(line)
+                    if expect_ids:
+                        expected_lines.append(line)
+                    elif match_ids and not ignore_ids:
+                        self.print_diagnostic_message('matching line: %s' % line)
+                        matching_lines.append(line)
+
+                elif self.line_is_expected(line, expect_messages_regex):
+                    expected_lines.append(line)
+
+                elif self.line_matches(line, match_messages_regex, ignore_messages_regex):
+                    matching_lines.append(line)
+
+        if self.is_filename_stdin(log_file_path):
+            classify(sys.stdin)
+        else:
+            encoding = locale.getpreferredencoding(False)
+            with open(log_file_path, 'rb') as raw_file:
+                if os.fstat(raw_file.fileno()).st_size == 0:
+                    ranges = self.get_analysis_ranges(b'', check_marker, encoding)
+                else:
+                    log_map = mmap.mmap(raw_file.fileno(), 0, access=mmap.ACCESS_READ)
+                    try:
+                        ranges = self.get_analysis_ranges(log_map, check_marker, encoding)
+                    finally:
+                        log_map.close()
+
+                for start, end in ranges:
+                    reader = io.BufferedReader(ByteRangeReader(raw_file, start, end), STREAM_BLOCK_SIZE)
+                    classify(io.TextIOWrapper(reader, encoding=encoding))
+
+        matching_lines.reverse()
+        expected_lines.reverse()
+        return matching_lines, expected_lines
+    # ---------------------------------------------------------------------
+
     def analyze_file_list(self, log_file_list, match_messages_regex, ignore_messages_regex, expect_messages_regex,
-                          maximum_log_length=None):
+                          maximum_log_length=None, classifier=None):
         '''
         @summary: Analyze input files messages matching input regex expressions.
             See line_matches() for details on matching criteria.
@@ -563,6 +1144,10 @@ class AnsibleLogAnalyzer:
         @param maximum_log_length
             The maximum length of the log message. If the length of the log message is greater than this value,
 
+        @param classifier:
+            MessageClassifier instance to classify the lines with, instead of the regex class instances.
+            Requires the streaming analyzer.
+
         @return: Returns map <file_name, list_of_matching_strings>
         '''
         res = {}
@@ -570,9 +1155,14 @@ class AnsibleLogAnalyzer:
         for log_file in log_file_list:
             if not len(log_file):
                 continue
-            match_strings, expect_strings = self.analyze_file(log_file, match_messages_regex, ignore_messages_regex,
-                                                              expect_messages_regex,
-                                                              maximum_log_length=maximum_log_length)
+            if self.streaming or classifier is not None:
+                match_strings, expect_strings = self.analyze_file_streaming(
+                    log_file, match_messages_regex, ignore_messages_regex, expect_messages_regex,
+                    maximum_log_length=maximum_log_length, classifier=classifier)
+            else:
+                match_strings, expect_strings = self.analyze_file(log_file, match_messages_regex,
+                                                                  ignore_messages_regex, expect_messages_regex,
+                                                                  maximum_log_length=maximum_log_length)
 
             match_strings.reverse()
             expect_strings.reverse()
@@ -609,11 +1199,20 @@ def usage():
     print('                                 All the strings from these files will be expected to present')
     print('                                 in one of specified log files during the analysis. Must be present')
     print('                                 when action == analyze.')
+    print('--rules_file path                JSON file with "match", "ignore" and "expect" lists of regular')
+    print('                                 expressions. Must be present when action == analyze_extracted.')
+    print('                                 analyze_extracted - analyze files specified in --logs, which were')
+    print('                                 already bounded by markers, and print the result as JSON.')
+    print('--max_log_length length          Maximum length of analyzed messages in files without default markers.')
+    print('--state_file path                File to record the positions of placed markers in, used by the')
+    print('                                 extract_log module to seek straight to the start marker.')
+    print('--no_streaming                   Read the whole log files into memory and match the lines with the')
+    print('                                 combined regular expressions, instead of the streaming classifier.')
 
 # ---------------------------------------------------------------------
 
 
-def check_action(action, log_files_in, out_dir, match_files_in, ignore_files_in, expect_files_in):
+def check_action(action, log_files_in, out_dir, match_files_in, ignore_files_in, expect_files_in, rules_file=None):
     '''
     @summary: This function validates command line parameter 'action' and
         other related parameters.
@@ -634,6 +1233,15 @@ def check_action(action, log_files_in, out_dir, match_files_in, ignore_files_in,
             print('ERROR: missing required match_files_in for analyze action')
             ret_code = False
 
+    elif action == 'analyze_extracted':
+        if rules_file is None or len(rules_file) == 0:
+            print('ERROR: missing required rules_file for analyze_extracted action')
+            ret_code = False
+
+        elif log_files_in is None or len(log_files_in) == 0:
+            print('ERROR: missing required logs for analyze_extracted action')
+            ret_code = False
+
     else:
         ret_code = False
         print(('ERROR: invalid action:%s specified' % action))
@@ -661,7 +1269,8 @@ def check_run_id(run_id):
 # ---------------------------------------------------------------------
 
 
-def write_result_file(run_id, out_dir, analysis_result_per_file, messages_regex_e, unused_regex_messages):
+def write_result_file(run_id, out_dir, analysis_result_per_file, messages_regex_e, unused_regex_messages,
+                      classifier=None):
     '''
     @summary: Write results of analysis into a file.
 
@@ -671,6 +1280,8 @@ def write_result_file(run_id, out_dir, analysis_result_per_file, messages_regex_
 
     @param analysis_result_per_file: map file_name: [list of found matching strings]
 
+    @param classifier: MessageClassifier used for the analysis, provides the unused expect regexes
+
     @return: void
     '''
 
@@ -703,12 +1314,15 @@ def write_result_file(run_id, out_dir, analysis_result_per_file, messages_regex_
             "\n-------------------------------------------------\n\n")
         out_file.write('Total matches:%d\n' % match_cnt)
         # Find unused regex matches
-        for regex in messages_regex_e:
-            for line in expected_lines_total:
-                if re.search(regex, line):
-                    break
-            else:
-                unused_regex_messages.append(regex)
+        if classifier is not None:
+            unused_regex_messages.extend(classifier.get_unused_expect_regexes())
+        else:
+            for regex in messages_regex_e:
+                for line in expected_lines_total:
+                    if re.search(regex, line):
+                        break
+                else:
+                    unused_regex_messages.append(regex)
 
         out_file.write('Total expected and found matches:%d\n' % expected_cnt)
         out_file.write('Total expected but not found matches: %d\n\n' %
@@ -763,6 +1377,50 @@ def write_summary_file(run_id, out_dir, analysis_result_per_file, unused_regex_m
 # ---------------------------------------------------------------------
 
 
+def load_rules_file(rules_file):
+    '''
+    @summary: Load the rule set pushed by the sonic-mgmt LogAnalyzer.
+
+    @param rules_file: Path to JSON file with "match", "ignore" and "expect" lists of regular expressions.
+
+    @return: Tuple of match, ignore and expect lists.
+    '''
+    if not os.path.isfile(rules_file):
+        print('ERROR: rules file %s not found' % rules_file)
+        sys.exit(err_no_rules_file)
+
+    with open(rules_file) as f:
+        rules = json.load(f)
+    return rules.get('match', []), rules.get('ignore', []), rules.get('expect', [])
+# ---------------------------------------------------------------------
+
+
+def get_json_result(analysis_result_per_file, classifier):
+    '''
+    @summary: Build the compact result of the analyze_extracted action.
+
+    @param analysis_result_per_file: map file_name: [matching lines, expected lines]
+
+    @param classifier: MessageClassifier used for the analysis.
+
+    @return: dictionary with matching and expected lines per file, expected regular
+             expressions which were not found and the total counts.
+    '''
+    unused_regex_messages = classifier.get_unused_expect_regexes()
+    result = {
+        'files': {},
+        'unused_expected_regexp': unused_regex_messages,
+        'total': {'match': 0, 'expected_match': 0, 'expected_missing_match': len(unused_regex_messages)},
+    }
+    for file_name, (matching_lines, expected_lines) in list(analysis_result_per_file.items()):
+        result['files'][file_name] = {'match': matching_lines, 'expect': expected_lines}
+        result['total']['match'] += len(matching_lines)
+        result['total']['expected_match'] += len(expected_lines)
+
+    return result
+# ---------------------------------------------------------------------
+
+
 def main(argv):
 
     action = None
@@ -773,13 +1431,18 @@ def main(argv):
     match_files_in = None
     ignore_files_in = None
     expect_files_in = None
+    rules_file = None
+    max_log_length = None
+    state_file = None
+    streaming = True
     verbose = False
 
     try:
         opts, args = getopt.getopt(argv, "a:r:s:l:o:m:i:e:vh",
                                    ["action=", "run_id=", "start_marker=", "logs=",
                                     "out_dir=", "match_files_in=", "ignore_files_in=",
-                                    "expect_files_in=", "verbose", "help"])
+                                    "expect_files_in=", "rules_file=", "max_log_length=", "state_file=",
+                                    "no_streaming", "verbose", "help"])
 
     except getopt.GetoptError:
         print("Invalid option specified")
@@ -815,15 +1478,28 @@ def main(argv):
         elif (opt in ("-e", "--expect_files_in")):
             expect_files_in = arg
 
+        elif (opt == "--rules_file"):
+            rules_file = arg
+
+        elif (opt == "--max_log_length"):
+            max_log_length = int(arg)
+
+        elif (opt == "--state_file"):
+            state_file = arg
+
+        elif (opt == "--no_streaming"):
+            streaming = False
+
         elif (opt in ("-v", "--verbose")):
             verbose = True
 
-    if not (check_action(action, log_files_in, out_dir, match_files_in, ignore_files_in, expect_files_in)
+    if not (check_action(action, log_files_in, out_dir, match_files_in, ignore_files_in, expect_files_in,
+                         rules_file)
             and check_run_id(run_id)):
         usage()
         sys.exit(err_invalid_input)
 
-    analyzer = AnsibleLogAnalyzer(run_id, verbose, start_marker)
+    analyzer = AnsibleLogAnalyzer(run_id, verbose, start_marker, streaming=streaming, state_file=state_file)
 
     log_file_list = list([_f for _f in log_files_in.split(tokenizer) if _f])
 
@@ -850,12 +1526,33 @@ def main(argv):
         if not log_file_list:
             log_file_list.append(system_log_file)
 
+        # -- The classifier requires the streaming analyzer, the legacy analyzer uses the combined regexes
+        classifier = None
+        if analyzer.streaming:
+            classifier = analyzer.create_classifier(messages_regex_m, messages_regex_i, messages_regex_e)
         result = analyzer.analyze_file_list(log_file_list, match_messages_regex,
-                                            ignore_messages_regex, expect_messages_regex)
+                                            ignore_messages_regex, expect_messages_regex,
+                                            classifier=classifier)
         unused_regex_messages = []
         write_result_file(run_id, out_dir, result,
-                          messages_regex_e, unused_regex_messages)
+                          messages_regex_e, unused_regex_messages, classifier=classifier)
         write_summary_file(run_id, out_dir, result, unused_regex_messages)
+    elif action == "analyze_extracted":
+        match_messages, ignore_messages, expect_messages = load_rules_file(rules_file)
+        classifier = analyzer.create_classifier(match_messages, ignore_messages, expect_messages)
+        if analyzer.streaming:
+            result = analyzer.analyze_file_list(log_file_list, None, None, None,
+                                                maximum_log_length=max_log_length, classifier=classifier)
+        else:
+            regexes = [re.compile('|'.join(messages)) if messages else None
+                       for messages in (match_messages, ignore_messages, expect_messages)]
+            result = analyzer.analyze_file_list(log_file_list, *regexes, maximum_log_length=max_log_length)
+            # -- Count the expect rules hit by the expected lines, for the unused expected regexes
+            for _, expected_lines in result.values():
+                for line in expected_lines:
+                    classifier.classify(line)
+        print(json.dumps(get_json_result(result, classifier), separators=(',', ':')))
+        return 0
     elif action == "add_end_marker":
         analyzer.place_marker(
             log_file_list, analyzer.create_end_marker(), wait_for_marker=True)
@@ -9,7 +9,6 @@ import six
 import ptf.testutils as testutils
 import ptf.mask as mask
 import ptf.packet as packet
-import queue
 import re
 
 from abc import ABCMeta, abstractmethod
@@ -32,6 +31,7 @@ from tests.common.platform.processes_utils import wait_critical_processes
 from tests.common.platform.interface_utils import check_all_interface_information
 from tests.common.utilities import get_iface_ip
 from tests.common.sai_validation.sonic_db import start_db_monitor, wait_for_n_keys, stop_db_monitor
+from tests.common.sai_validation.db_event_store import DbEventStore
 from tests.common.validation.sai.acl_validation import validate_acl_asicdb_entries
 from tests.common.utilities import is_ipv4_address
 from tests.common.utilities import is_ipv6_only_topology
@@ -1580,7 +1580,7 @@ class TestBasicAcl(BaseAclTest):
             n_rules = len(rules['acl']['acl-sets']['acl-set'][table_name]['acl-entries']['acl-entry'])
             # n_rules + 1 because of one extra rule created (by default) to DROP all
             # traffic if no rule matches
-            event_queue = queue.Queue()
+            event_queue = DbEventStore()
             monitor_ctx = start_db_monitor(executor, gnmi_connection, path, event_queue)
             logger.info("Applying ACL rules config \"{}\"".format(dut_conf_file_path))
             dut.command("config acl update full {}".format(dut_conf_file_path))
@@ -1646,7 +1646,7 @@ class TestIncrementalAcl(BaseAclTest):
         path = 'ASIC_DB/localhost/ASIC_STATE'
         filter_path = 'SAI_OBJECT_TYPE_ACL_ENTRY'
         with SafeThreadPoolExecutor(max_workers=8) as executor:
-            event_queue = queue.Queue()
+            event_queue = DbEventStore()
             monitor_ctx = start_db_monitor(executor, gnmi_connection, path, event_queue)
             for part, config_file in enumerate(ACL_RULES_PART_TEMPLATES[ip_version]):
                 logger.info('Start monitoring for ACL rules')
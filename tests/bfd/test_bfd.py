@@ -3,13 +3,13 @@ import random
 import time
 import json
 import logging
-import queue
 
 from datetime import timedelta
 
 from tests.common.dualtor.mux_simulator_control import toggle_all_simulator_ports_to_rand_selected_tor_m    # noqa:F401
 from tests.common.snappi_tests.common_helpers import get_egress_queue_count
 from tests.common.sai_validation.sonic_db import start_db_monitor, stop_db_monitor, wait_until_condition, check_key
+from tests.common.sai_validation.db_event_store import DbEventStore
 from tests.common.utilities import wait_until
 from tests.common.helpers.multi_thread_utils import SafeThreadPoolExecutor
 from tests.common.helpers.assertions import pytest_assert
@@ -449,7 +449,7 @@ def test_bfd_basic(request, gnmi_connection,
                                                                                                 count=bfd_session_cnt)
     logger.debug(f'neighbor details: {neighbor_addrs}, {neighbor_devs}, {neighbor_interfaces}')
     try:
-        event_queue = queue.Queue()
+        event_queue = DbEventStore()
         path = 'STATE_DB/localhost/BFD_SESSION_TABLE/'
         executor = SafeThreadPoolExecutor(max_workers=3)
         monitor_ctx = start_db_monitor(executor=executor, gnmi_conn=gnmi_connection,
@@ -5,13 +5,13 @@ from copy import deepcopy
 import json
 import logging
 import traceback
-import yaml
 
 from natsort import natsorted
 import pytest
 
 from tests.common.reboot import reboot
 from tests.common.storage_backend.backend_utils import skip_test_module_over_backend_topologies     # noqa F401
+from tests.common.topo_utils import load_topo
 from tests.common.utilities import wait_until
 import ptf.testutils as testutils
 from ptf.mask import Mask
@@ -202,8 +202,7 @@ def setup_vnet(tbinfo, duthosts, rand_one_dut_hostname, ptfhost, localhost,
         duthost.shell("sonic-clear nd")
         duthost.shell("sonic-clear fdb all")
 
-        with open("../ansible/vars/topo_{}.yml".format(tbinfo['topo']['name']), 'r') as fh:
-            g_vars['topo_properties'] = yaml.safe_load(fh)
+        g_vars['topo_properties'] = load_topo("../ansible/vars/topo_{}.yml".format(tbinfo['topo']['name']))
 
         g_vars['props'] = g_vars['topo_properties']['configuration_properties']['common']
 
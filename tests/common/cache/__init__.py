@@ -1,4 +1,5 @@
 from .facts_cache import FactsCache
 from .facts_cache import cached
+from .facts_cache import get_call_argument
 
-__all__ = [FactsCache, cached]
+__all__ = [FactsCache, cached, get_call_argument]
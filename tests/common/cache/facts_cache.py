@@ -1,12 +1,17 @@
 
 
+import contextlib
+import fcntl
+import functools
 import inspect
+import json
 import logging
 import os
 import pickle
-import random
 import shutil
+import sqlite3
 import sys
+import tempfile
 import time
 
 from collections import defaultdict
@@ -22,7 +27,36 @@ CACHE_LOCATION = os.path.join(CURRENT_PATH, '../../../_cache')
 
 SIZE_LIMIT = 1000000000  # 1G bytes, max disk usage allowed by cache
 ENTRY_LIMIT = 1000000    # Max number of pickle files allowed in cache.
+# When the limits are exceeded, the least recently used entries are evicted down to this ratio of the limits
+EVICTION_TARGET = 0.9
+# Min seconds between two updates of the last access time of cached facts read from memory
+TOUCH_INTERVAL = 60
 DISABLE_CACHE_PARAM = "disable_cache"
+# Default max age in seconds of the cached facts not accessed, evicted at the start of the test sessions
+CACHE_MAX_AGE = 7 * 24 * 3600
+
+# Header of the cache files, followed by the pickled facts. Bump the version when the layout of the cached facts
+# changes, the cache files of other versions are then ignored and the facts gathered again.
+CACHE_FILE_MAGIC = b'SONIC-MGMT-FACTS-CACHE'
+CACHE_FILE_VERSION = 1
+CACHE_FILE_HEADER = CACHE_FILE_MAGIC + ' {}\n'.format(CACHE_FILE_VERSION).encode()
+
+# Index of the cache files: size, last access and modification time of each entry, and the total usage kept up to
+# date by triggers. Shared by all the processes using the cache, it is rebuilt from the cache files if removed.
+INDEX_FILE = '.index.sqlite'
+INDEX_SCHEMA = [
+    'CREATE TABLE entries (zone TEXT NOT NULL, key TEXT NOT NULL, size INTEGER NOT NULL, atime REAL NOT NULL, '
+    'mtime REAL NOT NULL, PRIMARY KEY (zone, key))',
+    'CREATE INDEX entries_atime ON entries (atime)',
+    'CREATE TABLE usage (id INTEGER PRIMARY KEY CHECK (id = 0), size INTEGER NOT NULL, entries INTEGER NOT NULL)',
+    'INSERT INTO usage VALUES (0, 0, 0)',
+    'CREATE TRIGGER entries_insert AFTER INSERT ON entries BEGIN '
+    'UPDATE usage SET size = size + NEW.size, entries = entries + 1; END',
+    'CREATE TRIGGER entries_delete AFTER DELETE ON entries BEGIN '
+    'UPDATE usage SET size = size - OLD.size, entries = entries - 1; END',
+    'CREATE TRIGGER entries_update AFTER UPDATE OF size ON entries BEGIN '
+    'UPDATE usage SET size = size + NEW.size - OLD.size; END',
+]
 
 
 class Singleton(type):
@@ -53,25 +87,139 @@ class FactsCache(with_metaclass(Singleton, object)):
         self._cache_location = os.path.abspath(cache_location)
         self._cache = defaultdict(dict)
         self._write_lock = Lock()
+        # Time of the last update of the last access time in the index, key is (zone, key)
+        self._touched = {}
 
-    def _check_usage(self):
-        """Check cache usage, raise exception if usage exceeds the limitations.
+    @contextlib.contextmanager
+    def _index(self):
+        """Open a transaction on the index of the cache files, create the index if it does not exist.
+
+        The transaction holds the write lock of the index, the other processes wait for it to update the index.
+        """
+        os.makedirs(self._cache_location, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(self._cache_location, INDEX_FILE), timeout=60, isolation_level=None)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'entries'").fetchone():
+                    self._create_index(conn)
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+
+    def _create_index(self, conn):
+        for statement in INDEX_SCHEMA:
+            conn.execute(statement)
+        for zone in os.listdir(self._cache_location):
+            cache_subfolder = os.path.join(self._cache_location, zone)
+            if zone.startswith('.') or not os.path.isdir(cache_subfolder):
+                continue
+            for f in os.listdir(cache_subfolder):
+                if f.startswith('.') or not f.endswith('.pickle'):
+                    continue
+                stat = os.stat(os.path.join(cache_subfolder, f))
+                conn.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)',
+                             (zone, f[:-len('.pickle')], stat.st_size, stat.st_atime, stat.st_mtime))
+        logger.info('[Cache] Created index of cache folder {}'.format(self._cache_location))
+
+    def usage(self):
+        """Get the disk usage of the cache.
+
+        Returns:
+            dict: 'size' is the total size in bytes of the cache files, 'entries' is the number of cache files.
+        """
+        with self._index() as conn:
+            size, entries = conn.execute('SELECT size, entries FROM usage').fetchone()
+        return {'size': size, 'entries': entries}
+
+    def _remove_entries(self, conn, entries):
+        for zone, key in entries:
+            conn.execute('DELETE FROM entries WHERE zone = ? AND key = ?', (zone, key))
+            try:
+                os.remove(self._facts_file(zone, key))
+            except OSError:
+                pass
+            logger.info('[Cache] Evicted cached facts "{}.{}"'.format(zone, key))
+
+    def _evict_lru(self, conn, zone, key, size):
+        """Evict the least recently used entries if caching facts of the size exceeds the limitations.
         """
-        total_size = 0
-        total_entries = 0
-        for root, _, files in os.walk(self._cache_location):
-            for f in files:
-                fp = os.path.join(root, f)
-                total_size += os.path.getsize(fp)
-                total_entries += 1
-
-        if total_size > SIZE_LIMIT or total_entries > ENTRY_LIMIT:
-            msg = 'Cache usage exceeds limitations. total_size={}, SIZE_LIMIT={}, total_entries={}, ENTRY_LIMIT={}' \
-                .format(total_size, SIZE_LIMIT, total_entries, ENTRY_LIMIT)
-            raise Exception(msg)
+        total_size, total_entries = conn.execute('SELECT size, entries FROM usage').fetchone()
+        current = conn.execute('SELECT size FROM entries WHERE zone = ? AND key = ?', (zone, key)).fetchone()
+        if current:
+            total_size -= current[0]
+            total_entries -= 1
+        if total_size + size <= SIZE_LIMIT and total_entries + 1 <= ENTRY_LIMIT:
+            return
+
+        excess_size = total_size + size - int(SIZE_LIMIT * EVICTION_TARGET)
+        excess_entries = total_entries + 1 - int(ENTRY_LIMIT * EVICTION_TARGET)
+        evicted = []
+        for entry_zone, entry_key, entry_size in conn.execute(
+                'SELECT zone, key, size FROM entries WHERE NOT (zone = ? AND key = ?) ORDER BY atime', (zone, key)):
+            if excess_size <= 0 and excess_entries <= 0:
+                break
+            evicted.append((entry_zone, entry_key))
+            excess_size -= entry_size
+            excess_entries -= 1
+        logger.info('[Cache] Cache usage exceeds limitations. total_size={}, SIZE_LIMIT={}, total_entries={}, '
+                    'ENTRY_LIMIT={}, evicting {} least recently used entries'
+                    .format(total_size, SIZE_LIMIT, total_entries, ENTRY_LIMIT, len(evicted)))
+        self._remove_entries(conn, evicted)
+
+    def evict(self, zone=None, max_age=0):
+        """Evict the cached facts not accessed for some time.
+
+        Args:
+            zone (str): Only evict the cached facts of this zone. Default to None, the cached facts of all the zones.
+            max_age (int): Evict the cached facts not accessed for more than max_age seconds.
+
+        Returns:
+            list: (zone, key) of the evicted facts.
+        """
+        query = 'SELECT zone, key FROM entries WHERE atime < ?'
+        params = [time.time() - max_age]
+        if zone:
+            query += ' AND zone = ?'
+            params.append(zone)
+        with self._index() as conn:
+            evicted = conn.execute(query, params).fetchall()
+            self._remove_entries(conn, evicted)
+        for evicted_zone, evicted_key in evicted:
+            self._cache.get(evicted_zone, {}).pop(evicted_key, None)
+        return evicted
+
+    def _touch(self, zone, key):
+        """Update the last access time of cached facts in the index."""
+        now = time.time()
+        self._touched[(zone, key)] = now
+        try:
+            with self._index() as conn:
+                conn.execute('UPDATE entries SET atime = ? WHERE zone = ? AND key = ?', (now, zone, key))
+        except sqlite3.Error as e:
+            logger.debug('[Cache] Update index of "{}.{}" failed with exception: {}'.format(zone, key, repr(e)))
+
+    def _touch_memory_hit(self, zone, key):
+        """Update the last access time of cached facts read from memory, at most once per TOUCH_INTERVAL.
+
+        The facts read from memory are the most used ones, their last access time must be kept up to date for the
+        least recently used eviction. The index is only updated once per interval to keep the memory hits cheap.
+        """
+        if time.time() - self._touched.get((zone, key), 0) >= TOUCH_INTERVAL:
+            self._touch(zone, key)
+
+    def _facts_file(self, zone, key):
+        return os.path.join(self._cache_location, '{}/{}.pickle'.format(zone, key))
 
     def _read_facts_file(self, facts_file, z, k):
         with open(facts_file, 'rb') as f:
+            header = f.readline()
+            if header != CACHE_FILE_HEADER:
+                raise ValueError('Unsupported cache file header {}, expected {}'.format(header[:64], CACHE_FILE_HEADER))
             self._cache[z][k] = pickle.load(f)
             logger.debug('[Cache] Loaded cached facts "{}.{}" from {}'.format(z, k, facts_file))
             return self._cache[z][k]
@@ -90,32 +238,21 @@ class FactsCache(with_metaclass(Singleton, object)):
         # Lazy load
         if zone in self._cache and key in self._cache[zone]:
             logger.debug('[Cache] Read cached facts "{}.{}"'.format(zone, key))
+            self._touch_memory_hit(zone, key)
             return self._cache[zone][key]
         else:
-            facts_file = os.path.join(self._cache_location, '{}/{}.pickle'.format(zone, key))
+            facts_file = self._facts_file(zone, key)
             try:
-                return self._read_facts_file(facts_file, zone, key)
+                facts = self._read_facts_file(facts_file, zone, key)
+                self._touch(zone, key)
+                return facts
             except (IOError, ValueError) as e:
                 logger.info('[Cache] Load cache file "{}" failed with IOError or ValueError: {}'
                             .format(os.path.abspath(facts_file), repr(e)))
                 return self.NOTEXIST
             except (EOFError, UnpicklingError) as e:
-                # When parallel run is enabled, multiple processes may try to read/write the same cache file,
-                # so there will be a chance that
-                #   - a file is being written by process1 while process2 is reading it, causing EOFError in process2
-                #   - a file is being read by multiple processes at the same time, causing UnpicklingError in some of
-                #     the processes
-                # In these cases, we will retry to read the file after a short random sleep. If we still get the same
-                # error after retrying, we will return NOTEXIST to overwrite the file.
-                retry_attempts = 3
-                for attempt in range(retry_attempts):
-                    time.sleep(random.randint(3, 6))
-                    try:
-                        return self._read_facts_file(facts_file, zone, key)
-                    except (EOFError, UnpicklingError):
-                        logger.warning('[Cache] Retry {}/{} failed for file "{}"'
-                                       .format(attempt + 1, retry_attempts, facts_file))
-
+                # The cache files are replaced atomically by write, so a reader never sees a partially written file.
+                # The file is corrupted, return NOTEXIST to overwrite it.
                 logger.error('[Cache] Load cache file "{}" failed with EOFError or UnpicklingError: {}'
                              .format(facts_file, repr(e)))
                 return self.NOTEXIST
@@ -127,6 +264,9 @@ class FactsCache(with_metaclass(Singleton, object)):
     def write(self, zone, key, value):
         """Store facts to cache.
 
+        The cache file is written to a temporary file which then replaces the cache file, so that the other
+        processes reading the cache file concurrently see either the old or the new facts.
+
         Args:
             zone (str): Cached facts are organized by zones. This argument is to specify the zone name.
                 The zone name could be hostname.
@@ -137,22 +277,67 @@ class FactsCache(with_metaclass(Singleton, object)):
             boolean: Caching facts is successful or not.
         """
         with self._write_lock:
-            self._check_usage()
-            facts_file = os.path.join(self._cache_location, '{}/{}.pickle'.format(zone, key))
+            facts_file = self._facts_file(zone, key)
+            tmp_file = None
             try:
                 cache_subfolder = os.path.join(self._cache_location, zone)
                 if not os.path.exists(cache_subfolder):
                     logger.info('[Cache] Create cache dir {}'.format(cache_subfolder))
-                    os.makedirs(cache_subfolder)
+                    os.makedirs(cache_subfolder, exist_ok=True)
 
-                with open(facts_file, 'wb') as f:
+                fd, tmp_file = tempfile.mkstemp(dir=cache_subfolder, prefix='.{}.'.format(key), suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(CACHE_FILE_HEADER)
                     pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
-                    self._cache[zone][key] = value
-                    logger.info('[Cache] Cached facts "{}.{}" to {}'.format(zone, key, facts_file))
-                    return True
-            except (IOError, ValueError) as e:
+                    size = f.tell()
+                if size > SIZE_LIMIT:
+                    logger.error('[Cache] Facts "{}.{}" of size {} exceed SIZE_LIMIT={}, not cached'
+                                 .format(zone, key, size, SIZE_LIMIT))
+                    return False
+
+                with self._index() as conn:
+                    self._evict_lru(conn, zone, key, size)
+                    os.replace(tmp_file, facts_file)
+                    tmp_file = None
+                    now = time.time()
+                    conn.execute('INSERT INTO entries VALUES (?, ?, ?, ?, ?) ON CONFLICT (zone, key) '
+                                 'DO UPDATE SET size = excluded.size, atime = excluded.atime, mtime = excluded.mtime',
+                                 (zone, key, size, now, now))
+                self._cache[zone][key] = value
+                self._touched[(zone, key)] = now
+                logger.info('[Cache] Cached facts "{}.{}" to {}'.format(zone, key, facts_file))
+                return True
+            except (IOError, ValueError, pickle.PicklingError, sqlite3.Error) as e:
                 logger.error('[Cache] Dump cache file "{}" failed with exception: {}'.format(facts_file, repr(e)))
                 return False
+            finally:
+                if tmp_file is not None:
+                    try:
+                        os.remove(tmp_file)
+                    except OSError:
+                        pass
+
+    @contextlib.contextmanager
+    def lock(self, zone, key):
+        """Hold an exclusive lock of cached facts, shared by all the processes using the cache.
+
+        Used to gather facts only once: the first process (or thread) gathers and caches the facts while holding the
+        lock, the others wait for the lock then read the cached facts. The lock is released on exit, or when the
+        process holding it dies.
+
+        Args:
+            zone (str): Zone name of cached facts.
+            key (str): Name of cached facts.
+        """
+        cache_subfolder = os.path.join(self._cache_location, zone)
+        os.makedirs(cache_subfolder, exist_ok=True)
+        lock_file = os.path.join(cache_subfolder, '.{}.lock'.format(key))
+        with open(lock_file, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
 
     def cleanup(self, zone=None, key=None):
         """Cleanup cached files.
@@ -168,6 +353,11 @@ class FactsCache(with_metaclass(Singleton, object)):
                 if zone in self._cache and key in self._cache[zone]:
                     del self._cache[zone][key]
                     logger.debug('[Cache] Removed "{}.{}" from cache.'.format(zone, key))
+                try:
+                    with self._index() as conn:
+                        conn.execute('DELETE FROM entries WHERE zone = ? AND key = ?', (zone, key))
+                except sqlite3.Error as e:
+                    logger.error('[Cache] Remove {}.{} from index failed with exception: {}'.format(zone, key, repr(e)))
                 try:
                     cache_file = os.path.join(self._cache_location, zone, '{}.pickle'.format(key))
                     os.remove(cache_file)
@@ -179,6 +369,11 @@ class FactsCache(with_metaclass(Singleton, object)):
                 if zone in self._cache:
                     del self._cache[zone]
                     logger.debug('[Cache] Removed zone "{}" from cache'.format(zone))
+                try:
+                    with self._index() as conn:
+                        conn.execute('DELETE FROM entries WHERE zone = ?', (zone,))
+                except sqlite3.Error as e:
+                    logger.error('[Cache] Remove zone "{}" from index failed with exception: {}'.format(zone, repr(e)))
                 try:
                     cache_subfolder = os.path.join(self._cache_location, zone)
                     shutil.rmtree(cache_subfolder)
@@ -195,6 +390,46 @@ class FactsCache(with_metaclass(Singleton, object)):
                              .format(self._cache_location, repr(e)))
 
 
+@functools.lru_cache(maxsize=None)
+def _binding_plan(function):
+    """Get how the parameters of a function are bound from the call arguments, computed once per function.
+
+    Returns:
+        dict: Key is parameter name, value is (index of the positional argument or None, default value or None).
+    """
+    plan = {}
+    index = 0
+    for param in inspect.signature(function).parameters.values():
+        default = None if param.default is inspect.Parameter.empty else param.default
+        if param.kind in (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD):
+            plan[param.name] = (index, default)
+            index += 1
+        elif param.kind == inspect.Parameter.KEYWORD_ONLY:
+            plan[param.name] = (None, default)
+    return plan
+
+
+def get_call_argument(function, func_args, func_kargs, argname):
+    """Get the value of a parameter of a function call, without binding all the call arguments.
+
+    Args:
+        function (function): The called function.
+        func_args (tuple): Positional arguments of the call.
+        func_kargs (dict): Keyword arguments of the call.
+        argname (str): Name of the parameter.
+
+    Returns:
+        The value of the parameter, its default value if it is not passed, or None if the function has no such
+        parameter and it is not passed as keyword argument.
+    """
+    if argname in func_kargs:
+        return func_kargs[argname]
+    index, default = _binding_plan(function).get(argname, (None, None))
+    if index is not None and index < len(func_args):
+        return func_args[index]
+    return default
+
+
 def _get_default_zone(function, func_args, func_kargs):
     """
         Default zone getter used for decorator cached.
@@ -209,36 +444,89 @@ def _get_default_zone(function, func_args, func_kargs):
         raise ValueError("Failed to get attribute 'hostname' of type string from instance of type %s."
                          % type(func_args[0]))
     zone = hostname
-    signature = inspect.signature(function)
-    arg_names = list(signature.parameters.keys())
-    if 'namespace' in arg_names:
-        try:
-            index = arg_names.index('namespace')
-            namespace = func_args[index]
-            if namespace and isinstance(namespace, str):
-                zone = "{}-{}".format(hostname, namespace)
-        except IndexError:
-            pass
+    index = _binding_plan(function).get('namespace', (None, None))[0]
+    if index is not None and index < len(func_args):
+        namespace = func_args[index]
+        if namespace and isinstance(namespace, str):
+            zone = "{}-{}".format(hostname, namespace)
     return zone
 
 
-def _get_disable_cache(target, args, kwargs):
+class CacheStats(object):
+    """Hit/miss counters and latency of a function decorated by cached.
+
+    Hits are split between the facts already in memory and the facts loaded from the cache files. The latency
+    includes the zone getter and the after_read/before_write hooks, and the decorated function for the misses.
     """
-    For the function with signature:
 
-        @cached(name='feature_status')
-        def get_feature_status(self, disable_cache=True):
+    def __init__(self, name):
+        self.name = name
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.hit_time = 0.0
+        self.miss_time = 0.0
+        self._lock = Lock()
+
+    def record(self, source, elapsed):
+        with self._lock:
+            if source == 'memory':
+                self.memory_hits += 1
+                self.hit_time += elapsed
+            elif source == 'disk':
+                self.disk_hits += 1
+                self.hit_time += elapsed
+            else:
+                self.misses += 1
+                self.miss_time += elapsed
+
+    def summary(self):
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            return {
+                'name': self.name,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'avg_hit_time': self.hit_time / hits if hits else 0.0,
+                'avg_miss_time': self.miss_time / self.misses if self.misses else 0.0,
+            }
+
 
-    If the disable_cache is not explicitly passed, like it get called by .get_feature_status()
-    disable_cache will not show in **kwargs,
-    Need to fetch it with inspect.
+# CacheStats of the functions decorated by cached, key is '<module>.<qualified name>' of the function
+CACHE_STATS = {}
+
+
+def get_cache_stats():
+    """Get the hit/miss counters and latency of all the functions decorated by cached.
+
+    Returns:
+        dict: Key is '<module>.<qualified name>' of the decorated function, value is the summary of its CacheStats.
     """
-    # Get the function signature
-    sig = inspect.signature(target)
-    bound_args = sig.bind_partial(*args, **kwargs)
-    bound_args.apply_defaults()
+    return {function: stats.summary() for function, stats in CACHE_STATS.items()}
+
 
-    return bound_args.arguments.get(DISABLE_CACHE_PARAM, False)
+def dump_cache_stats(path=None):
+    """Log the hit/miss counters and latency of the functions decorated by cached, and save them to a json file.
+
+    Args:
+        path (str): Path of the json file, not saved if None.
+
+    Returns:
+        dict: The stats, see get_cache_stats.
+    """
+    stats = get_cache_stats()
+    lines = ["{:>8} {:>8} {:>8} {:>10.6f}s {:>10.6f}s  {}".format(
+                 summary["memory_hits"], summary["disk_hits"], summary["misses"], summary["avg_hit_time"],
+                 summary["avg_miss_time"], function)
+             for function, summary in sorted(stats.items())
+             if summary["memory_hits"] or summary["disk_hits"] or summary["misses"]]
+    logger.info("Facts cache stats:\n{:>8} {:>8} {:>8} {:>11} {:>11}  {}\n{}".format(
+        "memory", "disk", "misses", "avg hit", "avg miss", "function", "\n".join(lines)))
+    if path:
+        with open(path, "w") as stats_file:
+            json.dump(stats, stats_file, indent=2)
+    return stats
 
 
 def cached(name, zone_getter=None, after_read=None, before_write=None):
@@ -253,6 +541,9 @@ def cached(name, zone_getter=None, after_read=None, before_write=None):
     if the function is a bound method of class AnsibleHostBase and its derivatives, it will try to use its
     attribute 'hostname' as zone, or raises an error if 'hostname' doesn't exists or is not a string.
 
+    The hit/miss counters and latency of the decorated function are available as its 'cache_stats' attribute, see
+    CacheStats and get_cache_stats.
+
     Args:
         name ([str]): Name of the cached facts.
         zone_getter ([function]): Function used to get hostname used as zone.
@@ -264,30 +555,60 @@ def cached(name, zone_getter=None, after_read=None, before_write=None):
     cache = FactsCache()
 
     def decorator(target):
+        _zone_getter = zone_getter or _get_default_zone
+        # Parameters of the target, bound once at decoration time
+        has_disable_cache = DISABLE_CACHE_PARAM in _binding_plan(target)
+        stats = CACHE_STATS['{}.{}'.format(target.__module__, target.__qualname__)] = CacheStats(name)
+
         def wrapper(*args, **kargs):
 
             # Support to choose enable/disable cache by function param
-            disable_cache = _get_disable_cache(target, args, kargs)
-            if disable_cache:
+            if has_disable_cache and get_call_argument(target, args, kargs, DISABLE_CACHE_PARAM):
                 return target(*args, **kargs)
 
-            _zone_getter = zone_getter or _get_default_zone
+            start = time.perf_counter()
             zone = _zone_getter(target, args, kargs)
 
-            cached_facts = cache.read(zone, name)
-            if after_read:
-                cached_facts = after_read(cached_facts, target, args, kargs)
-            if cached_facts is not FactsCache.NOTEXIST:
-                logger.debug(f"[Cache] Use cache for func[{target}], zone[{zone}], key[{name}]")
+            def _read():
+                cached_facts = cache.read(zone, name)
+                if after_read:
+                    cached_facts = after_read(cached_facts, target, args, kargs)
                 return cached_facts
+
+            # Facts already in memory, skip the cache files
+            zone_facts = cache._cache.get(zone)
+            if zone_facts is not None and name in zone_facts:
+                source = 'memory'
+                cached_facts = zone_facts[name]
+                cache._touch_memory_hit(zone, name)
+                if after_read:
+                    cached_facts = after_read(cached_facts, target, args, kargs)
             else:
+                source = 'disk'
+                cached_facts = _read()
+            if cached_facts is not FactsCache.NOTEXIST:
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"[Cache] Use cache for func[{target}], zone[{zone}], key[{name}]")
+                stats.record(source, time.perf_counter() - start)
+                return cached_facts
+
+            # Gather the facts once: while another process or thread is gathering them, wait for it and use the
+            # facts it has cached
+            with cache.lock(zone, name):
+                cached_facts = _read()
+                if cached_facts is not FactsCache.NOTEXIST:
+                    logger.debug(f"[Cache] Use cache for func[{target}], zone[{zone}], key[{name}]")
+                    stats.record('disk', time.perf_counter() - start)
+                    return cached_facts
                 facts = target(*args, **kargs)
                 if before_write:
                     _facts = before_write(facts, target, args, kargs)
                     cache.write(zone, name, _facts)
                 else:
                     cache.write(zone, name, facts)
+                stats.record('miss', time.perf_counter() - start)
                 return facts
+        wrapper.cache_stats = stats
         return wrapper
     return decorator
 
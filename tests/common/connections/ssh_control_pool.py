@@ -0,0 +1,245 @@
+"""
+Session wide pool of the multiplexed SSH connections used by the ansible module calls.
+
+The ssh connection plugin of ansible already keeps a master SSH connection per host alive between the module calls
+(ControlMaster/ControlPersist in ansible.cfg). Later module calls, from any fixture, thread or worker process of
+the session, are sent over that master without a new SSH handshake.
+
+This pool pins the control path of the master connection of each (host, user, become) and manages those masters:
+    - health check of the masters, the stale ones are closed.
+    - reset of the masters of a host after it is rebooted (see wait_for_startup in tests/common/reboot.py). Else
+      the next module calls would be sent over the master connection to the host before its reboot, and would hang
+      until the master detects the connection is dead.
+    - metrics of the module calls done over an existing master (handshakes saved) or opening a new one.
+"""
+import hashlib
+import logging
+import os
+import subprocess
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONTROL_DIR = "~/.ansible/cp"
+SSH_CONTROL_TIMEOUT = 10
+
+
+class SshControlEntry(object):
+    """
+    Master SSH connection of a (host, user, become) in the pool.
+    """
+
+    def __init__(self, key, control_path, port=22):
+        self.key = key
+        self.control_path = control_path
+        self.port = port
+        self.calls = 0
+        self.handshakes_saved = 0
+        self.connects = 0
+        self.resets = 0
+
+    @property
+    def address(self):
+        return self.key[0]
+
+    @property
+    def user(self):
+        return self.key[1]
+
+    def metrics(self):
+        return {
+            "calls": self.calls,
+            "handshakes_saved": self.handshakes_saved,
+            "connects": self.connects,
+            "resets": self.resets
+        }
+
+
+class SshControlPool(object):
+    """
+    Pool of the master SSH connections keyed by (host, user, become).
+
+    The pool is enabled by the `ssh_control_pool` session fixture when the `--ssh_control_pool` option is set.
+    Only the hosts using the ssh connection plugin are attached to the pool.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    # Command used to control the master connections, can be replaced for testing
+    ssh_command = "ssh"
+
+    @classmethod
+    def enable(cls, control_dir=DEFAULT_CONTROL_DIR):
+        with cls._instance_lock:
+            cls._instance = cls(control_dir)
+            logger.info("SSH control pool enabled, control dir {}".format(cls._instance.control_dir))
+        return cls._instance
+
+    @classmethod
+    def disable(cls, close=False):
+        """
+        Disable the pool, and close all its master connections if close is True.
+        """
+        with cls._instance_lock:
+            instance, cls._instance = cls._instance, None
+        if instance is not None:
+            instance.log_metrics()
+            if close:
+                instance.close_all()
+        return instance
+
+    @classmethod
+    def get_instance(cls):
+        return cls._instance
+
+    def __init__(self, control_dir=DEFAULT_CONTROL_DIR):
+        self.control_dir = os.path.expanduser(control_dir)
+        os.makedirs(self.control_dir, mode=0o700, exist_ok=True)
+        self.entries = {}
+        self._lock = threading.Lock()
+
+    def control_path(self, address, user, become, port=22):
+        """
+        Get the control path of the master connection of (address, user, become).
+
+        The path is short and has no '%' so that it is under the unix socket path limit, and is used as is by
+        the ssh connection plugin.
+        """
+        digest = hashlib.sha1("{}-{}-{}-{}".format(address, port, user, bool(become)).encode()).hexdigest()
+        return os.path.join(self.control_dir, "sm-" + digest[:12])
+
+    def get_entry(self, address, user, become, port=22):
+        key = (address, user, bool(become))
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = SshControlEntry(
+                    key, self.control_path(address, user, become, port=port), port=port)
+            return entry
+
+    def attach(self, host):
+        """
+        Attach an AnsibleHostBase to the pool: pin the control path of its master SSH connection.
+
+        Args:
+            host: AnsibleHostBase instance.
+
+        Returns:
+            The SshControlEntry of the host, or None if the host does not use the ssh connection plugin.
+        """
+        if host.hostname == "localhost":
+            return None
+        inventory_host = host.host.options["inventory_manager"].get_host(host.hostname)
+        host_vars = inventory_host.vars
+        if host_vars.get("ansible_connection", "ssh") not in ("ssh", "smart"):
+            return None
+        if "ansible_control_path" in host_vars:
+            logger.debug("Control path of {} is set by inventory, not attached to the SSH control pool"
+                         .format(host.hostname))
+            return None
+
+        address = host_vars.get("ansible_host", host.hostname)
+        user = host_vars.get("ansible_user", host_vars.get("ansible_ssh_user"))
+        become = host.host.options.get("become", False)
+        port = host_vars.get("ansible_port", 22)
+        entry = self.get_entry(address, user, become, port=port)
+        inventory_host.set_variable("ansible_control_path", entry.control_path)
+        return entry
+
+    def record_call(self, entry):
+        """
+        Count a module call of a host attached to the pool.
+        """
+        reused = os.path.exists(entry.control_path)
+        with self._lock:
+            entry.calls += 1
+            if reused:
+                entry.handshakes_saved += 1
+            else:
+                entry.connects += 1
+
+    def _control(self, entry, command):
+        """
+        Run 'ssh -O <command>' on the master connection of the entry.
+
+        Returns:
+            True if the master connection handled the command.
+        """
+        cmd = [self.ssh_command, "-O", command, "-o", "ControlPath={}".format(entry.control_path),
+               "-p", str(entry.port)]
+        if entry.user:
+            cmd.extend(["-l", str(entry.user)])
+        cmd.append(entry.address)
+        try:
+            res = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=SSH_CONTROL_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.warning("Failed to run '{}': {}".format(" ".join(cmd), repr(e)))
+            return False
+        return res.returncode == 0
+
+    def is_alive(self, entry):
+        """
+        Health check of the master connection of the entry.
+        """
+        return os.path.exists(entry.control_path) and self._control(entry, "check")
+
+    def close(self, entry):
+        """
+        Close the master connection of the entry. The next module call opens a new one.
+        """
+        if not os.path.exists(entry.control_path):
+            return
+        if not self._control(entry, "exit"):
+            # The master process is gone or is not responding, remove its socket so it is not used anymore
+            try:
+                os.remove(entry.control_path)
+            except OSError:
+                pass
+        with self._lock:
+            entry.resets += 1
+
+    def health_check(self):
+        """
+        Check all the master connections and close the stale ones.
+
+        Returns:
+            List of the keys of the closed master connections.
+        """
+        with self._lock:
+            entries = list(self.entries.values())
+        stale = []
+        for entry in entries:
+            if os.path.exists(entry.control_path) and not self.is_alive(entry):
+                logger.info("Master SSH connection {} is stale, closing it".format(entry.key))
+                self.close(entry)
+                stale.append(entry.key)
+        return stale
+
+    def reset_host(self, address):
+        """
+        Close all the master connections to a host, for example after it is rebooted.
+        """
+        with self._lock:
+            entries = [entry for entry in self.entries.values() if entry.address == address]
+        for entry in entries:
+            logger.info("Resetting master SSH connection {}".format(entry.key))
+            self.close(entry)
+
+    def close_all(self):
+        with self._lock:
+            entries = list(self.entries.values())
+        for entry in entries:
+            self.close(entry)
+
+    def metrics(self):
+        with self._lock:
+            return {"{}@{} become={}".format(entry.user, entry.address, entry.key[2]): entry.metrics()
+                    for entry in self.entries.values()}
+
+    def log_metrics(self):
+        metrics = self.metrics()
+        total_calls = sum(m["calls"] for m in metrics.values())
+        total_saved = sum(m["handshakes_saved"] for m in metrics.values())
+        logger.info("SSH control pool: {} module calls, {} SSH handshakes saved, per connection: {}".format(
+            total_calls, total_saved, metrics))
@@ -6,23 +6,29 @@ and compare them to identify differences. It supports various SONiC database typ
 including APPL_DB, CONFIG_DB, and STATE_DB.
 
 Main features:
-- Take snapshots of Redis databases
-- Compare snapshots and generate detailed diffs
+- Take snapshots of Redis databases, all the databases are dumped concurrently on the DUT
+- Store the snapshots in a compact format, see write_snapshot/read_snapshot_buckets
+- Compare snapshots and generate detailed diffs, one hash bucket of keys at a time
 - Filter out volatile/transient data that changes frequently
 - Provide metrics on database differences
 """
 
 from enum import Enum
+import functools
+import gzip
 import json
 import logging
 import os
 import re
 import copy
+import tempfile
+import zlib
 from typing import Dict, List, Tuple
 from collections import Counter
 from dataclasses import dataclass
 
 from tests.common.helpers.custom_msg_utils import add_custom_msg
+from tests.common.helpers.multi_thread_utils import fanout_map
 
 logger = logging.getLogger(__name__)
 
@@ -40,12 +46,50 @@ def match_key(key, kset):
     Returns:
         bool: True if the key matches any pattern in kset, False otherwise
     """
-    for k in kset:
-        if key.startswith(k):
-            return True
-        elif re.match(k, key):
-            return True
-    return False
+    return bool(compile_key_patterns(kset)(key))
+
+
+def compile_key_patterns(kset):
+    """
+    Compile a set of patterns of match_key into a function matching a key against all of them at once.
+
+    Args:
+        kset (iterable): Set of patterns, see match_key.
+
+    Returns:
+        Function taking a key and returning a true value if it matches any of the patterns.
+    """
+    return _compile_key_patterns(frozenset(kset))
+
+
+# Bounded: match_key is called with the patterns of each entry of the DBs, which vary over a session
+@functools.lru_cache(maxsize=256)
+def _compile_key_patterns(patterns):
+    # The prefixes and the regexes are combined in one regex when possible
+    combined = []
+    regexes = []
+    for pattern in sorted(patterns):
+        combined.append("(?:{})".format(re.escape(pattern)))
+        try:
+            regex = re.compile(pattern)
+        except re.error:
+            # Only a prefix
+            continue
+        # Back references and global flags can not be combined with the other patterns
+        if re.search(r"\\\d|\(\?P=|^\(\?[aiLmsux]+\)", pattern):
+            regexes.append(regex)
+        else:
+            combined.append("(?:{})".format(pattern))
+    try:
+        regexes.insert(0, re.compile("|".join(combined) or "(?!)"))
+    except re.error:
+        regexes.extend(re.compile(pattern[3:-1]) for pattern in combined)
+    if len(regexes) == 1:
+        return regexes[0].match
+
+    def _match(key):
+        return any(regex.match(key) for regex in regexes)
+    return _match
 
 
 def dut_dump(redis_cmd, duthost, data_dir, fname):
@@ -89,6 +133,8 @@ class DBType(Enum):
     STATE = 6
 
 
+_PROCESS_STATS_KEY = re.compile(r"^PROCESS_STATS\|\d+")
+
 # These are the keys/fields that are always ignored during comparison due to their volatile nature
 VOLATILE_VALUES = {
     DBType.APPL: {
@@ -151,6 +197,11 @@ VOLATILE_VALUES = {
 }
 
 
+@functools.lru_cache(maxsize=None)
+def _volatile_values(db_type: DBType) -> frozenset:
+    return frozenset(VOLATILE_VALUES.get(db_type, []))
+
+
 @dataclass
 class DbComparisonMetrics:
     """Metrics summarizing the comparison between two DB snapshots"""
@@ -293,31 +344,60 @@ class SnapshotDiff:
     """Container for differing values and metrics of a snapshot comparison for a singleDB supporting metric tracking
     """
     def __init__(self, db_type: DBType, snapshot_a: dict, snapshot_b: dict, label_a: str = "a", label_b: str = "b"):
+        self._start(db_type, label_a, label_b)
+        self._add_bucket(snapshot_a, snapshot_b)
+        self._finish()
+
+    @classmethod
+    def from_buckets(cls, db_type: DBType, buckets, label_a: str = "a", label_b: str = "b") -> "SnapshotDiff":
+        """Build the diff of two snapshots one bucket of keys at a time, see read_snapshot_buckets.
+
+        Args:
+            db_type (DBType): Type of the database of the snapshots.
+            buckets (iterable): The (bucket of snapshot a, bucket of snapshot b) pairs. A key must be in the
+                same bucket index in both snapshots.
+        """
+        snapshot_diff = cls.__new__(cls)
+        snapshot_diff._start(db_type, label_a, label_b)
+        for bucket_a, bucket_b in buckets:
+            snapshot_diff._add_bucket(bucket_a, bucket_b)
+        snapshot_diff._finish()
+        return snapshot_diff
+
+    def _start(self, db_type: DBType, label_a: str, label_b: str):
         self._db_type = db_type
-        self._snapshot_a = snapshot_a
-        self._snapshot_b = snapshot_b
         self._label_a = label_a
         self._label_b = label_b
-
-        # Start building metrics on snapshot
         self._metrics = DbComparisonMetrics()
-        self._metrics.total_a_keys = len(self._snapshot_a)
-        self._metrics.total_a_values_incl_volatile, self._metrics.total_a_values_excl_volatile = \
-            _sum_total_values(db_type, self._snapshot_a)
-        self._metrics.total_b_keys = len(self._snapshot_b)
-        self._metrics.total_b_values_incl_volatile, self._metrics.total_b_values_excl_volatile = \
-            _sum_total_values(db_type, self._snapshot_b)
+        self._diff = {}
+        self._processes_a = []
+        self._processes_b = []
+
+    def _add_bucket(self, snapshot_a: dict, snapshot_b: dict):
+        # Build metrics on snapshot
+        self._metrics.total_a_keys += len(snapshot_a)
+        incl_volatile, excl_volatile = _sum_total_values(self._db_type, snapshot_a)
+        self._metrics.total_a_values_incl_volatile += incl_volatile
+        self._metrics.total_a_values_excl_volatile += excl_volatile
+        self._metrics.total_b_keys += len(snapshot_b)
+        incl_volatile, excl_volatile = _sum_total_values(self._db_type, snapshot_b)
+        self._metrics.total_b_values_incl_volatile += incl_volatile
+        self._metrics.total_b_values_excl_volatile += excl_volatile
 
         # Build the diff
-        if db_type == DBType.STATE:
-            state_db_diff = self._diff_state_db_process_stats(self._snapshot_a, self._snapshot_b)
-            # Remove all 'PROCESS_STATS|*' keys from the dbs since they've already been diffed
-            self._snapshot_a = {k: v for k, v in self._snapshot_a.items() if not k.startswith("PROCESS_STATS|")}
-            self._snapshot_b = {k: v for k, v in self._snapshot_b.items() if not k.startswith("PROCESS_STATS|")}
-            remaining_diff = self._diff_dict(db_type, self._snapshot_a, self._snapshot_b)
-            self._diff = {**state_db_diff, **remaining_diff}
-        else:
-            self._diff = self._diff_dict(db_type, self._snapshot_a, self._snapshot_b)
+        if self._db_type == DBType.STATE:
+            self._extract_state_db_processes(snapshot_a, self._processes_a)
+            self._extract_state_db_processes(snapshot_b, self._processes_b)
+            # Remove all 'PROCESS_STATS|*' keys from the dbs since they are diffed separately
+            snapshot_a = {k: v for k, v in snapshot_a.items() if not k.startswith("PROCESS_STATS|")}
+            snapshot_b = {k: v for k, v in snapshot_b.items() if not k.startswith("PROCESS_STATS|")}
+        self._diff.update(self._diff_dict(self._db_type, snapshot_a, snapshot_b))
+
+    def _finish(self):
+        if self._db_type == DBType.STATE:
+            state_db_diff = self._diff_state_db_process_stats(self._processes_a, self._processes_b)
+            self._diff = {**state_db_diff, **self._diff}
+        self._processes_a = self._processes_b = None
 
         # Now that diff has been built, get metrics on the diff components
         self._metrics.populate_diff_metrics_from_diff(self._diff, label_a=self._label_a, label_b=self._label_b)
@@ -330,7 +410,16 @@ class SnapshotDiff:
     def metrics(self) -> DbComparisonMetrics:
         return self._metrics
 
-    def _diff_state_db_process_stats(self, state_db_a: dict, state_db_b: dict) -> dict:
+    @staticmethod
+    def _extract_state_db_processes(state_db: dict, extracted_cmd_store: list):
+        """Extract all the CMD entries of the PROCESS_STATS entries of a STATE_DB"""
+        for key, content in state_db.items():
+            if _PROCESS_STATS_KEY.match(key):
+                assert "value" in content and "CMD" in content["value"], \
+                    f"Unexpected PROCESS_STATS entry: {key} : {content}"
+                extracted_cmd_store.append(content["value"]["CMD"])
+
+    def _diff_state_db_process_stats(self, db_a_processes: list, db_b_processes: list) -> dict:
         """Between reboots or process restarts the PID can change but there is an
         equivalent process running. This pairs up the PROCESS_STATS entries and diffs
         based on the process running vs not.
@@ -340,17 +429,6 @@ class SnapshotDiff:
               into a tree structure and the trees of each compared. For now, this is simply
               a count of process matches. So far this has been adequate.
         """
-
-        # Extract all the CMD entries out of the DB's
-        db_a_processes = []
-        db_b_processes = []
-        for extracted_cmd_store, state_db in [(db_a_processes, state_db_a), (db_b_processes, state_db_b)]:
-            for key, content in state_db.items():
-                if re.match(r"^PROCESS_STATS\|\d+", key):
-                    assert "value" in content and "CMD" in content["value"], \
-                        f"Unexpected PROCESS_STATS entry: {key} : {content}"
-                    extracted_cmd_store.append(content["value"]["CMD"])
-
         db_a_processes_counter = Counter(db_a_processes)
         db_b_processes_counter = Counter(db_b_processes)
         db_a_only_processes = list((db_a_processes_counter - db_b_processes_counter).elements())
@@ -376,54 +454,43 @@ class SnapshotDiff:
     def _diff_dict(self, db_type: DBType, dict_a: dict, dict_b: dict) -> dict:
 
         result = {}
-        always_ignore_keys = set(VOLATILE_VALUES.get(db_type, []))
+        always_ignore_keys = _volatile_values(db_type)
 
-        a_keys = set(dict_a.keys()) - always_ignore_keys
-        b_keys = set(dict_b.keys()) - always_ignore_keys
+        a_keys = dict_a.keys() - always_ignore_keys
+        b_keys = dict_b.keys() - always_ignore_keys
         a_only_keys = a_keys - b_keys
         b_only_keys = b_keys - a_keys
         keys_in_both = a_keys & b_keys
 
-        # Process a-only keys
+        # Process a-only and b-only keys, without the always ignore keys
+        matcher = compile_key_patterns(always_ignore_keys) if a_only_keys or b_only_keys else None
         for key in a_only_keys:
-            if isinstance(dict_a[key], dict):
-                # Remove always ignore keys
-                val = copy.deepcopy(dict_a[key])
-                _recursively_remove_keys_matching_pattern(val, always_ignore_keys)
-            else:
-                val = dict_a[key]
             result[key] = {
-                self._label_a: val,
+                self._label_a: _copy_without_matching_keys(dict_a[key], matcher),
                 self._label_b: None
             }
-
-        # Process b-only keys
         for key in b_only_keys:
-            if isinstance(dict_b[key], dict):
-                # Remove always ignore keys
-                val = copy.deepcopy(dict_b[key])
-                _recursively_remove_keys_matching_pattern(val, always_ignore_keys)
-            else:
-                val = dict_b[key]
             result[key] = {
                 self._label_a: None,
-                self._label_b: val
+                self._label_b: _copy_without_matching_keys(dict_b[key], matcher)
             }
 
         # Process keys that are in both
         for key in keys_in_both:
             value_a = dict_a[key]
             value_b = dict_b[key]
+            if value_a == value_b:
+                # Most of the keys are the same, compared at once without walking them
+                continue
             if isinstance(value_a, dict) and isinstance(value_b, dict):
                 nested_diff = self._diff_dict(db_type, value_a, value_b)
                 if nested_diff:
                     result[key] = nested_diff
-            elif value_a != value_b:
+            else:
                 result[key] = {
                     self._label_a: value_a,
                     self._label_b: value_b
                 }
-            # otherwise they are the same and therefore not included in the diff
 
         return result
 
@@ -512,12 +579,25 @@ def _recursively_remove_keys_matching_pattern(d_for_removal, patterns):
         d_for_removal (dict): Dictionary to remove keys from (modified in-place)
         patterns (iterable): Set of patterns to match against keys using match_key()
     """
-    if isinstance(d_for_removal, dict):
-        keys_to_remove = [k for k in d_for_removal if match_key(k, patterns)]
-        for k in keys_to_remove:
-            del d_for_removal[k]
-        for v in d_for_removal.values():
-            _recursively_remove_keys_matching_pattern(v, patterns)
+    matcher = compile_key_patterns(patterns)
+
+    def _remove(d):
+        if isinstance(d, dict):
+            keys_to_remove = [k for k in d if matcher(k)]
+            for k in keys_to_remove:
+                del d[k]
+            for v in d.values():
+                _remove(v)
+    _remove(d_for_removal)
+
+
+def _copy_without_matching_keys(value, matcher):
+    """Deep copy of a value without the keys of the nested dicts matching a compile_key_patterns matcher."""
+    if isinstance(value, dict):
+        return {k: _copy_without_matching_keys(v, matcher) for k, v in value.items() if not matcher(k)}
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return copy.deepcopy(value)
 
 
 def _sum_total_values(db_type: DBType, db_dump: dict) -> Tuple[int, int]:
@@ -535,6 +615,175 @@ def _sum_total_values(db_type: DBType, db_dump: dict) -> Tuple[int, int]:
     return total_incl_volatile, total_excl_volatile
 
 
+# Format of the snapshot files, gzip compressed json lines:
+#   {"format": SNAPSHOT_FORMAT, "version": SNAPSHOT_FORMAT_VERSION, "db": <DBType name>, "buckets": <count>}
+#   [<bucket index>, <key>, <content>]
+#   ...
+# The entries are grouped by bucket index, the bucket of a key is snapshot_bucket(key, buckets). So the same bucket
+# of two snapshots can be diffed without loading the other buckets.
+SNAPSHOT_FORMAT = "sonic-redis-db-snapshot"
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOT_FILE_SUFFIX = ".snapshot.gz"
+SNAPSHOT_BUCKETS = 64
+JSON_CHUNK_SIZE = 1024 * 1024
+
+
+def snapshot_bucket(key: str, buckets: int) -> int:
+    """Get the bucket index of a key, stable across processes unlike hash()."""
+    return zlib.crc32(key.encode("utf-8", "surrogatepass")) % buckets
+
+
+def iter_json_object(stream, chunk_size: int = JSON_CHUNK_SIZE):
+    """
+    Parse a json object from a text stream one item at a time, without loading the whole object.
+
+    Args:
+        stream: Text stream of the json object, e.g. the output file of redis-dump.
+        chunk_size (int): Size of the chunks read from the stream.
+
+    Yields:
+        (key, value) of each item of the object.
+
+    Raises:
+        ValueError: If the stream is not a json object.
+    """
+    decoder = json.JSONDecoder()
+    state = {"buf": "", "pos": 0, "eof": False}
+
+    def _fill():
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            state["eof"] = True
+        state["buf"] = state["buf"][state["pos"]:] + chunk
+        state["pos"] = 0
+
+    def _next_char():
+        while True:
+            buf, pos = state["buf"], state["pos"]
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            state["pos"] = pos
+            if pos < len(buf):
+                return buf[pos]
+            if state["eof"]:
+                raise ValueError("Unexpected end of the json object")
+            _fill()
+
+    def _expect(chars):
+        char = _next_char()
+        if char not in chars:
+            raise ValueError("Expected one of '{}' in the json object, got '{}'".format(chars, char))
+        state["pos"] += 1
+        return char
+
+    def _decode():
+        _next_char()
+        while True:
+            try:
+                value, end = decoder.raw_decode(state["buf"], state["pos"])
+                # A value ending at the end of the buffer, like a number, may continue in the next chunk
+                if end < len(state["buf"]) or state["eof"]:
+                    state["pos"] = end
+                    return value
+            except json.JSONDecodeError:
+                if state["eof"]:
+                    raise
+            _fill()
+
+    _expect("{")
+    if _next_char() == "}":
+        return
+    while True:
+        key = _decode()
+        if not isinstance(key, str):
+            raise ValueError("Expected a string key in the json object, got {!r}".format(key))
+        _expect(":")
+        yield key, _decode()
+        if _expect(",}") == "}":
+            return
+
+
+def write_snapshot(path: str, db_type: DBType, items, buckets: int = SNAPSHOT_BUCKETS):
+    """
+    Write the content of a DB in the snapshot format, see SNAPSHOT_FORMAT.
+
+    Args:
+        path (str): Path of the snapshot file.
+        db_type (DBType): Type of the DB.
+        items (iterable): The (key, content) of the DB, e.g. from iter_json_object.
+        buckets (int): Number of buckets.
+
+    Returns:
+        int: Number of keys written.
+    """
+    count = 0
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(path))) as spool_dir:
+        # Spool the entries per bucket, then concatenate the buckets
+        spools = [open(os.path.join(spool_dir, str(index)), "w+") for index in range(buckets)]
+        try:
+            for key, content in items:
+                index = snapshot_bucket(key, buckets)
+                spools[index].write(json.dumps([index, key, content], separators=(",", ":"), default=str) + "\n")
+                count += 1
+            tmp_path = path + ".tmp"
+            with gzip.open(tmp_path, "wt", compresslevel=6) as f:
+                f.write(json.dumps({"format": SNAPSHOT_FORMAT, "version": SNAPSHOT_FORMAT_VERSION,
+                                    "db": db_type.name, "buckets": buckets}) + "\n")
+                for spool in spools:
+                    spool.seek(0)
+                    for line in spool:
+                        f.write(line)
+            os.replace(tmp_path, path)
+        finally:
+            for spool in spools:
+                spool.close()
+    return count
+
+
+def read_snapshot_header(path: str) -> dict:
+    with gzip.open(path, "rt") as f:
+        header = json.loads(f.readline())
+    if header.get("format") != SNAPSHOT_FORMAT or header.get("version") != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError("{} is not a snapshot of version {}".format(path, SNAPSHOT_FORMAT_VERSION))
+    return header
+
+
+def read_snapshot_buckets(path: str):
+    """
+    Read a snapshot file one bucket at a time.
+
+    Yields:
+        (bucket index, dict of the keys of the bucket), for all the buckets in order, including the empty ones.
+    """
+    buckets = read_snapshot_header(path)["buckets"]
+    next_index = 0
+    bucket = {}
+    with gzip.open(path, "rt") as f:
+        f.readline()
+        for line in f:
+            index, key, content = json.loads(line)
+            while index > next_index:
+                yield next_index, bucket
+                bucket = {}
+                next_index += 1
+            bucket[key] = content
+    while next_index < buckets:
+        yield next_index, bucket
+        bucket = {}
+        next_index += 1
+
+
+def read_snapshot(path: str) -> dict:
+    """Read the whole content of a snapshot file, or of a redis-dump json file."""
+    if not path.endswith(SNAPSHOT_FILE_SUFFIX):
+        with open(path, "r") as f:
+            return json.load(f)
+    result = {}
+    for _, bucket in read_snapshot_buckets(path):
+        result.update(bucket)
+    return result
+
+
 class SonicRedisDBSnapshotter:
     """
     Class for taking and comparing Redis database snapshots on SONiC devices.
@@ -566,8 +815,9 @@ class SonicRedisDBSnapshotter:
         """
         Take a snapshot of specified Redis databases on the DUT.
 
-        This method captures the current state of the specified Redis databases
-        and stores them as JSON files in a snapshot directory.
+        The databases are dumped concurrently on the DUT, the compressed dumps are fetched concurrently, then
+        converted to the snapshot format without loading them whole, see write_snapshot. A snapshot is kept on
+        disk, so its diffs with other snapshots can be computed again without fetching it again.
 
         Args:
             snapshot_name (str): Name identifier for this snapshot
@@ -577,21 +827,57 @@ class SonicRedisDBSnapshotter:
         # NOTE: Need trailing slash below to avoid additional dir nesting
         snapshot_dir = f"{self._snapshot_base_dir}/{snapshot_name}/"
         os.makedirs(snapshot_dir, exist_ok=True)
-        for db in snapshot_dbs:
-            cmd = f"redis-dump -d {db.value} --pretty"
-            dump = dut_dump(cmd, self._duthost, snapshot_dir, db.name)
-            with open(f"{snapshot_dir}/{db.name}.json", "w") as f:
-                f.write(json.dumps(dump, indent=4, default=str))
+
+        dump_files = {db: f"/tmp/{snapshot_name}_{db.name}.json" for db in snapshot_dbs}
+        dump_cmds = [f"(rm -f {dump_file}.gz && redis-dump -d {db.value} -o {dump_file} && gzip -f {dump_file}) &"
+                     for db, dump_file in dump_files.items()]
+        # Wait for all the dumps, fail if any of them failed
+        cmd = "pids=''; {} rc=0; for pid in $pids; do wait $pid || rc=1; done; exit $rc".format(
+            " ".join("{} pids=\"$pids $!\";".format(dump_cmd) for dump_cmd in dump_cmds))
+        ret = self._duthost.shell(cmd, module_ignore_errors=True)
+        assert ret["rc"] == 0, "Failed to dump dbs {} on {}: {}".format(
+            [db.name for db in snapshot_dbs], self._duthost.hostname, ret.get("stderr", ""))
+
+        def _fetch_and_convert(db):
+            dump_file = dump_files[db] + ".gz"
+            ret = self._duthost.fetch(src=dump_file, dest=snapshot_dir, flat=True)
+            dest_file = ret.get("dest", None)
+            assert dest_file is not None, "Failed to fetch src={} dest:{}".format(dump_file, snapshot_dir)
+            assert os.path.exists(dest_file), "Fetched file not exist: {}".format(dest_file)
+            try:
+                with gzip.open(dest_file, "rt") as f:
+                    count = write_snapshot(os.path.join(snapshot_dir, db.name + SNAPSHOT_FILE_SUFFIX), db,
+                                           iter_json_object(f))
+            finally:
+                os.remove(dest_file)
+            logger.info(f"Snapshot of {db.name} on {self._duthost.hostname}: {count} keys")
+
+        fanout_map(_fetch_and_convert, snapshot_dbs,
+                   names=[f"{self._duthost.hostname}/{db.name}" for db in snapshot_dbs])
+        self._duthost.shell("rm -f {}".format(" ".join(dump_file + ".gz" for dump_file in dump_files.values())),
+                            module_ignore_errors=True)
+        self._snapshots.append(snapshot_name)
 
         logger.info(f"Snapshot {snapshot_name} taken for {self._duthost.hostname} at {snapshot_dir}")
 
+    def _snapshot_files(self, snapshot_name: str) -> Dict[DBType, str]:
+        """Get the files of the dbs of a snapshot, in the snapshot format or redis-dump json (older snapshots)."""
+        snapshot_dir = f"{self._snapshot_base_dir}/{snapshot_name}"
+        files = {}
+        for f in os.listdir(snapshot_dir):
+            for suffix in (SNAPSHOT_FILE_SUFFIX, ".json"):
+                if f.endswith(suffix) and f[:-len(suffix)] in DBType.__members__:
+                    files.setdefault(DBType[f[:-len(suffix)]], os.path.join(snapshot_dir, f))
+        return files
+
     def diff_snapshots(self, snapshot_a: str, snapshot_b: str) -> Dict[DBType, SnapshotDiff]:
         """
         Compare two snapshots and return detailed differences for each database.
 
         This method loads two previously taken snapshots and compares them,
         generating SnapshotDiff objects for each database type that contains
-        the differences and metrics.
+        the differences and metrics. The snapshots in the snapshot format are
+        compared one bucket of keys at a time.
 
         Args:
             snapshot_a (str): Name of the first snapshot to compare
@@ -604,25 +890,26 @@ class SonicRedisDBSnapshotter:
         Raises:
             AssertionError: If the snapshots don't contain the same database types
         """
-        snapshot_a_dir = f"{self._snapshot_base_dir}/{snapshot_a}"
-        snapshot_a_dbs = [f for f in os.listdir(snapshot_a_dir) if f.endswith(".json")]
-
-        snapshot_b_dir = f"{self._snapshot_base_dir}/{snapshot_b}"
-        snapshot_b_dbs = [f for f in os.listdir(snapshot_b_dir) if f.endswith(".json")]
+        snapshot_a_files = self._snapshot_files(snapshot_a)
+        snapshot_b_files = self._snapshot_files(snapshot_b)
 
-        assert set(snapshot_a_dbs) == set(snapshot_b_dbs), "Snapshotted dbs do not match. Cannot compare"
+        assert set(snapshot_a_files) == set(snapshot_b_files), "Snapshotted dbs do not match. Cannot compare"
 
         result = {}
 
-        for db_file in snapshot_a_dbs:
-            db_name = db_file.replace(".json", "")
-            db_type = DBType[db_name]
+        for db_type, file_a in snapshot_a_files.items():
             if db_type == DBType.ASIC:
                 # NOTE: ASIC DB diffing not currently supported
                 continue
-            db_dump_a = json.load(open(os.path.join(snapshot_a_dir, db_file), 'r'))
-            db_dump_b = json.load(open(os.path.join(snapshot_b_dir, db_file), 'r'))
-            snapshot_diff = SnapshotDiff(db_type, db_dump_a, db_dump_b, label_a=snapshot_a, label_b=snapshot_b)
+            file_b = snapshot_b_files[db_type]
+            if file_a.endswith(SNAPSHOT_FILE_SUFFIX) and file_b.endswith(SNAPSHOT_FILE_SUFFIX) and \
+                    read_snapshot_header(file_a)["buckets"] == read_snapshot_header(file_b)["buckets"]:
+                buckets = ((bucket_a, bucket_b) for (_, bucket_a), (_, bucket_b)
+                           in zip(read_snapshot_buckets(file_a), read_snapshot_buckets(file_b)))
+                snapshot_diff = SnapshotDiff.from_buckets(db_type, buckets, label_a=snapshot_a, label_b=snapshot_b)
+            else:
+                snapshot_diff = SnapshotDiff(db_type, read_snapshot(file_a), read_snapshot(file_b),
+                                             label_a=snapshot_a, label_b=snapshot_b)
 
             result[db_type] = snapshot_diff
 
@@ -2,13 +2,16 @@ import inspect
 import json
 import logging
 import collections
+import shlex
 import signal
 import threading
+import time
 from contextlib import contextmanager
 from multiprocessing.pool import ThreadPool
 import ansible
 from pytest_ansible.results import AdHocResult, ModuleResult
 
+from tests.common.connections.ssh_control_pool import SshControlPool
 from tests.common.errors import RunAnsibleModuleFail
 
 
@@ -89,6 +92,210 @@ except Exception as e:
     logger.error("Hack for https://github.com/ansible/pytest-ansible/issues/47 failed: {}".format(repr(e)))
 
 
+class ModuleCallStats(object):
+    """
+    @summary: Per module call counts and latency histograms of the AnsibleHostBase module calls.
+
+    The stats are recorded only when enabled (see the module_call_stats fixture in conftest.py). They are kept per
+    module and per caller (file::function) of the module, so the helpers dominating the wall time can be found.
+    """
+
+    # Upper bounds in seconds of the latency histogram buckets, the last bucket holds the calls above 60s
+    LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+    enabled = False
+    _lock = threading.Lock()
+    _stats = {}
+
+    @classmethod
+    def enable(cls, enabled=True):
+        cls.enabled = enabled
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._stats = {}
+
+    @classmethod
+    def record(cls, module_name, caller, elapsed):
+        bucket = len(cls.LATENCY_BUCKETS)
+        for index, upper in enumerate(cls.LATENCY_BUCKETS):
+            if elapsed <= upper:
+                bucket = index
+                break
+        with cls._lock:
+            stats = cls._stats.get((module_name, caller))
+            if stats is None:
+                stats = cls._stats[(module_name, caller)] = [0, 0.0, 0.0, [0] * (len(cls.LATENCY_BUCKETS) + 1)]
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] = max(stats[2], elapsed)
+            stats[3][bucket] += 1
+
+    @classmethod
+    def summary(cls):
+        """
+        @summary: Get the recorded stats.
+        @return: Dict with the stats per module and per caller, sorted by total time. Each stats is a dict with
+                 keys 'count', 'total', 'max' and 'histogram' (call count per bucket of LATENCY_BUCKETS).
+        """
+        with cls._lock:
+            items = [(key, list(stats[:3]) + [list(stats[3])]) for key, stats in cls._stats.items()]
+
+        def _aggregate(key_func):
+            aggregated = {}
+            for key, (count, total, max_time, histogram) in items:
+                agg = aggregated.setdefault(key_func(key), {
+                    "count": 0, "total": 0.0, "max": 0.0, "histogram": [0] * len(histogram)})
+                agg["count"] += count
+                agg["total"] += total
+                agg["max"] = max(agg["max"], max_time)
+                agg["histogram"] = [a + b for a, b in zip(agg["histogram"], histogram)]
+            return dict(sorted(aggregated.items(), key=lambda item: item[1]["total"], reverse=True))
+
+        return {
+            "buckets": list(cls.LATENCY_BUCKETS) + ["inf"],
+            "modules": _aggregate(lambda key: key[0]),
+            "callers": _aggregate(lambda key: "{} {}".format(key[1], key[0]))
+        }
+
+    @classmethod
+    def dump(cls, path=None, top=20):
+        """
+        @summary: Log the modules and callers with the largest total time, and save all the stats to a json file.
+        @param path: Path of the json file, not saved if None.
+        @param top: Number of modules and callers to log.
+        """
+        summary = cls.summary()
+        for section in ("modules", "callers"):
+            lines = ["{:>8} {:>10.2f}s {:>8.2f}s  {}".format(stats["count"], stats["total"], stats["max"], name)
+                     for name, stats in list(summary[section].items())[:top]]
+            logger.info("Module call stats, top {} {} by total time:\n{:>8} {:>11} {:>9}  {}\n{}".format(
+                top, section, "count", "total", "max", "name", "\n".join(lines)))
+        if path:
+            with open(path, "w") as stats_file:
+                json.dump(summary, stats_file, indent=2)
+        return summary
+
+
+class BatchCall(object):
+    """
+    @summary: A module call queued in a ModuleBatch. Its result is available after the batch is run.
+    """
+
+    def __init__(self, module_name, cmd, sh_cmd, module_ignore_errors=False):
+        self.module_name = module_name
+        self.cmd = cmd
+        self.sh_cmd = sh_cmd
+        self.module_ignore_errors = module_ignore_errors
+        self._result = None
+
+    @property
+    def result(self):
+        if self._result is None:
+            raise RuntimeError("Result of batched {} '{}' is not available, the batch was not run or stopped before "
+                               "this call".format(self.module_name, self.cmd))
+        return self._result
+
+    def __getitem__(self, key):
+        return self.result[key]
+
+    def get(self, key, default=None):
+        return self.result.get(key, default)
+
+
+class ModuleBatch(object):
+    """
+    @summary: Queue several shell/command module calls and run them on the host in a single ansible task.
+
+    The queued calls are run one after another by the shell_cmds module, so the connection setup and module
+    shipping are paid once for the whole batch instead of once per call. Each queued call returns a BatchCall
+    whose result has the same keys as the result of the shell/command module.
+
+    Example:
+        with duthost.batch() as batch:
+            version = batch.shell("show version")
+            status = batch.command("docker exec swss supervisorctl status", module_ignore_errors=True)
+        version["stdout_lines"], status["rc"]
+
+    The batch is run when the 'with' block exits without exception, or by calling run(). By default all the
+    queued calls are run even if one of them fails, so only batch side effect free calls. After the batch is run,
+    RunAnsibleModuleFail is raised for the first failed call which does not have module_ignore_errors set.
+    """
+
+    BATCHABLE_MODULES = ("shell", "command")
+
+    def __init__(self, host, continue_on_fail=True, timeout=0):
+        self.host = host
+        self.continue_on_fail = continue_on_fail
+        self.timeout = timeout
+        self.calls = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.run()
+        return False
+
+    def __getattr__(self, module_name):
+        if module_name not in self.BATCHABLE_MODULES:
+            raise AttributeError("Module '{}' can not be batched, only {} are supported".format(
+                module_name, ", ".join(self.BATCHABLE_MODULES)))
+
+        def _queue_wrapper(cmd, module_ignore_errors=False, chdir=None):
+            return self._queue(module_name, cmd, module_ignore_errors=module_ignore_errors, chdir=chdir)
+        return _queue_wrapper
+
+    def _queue(self, module_name, cmd, module_ignore_errors=False, chdir=None):
+        sh_cmd = cmd
+        if module_name == "command":
+            # The command module does not use a shell, quote the arguments to run them as is
+            sh_cmd = " ".join(shlex.quote(arg) for arg in shlex.split(cmd))
+        if chdir:
+            sh_cmd = "cd {} && {}".format(shlex.quote(chdir), sh_cmd)
+        call = BatchCall(module_name, cmd, sh_cmd, module_ignore_errors=module_ignore_errors)
+        self.calls.append(call)
+        return call
+
+    def run(self):
+        """
+        @summary: Run the queued calls in a single shell_cmds task.
+        @return: List of the results of the calls, in the order they were queued.
+        """
+        calls, self.calls = self.calls, []
+        if not calls:
+            return []
+
+        res = self.host.shell_cmds(cmds=[call.sh_cmd for call in calls], continue_on_fail=self.continue_on_fail,
+                                   timeout=self.timeout, module_ignore_errors=True)
+        if "results" not in res:
+            raise RunAnsibleModuleFail("run module shell_cmds failed", res)
+
+        for call, cmd_res in zip(calls, res["results"]):
+            # Strip the trailing newlines like the shell and command modules do
+            stdout = cmd_res["stdout"].rstrip("\r\n")
+            stderr = cmd_res["stderr"].rstrip("\r\n")
+            call._result = ModuleResult(
+                cmd=call.cmd,
+                rc=cmd_res["rc"],
+                stdout=stdout,
+                stderr=stderr,
+                stdout_lines=stdout.splitlines(),
+                stderr_lines=stderr.splitlines(),
+                start=cmd_res["start"],
+                end=cmd_res["end"],
+                changed=True,
+                failed=cmd_res["rc"] != 0
+            )
+
+        for call in calls:
+            if call._result is not None and call._result["failed"] and not call.module_ignore_errors:
+                raise RunAnsibleModuleFail("run module {} failed".format(call.module_name), call._result)
+        return [call._result for call in calls]
+
+
 class AnsibleHostBase(object):
     """
     @summary: The base class for various objects.
@@ -98,6 +305,9 @@ class AnsibleHostBase(object):
     on the host.
     """
 
+    # Master SSH connection of the host in the SshControlPool, None if the pool is not enabled
+    _ssh_control = None
+
     # Class-level flag for IPv6-only management mode.
     # Set by the ipv6_only_mgmt_enabled fixture in conftest.py
     _ipv6_only_mgmt_mode = False
@@ -157,6 +367,18 @@ class AnsibleHostBase(object):
                 self.mgmt_ipv6 = ansible_hostv6
         self.hostname = hostname
 
+        ssh_control_pool = SshControlPool.get_instance()
+        if ssh_control_pool is not None:
+            self._ssh_control = ssh_control_pool.attach(self)
+
+    def batch(self, continue_on_fail=True, timeout=0):
+        """
+        @summary: Get a ModuleBatch to run several shell/command module calls on this host in a single task.
+        @param continue_on_fail: Run the remaining calls after a call failed.
+        @param timeout: Time limit in seconds of each call, 0 means no limit.
+        """
+        return ModuleBatch(self, continue_on_fail=continue_on_fail, timeout=timeout)
+
     def __getattr__(self, module_name):
         if self.host.has_module(module_name):
             def _run_wrapper(*module_args, **kwargs):
@@ -167,13 +389,32 @@ class AnsibleHostBase(object):
             )
 
     def _run(self, module_name, *module_args, **complex_args):
-
-        previous_frame = inspect.currentframe().f_back
-        filename, line_number, function_name, lines, index = inspect.getframeinfo(previous_frame)
+        # Get the caller from the frame only, inspect.getframeinfo reads the source file of the caller
+        caller_frame = inspect.currentframe().f_back
+        if caller_frame.f_code.co_name == "_run_wrapper":
+            caller_frame = caller_frame.f_back
+        caller = (caller_frame.f_code.co_filename, caller_frame.f_code.co_name, caller_frame.f_lineno)
+
+        if not ModuleCallStats.enabled:
+            return self._run_module(caller, None, module_name, *module_args, **complex_args)
+
+        start = time.time()
+        if complex_args.get('module_async', False):
+            # An async call returns once submitted, its duration is recorded by the thread running it
+            return self._run_module(caller, start, module_name, *module_args, **complex_args)
+        try:
+            return self._run_module(caller, None, module_name, *module_args, **complex_args)
+        finally:
+            ModuleCallStats.record(module_name, "{}::{}".format(caller[0], caller[1]), time.time() - start)
+
+    def _run_module(self, caller, async_start, module_name, *module_args, **complex_args):
+        filename, function_name, line_number = caller
+        # Skip formatting the debug logs, including the json dumps of args and results, when they are not logged
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
 
         verbose = complex_args.pop('verbose', True)
         module = getattr(self.host, module_name)
-        if verbose:
+        if debug_enabled and verbose:
             logger.debug(
                 "{}::{}#{}: [{}] AnsibleModule::{}, args={}, kwargs={}".format(
                     filename,
@@ -185,7 +426,7 @@ class AnsibleHostBase(object):
                     json.dumps(complex_args, cls=AnsibleHostBase.CustomEncoder)
                 )
             )
-        else:
+        elif debug_enabled:
             logger.debug(
                 "{}::{}#{}: [{}] AnsibleModule::{} executing...".format(
                     filename,
@@ -201,8 +442,13 @@ class AnsibleHostBase(object):
 
         if module_async:
             def run_module(module_args, complex_args):
-                with suppress_signal_registration_for_non_main_thread():
-                    return module(*module_args, **complex_args)[self.hostname]
+                try:
+                    with suppress_signal_registration_for_non_main_thread():
+                        return module(*module_args, **complex_args)[self.hostname]
+                finally:
+                    if async_start is not None:
+                        ModuleCallStats.record(module_name, "{}::{}".format(filename, function_name),
+                                               time.time() - async_start)
             pool = ThreadPool()
             result = pool.apply_async(run_module, (module_args, complex_args))
             return pool, result
@@ -210,6 +456,11 @@ class AnsibleHostBase(object):
         module_args = json.loads(json.dumps(module_args, cls=AnsibleHostBase.CustomEncoder))
         complex_args = json.loads(json.dumps(complex_args, cls=AnsibleHostBase.CustomEncoder))
 
+        if self._ssh_control is not None:
+            ssh_control_pool = SshControlPool.get_instance()
+            if ssh_control_pool is not None:
+                ssh_control_pool.record_call(self._ssh_control)
+
         with suppress_signal_registration_for_non_main_thread():
             adhoc_res: AdHocResult = module(*module_args, **complex_args)
 
@@ -221,7 +472,7 @@ class AnsibleHostBase(object):
         hostname_res: ModuleResult = adhoc_res[self.hostname]
         hostname_res.encoder = AnsibleHostBase.CustomEncoder
 
-        if verbose:
+        if debug_enabled and verbose:
             logger.debug(
                 "{}::{}#{}: [{}] AnsibleModule::{} Result => {}".format(
                     filename,
@@ -231,7 +482,7 @@ class AnsibleHostBase(object):
                     module_name, json.dumps(hostname_res, cls=AnsibleHostBase.CustomEncoder)
                 )
             )
-        else:
+        elif debug_enabled:
             logger.debug(
                 "{}::{}#{}: [{}] AnsibleModule::{} done, is_failed={}, rc={}".format(
                     filename,
@@ -2,6 +2,7 @@ import logging
 import sys
 
 from tests.common.devices.multi_asic import MultiAsicSonicHost
+from tests.common.helpers.multi_thread_utils import fanout_map
 from tests.common.helpers.parallel_utils import is_initial_checks_active
 
 logger = logging.getLogger(__name__)
@@ -20,8 +21,14 @@ class DutHosts(object):
     class _Nodes(list):
         """ Internal class representing a list of MultiAsicSonicHosts """
         def _run_on_nodes(self, module, *module_args, **complex_args):
-            """ Delegate the call to each of the nodes, return the results in a dict."""
-            return {node.hostname: getattr(node, module)(*module_args, **complex_args) for node in self}
+            """ Delegate the call to each of the nodes, return the results in a dict.
+
+            The nodes are called concurrently when the parallel fan-out is enabled (see ParallelFanout).
+            """
+            nodes = list(self)
+            results = fanout_map(lambda node: getattr(node, module)(*module_args, **complex_args), nodes,
+                                 names=[node.hostname for node in nodes])
+            return {node.hostname: result for node, result in zip(nodes, results)}
 
         def __getattr__(self, attr):
             """ To support calling ansible modules on a list of MultiAsicSonicHost
@@ -225,11 +232,13 @@ class DutHosts(object):
         return self.nodes.__repr__()
 
     def config_facts(self, *module_args, **complex_args):
-        result = {}
-        for node in self.nodes:
-            complex_args['host'] = node.hostname
-            result[node.hostname] = node.config_facts(*module_args, **complex_args)['ansible_facts']
-        return result
+        def _node_config_facts(node):
+            node_complex_args = dict(complex_args, host=node.hostname)
+            return node.config_facts(*module_args, **node_complex_args)['ansible_facts']
+
+        nodes = list(self.nodes)
+        results = fanout_map(_node_config_facts, nodes, names=[node.hostname for node in nodes])
+        return {node.hostname: result for node, result in zip(nodes, results)}
 
     def reset(self):
         self.__initialize_nodes()
@@ -11,6 +11,7 @@ from tests.common.devices.sonic_asic import SonicAsic
 from tests.common.devices.sonic_docker import SonicDockerManager
 from tests.common.helpers.assertions import pytest_assert
 from tests.common.helpers.constants import DEFAULT_ASIC_ID, DEFAULT_NAMESPACE, ASICS_PRESENT
+from tests.common.helpers.multi_thread_utils import fanout_map
 from tests.common.platform.interface_utils import get_dut_interfaces_status
 
 logger = logging.getLogger(__name__)
@@ -169,7 +170,10 @@ class MultiAsicSonicHost(object):
                 return getattr(self.asic_instance(asic_index), multi_asic_attr)(*module_args, **asic_complex_args)
             elif type(asic_index) == str and asic_index.lower() == "all":
                 # All ASICs/namespace
-                return [getattr(asic, multi_asic_attr)(*module_args, **asic_complex_args) for asic in self.asics]
+                # The ASICs are called concurrently when the parallel fan-out is enabled
+                return fanout_map(lambda asic: getattr(asic, multi_asic_attr)(*module_args, **asic_complex_args),
+                                  self.asics,
+                                  names=["{}/asic{}".format(self.hostname, asic.asic_index) for asic in self.asics])
             else:
                 raise ValueError("Argument 'asic_index' must be an int or string 'all'.")
 
@@ -20,6 +20,8 @@ from tests.common.utilities import get_host_visible_vars, wait_until
 from tests.common.cache import cached
 from tests.common.helpers.constants import DEFAULT_ASIC_ID, DEFAULT_NAMESPACE
 from tests.common.helpers.platform_api.chassis import is_inband_port
+from tests.common.helpers import show_parser
+from tests.common.helpers.structured_show import ShowSource, json_output, run_show_sources, text_source
 from tests.common.errors import RunAnsibleModuleFail
 from tests.common import constants
 from typing import Dict, Optional, TypedDict
@@ -48,6 +50,9 @@ PROCESS_TO_CONTAINER_MAP = {
     "syncd": "syncd"
 }
 UNKNOWN_ASIC = "unknown"
+# Stages and bind points of the ACL resources, in the order of the "crm show resources all" command
+CRM_ACL_STAGES = ["INGRESS", "EGRESS"]
+CRM_ACL_BIND_POINTS = ["PORT", "LAG", "VLAN", "RIF", "SWITCH"]
 COUNTER_TYPE_CLI_MAP = {
     'QUEUE_STAT': 'queue',
     'PORT_STAT': 'port',
@@ -817,14 +822,65 @@ class SonicHost(AnsibleHostBase):
 
     def get_crm_resources(self, namespace=DEFAULT_NAMESPACE):
         """
-        @summary: Run the "crm show resources all" command and parse its output
+        @summary: Get the CRM resources, from the CRM counters in COUNTERS_DB, or from the output of the
+                  "crm show resources all" command if sonic-db-dump is not available
         """
         if self.is_multi_asic:
             return self.get_crm_resources_for_masic(namespace)
+        return run_show_sources(self, "get_crm_resources", [
+            ShowSource("db", 'sonic-db-dump -n COUNTERS_DB -k "CRM:*" -y', self._parse_crm_resources_db),
+            text_source("crm show resources all", self._parse_crm_resources_text)
+        ])
+
+    def _parse_crm_resources_db(self, dump_result):
+        """
+        @summary: Parse the CRM counters dumped from COUNTERS_DB, the same way the "crm show resources all"
+                  command shows them
+        """
+        dump = json_output(dump_result)
+        if not dump.get("CRM:STATS", {}).get("value"):
+            raise ValueError("CRM counters are not ready")
+
+        def _used_available(key, resources):
+            stats = dump.get(key, {}).get("value", {})
+            for resource in resources:
+                used = stats.get("crm_stats_{}_used".format(resource))
+                available = stats.get("crm_stats_{}_available".format(resource))
+                if used is not None and available is not None:
+                    yield resource, int(used), int(available)
+
+        stats = dump["CRM:STATS"]["value"]
+        main_resources = [field[len("crm_stats_"):-len("_used")] for field in stats
+                          if field.startswith("crm_stats_") and field.endswith("_used")]
+        result = {"main_resources": {}, "acl_resources": [], "table_resources": []}
+        for resource, used, available in _used_available("CRM:STATS", main_resources):
+            result["main_resources"][resource] = {"used": used, "available": available}
+        for stage in CRM_ACL_STAGES:
+            for bind_point in CRM_ACL_BIND_POINTS:
+                for resource, used, available in _used_available("CRM:ACL_STATS:{}:{}".format(stage, bind_point),
+                                                                 ["acl_group", "acl_table"]):
+                    result["acl_resources"].append({"stage": stage,
+                                                    "bind_point": bind_point,
+                                                    "resource_name": resource,
+                                                    "used_count": used,
+                                                    "available_count": available})
+        for key in sorted(dump):
+            if not key.startswith("CRM:ACL_TABLE_STATS:"):
+                continue
+            for resource, used, available in _used_available(key, ["acl_entry", "acl_counter"]):
+                result["table_resources"].append({"table_id": key[len("CRM:ACL_TABLE_STATS:"):],
+                                                  "resource_name": resource,
+                                                  "used_count": used,
+                                                  "available_count": available})
+        return result
+
+    def _parse_crm_resources_text(self, show_result):
+        """
+        @summary: Parse the output of the "crm show resources all" command
+        """
         result = {"main_resources": {}, "acl_resources": [], "table_resources": []}
-        output = self.command("crm show resources all")["stdout_lines"]
         current_table = 0   # Totally 3 tables in the command output
-        for line in output:
+        for line in show_result["stdout_lines"]:
             if len(line.strip()) == 0:
                 continue
             if "---" in line:
@@ -1628,73 +1684,13 @@ Totals               6450                 6449
         return feature_status, True
 
     def _parse_column_positions(self, sep_line, sep_char='-'):
-        """Parse the position of each columns in the command output
+        """Parse the position of each columns in the command output, see show_parser.parse_column_positions."""
+        return show_parser.parse_column_positions(sep_line, sep_char=sep_char)
 
-        Args:
-            sep_line: The output line separating actual data and column headers
-            sep_char: The character used in separation line. Defaults to '-'.
+    def _parse_show(self, output_lines, header_len=1, schema=None):
+        return show_parser.parse_show(output_lines, header_len=header_len, schema=schema)
 
-        Returns:
-            Returns a list. Each item is a tuple with two elements. The first element is start position of a column.
-            The second element is the end position of the column.
-        """
-        prev = ' ',
-        positions = []
-        for pos, char in enumerate(sep_line + ' '):
-            if char == sep_char:
-                if char != prev:
-                    left = pos
-            else:
-                if char != prev:
-                    right = pos
-                    positions.append((left, right))
-            prev = char
-        return positions
-
-    def _parse_show(self, output_lines, header_len=1):
-
-        result = []
-
-        sep_line_pattern = re.compile(r"^( *-+ *)+$")
-        sep_line_found = False
-        for idx, line in enumerate(output_lines):
-            if sep_line_pattern.match(line):
-                sep_line_found = True
-                header_lines = output_lines[idx - header_len:idx]
-                sep_line = output_lines[idx]
-                content_lines = output_lines[idx + 1:]
-                break
-
-        if not sep_line_found:
-            logging.error('Failed to find separation line in the show command output')
-            return result
-
-        try:
-            positions = self._parse_column_positions(sep_line)
-        except Exception as e:
-            logging.error('Possibly bad command output, exception: {}'.format(repr(e)))
-            return result
-
-        headers = []
-        for (left, right) in positions:
-            header = " ".join([header_line[left:right].strip().lower() for header_line in header_lines]).strip()
-            headers.append(header)
-
-        for content_line in content_lines:
-            # When an empty line is encountered while parsing the tabulate content, it is highly possible that the
-            # tabulate content has been drained. The empty line and rest of the lines should not be parsed.
-            if len(content_line) == 0:
-                break
-            item = {}
-            for idx, (left, right) in enumerate(positions):
-                k = headers[idx]
-                v = content_line[left:right].strip()
-                item[k] = v
-            result.append(item)
-
-        return result
-
-    def show_and_parse(self, show_cmd, header_len=1, **kwargs):
+    def show_and_parse(self, show_cmd, header_len=1, schema=None, stream=False, **kwargs):
         """Run a show command and parse the output using a generic pattern.
 
         This method can adapt to the column changes as long as the output format follows the pattern of
@@ -1756,8 +1752,15 @@ Totals               6450                 6449
               ...
             ]
 
+        The column layout is compiled once per header and cached, see tests/common/helpers/show_parser.py.
+
         Args:
             show_cmd: The show command that will be executed.
+            header_len: Number of the header lines above the separation line.
+            schema: Optional dict of {header: type} to convert the values of some columns, e.g. {"mtu": int}. The
+                values which can not be converted are kept as they are.
+            stream: Return an iterator over the content lines instead of a list, the dictionaries are only built
+                when iterated. Useful for the big outputs, like 'show mac' with thousands of entries.
 
         Returns:
             Return the parsed output of the show command in a list of dictionary. Each list item is a dictionary,
@@ -1771,7 +1774,9 @@ Totals               6450                 6449
             output = output[start_line_index:]
         else:
             output = output[start_line_index:end_line_index]
-        return self._parse_show(output, header_len)
+        if stream:
+            return show_parser.iter_show(output, header_len=header_len, schema=schema)
+        return self._parse_show(output, header_len, schema=schema)
 
     @cached(name='mg_facts')
     def get_extended_minigraph_facts(self, tbinfo, namespace=DEFAULT_NAMESPACE):
@@ -1972,11 +1977,11 @@ Totals               6450                 6449
                 }
             }
         '''
-        if namespace is None:
-            return {x.get('interface'): x for x in self.show_and_parse('show interfaces status')}
-        else:
-            return {x.get('interface'): x for x in self.show_and_parse('show interfaces status -n {}'
-                                                                       .format(namespace))}
+        # The command has no structured output, only the time spent is reported
+        cmd = 'show interfaces status' if namespace is None else 'show interfaces status -n {}'.format(namespace)
+        return run_show_sources(self, "get_interfaces_status", [
+            text_source(cmd, lambda result: {x.get('interface'): x for x in self._parse_show(result["stdout_lines"])})
+        ])
 
     def show_ipv6_interfaces(self):
         '''
@@ -2078,15 +2083,19 @@ Totals               6450                 6449
         """
         crm_facts = {}
 
+        with self.batch(continue_on_fail=False) as batch:
+            summary = batch.command('crm show summary')
+            thresholds_output = batch.shell('crm show thresholds all')
+
         # Get polling interval
-        output = self.command('crm show summary')['stdout']
+        output = summary['stdout']
         parsed = re.findall(r'Polling Interval: +(\d+) +second', output)
         if parsed:
             crm_facts['polling_interval'] = int(parsed[0])
 
         # Get thresholds
         crm_facts['thresholds'] = {}
-        thresholds = self.show_and_parse('crm show thresholds all')
+        thresholds = self._parse_show(thresholds_output['stdout_lines'])
         for threshold in thresholds:
             crm_facts['thresholds'][threshold['resource name']] = {
                 'high': int(threshold['high threshold']),
@@ -2204,14 +2213,46 @@ Totals               6450                 6449
         Returns:
             True or False
         """
-        bgp_summary_v4 = self.command("show ip bgp summary")["stdout_lines"]
-        bgp_summary_v6 = self.command("show ipv6 bgp summary")["stdout_lines"]
-        bgp_summary = bgp_summary_v4 + bgp_summary_v6
+        sources = [
+            text_source("show ip bgp summary; show ipv6 bgp summary", self._parse_bgp_state_idle_text)
+        ]
+        if not self.is_multi_asic:
+            # 'show ip bgp summary' formats the output of these commands, which only cover the host namespace
+            sources.insert(0, ShowSource("json", "vtysh -c 'show ip bgp summary json' -c 'show bgp ipv6 summary json'",
+                                         self._parse_bgp_state_idle_json))
+        return run_show_sources(self, "is_bgp_state_idle", sources)
+
+    def _parse_bgp_state_idle_json(self, summary_result):
+        # vtysh prints one json object per command
+        decoder = json.JSONDecoder()
+        output = summary_result["stdout"].strip()
+        summaries = []
+        while output:
+            summary, end = decoder.raw_decode(output)
+            summaries.append(summary)
+            output = output[end:].strip()
+        if len(summaries) != 2:
+            raise ValueError("Expected the bgp summaries of ipv4 and ipv6, got {}".format(len(summaries)))
+
+        idle_count = 0
+        expected_idle_count = 0
+        bgp_monitor_count = 0
+        for summary in summaries:
+            for af_summary in summary.values():
+                for peer in af_summary.get("peers", {}).values():
+                    expected_idle_count += 1
+                    if peer["state"].startswith("Idle") and \
+                            (peer.get("peerState") == "Admin" or "(Admin)" in peer["state"]):
+                        idle_count += 1
+                    if "BGPMonitor" in peer.get("desc", ""):
+                        bgp_monitor_count += 1
+        return idle_count == (expected_idle_count - bgp_monitor_count)
 
+    def _parse_bgp_state_idle_text(self, summary_result):
         idle_count = 0
         expected_idle_count = 0
         bgp_monitor_count = 0
-        for line in bgp_summary:
+        for line in summary_result["stdout_lines"]:
             if "Idle (Admin)" in line:
                 idle_count += 1
 
@@ -1,12 +1,23 @@
+import hashlib
 import logging
+import os
 import re
+import threading
+import time
 
 import yaml
 
+from tests.common.cache import FactsCache
 from tests.common.helpers.yaml_utils import BlankNone
 
 logger = logging.getLogger(__name__)
 
+INVENTORY_INDEX_ZONE = 'inventory_index'
+# Bump when the content of InventoryIndex changes
+INVENTORY_INDEX_VERSION = 1
+
+cache = FactsCache()
+
 
 def trim_inventory(inv_files, tbinfo, target_hostname):
     """
@@ -165,3 +176,153 @@ def trim_inventory(inv_files, tbinfo, target_hostname):
 
                     dump_trimmed_inv_to_file(inv, trimmed_inv_file_name)
                     inv_files[idx] = trimmed_inv_file_name
+
+
+def _inventory_files(inv_files):
+    """Get the inventory sources as a list, like ansible's InventoryManager does."""
+    if inv_files is None:
+        return []
+    if isinstance(inv_files, str):
+        return [inv_files]
+    return list(inv_files)
+
+
+def _inventory_source_files(inv_file):
+    """Get the files of an inventory source: the file itself, or all the files under a directory source."""
+    if os.path.isdir(inv_file):
+        source_files = []
+        for root, dirs, files in os.walk(inv_file):
+            dirs.sort()
+            source_files.extend(os.path.join(root, f) for f in sorted(files))
+        return source_files
+    if os.path.isfile(inv_file):
+        return [inv_file]
+    # Not a file, like a host list 'host1,host2'
+    return []
+
+
+# Content hash of the inventory sources per process, key is the stat of their files
+_inventory_hashes = {}
+# Seconds during which the inventory sources are not checked again after their hash was got
+INVENTORY_HASH_CHECK_INTERVAL = 10
+# Last check of the inventory sources per process, key is the inventory sources, value is (time, hash)
+_checked_inventory_hashes = {}
+
+
+def get_inventory_hash(inv_files):
+    """Get the hash of the content of inventory sources.
+
+    The stat of the files is checked at most every INVENTORY_HASH_CHECK_INTERVAL seconds, as the host vars
+    lookups get the hash on every call. The files are hashed again only when their size or modification time have
+    changed.
+
+    Args:
+        inv_files (list or string): List of inventory file paths, or string of a single inventory file path.
+
+    Returns:
+        str: Hex digest of the content of the inventory sources.
+    """
+    sources = tuple(_inventory_files(inv_files))
+    now = time.monotonic()
+    checked = _checked_inventory_hashes.get(sources)
+    if checked is not None and now - checked[0] < INVENTORY_HASH_CHECK_INTERVAL:
+        return checked[1]
+
+    signature = []
+    for inv_file in sources:
+        files = []
+        for source_file in _inventory_source_files(inv_file):
+            stat = os.stat(source_file)
+            files.append((source_file, stat.st_size, stat.st_mtime_ns))
+        signature.append((inv_file, tuple(files)))
+    signature = tuple(signature)
+
+    inventory_hash = _inventory_hashes.get(signature)
+    if inventory_hash is None:
+        digest = hashlib.sha256('{}\n'.format(INVENTORY_INDEX_VERSION).encode())
+        for inv_file, files in signature:
+            digest.update('{}\n'.format(inv_file).encode())
+            for source_file, _, _ in files:
+                with open(source_file, 'rb') as f:
+                    digest.update('{}\n'.format(source_file).encode())
+                    digest.update(hashlib.sha256(f.read()).digest())
+        inventory_hash = _inventory_hashes[signature] = digest.hexdigest()
+    _checked_inventory_hashes[sources] = (now, inventory_hash)
+    return inventory_hash
+
+
+class InventoryIndex(object):
+    """Flattened index of the hosts and groups of ansible inventory files.
+
+    Parsing inventory files with ansible's InventoryManager runs the inventory plugins over all the hosts, it takes
+    seconds for large lab inventories. The index holds the variables defined for each host and the hosts of each
+    group, so that looking them up does not need ansible.
+    """
+
+    def __init__(self, inventory_hash, hosts, groups):
+        """
+        Args:
+            inventory_hash (str): Hash of the content of the inventory files, see get_inventory_hash.
+            hosts (dict): Key is hostname, value is the dict of the variables defined for the host.
+            groups (dict): Key is group name, value is the list of the hostnames of the group (and its children).
+        """
+        self.inventory_hash = inventory_hash
+        self.hosts = hosts
+        self.groups = groups
+
+    @classmethod
+    def from_inventory_manager(cls, inventory_hash, inventory_manager):
+        hosts = {name: host.vars.copy() for name, host in inventory_manager.hosts.items()}
+        groups = {name: [host.name for host in group.get_hosts()]
+                  for name, group in inventory_manager.groups.items()}
+        return cls(inventory_hash, hosts, groups)
+
+    def get_host_vars(self, hostname):
+        """Get the variables defined for a host, None if the host is not in the inventory."""
+        host_vars = self.hosts.get(hostname)
+        return host_vars.copy() if host_vars is not None else None
+
+    def get_group_hosts(self, group_name):
+        """Get the hostnames of a group, None if the group is not in the inventory."""
+        hosts = self.groups.get(group_name)
+        return list(hosts) if hosts is not None else None
+
+
+# InventoryIndex per inventory hash, loaded once per process
+_inventory_indexes = {}
+_inventory_indexes_lock = threading.Lock()
+
+
+def get_inventory_index(inv_files, inventory_manager_factory):
+    """Get the index of inventory files.
+
+    The index is built once per content of the inventory files and stored in the facts cache: the other processes
+    load it instead of parsing the inventory files again.
+
+    Args:
+        inv_files (list or string): List of inventory file paths, or string of a single inventory file path.
+        inventory_manager_factory (function): Function creating ansible's InventoryManager of inventory files, used
+            to build the index.
+
+    Returns:
+        InventoryIndex: Index of the inventory files.
+    """
+    inventory_hash = get_inventory_hash(inv_files)
+    index = _inventory_indexes.get(inventory_hash)
+    if index is not None:
+        return index
+
+    with _inventory_indexes_lock:
+        index = _inventory_indexes.get(inventory_hash)
+        if index is None:
+            index = cache.read(INVENTORY_INDEX_ZONE, inventory_hash)
+            if index is FactsCache.NOTEXIST:
+                with cache.lock(INVENTORY_INDEX_ZONE, inventory_hash):
+                    index = cache.read(INVENTORY_INDEX_ZONE, inventory_hash)
+                    if index is FactsCache.NOTEXIST:
+                        logger.info('Building index of inventory {}'.format(inv_files))
+                        index = InventoryIndex.from_inventory_manager(inventory_hash,
+                                                                      inventory_manager_factory(inv_files))
+                        cache.write(INVENTORY_INDEX_ZONE, inventory_hash, index)
+            _inventory_indexes[inventory_hash] = index
+    return index
@@ -1,7 +1,13 @@
+import logging
 import multiprocessing.pool
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from multiprocessing.pool import ThreadPool
 from typing import List
 
+logger = logging.getLogger(__name__)
+
 
 class SafeThreadPoolExecutor:
     """
@@ -78,3 +84,150 @@ class SafeThreadPoolExecutor:
         self.shutdown(wait=True)
         # Returning False to ensure that any exception in the "with" statement is not suppressed.
         return False
+
+
+class FanoutError(Exception):
+    """
+    Aggregates the exceptions raised by the calls of a fan-out.
+
+    The exception of the first failed call (in the order of the fan-out items) is re-raised to the caller, so the
+    existing exception handling of the call sites is kept. The FanoutError is chained as its cause and holds the
+    exceptions of all the failed calls.
+    """
+
+    def __init__(self, errors):
+        """
+        Args:
+            errors: OrderedDict of fan-out item name to the exception raised by the call on that item.
+        """
+        self.errors = errors
+        super(FanoutError, self).__init__("{} of the fan-out calls failed: {}".format(
+            len(errors), ", ".join("{}: {!r}".format(name, error) for name, error in errors.items())))
+
+
+class _FanoutCall(object):
+    """
+    A single call of a fan-out. The call is executed once, either by a pool worker or by the thread doing the
+    fan-out, whichever claims it first.
+    """
+
+    def __init__(self, fn, item):
+        self.fn = fn
+        self.item = item
+        self.result = None
+        self.error = None
+        self._claimed = False
+        self._claim_lock = threading.Lock()
+        self._done = threading.Event()
+
+    def run(self):
+        with self._claim_lock:
+            if self._claimed:
+                return
+            self._claimed = True
+        try:
+            self.result = self.fn(self.item)
+        except BaseException as e:
+            self.error = e
+        finally:
+            self._done.set()
+
+    def wait(self):
+        self._done.wait()
+
+
+class ParallelFanout(object):
+    """
+    Bounded thread pool shared by the whole session to fan out the same call to several DUTs or ASICs.
+
+    The fan-out is opt-in: it is enabled by the `parallel_fanout` session fixture when the `--fanout_workers`
+    option is set, otherwise `fanout_map` calls the items one after another as before.
+
+    The pool size is the global cap of the background calls running concurrently. The thread doing a fan-out also
+    executes the calls of its own fan-out which are not picked up by a worker yet, so a nested fan-out (for example
+    duthosts.shell(..., asic_index="all") fans out to the nodes, then each node fans out to its ASICs) always makes
+    progress even when all the workers are busy.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def enable(cls, max_workers):
+        """
+        Create the shared fan-out pool with `max_workers` threads.
+        """
+        with cls._instance_lock:
+            if cls._instance is not None:
+                cls._instance.shutdown()
+            cls._instance = cls(max_workers)
+            logger.info("Parallel fan-out enabled with {} workers".format(max_workers))
+        return cls._instance
+
+    @classmethod
+    def disable(cls):
+        """
+        Shut down the shared fan-out pool, the following fan-outs are run serially.
+        """
+        with cls._instance_lock:
+            instance, cls._instance = cls._instance, None
+        if instance is not None:
+            instance.shutdown()
+
+    @classmethod
+    def get_instance(cls):
+        return cls._instance
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fanout")
+
+    def map(self, fn, items, names=None):
+        """
+        Call fn(item) for each of the items concurrently.
+
+        Args:
+            fn: function to call with each item.
+            items: list of items.
+            names: optional list of names of the items used to report the failures, defaults to str(item).
+
+        Raises:
+            The exception of the first failed call, chained from a FanoutError holding all the exceptions.
+
+        Returns:
+            list of the results, in the order of the items.
+        """
+        calls = [_FanoutCall(fn, item) for item in items]
+        # The first call is executed by this thread anyway, no need to queue it
+        for call in calls[1:]:
+            self._executor.submit(call.run)
+        for call in calls:
+            call.run()
+        for call in calls:
+            call.wait()
+
+        names = names if names is not None else [str(item) for item in items]
+        errors = OrderedDict((name, call.error) for name, call in zip(names, calls) if call.error is not None)
+        if errors:
+            fanout_error = FanoutError(errors)
+            if len(errors) > 1:
+                logger.error(str(fanout_error))
+            raise next(iter(errors.values())) from fanout_error
+        return [call.result for call in calls]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+def fanout_map(fn, items, names=None):
+    """
+    Call fn(item) for each of the items and return the list of results in the order of the items.
+
+    The calls are run concurrently on the shared ParallelFanout pool when it is enabled, else one after another.
+    See ParallelFanout.map for the error handling.
+    """
+    items = list(items)
+    fanout = ParallelFanout.get_instance()
+    if fanout is None or len(items) < 2:
+        return [fn(item) for item in items]
+    return fanout.map(fn, items, names=names)
@@ -0,0 +1,138 @@
+"""
+Parser of the tabulated output of the show commands, see SonicHost.show_and_parse.
+
+A table is a line of headers, or header_len lines of headers, then a separation line with '-' under each column,
+then the content lines:
+
+          Interface            Lanes    Speed    MTU
+    ---------------  ---------------  -------  -----
+          Ethernet0          0,1,2,3      40G   9100
+
+The column layout (the positions of the columns and their headers) is compiled once per header signature (the
+header lines and the separation line) and cached, so the layout is shared by all the calls of a show command, on
+all the DUTs. The content lines are sliced with the precomputed offsets of the layout.
+"""
+import functools
+import logging
+import re
+from collections import deque
+from itertools import takewhile
+
+logger = logging.getLogger(__name__)
+
+SEP_LINE_PATTERN = re.compile(r"^( *-+ *)+$")
+LAYOUT_CACHE_SIZE = 256
+
+
+def parse_column_positions(sep_line, sep_char='-'):
+    """Parse the position of each column from the separation line.
+
+    Args:
+        sep_line: The output line separating actual data and column headers
+        sep_char: The character used in separation line. Defaults to '-'.
+
+    Returns:
+        Returns a list. Each item is a tuple with two elements. The first element is start position of a column.
+        The second element is the end position of the column.
+    """
+    return [match.span() for match in re.finditer(re.escape(sep_char) + "+", sep_line)]
+
+
+class TableLayout(object):
+    """Compiled column layout of a table.
+
+    The content lines are parsed by a function of the layout, which slices the columns with the slices precomputed
+    from the positions of the columns.
+    """
+
+    def __init__(self, headers, positions):
+        self.headers = tuple(headers)
+        self.positions = tuple(positions)
+        columns = tuple((header, slice(left, right)) for header, (left, right) in zip(self.headers, self.positions))
+
+        def parse_line(line):
+            return {header: line[column].strip() for header, column in columns}
+
+        self.parse_line = parse_line
+
+    def converters(self, schema):
+        """Get the (header, converter) of the columns of the layout which have a type in the schema."""
+        if not schema:
+            return []
+        return [(header, schema[header]) for header in dict.fromkeys(self.headers) if header in schema]
+
+
+@functools.lru_cache(maxsize=LAYOUT_CACHE_SIZE)
+def compile_layout(header_lines, sep_line):
+    """Compile the column layout of a table.
+
+    Args:
+        header_lines (tuple): The header lines of the table.
+        sep_line (str): The separation line of the table.
+
+    Returns:
+        TableLayout: The layout, the headers are in lowercase.
+    """
+    positions = parse_column_positions(sep_line)
+    headers = [" ".join([header_line[left:right].strip().lower() for header_line in header_lines]).strip()
+               for left, right in positions]
+    return TableLayout(headers, positions)
+
+
+def _find_table(lines, header_len):
+    """Find the separation line, compile the layout of the table from it and the header lines above it.
+
+    Returns:
+        The TableLayout, or None if there is no separation line. The lines iterator is left after the separation line.
+    """
+    previous_lines = deque(maxlen=header_len)
+    for line in lines:
+        if SEP_LINE_PATTERN.match(line):
+            return compile_layout(tuple(previous_lines), line)
+        previous_lines.append(line)
+    logger.error('Failed to find separation line in the show command output')
+    return None
+
+
+def _convert(items, converters):
+    for item in items:
+        for header, converter in converters:
+            try:
+                item[header] = converter(item[header])
+            except (TypeError, ValueError):
+                pass
+        yield item
+
+
+def iter_show(output_lines, header_len=1, schema=None):
+    """Parse the tabulated output of a show command, one content line at a time.
+
+    Args:
+        output_lines: Iterable of the output lines, without the line breaks.
+        header_len: Number of the header lines above the separation line.
+        schema: Optional dict of {header: type}, the type (or any callable) converts the values of the column.
+            The values which can not be converted are kept as they are, like 'N/A'.
+
+    Returns:
+        Iterator of the content lines as dicts, keys are the column headers in lowercase.
+    """
+    lines = iter(output_lines)
+    layout = _find_table(lines, header_len)
+    if layout is None:
+        return iter(())
+    # When an empty line is encountered while parsing the tabulate content, it is highly possible that the
+    # tabulate content has been drained. The empty line and rest of the lines should not be parsed.
+    items = map(layout.parse_line, takewhile(bool, lines))
+    converters = layout.converters(schema)
+    if converters:
+        items = _convert(items, converters)
+    return items
+
+
+def parse_show(output_lines, header_len=1, schema=None):
+    """Parse the tabulated output of a show command, see iter_show.
+
+    Returns:
+        list: The content lines as dicts, empty if the output has no separation line.
+    """
+    return list(iter_show(output_lines, header_len=header_len, schema=schema))
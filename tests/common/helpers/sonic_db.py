@@ -1,12 +1,66 @@
 import logging
 import json
+import shlex
 import six
 import ast
+import time
+from collections import OrderedDict
 from tests.common.helpers.constants import DEFAULT_NAMESPACE
 from tests.common.devices.sonic_asic import SonicAsic
 
 logger = logging.getLogger(__name__)
 
+# Lua script run by the redis server to get many hashes at once, the KEYS of the script. Returns the json
+# {key: {field: value}} of the keys which are hashes. A run of the script is atomic and blocks the server, so the
+# keys are given in pages of BULK_KEYS_PER_EVAL keys.
+BULK_HGETALL_SCRIPT = """
+local result = {}
+for _, key in ipairs(KEYS) do
+    if redis.call('TYPE', key)['ok'] == 'hash' then
+        local hash = {}
+        local flat = redis.call('HGETALL', key)
+        for i = 1, #flat, 2 do
+            hash[flat[i]] = flat[i + 1]
+        end
+        result[key] = hash
+    end
+end
+return cjson.encode(result)
+"""
+# Lua script run by the redis server to get a page of the keys matching the pattern ARGV[2] with a single SCAN
+# from the cursor ARGV[1]. Returns the json [next cursor, [key, ...]]. The cursor loop is run by the caller, the
+# server serves the other clients between the pages.
+SCAN_PAGE_SCRIPT = """
+local reply = redis.call('SCAN', ARGV[1], 'MATCH', ARGV[2], 'COUNT', ARGV[3])
+return cjson.encode(reply)
+"""
+# Number of keys given to one run of BULK_HGETALL_SCRIPT
+BULK_KEYS_PER_EVAL = 500
+# COUNT of one SCAN page, number of the keys of the database visited by the page
+BULK_SCAN_COUNT = 10000
+# Size of the shell command running several runs of the script. The shell module gives the command as a single
+# argument of /bin/sh -c, which linux limits to 128KB (MAX_ARG_STRLEN), and the become wrapper may escape it again.
+BULK_MAX_CMD_SIZE = 64 * 1024
+
+
+class BulkHashes(dict):
+    """
+    Hashes fetched by SonicDbCli.hget_all_bulk, {key: {field: value}}.
+
+    Attributes:
+        elapsed: Time spent by the DUT invocation, in seconds.
+        evals: Number of the runs of the script in the DUT invocations.
+        invocations: Number of the DUT invocations.
+        payload_size: Size of the output of the DUT invocations, in bytes.
+    """
+
+    def __init__(self, hashes=None, elapsed=0.0, evals=0, invocations=0, payload_size=0):
+        super(BulkHashes, self).__init__(hashes or {})
+        self.elapsed = elapsed
+        self.evals = evals
+        self.invocations = invocations
+        self.payload_size = payload_size
+
 
 class SonicDbCli(object):
     """Base class for interface to SonicDb using sonic-db-cli command.
@@ -173,6 +227,131 @@ class SonicDbCli(object):
             else:
                 return result['stdout'].splitlines()
 
+    def _eval_cmd(self, script, keys=(), args=()):
+        """Builds the sonic-db-cli command running a lua script with some keys and arguments."""
+        return "{} {} EVAL {} {} {}".format(
+            getattr(self.host, "sonic_db_cli", "sonic-db-cli"), self.database, shlex.quote(script), len(keys),
+            " ".join(shlex.quote(str(item)) for item in list(keys) + list(args))).rstrip()
+
+    def _bulk_hgetall_cmd(self, keys=()):
+        """Builds the sonic-db-cli command running BULK_HGETALL_SCRIPT for some keys."""
+        return self._eval_cmd(BULK_HGETALL_SCRIPT, keys=keys)
+
+    def _bulk_hgetall_cmds(self, keys):
+        """
+        Splits the keys in runs of BULK_HGETALL_SCRIPT of at most BULK_KEYS_PER_EVAL keys, and the runs in shell
+        commands of at most BULK_MAX_CMD_SIZE bytes.
+
+        Returns:
+            List of the shell commands, each one a list of the sonic-db-cli commands it runs.
+        """
+        base_size = len(self._bulk_hgetall_cmd())
+        evals = []
+        chunk = []
+        size = base_size
+        for key in keys:
+            key_size = len(shlex.quote(key)) + 1
+            if chunk and (len(chunk) >= BULK_KEYS_PER_EVAL or size + key_size > BULK_MAX_CMD_SIZE):
+                evals.append(self._bulk_hgetall_cmd(keys=chunk))
+                chunk = []
+                size = base_size
+            chunk.append(key)
+            size += key_size
+        evals.append(self._bulk_hgetall_cmd(keys=chunk))
+
+        cmds = [[evals[0]]]
+        size = len(evals[0])
+        for cmd in evals[1:]:
+            if size + len(" && ") + len(cmd) > BULK_MAX_CMD_SIZE:
+                cmds.append([cmd])
+                size = len(cmd)
+            else:
+                cmds[-1].append(cmd)
+                size += len(" && ") + len(cmd)
+        return cmds
+
+    def hget_all_bulk(self, keys=None, pattern=None):
+        """
+        Gets many hashes with a few DUT invocations, instead of one sonic-db-cli HGETALL per key.
+
+        The hashes are read by a lua script run by the redis server, for the keys or for the keys found by
+        scan_keys with the pattern. The keys are split in runs of the script of BULK_KEYS_PER_EVAL keys, done by as
+        few shell commands as the BULK_MAX_CMD_SIZE limit of a command allows.
+
+        Args:
+            keys: List of full names of the keys to get.
+            pattern: Redis glob-style pattern of the keys to get, e.g. 'ASIC_STATE:SAI_OBJECT_TYPE_PORT:*'.
+                Either keys or pattern must be given.
+
+        Returns:
+            BulkHashes {key: {field: value}} of the keys which exist and are hashes, with the timing of the call.
+
+        Raises:
+            SonicDbNoCommandOutput: If a run of the script had no output.
+        """
+        if (keys is None) == (pattern is None):
+            raise ValueError("Either keys or pattern must be given")
+        start = time.time()
+        hashes = BulkHashes()
+        if pattern is not None:
+            keys, hashes.invocations = self._scan_keys(pattern)
+        keys = list(OrderedDict.fromkeys(keys))
+        if not keys:
+            hashes.elapsed = time.time() - start
+            return hashes
+        cmds = self._bulk_hgetall_cmds(keys)
+
+        hashes.invocations += len(cmds)
+        for evals in cmds:
+            result = self.host.shell(" && ".join(evals), verbose=False)
+            outputs = [line for line in result["stdout_lines"] if line.strip()]
+            if len(outputs) != len(evals):
+                raise SonicDbNoCommandOutput("Bulk HGETALL of {} returned {} outputs for {} runs".format(
+                    pattern if pattern is not None else "{} keys".format(len(keys)), len(outputs), len(evals)))
+            hashes.evals += len(evals)
+            hashes.payload_size += len(result["stdout"])
+            for output in outputs:
+                # cjson encodes the empty tables as empty objects
+                hashes.update(json.loads(output))
+        hashes.elapsed = time.time() - start
+        logger.debug("Bulk HGETALL of {} keys in {} {} in {} runs and {} invocations: {:.3f}s, {} bytes".format(
+            len(hashes), self.database, pattern if pattern is not None else "list", hashes.evals,
+            hashes.invocations, hashes.elapsed, hashes.payload_size))
+        return hashes
+
+    def _scan_keys(self, pattern):
+        """Runs the SCAN cursor loop of scan_keys, returns the keys and the number of DUT invocations."""
+        keys = []
+        invocations = 0
+        cursor = "0"
+        while True:
+            result = self.host.shell(self._eval_cmd(SCAN_PAGE_SCRIPT, args=(cursor, pattern, BULK_SCAN_COUNT)),
+                                     verbose=False)
+            invocations += 1
+            if not result["stdout"].strip():
+                raise SonicDbNoCommandOutput("SCAN of {} in {} had no output".format(pattern, self.database))
+            cursor, page = json.loads(result["stdout"])
+            # cjson encodes the empty tables as empty objects
+            keys.extend(page or [])
+            if str(cursor) == "0":
+                return keys, invocations
+
+    def scan_keys(self, pattern):
+        """
+        Gets the keys matching a pattern with SCAN, one DUT invocation per page of BULK_SCAN_COUNT keys.
+
+        Each page is a single SCAN run by the redis server, the other clients are served between the pages. Like
+        SCAN, a key may be returned more than once if the keys change during the scan.
+
+        Args:
+            pattern: Redis glob-style pattern of the keys, e.g. 'ASIC_STATE:SAI_OBJECT_TYPE_PORT:*'.
+
+        Returns:
+            List of the keys, of any type.
+        """
+        keys, _ = self._scan_keys(pattern)
+        return list(OrderedDict.fromkeys(keys))
+
     def dump(self, table):
         """
         Dumps and entire table with sonic-db-dump.
@@ -0,0 +1,193 @@
+"""
+Structured sources of the SonicHost show helpers.
+
+Some helpers scrape the human formatted output of the show commands while the DUT can give the same data in a
+structured form: the show commands with '--json', vtysh commands with 'json' or the databases with sonic-db-dump.
+A helper lists its sources in order of preference, the structured ones first and the text one last, and
+run_show_sources takes the first source that works:
+    - The command of a structured source failing makes run_show_sources fall back to the next source. If the
+      failure means that the command is not supported by the image (see is_unsupported) and a later source works,
+      the structured source is not tried anymore on that host. Other failures (e.g. redis or bgpd restarting
+      during a reboot or a config reload) only make this call fall back.
+    - The parser of a source raising ValueError, KeyError or TypeError (unexpected or incomplete output) also makes
+      run_show_sources fall back to the next source, for this call only.
+    - The last source is run as is, its errors are raised to the caller.
+
+The path taken and the time spent are logged per call, and recorded per helper by StructuredShowStats when enabled
+(see the module_call_stats fixture in conftest.py).
+"""
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Errors of a parser meaning the output of a source is not usable
+PARSE_ERRORS = (ValueError, KeyError, TypeError)
+# Exit codes and messages of a command meaning it is not supported by the image: command not found or not
+# executable, unknown vtysh command, unknown click command or option, unknown argparse argument
+UNSUPPORTED_RCS = (126, 127)
+UNSUPPORTED_MESSAGES = ("command not found", "unknown command", "no such command", "no such option",
+                        "unrecognized arguments", "invalid choice")
+
+_unavailable_sources = set()
+_unavailable_sources_lock = threading.Lock()
+
+
+class ShowSource(object):
+    """
+    A source of the data of a helper: a shell command and the parser of its output into the result of the helper.
+    """
+
+    def __init__(self, path, cmd, parse, structured=True):
+        """
+        Args:
+            path (str): Name of the source, reported as the path taken, e.g. 'json', 'db' or 'text'.
+            cmd (str): The shell command.
+            parse: Callable parsing the result of the shell module into the result of the helper.
+            structured (bool): Whether the output of the command is structured.
+        """
+        self.path = path
+        self.cmd = cmd
+        self.parse = parse
+        self.structured = structured
+
+
+def text_source(cmd, parse):
+    return ShowSource("text", cmd, parse, structured=False)
+
+
+def json_output(result):
+    """Get the json output of a shell module result."""
+    return json.loads(result["stdout"])
+
+
+class StructuredShowStats(object):
+    """
+    @summary: Per helper counts and total time of each path taken by run_show_sources.
+    """
+
+    enabled = False
+    _lock = threading.Lock()
+    _stats = {}
+
+    @classmethod
+    def enable(cls, enabled=True):
+        cls.enabled = enabled
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._stats = {}
+
+    @classmethod
+    def record(cls, helper, path, elapsed, fallbacks):
+        with cls._lock:
+            stats = cls._stats.setdefault(helper, {}).setdefault(path, {"count": 0, "total": 0.0, "fallbacks": 0})
+            stats["count"] += 1
+            stats["total"] += elapsed
+            stats["fallbacks"] += fallbacks
+
+    @classmethod
+    def summary(cls):
+        """
+        @summary: Get the recorded stats.
+        @return: Dict of {helper: {path: {'count', 'total', 'fallbacks'}}}, sorted by total time of the helpers.
+                 'fallbacks' is the number of the sources which did not work before the path was taken.
+        """
+        with cls._lock:
+            stats = {helper: {path: dict(path_stats) for path, path_stats in paths.items()}
+                     for helper, paths in cls._stats.items()}
+        return dict(sorted(stats.items(), key=lambda item: sum(s["total"] for s in item[1].values()), reverse=True))
+
+    @classmethod
+    def dump(cls, path=None):
+        """
+        @summary: Log the stats of the helpers, and save them to a json file.
+        @param path: Path of the json file, not saved if None.
+        """
+        summary = cls.summary()
+        lines = ["{:>8} {:>10.2f}s {:>9}  {} ({})".format(
+                     stats["count"], stats["total"], stats["fallbacks"], helper, path_taken)
+                 for helper, paths in summary.items() for path_taken, stats in paths.items()]
+        logger.info("Show helper stats per path taken:\n{:>8} {:>11} {:>9}  {}\n{}".format(
+            "count", "total", "fallbacks", "helper (path)", "\n".join(lines)))
+        if path:
+            with open(path, "w") as stats_file:
+                json.dump(summary, stats_file, indent=2)
+        return summary
+
+
+def is_unsupported(output):
+    """Whether the shell module result of a failed command means that the command is not supported by the host."""
+    if output.get("rc") in UNSUPPORTED_RCS:
+        return True
+    message = "{}\n{}".format(output.get("stderr", ""), output.get("stdout", "")).lower()
+    return any(unsupported in message for unsupported in UNSUPPORTED_MESSAGES)
+
+
+def is_source_unavailable(hostname, helper, source):
+    return (hostname, helper, source.path, source.cmd) in _unavailable_sources
+
+
+def _set_source_unavailable(hostname, helper, source):
+    with _unavailable_sources_lock:
+        _unavailable_sources.add((hostname, helper, source.path, source.cmd))
+
+
+def reset_unavailable_sources(hostname=None):
+    """Try again the structured sources found unavailable, on a host (e.g. after an image upgrade) or all hosts."""
+    with _unavailable_sources_lock:
+        for key in [key for key in _unavailable_sources if hostname is None or key[0] == hostname]:
+            _unavailable_sources.discard(key)
+
+
+def run_show_sources(host, helper, sources):
+    """
+    Get the result of a helper from the first of its sources which works on the host.
+
+    Args:
+        host: The SonicHost.
+        helper (str): Name of the helper, for the logs and the stats.
+        sources (list): The ShowSource of the helper, in order of preference.
+
+    Returns:
+        The result of the parser of the source taken.
+    """
+    start = time.time()
+    unsupported_sources = []
+    fallbacks = 0
+    sources = [source for source in sources[:-1] if not is_source_unavailable(host.hostname, helper, source)] \
+        + sources[-1:]
+    for index, source in enumerate(sources):
+        if index == len(sources) - 1:
+            result = source.parse(host.shell(source.cmd))
+            break
+        output = host.shell(source.cmd, module_ignore_errors=True)
+        if output.get("rc", 1) != 0:
+            logger.debug("{} on {}: '{}' failed, falling back".format(helper, host.hostname, source.cmd))
+            if is_unsupported(output):
+                unsupported_sources.append(source)
+            fallbacks += 1
+            continue
+        try:
+            result = source.parse(output)
+            break
+        except PARSE_ERRORS as e:
+            logger.debug("{} on {}: failed to parse the output of '{}': {}, falling back".format(
+                helper, host.hostname, source.cmd, repr(e)))
+            fallbacks += 1
+
+    # A source worked, so the commands which failed before it as unsupported are really not supported by the host
+    for failed in unsupported_sources:
+        if failed.structured:
+            logger.info("{} on {}: '{}' is not supported, using the next source from now on".format(
+                helper, host.hostname, failed.cmd))
+            _set_source_unavailable(host.hostname, helper, failed)
+
+    elapsed = time.time() - start
+    logger.debug("{} on {}: {} path taken in {:.3f}s".format(helper, host.hostname, source.path, elapsed))
+    if StructuredShowStats.enabled:
+        StructuredShowStats.record(helper, source.path, elapsed, fallbacks)
+    return result
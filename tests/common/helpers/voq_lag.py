@@ -21,9 +21,8 @@ def get_lag_ids_from_chassis_db(duthosts):
     lag_ids = list()
     for sup in duthosts.supervisor_nodes:
         voqdb = VoqDbCli(sup)
-        lag_list = voqdb.get_lag_list()
-        for lag in lag_list:
-            lag_ids.append(voqdb.hget_key_value(lag, "lag_id"))
+        lags = voqdb.hget_all_bulk(keys=voqdb.get_lag_list())
+        lag_ids.extend(lag["lag_id"] for lag in lags.values() if "lag_id" in lag)
 
     logging.info("LAG IDs present in CHASSIS_DB are {}".format(lag_ids))
     return lag_ids
@@ -112,12 +111,8 @@ def verify_lag_id_in_asic_dbs(asics, lag_id, expected=True):
     """Verifies if LAG exists or not in given ASIC DBs"""
     for asic in asics:
         asicdb = AsicDbCli(asic)
-        asic_db_lag_list = asicdb.get_asic_db_lag_list()
-        exists = False
-        for lag in asic_db_lag_list:
-            if asicdb.hget_key_value(lag, "SAI_LAG_ATTR_SYSTEM_PORT_AGGREGATE_ID") == lag_id:
-                exists = True
-                break
+        asic_db_lags = asicdb.hget_all_bulk(keys=asicdb.get_asic_db_lag_list())
+        exists = any(lag.get("SAI_LAG_ATTR_SYSTEM_PORT_AGGREGATE_ID") == lag_id for lag in asic_db_lags.values())
 
         lag_id_exists_msg = "LAG ID {} exists in {} asic{} ASIC_DB"\
                             .format(lag_id, asic.sonichost.hostname, asic.asic_index)
@@ -182,18 +177,16 @@ def verify_lag_member_in_asic_db(asics, lag_id, expected=0):
     """Verifies if expected amount of LAG members exist in given ASIC DBs"""
     for asic in asics:
         asicdb = AsicDbCli(asic)
-        asic_lag_list = asicdb.get_asic_db_lag_list()
-        asic_db_lag_member_list = asicdb.get_asic_db_lag_member_list()
+        asic_lags = asicdb.hget_all_bulk(keys=asicdb.get_asic_db_lag_list())
+        asic_db_lag_members = asicdb.hget_all_bulk(keys=asicdb.get_asic_db_lag_member_list())
         lag_oid = None
 
-        for lag in asic_lag_list:
-            if asicdb.hget_key_value(lag, "SAI_LAG_ATTR_SYSTEM_PORT_AGGREGATE_ID") == lag_id:
+        for lag, fields in asic_lags.items():
+            if fields.get("SAI_LAG_ATTR_SYSTEM_PORT_AGGREGATE_ID") == lag_id:
                 lag_oid = ":".join(lag for lag in lag.split(':')[-2::1])
 
-        count = 0
-        for lag_member in asic_db_lag_member_list:
-            if asicdb.hget_key_value(lag_member, "SAI_LAG_MEMBER_ATTR_LAG_ID") == lag_oid:
-                count += 1
+        count = sum(1 for fields in asic_db_lag_members.values()
+                    if fields.get("SAI_LAG_MEMBER_ATTR_LAG_ID") == lag_oid)
 
         logging.info("Found {} members of LAG in {} asic {} ASIC_DB"
                      .format(count, asic.sonichost.hostname, asic.asic_index))
@@ -241,23 +234,22 @@ def verify_lag_member_status_in_asic_db(asics, lag_id, exp_disabled=0):
     """Verifies if expected amount of LAG members are disabled in given ASIC DBs"""
     for asic in asics:
         asicdb = AsicDbCli(asic)
-        asic_lag_list = asicdb.get_asic_db_lag_list()
-        asic_db_lag_member_list = asicdb.get_asic_db_lag_member_list()
+        asic_lags = asicdb.hget_all_bulk(keys=asicdb.get_asic_db_lag_list())
+        asic_db_lag_members = asicdb.hget_all_bulk(keys=asicdb.get_asic_db_lag_member_list())
         lag_oid = None
         count = 0
         disabled = 0
         # Find LAG members OIDs from lag id
-        for lag in asic_lag_list:
-            if asicdb.hget_key_value(lag, "SAI_LAG_ATTR_SYSTEM_PORT_AGGREGATE_ID") == lag_id:
+        for lag, fields in asic_lags.items():
+            if fields.get("SAI_LAG_ATTR_SYSTEM_PORT_AGGREGATE_ID") == lag_id:
                 lag_oid = ":".join(lag for lag in lag.split(':')[-2::1])
                 break
 
         # Find LAG members of LAG by OID, one should have disabled status
-        for lag_member in asic_db_lag_member_list:
-            if asicdb.hget_key_value(lag_member, "SAI_LAG_MEMBER_ATTR_LAG_ID") == lag_oid:
-                status = asicdb.hget_key_value(lag_member, "SAI_LAG_MEMBER_ATTR_EGRESS_DISABLE")
+        for fields in asic_db_lag_members.values():
+            if fields.get("SAI_LAG_MEMBER_ATTR_LAG_ID") == lag_oid:
                 count += 1
-                if status == "true":
+                if fields.get("SAI_LAG_MEMBER_ATTR_EGRESS_DISABLE") == "true":
                     disabled += 1
 
         logging.info("Found {} members of LAG in {} asic {} ASIC_DB, {} are disabled"
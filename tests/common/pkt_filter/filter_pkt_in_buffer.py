@@ -4,6 +4,9 @@ import sys
 import time
 import json
 import copy
+import socket
+import struct
+import weakref
 
 import ptf.mask as mask
 import ptf.packet as packet
@@ -13,6 +16,17 @@ if sys.version_info.major > 2:
 else:
     NATIVE_TYPE = (int, float, long, bool, list, dict, tuple, set, str, bytes, unicode, type(None))     # noqa: F821
 
+# Fields decoded and indexed for all the packets of a buffer, the (layer name, field name) of convert_pkt_to_dict
+INDEXED_FIELDS = (
+    ("Ethernet", "src"), ("Ethernet", "dst"), ("Ethernet", "type"), ("802.1Q", "vlan"),
+    ("IP", "src"), ("IP", "dst"), ("IP", "proto"), ("IPv6", "src"), ("IPv6", "dst"), ("IPv6", "nh"),
+    ("TCP", "sport"), ("TCP", "dport"), ("UDP", "sport"), ("UDP", "dport"), ("ICMP", "type"), ("ICMP", "id"),
+)
+# Default time to wait for the expected packets in the buffer
+FILTER_TIMEOUT = 3
+# Time without new packets in the buffer after which the matching packets are considered all received
+FILTER_SETTLE_TIME = 0.25
+
 
 def _parse_layer(layer):
     """
@@ -69,11 +83,262 @@ def convert_pkt_to_dict(pkt):
     return packet_dict
 
 
+def _field_value(value):
+    """Get the value of a field as in convert_pkt_to_dict"""
+    if isinstance(value, type(None)):
+        value = None
+    if not isinstance(value, NATIVE_TYPE):
+        value = _parse_layer(value)
+    return str(value)
+
+
+def decode_fields(pkt, fields):
+    """
+    Get the values of some fields of a scapy packet, without converting the whole packet to dictionary
+
+    Args:
+        pkt: Scapy packet
+        fields: List of (layer name, field name)
+
+    Returns:
+        Tuple of the values of the fields, as in the dictionary of convert_pkt_to_dict, or None for the fields
+        which are not in the packet
+    """
+    wanted = {}
+    for position, (layer_name, field_name) in enumerate(fields):
+        wanted.setdefault(layer_name, []).append((field_name, position))
+
+    values = [None] * len(fields)
+    layer = pkt
+    while layer:
+        layer_fields = wanted.get(layer.name)
+        if layer_fields and hasattr(layer, 'fields_desc'):
+            # Like in convert_pkt_to_dict, a layer replaces the previous layer of the same name
+            names = set(field.name for field in layer.fields_desc)
+            for field_name, position in layer_fields:
+                values[position] = _field_value(getattr(layer, field_name)) if field_name in names else None
+        layer = layer.payload
+
+    return tuple(values)
+
+
+_ETHER_TYPES = {0x8100: "802.1Q", 0x0800: "IP", 0x86dd: "IPv6"}
+_L4_PROTOCOLS = {6: ("TCP", 4), 17: ("UDP", 4)}
+_bound_ports_cache = {}
+
+
+def _bound_ports(layer_name):
+    """Get the ports of a TCP or UDP layer bound to a payload layer by scapy, None if bound otherwise"""
+    layer = getattr(packet, layer_name)
+    cached = _bound_ports_cache.get(layer_name)
+    if cached is None or cached[0] != len(layer.payload_guess):
+        ports = set()
+        for fields, _ in layer.payload_guess:
+            if not set(fields).issubset(("sport", "dport")):
+                ports = None
+                break
+            ports.update(fields.values())
+        cached = _bound_ports_cache[layer_name] = (len(layer.payload_guess), ports)
+    return cached[1]
+
+
+def decode_fields_raw(raw, fields):
+    """
+    Get the values of some fields of a raw packet without scapy, for the common Ethernet/802.1Q/IP/IPv6/TCP/UDP
+    packets
+
+    Returns:
+        Tuple of the values of the fields like decode_fields, or None if the packet is not a common packet and
+        should be decoded by scapy: other protocols, IP fragments, tunnels or any port decoded further by scapy
+    """
+    try:
+        values = {("Ethernet", "dst"): ":".join("%02x" % byte for byte in bytearray(raw[0:6])),
+                  ("Ethernet", "src"): ":".join("%02x" % byte for byte in bytearray(raw[6:12]))}
+        ether_type, = struct.unpack_from("!H", raw, 12)
+        values[("Ethernet", "type")] = str(ether_type)
+        offset = 14
+        layer = _ETHER_TYPES.get(ether_type)
+        while layer == "802.1Q":
+            tci, ether_type = struct.unpack_from("!HH", raw, offset)
+            values[("802.1Q", "vlan")] = str(tci & 0xfff)
+            offset += 4
+            layer = _ETHER_TYPES.get(ether_type)
+
+        if layer == "IP":
+            version_ihl, total_length, flags_fragment, protocol = struct.unpack_from("!BxHxxHxB", raw, offset)
+            header_length = (version_ihl & 0xf) * 4
+            if version_ihl >> 4 != 4 or header_length < 20 or flags_fragment & 0x3fff:
+                return None
+            values[("IP", "proto")] = str(protocol)
+            values[("IP", "src")] = socket.inet_ntoa(raw[offset + 12:offset + 16])
+            values[("IP", "dst")] = socket.inet_ntoa(raw[offset + 16:offset + 20])
+            end = offset + total_length
+            offset += header_length
+        elif layer == "IPv6":
+            payload_length, protocol = struct.unpack_from("!xxxxHB", raw, offset)
+            values[("IPv6", "nh")] = str(protocol)
+            values[("IPv6", "src")] = socket.inet_ntop(socket.AF_INET6, raw[offset + 8:offset + 24])
+            values[("IPv6", "dst")] = socket.inet_ntop(socket.AF_INET6, raw[offset + 24:offset + 40])
+            offset += 40
+            end = offset + payload_length
+        else:
+            return None
+
+        l4 = _L4_PROTOCOLS.get(protocol)
+        if l4 is None or end > len(raw) or end - offset < 8:
+            return None
+        sport, dport = struct.unpack_from("!HH", raw, offset)
+        bound_ports = _bound_ports(l4[0])
+        if bound_ports is None or sport in bound_ports or dport in bound_ports:
+            return None
+        values[(l4[0], "sport")] = str(sport)
+        values[(l4[0], "dport")] = str(dport)
+    except (struct.error, ValueError, OSError):
+        return None
+
+    return tuple(values.get(field) for field in fields)
+
+
+class PacketBufferIndex(object):
+    """
+    Decoded packets of the PTF buffer of a port, with hash indexes on their fields
+
+    Each packet of the buffer is decoded once into the tuple of the values of the indexed fields, without scapy
+    for the common packets (see decode_fields_raw). The buffer is followed incrementally: the packets added since
+    the last sync are decoded, the packets removed from the head of the buffer (polled or discarded by PTF) are
+    dropped from the index, and the index is rebuilt if the buffer was replaced (flushed).
+    """
+
+    def __init__(self, fields=INDEXED_FIELDS):
+        self.fields = tuple(fields)
+        self.field_positions = {field: position for position, field in enumerate(self.fields)}
+        # The raw decoding only knows the indexed fields
+        self._raw_decoding = set(self.fields).issubset(INDEXED_FIELDS)
+        self.reset()
+
+    def reset(self, buffer=None):
+        self._buffer = buffer
+        self._items = []
+        self._item_positions = {}
+        self._start = 0
+        self.size = 0
+        self.entries = []
+        self.indexes = {field: {} for field in self.fields}
+
+    def _add(self, item):
+        position = len(self.entries)
+        values = decode_fields_raw(item[0], self.fields) if self._raw_decoding else None
+        if values is None:
+            values = decode_fields(packet.Ether(item[0]), self.fields)
+        self.entries.append(values)
+        self._items.append(item)
+        self._item_positions[id(item)] = position
+        for field, value in zip(self.fields, values):
+            self.indexes[field].setdefault(value, []).append(position)
+
+    def _compact(self):
+        """Drop the packets removed from the buffer, without decoding the others again"""
+        items = self._items[self._start:]
+        entries = self.entries[self._start:]
+        self.reset(self._buffer)
+        for position, (item, values) in enumerate(zip(items, entries)):
+            self.entries.append(values)
+            self._items.append(item)
+            self._item_positions[id(item)] = position
+            for field, value in zip(self.fields, values):
+                self.indexes[field].setdefault(value, []).append(position)
+
+    def sync(self, buffer):
+        """
+        Decode the packets added to the buffer since the last sync
+
+        Args:
+            buffer: The PTF buffer of the port, list of (raw packet, timestamp)
+        """
+        items = buffer[:]
+        start = self._item_positions.get(id(items[0])) if items and self._items else None
+        live = len(self._items) - start if start is not None else 0
+        if (buffer is not self._buffer or start is None or self._items[start] is not items[0]
+                or len(items) < live or (live and items[live - 1] is not self._items[-1])):
+            if buffer is not self._buffer or self._items:
+                self.reset(buffer)
+            start, live = 0, 0
+        self._start = start
+        if self._start and self._start * 2 > len(self._items):
+            self._compact()
+        for item in items[live:]:
+            self._add(item)
+        self.size = len(items)
+
+    def find(self, criteria):
+        """
+        Find the packets matching some values of the indexed fields
+
+        Args:
+            criteria: List of ((layer name, field name), value)
+
+        Returns:
+            Sorted list of the positions of the matching packets in the buffer
+        """
+        postings = []
+        for field, value in criteria:
+            if value is None:
+                return []
+            postings.append(self.indexes[field].get(value, []))
+        if not postings:
+            return list(range(self.size))
+        postings.sort(key=len)
+        matches = set(postings[0])
+        for posting in postings[1:]:
+            matches.intersection_update(posting)
+        return sorted(position - self._start for position in matches if position >= self._start)
+
+    def packet(self, position):
+        """Get the scapy packet at a position of the buffer"""
+        return packet.Ether(self._items[self._start + position][0])
+
+
+# Indexes of the PTF buffers: {dataplane: {port: PacketBufferIndex}}
+_packet_indexes = weakref.WeakKeyDictionary()
+
+
+def get_packet_index(dataplane, port, fields=INDEXED_FIELDS):
+    """
+    Get the index of the PTF buffer of a port, synced with the buffer
+
+    Args:
+        dataplane: PTF dataplane
+        port: Port number
+        fields: Fields which must be indexed
+
+    Returns:
+        PacketBufferIndex
+    """
+    port_indexes = _packet_indexes.setdefault(dataplane, {})
+    index = port_indexes.get(port)
+    if index is None or not set(fields).issubset(index.fields):
+        index = port_indexes[port] = PacketBufferIndex(INDEXED_FIELDS + tuple(
+            field for field in fields if field not in INDEXED_FIELDS))
+    index.sync(dataplane.packet_queues[(0, port)])
+    return index
+
+
+def wait_for_packets(dataplane, timeout):
+    """Wait until a packet is received by the dataplane or the timeout"""
+    cvar = getattr(dataplane, 'cvar', None)
+    if cvar is None:
+        time.sleep(min(timeout, 0.05))
+        return
+    with cvar:
+        cvar.wait(timeout)
+
+
 class FilterPktBuffer(object):
     """
     FilterPktBuffer class for finding of packets in the buffer of PTF
     """
-    def __init__(self, ptfadapter, exp_pkt, dst_port_numbers, match_fields=None, ignore_fields=None):
+    def __init__(self, ptfadapter, exp_pkt, dst_port_numbers, match_fields=None, ignore_fields=None,
+                 timeout=FILTER_TIMEOUT, settle_time=FILTER_SETTLE_TIME, expected_count=None):
         """
         Initialize an object for finding packets in the buffer
 
@@ -83,6 +348,11 @@ class FilterPktBuffer(object):
             dst_port_numbers: Destination port numbers
             match_fields: List of packet fields that should be matched
             ignore_fields: List of packet fields that should be ignored
+            timeout: Max time to wait for the expected packets in the buffer
+            settle_time: Time without new packets in the buffer after which the matching packets are considered
+                all received, None to wait until the timeout. Use None or expected_count to count the packets.
+            expected_count: Number of matching packets on all the destination ports after which the wait stops,
+                None to wait for the settle time
         """
         self.received_pkt = None
         self.received_pkt_diff = []
@@ -99,8 +369,14 @@ class FilterPktBuffer(object):
             ignore_fields = []
         self.ignore_fields = ignore_fields
 
+        self.timeout = timeout
+        self.settle_time = settle_time
+        self.expected_count = expected_count
+
         self.masked_exp_pkt = mask.Mask(self.pkt)
         self.pkt_dict = convert_pkt_to_dict(self.pkt)
+        self.match_values = [((field, value), self.pkt_dict.get(field, {}).get(value))
+                             for field, value in self.match_fields]
 
         self.__ignore_fields()
 
@@ -129,36 +405,52 @@ class FilterPktBuffer(object):
 
         return pkt_dict
 
-    def __find_pkt_in_buffer(self, dst_port_number):
+    def __find_pkts_in_buffer(self):
         """
-        Find expected packet in buffer by using matched fields
+        Find expected packets in buffer by using matched fields
+
+        Waits until the expected count of packets matches, or until the buffers stop growing for the settle time
+        once a packet matches, or until the timeout.
 
         Returns:
-            Received packet
+            Dictionary of {destination port number: (index of the buffer, positions of the matched packets)}
         """
-        time.sleep(3)
-        common_buffer = self.ptfadapter.dataplane.packet_queues
-        packet_buffer = common_buffer[(0, dst_port_number)][:]
-        matched_index = 0
-        received_pkt = None
-
-        for pkt in packet_buffer:
-            packet_dict = convert_pkt_to_dict(packet.Ether(pkt[0]))
-
-            for field, value in self.match_fields:
-                try:
-                    if packet_dict[field][value] != self.pkt_dict[field][value]:
-                        break
-                except KeyError:
-                    break
-            else:
-                matched_index += 1
-                received_pkt = packet.Ether(pkt[0])
-
-        if received_pkt:
-            return ({dst_port_number: matched_index}, received_pkt)
+        dataplane = self.ptfadapter.dataplane
+        fields = [field for field, _ in self.match_values]
+        deadline = time.time() + self.timeout
+        sizes = None
+        while True:
+            matches = {}
+            for dst_port in self.dst_port_numbers:
+                index = get_packet_index(dataplane, dst_port, fields)
+                matches[dst_port] = (index, index.find(self.match_values))
+            now = time.time()
+            new_sizes = [index.size for index, _ in matches.values()]
+            if new_sizes != sizes:
+                sizes = new_sizes
+                last_growth = now
+            quiet_time = now - last_growth
+            if now >= deadline:
+                return matches
+            if self.expected_count is not None:
+                if sum(len(positions) for _, positions in matches.values()) >= self.expected_count:
+                    return matches
+            elif self.settle_time is not None and quiet_time >= self.settle_time \
+                    and any(positions for _, positions in matches.values()):
+                return matches
+            wait = deadline - now
+            if self.expected_count is None and self.settle_time is not None:
+                wait = min(wait, self.settle_time - quiet_time % self.settle_time)
+            wait_for_packets(dataplane, wait)
+
+    def count_pkt_in_buffer(self):
+        """
+        Count the packets in buffer matching the expected packet by matched fields
 
-        return (None, None)
+        Returns:
+            Dictionary of {destination port number: number of matched packets}
+        """
+        return {dst_port: len(positions) for dst_port, (_, positions) in self.__find_pkts_in_buffer().items()}
 
     def __diff_between_dict(self, rcv_pkt_dict, exp_pkt_dict, path=''):
         """
@@ -211,12 +503,10 @@ class FilterPktBuffer(object):
         Returns:
             Bool value or difference between received packet and expected packet
         """
-        for dst_port in self.dst_port_numbers:
-            matched_index, received_pkt = self.__find_pkt_in_buffer(dst_port)
-
-            if received_pkt:
-                self.received_pkt = received_pkt
-                self.matched_index.update(matched_index)
+        for dst_port, (index, positions) in self.__find_pkts_in_buffer().items():
+            if positions:
+                self.received_pkt = index.packet(positions[-1])
+                self.matched_index[dst_port] = len(positions)
 
         if self.received_pkt:
             return self.masked_exp_pkt.pkt_match(self.received_pkt) or self._diff_between_pkt(self.received_pkt)
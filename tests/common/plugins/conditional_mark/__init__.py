@@ -3,17 +3,21 @@
 This plugin supports adding any mark to specified test cases based on conditions. All the information of test cases,
 marks, and conditions can be specified in a centralized file.
 """
+import hashlib
 import json
 import logging
 import os
+import pickle
 import re
 import subprocess
 import yaml
 import glob
 import pytest
 
+from tests.common.cache import FactsCache
 from tests.common.testbed import TestbedInfo
-from .issue import check_issues
+from .engine import ConditionCache, ConditionsIndex
+from .issue import CheckerIssueStatusBackend, IssueStatusResolver, LocalFileIssueStatusBackend
 from tests.common.utilities import get_duts_from_host_pattern
 
 logger = logging.getLogger(__name__)
@@ -34,6 +38,22 @@ MARK_CONDITIONS_CONSTANTS = {
                      't2_single_node_max_64p', 't2-single-node-max-64p', 't2_single_node_max_64p_v2',
                      'urh_min', 'lrh_min', 'lt2-o224', 'lt2-o32', 'lt2-o256-u32d224']
 }
+CONDITIONS_CACHE_ZONE = 'conditional_mark'
+CONDITIONS_CACHE_KEY = 'tests_mark_conditions'
+ISSUE_STATUS_CACHE_KEY = 'issue_status'
+ISSUE_URL_PATTERN = re.compile('https?://[^ )]+')
+
+cache = FactsCache()
+
+# Mark conditions loaded for the session
+_session_conditions = None
+
+# State of the issues referenced by the mark conditions, resolved for the session
+_session_issue_status = {}
+
+# Index of the last conditions list used by find_all_matches, and the compiled condition strings
+_conditions_index = None
+_condition_cache = ConditionCache()
 
 
 def pytest_addoption(parser):
@@ -69,6 +89,23 @@ def pytest_addoption(parser):
         help="Dynamically update the skip reason based on the conditions, "
              "by default it will not use the static reason specified in the mark conditions file")
 
+    parser.addoption(
+        '--issue-status-file',
+        action='store',
+        dest='issue_status_file',
+        default=os.environ.get('SONIC_MGMT_ISSUE_STATUS_FILE'),
+        help="Resolve the state of the issues in the mark conditions from this yaml or json file instead of "
+             "querying the issue tracker. The file is a dict of issue URL to 'open'/'closed' or bool (active).")
+
+    parser.addoption(
+        '--issue-status-cache-ttl',
+        action='store',
+        dest='issue_status_cache_ttl',
+        type=int,
+        default=3600,
+        help="Time in seconds the state of the issues is cached on disk and reused by the later sessions. "
+             "0 disables the cache. Default is 3600.")
+
 
 def load_conditions(session):
     """Load the content from mark conditions file
@@ -99,19 +136,71 @@ def load_conditions(session):
 
     try:
         logger.debug('Trying to load test mark conditions files: {}'.format(conditions_files))
+        contents = []
         for conditions_file in conditions_files:
-            with open(conditions_file) as f:
-                logger.debug('Loaded test mark conditions file: {}'.format(conditions_file))
-                conditions = yaml.safe_load(f)
-                for key, value in list(conditions.items()):
-                    conditions_list.append({key: value})
+            with open(conditions_file, 'rb') as f:
+                contents.append(f.read())
+
+        # The parsed conditions are cached by the hash of the conditions files, skip parsing them if unchanged
+        conditions_hash = get_conditions_hash(conditions_files, contents)
+        cached_conditions = read_cached_conditions(conditions_hash)
+        if cached_conditions is not None:
+            logger.debug('Loaded test mark conditions from cache: {}'.format(conditions_files))
+            return cached_conditions
+
+        for conditions_file, content in zip(conditions_files, contents):
+            logger.debug('Loaded test mark conditions file: {}'.format(conditions_file))
+            conditions = yaml.safe_load(content)
+            for key, value in list(conditions.items()):
+                conditions_list.append({key: value})
     except Exception as e:
         logger.error('Failed to load {}, exception: {}'.format(conditions_files, repr(e)), exc_info=True)
         pytest.fail('Loading conditions file "{}" failed. Possibly invalid yaml file.'.format(conditions_files))
 
+    cache.write(CONDITIONS_CACHE_ZONE, CONDITIONS_CACHE_KEY, {
+        'hash': conditions_hash,
+        'conditions': pickle.dumps(conditions_list, pickle.HIGHEST_PROTOCOL)
+    })
     return conditions_list
 
 
+def read_cached_conditions(conditions_hash):
+    """Read the parsed mark conditions from cache.
+
+    Args:
+        conditions_hash (str): Hash of the conditions files, see get_conditions_hash.
+
+    Returns:
+        list or None: The conditions list, or None if the cached conditions are missing or for other files.
+    """
+    cached = cache.read(CONDITIONS_CACHE_ZONE, CONDITIONS_CACHE_KEY)
+    if not isinstance(cached, dict) or cached.get('hash') != conditions_hash:
+        return None
+    try:
+        # The conditions are unpickled for each load, because the mark details are updated by the evaluation
+        return pickle.loads(cached['conditions'])
+    except Exception as e:
+        logger.info('Failed to load cached test mark conditions, exception: {}'.format(repr(e)))
+        return None
+
+
+def get_conditions_hash(conditions_files, contents):
+    """Get the hash of the mark conditions files, used as the key of their cached parsed content.
+
+    Args:
+        conditions_files (list): Paths of the conditions files, in loading order.
+        contents (list): Contents (bytes) of the conditions files.
+
+    Returns:
+        str: Hex digest of the paths and contents of the files, and of the yaml parser version.
+    """
+    conditions_hash = hashlib.sha256(yaml.__version__.encode())
+    for conditions_file, content in zip(conditions_files, contents):
+        conditions_hash.update(os.path.abspath(conditions_file).encode())
+        conditions_hash.update(hashlib.sha256(content).digest())
+    return conditions_hash.hexdigest()
+
+
 def read_asic_name(hwsku):
     '''
     Get asic generation name from file 'ansible/group_vars/sonic/variables'
@@ -450,6 +539,22 @@ def load_basic_facts(dut_name, session):
     return results
 
 
+def get_conditions_index(conditions):
+    """Get the index of a conditions list, it is built once for the list.
+
+    Args:
+        conditions (list): List of conditions
+
+    Returns:
+        ConditionsIndex: Index of the conditions by test case name.
+    """
+    global _conditions_index
+    if (_conditions_index is None or _conditions_index.conditions is not conditions
+            or len(conditions) != len(_conditions_index.use_longest)):
+        _conditions_index = ConditionsIndex(conditions)
+    return _conditions_index
+
+
 def find_all_matches(nodeid, conditions, session, dynamic_update_skip_reason, basic_facts):
     """Find all matches of the given test case name in the conditions list.
 
@@ -460,35 +565,11 @@ def find_all_matches(nodeid, conditions, session, dynamic_update_skip_reason, ba
     Returns:
         list: All match test case name or None if not found
     """
-    all_matches = []
     max_length = -1
     conditional_marks = {}
     matches = []
 
-    for condition in conditions:
-        # condition is a dict which has only one item, so we use condition.keys()[0] to get its key.
-        condition_entry = list(condition.keys())[0]
-        condition_items = condition[condition_entry]
-        if "regex" in condition_items.keys():
-            assert isinstance(condition_items["regex"], bool), \
-                "The value of 'regex' in the mark conditions yaml should be bool type."
-            if condition_items["regex"] is True:
-                match = re.search(condition_entry, nodeid)
-            else:
-                match = None
-
-        elif "use_longest" in condition_items.keys():
-            assert isinstance(condition_items["use_longest"], bool), \
-                "The value of 'use_longest' in the mark conditions yaml should be bool type."
-            if nodeid.startswith(condition_entry) and condition_items["use_longest"] is True:
-                all_matches = []
-
-            match = nodeid.startswith(condition_entry)
-        else:
-            match = nodeid.startswith(condition_entry)
-
-        if match:
-            all_matches.append(condition)
+    all_matches = get_conditions_index(conditions).match(nodeid)
 
     for match in all_matches:
         case_starting_substring = list(match.keys())[0]
@@ -529,6 +610,71 @@ def find_all_matches(nodeid, conditions, session, dynamic_update_skip_reason, ba
     return matches
 
 
+def get_issue_status_resolver(session):
+    """Get the resolver of the issues state for the session.
+
+    The issues state is resolved from the file of the '--issue-status-file' option if it is set, else from the
+    issue tracker. The resolved state is cached on disk for '--issue-status-cache-ttl' seconds.
+
+    Args:
+        session (obj): Pytest session object.
+
+    Returns:
+        IssueStatusResolver: Resolver of the issues state.
+    """
+    option = session.config.option
+    issue_status_file = getattr(option, 'issue_status_file', None)
+    if issue_status_file:
+        # The state of the issues from a local file is not cached
+        return IssueStatusResolver(LocalFileIssueStatusBackend(issue_status_file), ttl=0)
+
+    proxies = session.config.cache.get('PROXIES', {})
+    return IssueStatusResolver(CheckerIssueStatusBackend(proxies=proxies), cache=cache,
+                               ttl=getattr(option, 'issue_status_cache_ttl', 3600),
+                               cache_zone=CONDITIONS_CACHE_ZONE, cache_key=ISSUE_STATUS_CACHE_KEY)
+
+
+def find_issues(conditions):
+    """Find the issue URLs in the condition strings of mark conditions entries.
+
+    Args:
+        conditions (list): List of mark conditions entries, see load_conditions.
+
+    Returns:
+        set: The unique issue URLs.
+    """
+    issues = set()
+    for condition in conditions:
+        for mark_details in list(condition.values())[0].values():
+            if not isinstance(mark_details, dict):
+                continue
+            mark_conditions = mark_details.get('conditions', None)
+            if not isinstance(mark_conditions, list):
+                mark_conditions = [mark_conditions]
+            for mark_condition in mark_conditions:
+                if isinstance(mark_condition, str):
+                    issues.update(ISSUE_URL_PATTERN.findall(mark_condition))
+    return issues
+
+
+def resolve_issue_status(issues, session):
+    """Resolve the state of a batch of issues at once, and keep it for the session.
+
+    The issues already resolved in the session are not resolved again. The others are resolved concurrently,
+    see get_issue_status_resolver.
+
+    Args:
+        issues (iterable of str): Issue URLs.
+        session (obj): Pytest session object.
+    """
+    unknown_issues = [issue_url for issue_url in issues if issue_url not in _session_issue_status]
+    if unknown_issues:
+        results = get_issue_status_resolver(session).resolve(unknown_issues)
+        for issue_url in unknown_issues:
+            # Consider the issue as active anyway if unable to get issue state, and do not retry in the session
+            _session_issue_status[issue_url] = results.get(issue_url, True)
+
+
 def update_issue_status(condition_str, session):
     """Replace issue URL with 'True' or 'False' based on its active state.
 
@@ -544,28 +690,15 @@ def update_issue_status(condition_str, session):
     Returns:
         str: New condition string with issue URLs already replaced with 'True' or 'False'.
     """
-    issues = re.findall('https?://[^ )]+', condition_str)
+    issues = ISSUE_URL_PATTERN.findall(condition_str)
     if not issues:
         logger.debug('No issue specified in condition')
         return condition_str
 
-    issue_status_cache = session.config.cache.get('ISSUE_STATUS', {})
-    proxies = session.config.cache.get('PROXIES', {})
-
-    unknown_issues = [issue_url for issue_url in issues if issue_url not in issue_status_cache]
-    if unknown_issues:
-        results = check_issues(unknown_issues, proxies=proxies)
-        issue_status_cache.update(results)
-        session.config.cache.set('ISSUE_STATUS', issue_status_cache)
+    resolve_issue_status(issues, session)
 
     for issue_url in issues:
-        if issue_url in issue_status_cache:
-            replace_str = str(issue_status_cache[issue_url])
-        else:
-            # Consider the issue as active anyway if unable to get issue state
-            replace_str = 'True'
-
-        condition_str = condition_str.replace(issue_url, replace_str)
+        condition_str = condition_str.replace(issue_url, str(_session_issue_status[issue_url]))
     return condition_str
 
 
@@ -588,6 +721,28 @@ def evaluate_condition(dynamic_update_skip_reason, mark_details, condition, basi
     if condition is None or condition.strip() == '':
         return True    # Empty condition item will be evaluated as True. Equivalent to be ignored.
 
+    # The result of a condition only depends on the basic facts and the issues status of the session
+    _condition_cache.bind(basic_facts, session)
+    condition_result = _condition_cache.results.get(condition)
+    if condition_result is None:
+        condition_result = _condition_cache.results[condition] = _evaluate_condition_str(condition, basic_facts,
+                                                                                         session)
+    if condition_result and dynamic_update_skip_reason:
+        mark_details['reason'].append(condition)
+    return condition_result
+
+
+def _evaluate_condition_str(condition, basic_facts, session):
+    """Evaluate a raw condition string, with its issue URLs replaced by their status.
+
+    Args:
+        condition (str): A raw condition string.
+        basic_facts (dict): A one level dict with basic facts.
+        session (obj): Pytest session object, for getting cached data.
+
+    Returns:
+        bool: True or False based on condition string evaluation result.
+    """
     condition_str = update_issue_status(condition, session)
     try:
         safe_facts = {k: v for k, v in basic_facts.items()}
@@ -599,11 +754,7 @@ def evaluate_condition(dynamic_update_skip_reason, mark_details, condition, basi
                 logger.warning("Variable %s not found in basic_facts, defaulting to None", var)
                 safe_globals[var] = None
 
-        condition_result = bool(eval(condition_str, safe_globals))
-
-        if condition_result and dynamic_update_skip_reason:
-            mark_details['reason'].append(condition)
-        return condition_result
+        return bool(eval(_condition_cache.compile(condition_str), safe_globals))
     except Exception:
         raise RuntimeError('Failed to evaluate condition, raw_condition={}, condition_str={}'.format(
             condition,
@@ -649,16 +800,18 @@ def evaluate_conditions(dynamic_update_skip_reason, mark_details, conditions, ba
 def pytest_collection(session):
     """Hook for loading conditions.
 
-    The pytest session.config.cache is used for caching loaded conditions for later use.
+    The loaded conditions are held in memory for later use in pytest_collection_modifyitems.
     DUT facts are loaded lazily in pytest_collection_modifyitems to avoid expensive SSH
     overhead when all tests are already going to be skipped (e.g. topology mismatch).
 
     Args:
         session (obj): Pytest session object.
     """
+    global _session_conditions
 
-    # Always clear cached conditions of previous run.
-    session.config.cache.set('TESTS_MARK_CONDITIONS', None)
+    # Always clear conditions and issues state of previous run.
+    _session_conditions = None
+    _session_issue_status.clear()
 
     if session.config.option.ignore_conditional_mark:
         logger.info('Ignore conditional mark')
@@ -666,7 +819,7 @@ def pytest_collection(session):
 
     conditions = load_conditions(session)
     if conditions:
-        session.config.cache.set('TESTS_MARK_CONDITIONS', conditions)
+        _session_conditions = conditions
 
 
 @pytest.hookimpl(trylast=True)
@@ -682,7 +835,7 @@ def pytest_collection_modifyitems(session, config, items):
         config (obj): Pytest config object.
         items (obj): List of pytest Item objects.
     """
-    conditions = config.cache.get('TESTS_MARK_CONDITIONS', None)
+    conditions = _session_conditions
     if not conditions:
         logger.debug('No mark condition is defined')
         return
@@ -713,10 +866,19 @@ def pytest_collection_modifyitems(session, config, items):
     basic_facts['constants'] = MARK_CONDITIONS_CONSTANTS
     # Normalize nodeids: strip root directory prefix if present (pytest 9.0+ includes it)
     root_prefix = os.path.basename(str(session.config.rootpath)) + "/"
-    for item in items:
-        nodeid = item.nodeid
-        if nodeid.startswith(root_prefix):
-            nodeid = nodeid[len(root_prefix):]
+    nodeids = [item.nodeid[len(root_prefix):] if item.nodeid.startswith(root_prefix) else item.nodeid
+               for item in items]
+
+    # Resolve the state of all the issues of the entries matching the collected test cases in one batch, instead
+    # of one issue after another while evaluating the conditions
+    index = get_conditions_index(conditions)
+    matched_entries = {}
+    for nodeid in nodeids:
+        for condition in index.match(nodeid):
+            matched_entries[id(condition)] = condition
+    resolve_issue_status(find_issues(matched_entries.values()), session)
+
+    for item, nodeid in zip(items, nodeids):
         all_matches = find_all_matches(nodeid, conditions, session, dynamic_update_skip_reason, basic_facts)
 
         if all_matches:
@@ -0,0 +1,118 @@
+"""Compiled mark conditions for the conditional mark plugin.
+
+The mark conditions are loaded as a list of one item dicts: {test case name prefix or regex: marks}. For each
+collected test case, find_all_matches needs the entries whose name is a prefix of the test case (or whose regex
+matches it), in the order of the list, and evaluates the condition strings of their marks.
+
+ConditionsIndex indexes the entries once: the prefixes in a trie and the regexes precompiled, so finding the
+matching entries of a test case does not scan the whole list. ConditionCache compiles each condition string once
+and memoizes its evaluation result for the basic facts of the session.
+"""
+import re
+
+# Key of the trie nodes holding the indexes of the entries ending at that node
+_ENTRIES = None
+
+
+class ConditionsIndex(object):
+    """Index of the mark conditions entries by test case name prefix."""
+
+    def __init__(self, conditions):
+        """
+        Args:
+            conditions (list): List of the mark conditions entries, see load_conditions.
+
+        Raises:
+            AssertionError: if the value of 'regex' or 'use_longest' of an entry is not bool.
+            re.error: if the regex of an entry is invalid.
+        """
+        self.conditions = conditions
+        self.trie = {}
+        self.regexes = []
+        self.use_longest = []
+
+        for index, condition in enumerate(conditions):
+            # condition is a dict which has only one item
+            condition_entry = list(condition.keys())[0]
+            condition_items = condition[condition_entry]
+            use_longest = False
+            if "regex" in condition_items.keys():
+                assert isinstance(condition_items["regex"], bool), \
+                    "The value of 'regex' in the mark conditions yaml should be bool type."
+                # An entry with 'regex: False' never matches
+                if condition_items["regex"] is True:
+                    self.regexes.append((index, re.compile(condition_entry)))
+            else:
+                if "use_longest" in condition_items.keys():
+                    assert isinstance(condition_items["use_longest"], bool), \
+                        "The value of 'use_longest' in the mark conditions yaml should be bool type."
+                    use_longest = condition_items["use_longest"]
+                node = self.trie
+                for char in condition_entry:
+                    node = node.setdefault(char, {})
+                node.setdefault(_ENTRIES, []).append(index)
+            self.use_longest.append(use_longest)
+
+    def match(self, nodeid):
+        """Find the entries matching a test case.
+
+        Args:
+            nodeid (str): Full test case name.
+
+        Returns:
+            list: The matching entries in the order of the conditions list. A matching entry with
+                'use_longest: True' drops the matching entries before it.
+        """
+        indexes = []
+        node = self.trie
+        if _ENTRIES in node:
+            indexes.extend(node[_ENTRIES])
+        for char in nodeid:
+            node = node.get(char)
+            if node is None:
+                break
+            if _ENTRIES in node:
+                indexes.extend(node[_ENTRIES])
+
+        for index, regex in self.regexes:
+            if regex.search(nodeid):
+                indexes.append(index)
+
+        all_matches = []
+        for index in sorted(indexes):
+            if self.use_longest[index]:
+                all_matches = []
+            all_matches.append(self.conditions[index])
+        return all_matches
+
+
+class ConditionCache(object):
+    """Compiled condition strings and their evaluation results for a set of basic facts.
+
+    The results are only valid for the basic facts and the session they were evaluated with, the cache is
+    cleared when it is used with other ones.
+    """
+
+    def __init__(self):
+        self.code = {}
+        self.results = {}
+        self._basic_facts = None
+        self._basic_facts_len = None
+        self._session = None
+
+    def compile(self, condition_str):
+        """Get the code object of a condition string, compiled once."""
+        code = self.code.get(condition_str)
+        if code is None:
+            code = self.code[condition_str] = compile(condition_str, "<condition>", "eval")
+        return code
+
+    def bind(self, basic_facts, session):
+        """Bind the evaluation results to the basic facts and the session, clear them if they have changed."""
+        # The references to the basic facts and the session are kept, so their ids can not be reused
+        if (basic_facts is not self._basic_facts or session is not self._session
+                or len(basic_facts) != self._basic_facts_len):
+            self.results = {}
+            self._basic_facts = basic_facts
+            self._basic_facts_len = len(basic_facts)
+            self._session = session
@@ -1,14 +1,17 @@
 """For checking issue state based on supplied issue URL.
 """
+import json
 import logging
-import multiprocessing
 import os
 import re
+import time
 from abc import ABCMeta, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlencode
 
 import requests
 import six
+import yaml
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +22,8 @@ class IssueCheckerBase(six.with_metaclass(ABCMeta, object)):
 
     def __init__(self, url):
         self.url = url
+        # Set to False by is_active when the issue state could not be retrieved
+        self.resolved = True
 
     @abstractmethod
     def is_active(self):
@@ -79,6 +84,7 @@ class GitHubIssueChecker(IssueCheckerBase):
             except Exception as direct_err:
                 logger.error(f"Access GitHub API directly failed for {direct_url}: {direct_err}")
                 logger.debug(f"Issue {direct_url} is considered active due to API access failure.")
+                self.resolved = False
                 return True
 
         # Check issue state
@@ -115,11 +121,50 @@ def issue_checker_factory(url, proxies):
     return None
 
 
+class IssueStatusBackendBase(six.with_metaclass(ABCMeta, object)):
+    """Base class for the backends resolving the state of a batch of issues
+    """
+
+    @abstractmethod
+    def resolve(self, issues):
+        """Resolve the state of the issues.
+
+        Args:
+            issues (list of str): List of issue URLs.
+
+        Returns:
+            tuple: (dict, set). The dict is the state of the resolved issues, key is issue URL, value is True if the
+                issue is active else False. The set holds the URLs of the issues whose state could not be retrieved,
+                their state in the dict (if any) is not cached.
+        """
+        return {}, set()
+
+
+class CheckerIssueStatusBackend(IssueStatusBackendBase):
+    """Resolve the issues state with the issue checkers, concurrently in threads
+    """
+
+    def __init__(self, proxies=None, max_workers=16):
+        self.proxies = proxies
+        self.max_workers = max_workers
+
+    def resolve(self, issues):
+        checkers = [c for c in [issue_checker_factory(issue, self.proxies) for issue in issues] if c is not None]
+        if not checkers:
+            return {}, set(issues)
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(checkers))) as executor:
+            states = list(executor.map(lambda checker: checker.is_active(), checkers))
+        results = {checker.url: state for checker, state in zip(checkers, states)}
+        unresolved = set(issues) - set(checker.url for checker in checkers if checker.resolved)
+        return results, unresolved
+
+
 def check_issues(issues, proxies=None):
     """Check state of the specified issues.
 
-    Because issue state checking may involve sending HTTP request. This function uses parallel run to speed up
-    issue status checking.
+    Because issue state checking may involve sending HTTP request, the issues are checked concurrently by
+    CheckerIssueStatusBackend.
 
     Args:
         issues (list of str): List of issue URLs.
@@ -127,23 +172,99 @@ def check_issues(issues, proxies=None):
     Returns:
         dict: Issue state check result. Key is issue URL, value is either True or False based on issue state.
     """
-    checkers = [c for c in [issue_checker_factory(issue, proxies) for issue in issues] if c is not None]
-    if not checkers:
+    results, _ = CheckerIssueStatusBackend(proxies=proxies).resolve(issues)
+    if not results:
         logger.error('No checker created for issues: {}'.format(issues))
-        return {}
+    return results
 
-    check_results = multiprocessing.Manager().dict()
-    check_procs = []
 
-    def _check_issue(checker, results):
-        results[checker.url] = checker.is_active()
+class LocalFileIssueStatusBackend(IssueStatusBackendBase):
+    """Resolve the issues state from a local yaml or json file, without any network access.
 
-    for checker in checkers:
-        check_procs.append(multiprocessing.Process(target=_check_issue, args=(checker, check_results,)))
+    The file is a dict with issue URL as key, and as value either a bool (True if the issue is active) or the
+    state string of the issue ('open' or 'closed'). Example:
+        https://github.com/sonic-net/sonic-mgmt/issues/1234: closed
+        https://github.com/sonic-net/sonic-buildimage/issues/5678: true
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def resolve(self, issues):
+        with open(self.path) as f:
+            if self.path.endswith('.json'):
+                states = json.load(f) or {}
+            else:
+                states = yaml.safe_load(f) or {}
+
+        results = {}
+        for issue in issues:
+            if issue not in states:
+                continue
+            state = states[issue]
+            results[issue] = state.lower() != 'closed' if isinstance(state, str) else bool(state)
+        return results, set(issues) - set(results)
 
-    for proc in check_procs:
-        proc.start()
-    for proc in check_procs:
-        proc.join(timeout=60)
 
-    return dict(check_results)
+class IssueStatusResolver(object):
+    """Resolve the state of a batch of issues through a backend, with a cache of the states on disk.
+
+    The cached state of an issue is used until it is older than the TTL, so the later sessions do not need
+    to query the issue tracker again.
+    """
+
+    def __init__(self, backend, cache=None, ttl=3600, cache_zone='conditional_mark', cache_key='issue_status'):
+        """
+        Args:
+            backend (IssueStatusBackendBase): Backend resolving the issues state.
+            cache (FactsCache): Cache for the issues state, not cached on disk if None.
+            ttl (int): Time to live in seconds of the cached issues state, not cached on disk if 0.
+        """
+        self.backend = backend
+        self.cache = cache if ttl > 0 else None
+        self.ttl = ttl
+        self.cache_zone = cache_zone
+        self.cache_key = cache_key
+
+    def _read_cache(self):
+        if self.cache is None:
+            return {}
+        cached = self.cache.read(self.cache_zone, self.cache_key)
+        return cached if isinstance(cached, dict) else {}
+
+    def resolve(self, issues):
+        """Resolve the state of the issues.
+
+        Args:
+            issues (iterable of str): Issue URLs.
+
+        Returns:
+            dict: Key is issue URL, value is True if the issue is active else False. The issues whose state could
+                not be resolved are not included.
+        """
+        issues = sorted(set(issues))
+        now = time.time()
+        cached = self._read_cache()
+        results = {}
+        for issue in issues:
+            entry = cached.get(issue)
+            if entry and now - entry['time'] < self.ttl:
+                results[issue] = entry['active']
+
+        unknown_issues = [issue for issue in issues if issue not in results]
+        if not unknown_issues:
+            return results
+
+        logger.info('Resolving the state of {} issues, {} from cache'.format(len(unknown_issues), len(results)))
+        resolved, unresolved = self.backend.resolve(unknown_issues)
+        results.update(resolved)
+
+        to_cache = {issue: {'active': active, 'time': now} for issue, active in resolved.items()
+                    if issue not in unresolved}
+        if self.cache is not None and to_cache:
+            # Re-read the cache to keep the states cached by other sessions meanwhile
+            cached = self._read_cache()
+            cached = {issue: entry for issue, entry in cached.items() if now - entry['time'] < self.ttl}
+            cached.update(to_cache)
+            self.cache.write(self.cache_zone, self.cache_key, cached)
+        return results
@@ -1,7 +1,14 @@
 import logging
+import os
+import shutil
+import tempfile
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
+from tests.common.plugins import conditional_mark
 from tests.common.plugins.conditional_mark import find_all_matches, load_conditions
+from tests.common.plugins.conditional_mark.engine import ConditionsIndex
+from tests.common.plugins.conditional_mark.issue import GitHubIssueChecker, IssueStatusBackendBase, \
+    IssueStatusResolver, LocalFileIssueStatusBackend, check_issues
 
 logger = logging.getLogger(__name__)
 
@@ -293,5 +300,176 @@ class TestFindAllMatches(unittest.TestCase):
         self.assertIn('xfail', marks_found)
 
 
+class TestConditionsIndex(unittest.TestCase):
+    """Test cases for the index of the conditions used by find_all_matches."""
+
+    CONDITIONS = [
+        {"test_a.py": {"skip": {"reason": "a"}}},
+        {"test_a.py::test_.*_ipv6": {"regex": True, "xfail": {"reason": "ipv6"}}},
+        {"test_a.py::test_1": {"regex": False, "skip": {"reason": "never"}}},
+        {"": {"skip": {"reason": "all"}}},
+        {"test_a.py::test_1": {"use_longest": True, "skip": {"reason": "longest"}}},
+        {"test_a.py::test_1_ipv6": {"xfail": {"reason": "longer"}}},
+        {"ipv6$": {"regex": True, "skip": {"reason": "regex after longest"}}},
+    ]
+
+    def _match(self, nodeid):
+        return [list(condition.keys())[0] for condition in ConditionsIndex(self.CONDITIONS).match(nodeid)]
+
+    def test_prefix_and_regex_matches_in_conditions_order(self):
+        self.assertEqual(self._match("test_a.py::test_2_ipv6"),
+                         ["test_a.py", "test_a.py::test_.*_ipv6", "", "ipv6$"])
+        self.assertEqual(self._match("test_b.py::test_2"), [""])
+
+    def test_use_longest_drops_previous_matches(self):
+        self.assertEqual(self._match("test_a.py::test_1"), ["test_a.py::test_1"])
+        self.assertEqual(self._match("test_a.py::test_1_ipv6"),
+                         ["test_a.py::test_1", "test_a.py::test_1_ipv6", "ipv6$"])
+
+    def test_invalid_regex_value(self):
+        with self.assertRaises(AssertionError):
+            ConditionsIndex([{"test_a.py": {"regex": "yes"}}])
+
+    def test_dynamic_skip_reason_with_cached_results(self):
+        conditions, session_mock = load_test_conditions()
+        nodeid = "test_conditional_mark.py::test_mark_3"
+        for _ in range(2):
+            matches = find_all_matches(nodeid, conditions, session_mock, True, CUSTOM_BASIC_FACTS)
+            self.assertEqual(matches[0]["test_conditional_mark.py::test_mark_3"]["skip"]["reason"],
+                             ["topo_type in ['t0']"])
+
+    def test_results_follow_basic_facts(self):
+        conditions, session_mock = load_test_conditions()
+        nodeid = "test_conditional_mark.py::test_mark_1"
+
+        def _skip_reason(basic_facts):
+            matches = find_all_matches(nodeid, conditions, session_mock, False, basic_facts)
+            skips = [mark_details for match in matches for mark_name, mark_details in list(match.values())[0].items()
+                     if mark_name == "skip"]
+            return skips[0]["reason"]
+
+        self.assertEqual(_skip_reason(CUSTOM_BASIC_FACTS), "Skip test_conditional_mark.py::test_mark")
+        self.assertEqual(_skip_reason({"asic_type": "mellanox", "topo_type": "t0"}),
+                         "Skip test_conditional_mark.py::test_mark_1")
+
+
+class TestLoadConditionsCache(unittest.TestCase):
+    """Test cases for the cache of the parsed conditions files."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.conditions_file = os.path.join(self.tmp_dir, "tests_conditions.yaml")
+        shutil.copy("tests/common/plugins/conditional_mark/unit_test/tests_conditions.yaml", self.conditions_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _load(self):
+        session_mock = MagicMock()
+        session_mock.config.option.mark_conditions_files = [self.conditions_file]
+        return load_conditions(session_mock)
+
+    def test_cached_conditions_are_fresh_copies(self):
+        conditions = self._load()
+        conditions[0]["test_conditional_mark.py"]["skip"]["reason"] = []
+        cached_conditions = self._load()
+        self.assertEqual(cached_conditions[0]["test_conditional_mark.py"]["skip"]["reason"],
+                         "Skip test_conditional_mark.py")
+        self.assertEqual(len(cached_conditions), len(conditions))
+
+    def test_changed_file_is_parsed(self):
+        self._load()
+        with open(self.conditions_file, "a") as f:
+            f.write("\ntest_new_entry.py:\n  skip:\n    reason: new\n")
+        self.assertEqual(list(self._load()[-1].keys()), ["test_new_entry.py"])
+
+
+class FakeIssueStatusBackend(IssueStatusBackendBase):
+
+    def __init__(self, states, unresolved=()):
+        self.states = states
+        self.unresolved = set(unresolved)
+        self.calls = []
+
+    def resolve(self, issues):
+        self.calls.append(list(issues))
+        return {issue: self.states.get(issue, True) for issue in issues}, self.unresolved & set(issues)
+
+
+class FakeFactsCache(object):
+
+    def __init__(self):
+        self.data = {}
+
+    def read(self, zone, key):
+        return self.data.get((zone, key))
+
+    def write(self, zone, key, value):
+        self.data[(zone, key)] = value
+
+
+class TestIssueStatus(unittest.TestCase):
+    """Test cases for the batch resolution of the issues state."""
+
+    ISSUE_1 = "https://github.com/sonic-net/sonic-mgmt/issues/1"
+    ISSUE_2 = "https://github.com/sonic-net/sonic-mgmt/issues/2"
+    ISSUE_3 = "https://github.com/sonic-net/sonic-mgmt/issues/3"
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.issue_status_file = os.path.join(self.tmp_dir, "issue_status.yaml")
+        with open(self.issue_status_file, "w") as f:
+            f.write("{}: closed\n{}: open\n".format(self.ISSUE_1, self.ISSUE_2))
+        conditional_mark._session_issue_status.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+        conditional_mark._session_issue_status.clear()
+
+    def test_local_file_backend(self):
+        results, unresolved = LocalFileIssueStatusBackend(self.issue_status_file).resolve(
+            [self.ISSUE_1, self.ISSUE_2, self.ISSUE_3])
+        self.assertEqual(results, {self.ISSUE_1: False, self.ISSUE_2: True})
+        self.assertEqual(unresolved, {self.ISSUE_3})
+
+    def test_resolver_cache_ttl(self):
+        facts_cache = FakeFactsCache()
+        backend = FakeIssueStatusBackend({self.ISSUE_1: False}, unresolved=[self.ISSUE_3])
+        resolver = IssueStatusResolver(backend, cache=facts_cache, ttl=3600)
+        self.assertEqual(resolver.resolve([self.ISSUE_1, self.ISSUE_2, self.ISSUE_3, self.ISSUE_1]),
+                         {self.ISSUE_1: False, self.ISSUE_2: True, self.ISSUE_3: True})
+        self.assertEqual(backend.calls, [[self.ISSUE_1, self.ISSUE_2, self.ISSUE_3]])
+
+        # A later session only resolves the issue which could not be resolved
+        backend = FakeIssueStatusBackend({})
+        IssueStatusResolver(backend, cache=facts_cache, ttl=3600).resolve([self.ISSUE_1, self.ISSUE_2, self.ISSUE_3])
+        self.assertEqual(backend.calls, [[self.ISSUE_3]])
+
+        # Expired states are resolved again
+        backend = FakeIssueStatusBackend({})
+        IssueStatusResolver(backend, cache=facts_cache, ttl=0.000001).resolve([self.ISSUE_1])
+        self.assertEqual(backend.calls, [[self.ISSUE_1]])
+
+    def test_check_issues(self):
+        states = {self.ISSUE_1: False, self.ISSUE_2: True}
+        with patch.object(GitHubIssueChecker, "is_active", autospec=True,
+                          side_effect=lambda checker: states[checker.url]):
+            self.assertEqual(check_issues([self.ISSUE_1, self.ISSUE_2, "not an issue url"]), states)
+
+    def test_update_issue_status_from_file(self):
+        session_mock = MagicMock()
+        session_mock.config.option.issue_status_file = self.issue_status_file
+        conditions = [{"test_a.py": {"skip": {"conditions": ["{} or {}".format(self.ISSUE_1, self.ISSUE_3)]}}},
+                      {"test_b.py": {"xfail": {"conditions": "asic_type in ['vs'] and {}".format(self.ISSUE_2)}}}]
+        self.assertEqual(conditional_mark.find_issues(conditions), {self.ISSUE_1, self.ISSUE_2, self.ISSUE_3})
+
+        conditional_mark.resolve_issue_status(conditional_mark.find_issues(conditions), session_mock)
+        # The issues state is kept for the session, the file is not read again
+        os.remove(self.issue_status_file)
+        self.assertEqual(conditional_mark.update_issue_status("{} or {}".format(self.ISSUE_1, self.ISSUE_3),
+                                                              session_mock), "False or True")
+        self.assertEqual(conditional_mark.update_issue_status(self.ISSUE_2, session_mock), "True")
+
+
 if __name__ == "__main__":
     unittest.main()
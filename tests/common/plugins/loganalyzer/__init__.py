@@ -52,6 +52,9 @@ def pytest_addoption(parser):
     parser.addoption("--force_load_err_list", action="store_true", default=False,
                      help="Load the user defined err msgs which is not included in the common ignore file,"
                           "even when disable_loganalyzer is true")
+    parser.addoption("--loganalyzer_on_dut", action="store_true", default=False,
+                     help="analyze the extracted logs on the DUT and fetch only the results, "
+                          "instead of fetching the extracted logs to the sonic-mgmt host")
 
 
 @reset_ansible_local_tmp
@@ -1,7 +1,9 @@
+import hashlib
 import json
 import logging
 import os
 import re
+import shlex
 import time
 import pprint
 import shutil
@@ -162,6 +164,8 @@ class LogAnalyzer:
         ansible_host.loganalyzer = self
         self.dut_run_dir = dut_run_dir
         self.extracted_syslog = os.path.join(self.dut_run_dir, "syslog")
+        # Marker positions recorded on init, extract_log seeks straight to the start marker with them
+        self.marker_state_file = os.path.join(self.dut_run_dir, "loganalyzer_markers.json")
         self.marker_prefix = marker_prefix.replace(' ', '_')
         # use existing syslog msg as marker to search in logs instead of writing a new one
         self.start_marker = start_marker
@@ -174,6 +178,7 @@ class LogAnalyzer:
         self._markers = []
         self.fail = True
         self.store_la_logs = False
+        self.analyze_on_dut = False
 
         self.additional_files = list(additional_files.keys())
         self.additional_start_str = list(additional_files.values())
@@ -182,6 +187,7 @@ class LogAnalyzer:
             # override the fail and store_la_logs if they are set in the request config options
             self.fail = not (self.request.config.getoption("--ignore_la_failure"))
             self.store_la_logs = self.request.config.getoption("--store_la_logs")
+            self.analyze_on_dut = self.request.config.getoption("--loganalyzer_on_dut")
 
         self._la_logs_dir = "/tmp/loganalyzer/{}".format(self.ansible_host.hostname)
         self.bughandler = bughandler
@@ -419,8 +425,8 @@ class LogAnalyzer:
         Adds the marker to the log files
         """
         start_marker = ".".join((self.marker_prefix, time.strftime("%Y-%m-%d-%H:%M:%S", time.gmtime())))
-        cmd = "python {run_dir}/loganalyzer.py --action init --run_id {start_marker}"\
-            .format(run_dir=self.dut_run_dir, start_marker=start_marker)
+        cmd = "python {run_dir}/loganalyzer.py --action init --run_id {start_marker} --state_file {state_file}"\
+            .format(run_dir=self.dut_run_dir, start_marker=start_marker, state_file=self.marker_state_file)
         if log_files:
             cmd += " --logs {}".format(','.join(log_files))
 
@@ -432,6 +438,8 @@ class LogAnalyzer:
         """
         @summary: Extract syslog logs based on the start/stop markers and compose one file.
                   Download composed file, analyze file based on defined regular expressions.
+                  If analyze_on_dut is set, the composed file is analyzed on the DUT and only
+                  the results are downloaded.
 
         @param marker: Marker obtained from "init" method.
         @param fail: Flag to enable/disable raising exception when loganalyzer find error messages.
@@ -466,7 +474,7 @@ class LogAnalyzer:
 
             # On DUT extract syslog files from /var/log/ and create one file by location - /tmp/syslog
             self.ansible_host.extract_log(directory='/var/log', file_prefix='syslog', start_string=start_string,
-                                          target_filename=self.extracted_syslog)
+                                          target_filename=self.extracted_syslog, state_file=self.marker_state_file)
             for idx, path in enumerate(self.additional_files):
                 file_dir, file_name = split(path)
                 extracted_file_name = os.path.join(self.dut_run_dir, file_name)
@@ -475,38 +483,27 @@ class LogAnalyzer:
                 else:
                     start_str = start_string
                 self.ansible_host.extract_log(directory=file_dir, file_prefix=file_name, start_string=start_str,
-                                              target_filename=extracted_file_name)
-
-        # Download extracted logs from the DUT to the temporal folder defined in SYSLOG_TMP_FOLDER
-        self.save_extracted_log(dest=tmp_folder)
-        file_list = [tmp_folder]
+                                              target_filename=extracted_file_name,
+                                              state_file=self.marker_state_file)
 
+        # Name of each extracted file in the analysis result: the path of its local copy
+        extracted_files = {self.extracted_syslog: tmp_folder}
         for path in self.additional_files:
             file_dir, file_name = split(path)
             extracted_file_name = os.path.join(self.dut_run_dir, file_name)
-            tmp_folder = ".".join((extracted_file_name, timestamp))
-            self.save_extracted_file(dest=tmp_folder, src=extracted_file_name)
-            file_list.append(tmp_folder)
-
-        match_messages_regex = re.compile('|'.join(self.match_regex)) if len(self.match_regex) else None
-        ignore_messages_regex = re.compile('|'.join(self.ignore_regex)) if len(self.ignore_regex) else None
-        expect_messages_regex = re.compile('|'.join(self.expect_regex)) if len(self.expect_regex) else None
-
-        logging.debug("Analyze files {}".format(file_list))
-        logging.debug('    match_regex="{}"'.format(match_messages_regex.pattern if match_messages_regex else ''))
-        logging.debug('    ignore_regex="{}"'.format(ignore_messages_regex.pattern if ignore_messages_regex else ''))
-        logging.debug('    expect_regex="{}"'.format(expect_messages_regex.pattern if expect_messages_regex else ''))
-        analyzer_parse_result = self.ansible_loganalyzer.analyze_file_list(
-            file_list, match_messages_regex, ignore_messages_regex, expect_messages_regex,
-            maximum_log_length=maximum_log_length)
-        # Print file content and remove the file
-        for folder in file_list:
-            with open(folder) as fo:
-                logging.debug("{} file content:\n\n{}".format(folder, fo.read()))
-            os.remove(folder)
+            extracted_files[extracted_file_name] = ".".join((extracted_file_name, timestamp))
 
-        expected_lines_total = []
-        unused_regex_messages = []
+        logging.debug("Analyze files {}".format(list(extracted_files.values())))
+        logging.debug('    match_regex="{}"'.format('|'.join(self.match_regex)))
+        logging.debug('    ignore_regex="{}"'.format('|'.join(self.ignore_regex)))
+        logging.debug('    expect_regex="{}"'.format('|'.join(self.expect_regex)))
+
+        if self.analyze_on_dut:
+            analyzer_parse_result, unused_regex_messages = self._analyze_on_dut(
+                marker, extracted_files, maximum_log_length=maximum_log_length)
+        else:
+            analyzer_parse_result, unused_regex_messages = self._analyze_locally(
+                extracted_files, maximum_log_length=maximum_log_length)
 
         for key, value in list(analyzer_parse_result.items()):
             matching_lines, expecting_lines = value
@@ -516,15 +513,7 @@ class LogAnalyzer:
                                                     "expected_match": len(expecting_lines)}
             analyzer_summary["match_messages"][key] = matching_lines
             analyzer_summary["expect_messages"][key] = expecting_lines
-            expected_lines_total.extend(expecting_lines)
 
-        # Find unused regex matches
-        for regex in self.expect_regex:
-            for line in expected_lines_total:
-                if re.search(regex, line):
-                    break
-            else:
-                unused_regex_messages.append(regex)
         analyzer_summary["total"]["expected_missing_match"] = len(unused_regex_messages)
         analyzer_summary["unused_expected_regexp"] = unused_regex_messages
         logging.debug("Analyzer summary: {}".format(pprint.pformat(analyzer_summary)))
@@ -545,6 +534,81 @@ class LogAnalyzer:
             logging.warning("Skip bug handler execution because it is not a valid BugHandler")
         return analyzer_summary
 
+    def _analyze_locally(self, extracted_files, maximum_log_length=None):
+        """
+        @summary: Download the extracted files to the ansible host and analyze them there.
+
+        @param extracted_files: Dictionary of extracted file path on the DUT to local file path.
+        @param maximum_log_length: The long message (length > maximum_log_length) will be skipped.
+        @return: Tuple of the analysis result per local file and the list of unused expect regexes.
+        """
+        # Download extracted logs from the DUT to the temporal folder defined in SYSLOG_TMP_FOLDER
+        for src, dest in list(extracted_files.items()):
+            if src == self.extracted_syslog:
+                self.save_extracted_log(dest=dest)
+            else:
+                self.save_extracted_file(dest=dest, src=src)
+        file_list = list(extracted_files.values())
+
+        classifier = self.ansible_loganalyzer.create_classifier(self.match_regex, self.ignore_regex, self.expect_regex)
+        analyzer_parse_result = self.ansible_loganalyzer.analyze_file_list(
+            file_list, None, None, None, maximum_log_length=maximum_log_length, classifier=classifier)
+        # Print file content and remove the file
+        for folder in file_list:
+            with open(folder) as fo:
+                logging.debug("{} file content:\n\n{}".format(folder, fo.read()))
+            os.remove(folder)
+
+        # Expect regexes which were not found in any expected line
+        return analyzer_parse_result, classifier.get_unused_expect_regexes()
+
+    def _get_rules_file(self):
+        """
+        @summary: Get the path and content of the rule set file on the DUT.
+                  The file name contains the hash of the content, so a rule set is pushed to the DUT
+                  only once and any change of the regular expressions results in a new file.
+        """
+        content = json.dumps({"match": self.match_regex, "ignore": self.ignore_regex, "expect": self.expect_regex},
+                             sort_keys=True)
+        content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        return os.path.join(self.dut_run_dir, "loganalyzer_rules.{}.json".format(content_hash)), content
+
+    def _analyze_on_dut(self, marker, extracted_files, maximum_log_length=None):
+        """
+        @summary: Analyze the extracted files on the DUT, only the results are transferred back.
+                  The rule set is pushed to the DUT when it is not there yet.
+
+        @param marker: Marker obtained from "init" method.
+        @param extracted_files: Dictionary of extracted file path on the DUT to local file path.
+        @param maximum_log_length: The long message (length > maximum_log_length) will be skipped.
+        @return: Tuple of the analysis result per local file and the list of unused expect regexes.
+        """
+        rules_file, rules_content = self._get_rules_file()
+        cmd = "python {run_dir}/loganalyzer.py --action analyze_extracted --run_id {marker} --rules_file {rules_file}"\
+            " --logs {logs}".format(run_dir=self.dut_run_dir, marker=marker, rules_file=rules_file,
+                                    logs=",".join(extracted_files.keys()))
+        if self.ansible_loganalyzer.start_marker:
+            cmd += " --start_marker {}".format(shlex.quote(self.ansible_loganalyzer.start_marker))
+        if maximum_log_length is not None:
+            cmd += " --max_log_length {}".format(maximum_log_length)
+
+        result = self.ansible_host.command(cmd, module_ignore_errors=True)
+        if result["rc"] == system_msg_handler.err_no_rules_file % 256:
+            logging.debug("Pushing loganalyzer rule set {}".format(rules_file))
+            self.ansible_host.copy(content=rules_content, dest=rules_file)
+            result = self.ansible_host.command(cmd, module_ignore_errors=True)
+
+        if result["rc"] != 0:
+            raise LogAnalyzerError("Log analyzer failed on DUT:\n{}\n{}".format(result["stdout"], result["stderr"]))
+
+        dut_result = json.loads(result["stdout"])
+        logging.debug("Analyzer DUT totals: {}".format(dut_result["total"]))
+        analyzer_parse_result = {}
+        for src, dest in list(extracted_files.items()):
+            file_result = dut_result["files"][src]
+            analyzer_parse_result[dest] = [file_result["match"], file_result["expect"]]
+        return analyzer_parse_result, dut_result["unused_expected_regexp"]
+
     def save_extracted_log(self, dest):
         """
         @summary: Download extracted syslog log file to the ansible host.
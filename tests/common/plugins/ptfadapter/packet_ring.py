@@ -0,0 +1,411 @@
+"""
+Batch receive path of PtfTestAdapter.
+
+The PTF dataplane thread queues the packets received on each port in a list, and the poll of a packet pops it from
+the head of the list. Both the poll and the discard of the oldest packet when the queue is full are O(queue length),
+and the queue length of PtfTestAdapter is 100000. This module replaces the lists of the dataplane by PacketRing
+objects, which keep the same interface (len, iteration, indexing, pop(0)), so ptf.testutils and the tests reading
+dataplane.packet_queues keep working, and add:
+    - batch receive of the queued packets of several ports in one call, see recv_batch(),
+    - per-port counters of the received, filtered and discarded packets with the rates, see PortCounters,
+    - filtering of the received packets with RxFilter, attached to the socket of the port as a classic BPF program
+      when the port has one (local interfaces), else run by the dataplane thread before queuing the packets (ports of
+      ptf_nn_agent).
+"""
+import ctypes
+import heapq
+import socket
+import struct
+import threading
+from collections import deque, namedtuple
+
+import ptf.mask as mask
+import ptf.ptfutils as ptfutils
+
+# As defined in asm/socket.h
+SO_ATTACH_FILTER = 26
+SO_DETACH_FILTER = 27
+
+# Classic BPF opcodes, see linux/filter.h
+BPF_LD_W_ABS = 0x20
+BPF_LD_H_ABS = 0x28
+BPF_LD_B_ABS = 0x30
+BPF_LD_W_LEN = 0x80
+BPF_ALU_AND_K = 0x54
+BPF_JMP_JEQ_K = 0x15
+BPF_JMP_JGE_K = 0x35
+BPF_RET_K = 0x06
+BPF_LOADS = {4: BPF_LD_W_ABS, 2: BPF_LD_H_ABS, 1: BPF_LD_B_ABS}
+BPF_ACCEPT = 0x40000
+
+# Packets shorter than this are padded by Ethernet, see ptf.dataplane.match_exp_pkt
+MIN_FRAME_SIZE = 60
+ETHERTYPE_OFFSET = 12
+VLAN_TPIDS = (0x8100, 0x88a8, 0x9100)
+
+RxPacket = namedtuple("RxPacket", ["port", "packet", "time"])
+
+
+class RxFilter(object):
+    """
+    Match of the bytes of the received packets.
+
+    The filter compares the bytes of the packets under a mask to the expected bytes, and optionally the length of the
+    packets. It runs in python (match()) or in the kernel as a classic BPF program (bpf_program()).
+    """
+
+    def __init__(self, value, care_mask=None, length=None, min_length=None):
+        """
+        Args:
+            value (bytes): Expected bytes of the head of the packets.
+            care_mask (bytes): Mask of the bits of value to compare, all the bits by default.
+            length (int): Exact length of the packets, None to not check it.
+            min_length (int): Minimum length of the packets, the length of value by default.
+        """
+        value = bytes(value)
+        care_mask = bytes(care_mask) if care_mask is not None else b"\xff" * len(value)
+        if len(care_mask) != len(value):
+            raise ValueError("The mask has {} bytes, the value {} bytes".format(len(care_mask), len(value)))
+        # Trailing bytes not compared are not loaded
+        end = len(care_mask.rstrip(b"\x00"))
+        self.value = value[:end]
+        self.care_mask = care_mask[:end]
+        self.length = length
+        self.min_length = max(min_length or 0, len(value))
+        self._mask_int = int.from_bytes(self.care_mask, "big")
+        self._value_int = int.from_bytes(self.value, "big") & self._mask_int
+
+    @classmethod
+    def from_packet(cls, pkt, length=None):
+        """
+        Build the filter of the packets matched by an expected packet, like ptf.dataplane.match_exp_pkt.
+
+        Args:
+            pkt: Expected packet, ptf.mask.Mask, scapy packet or bytes.
+            length (int): Only compare the first bytes of the expected packet (e.g. the headers), the length of the
+                packets is not checked then.
+        """
+        if isinstance(pkt, mask.Mask):
+            value = bytes(pkt.exp_pkt)[:pkt.size]
+            care_mask = bytes(pkt.mask)
+            exact_length = None if pkt.ignore_extra_bytes else pkt.size
+        else:
+            value = bytes(pkt)
+            care_mask = None
+            exact_length = len(value) if len(value) >= MIN_FRAME_SIZE else None
+        if length is not None:
+            value = value[:length]
+            care_mask = care_mask[:length] if care_mask is not None else None
+            exact_length = None
+        return cls(value, care_mask, length=exact_length)
+
+    def match(self, pkt):
+        """Check if a packet (bytes) passes the filter."""
+        size = len(pkt)
+        if size < self.min_length or (self.length is not None and size != self.length):
+            return False
+        return int.from_bytes(pkt[:len(self.value)], "big") & self._mask_int == self._value_int
+
+    @property
+    def kernel_safe(self):
+        """
+        Check if the filter can run in the kernel for the packets captured by a packet socket.
+
+        The kernel offloads the VLAN tag of the packets out of the data seen by BPF (PTF adds it back with the
+        auxiliary data). A kernel filter of untagged packets may accept tagged packets rejected by match(), but a
+        filter of tagged packets would reject all the packets, so these filters, and the filters with a don't care
+        ethertype, only run in python.
+        """
+        if len(self.value) <= ETHERTYPE_OFFSET and self.length is None:
+            return True
+        if self.care_mask[ETHERTYPE_OFFSET:ETHERTYPE_OFFSET + 2] != b"\xff\xff":
+            return False
+        return struct.unpack_from("!H", self.value, ETHERTYPE_OFFSET)[0] not in VLAN_TPIDS
+
+    def bpf_program(self):
+        """
+        Compile the filter to a classic BPF program.
+
+        Returns:
+            list: Instructions (code, jt, jf, k). A load out of the packet rejects the packet, like the minimum
+                length check of match().
+        """
+        program = []
+
+        def reject_unless(code, k):
+            # Skip the reject instruction if the condition is true
+            program.append((code, 1, 0, k))
+            program.append((BPF_RET_K, 0, 0, 0))
+
+        if self.length is not None or self.min_length > len(self.value):
+            program.append((BPF_LD_W_LEN, 0, 0, 0))
+            if self.length is not None:
+                reject_unless(BPF_JMP_JEQ_K, self.length)
+            else:
+                reject_unless(BPF_JMP_JGE_K, self.min_length)
+        offset = 0
+        while offset < len(self.value):
+            if not self.care_mask[offset]:
+                offset += 1
+                continue
+            size = 4 if len(self.value) - offset >= 4 else 2 if len(self.value) - offset >= 2 else 1
+            care = int.from_bytes(self.care_mask[offset:offset + size], "big")
+            program.append((BPF_LOADS[size], 0, 0, offset))
+            if care != (1 << size * 8) - 1:
+                program.append((BPF_ALU_AND_K, 0, 0, care))
+            reject_unless(BPF_JMP_JEQ_K, int.from_bytes(self.value[offset:offset + size], "big") & care)
+            offset += size
+        program.append((BPF_RET_K, 0, 0, BPF_ACCEPT))
+        return program
+
+    def attach(self, sock):
+        """Attach the filter to a socket as a BPF program, replacing the filter attached before."""
+        program = self.bpf_program()
+        buf = ctypes.create_string_buffer(b"".join(struct.pack("HBBI", *insn) for insn in program))
+        sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, struct.pack("HL", len(program), ctypes.addressof(buf)))
+
+
+def detach_filter(sock):
+    """Remove the BPF program attached to a socket, if any."""
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, SO_DETACH_FILTER, 0)
+    except OSError:
+        pass
+
+
+class PortCounters(object):
+    """Counters of the packets received on a port of the dataplane."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.packets = 0
+        self.bytes = 0
+        self.filtered = 0
+        self.overflow = 0
+        self.max_queued = 0
+        self.first_time = None
+        self.last_time = None
+
+    def snapshot(self, queued=0):
+        """
+        Get the counters and the rates of the port.
+
+        Returns:
+            dict: 'packets' and 'bytes' queued since the last reset, 'filtered' (rejected by the filter of the
+                dataplane thread), 'overflow' (discarded because the queue was full), 'queued' and 'max_queued', and
+                'pps'/'bps' between the first and the last queued packets.
+        """
+        duration = (self.last_time - self.first_time) if self.packets > 1 else 0
+        return {
+            "packets": self.packets,
+            "bytes": self.bytes,
+            "filtered": self.filtered,
+            "overflow": self.overflow,
+            "queued": queued,
+            "max_queued": self.max_queued,
+            "pps": (self.packets - 1) / duration if duration > 0 else 0.0,
+            "bps": self.bytes * 8 / duration if duration > 0 else 0.0,
+        }
+
+
+class PacketRing(deque):
+    """
+    Queue of the packets received on a port, (packet, timestamp) in order, replacing the list of the dataplane.
+
+    The dataplane thread discards the oldest packet with pop(0) when the queue is full, then appends the packet. The
+    discard is deferred to the append, so a packet rejected by the filter does not discard a queued packet.
+    """
+
+    def __init__(self, dataplane, items=()):
+        super(PacketRing, self).__init__(items)
+        self.dataplane = dataplane
+        self.counters = PortCounters()
+        self.rx_filter = None
+        self._discard_oldest = False
+
+    def append(self, item):
+        pkt, timestamp = item
+        if self.rx_filter is not None and not self.rx_filter.match(pkt):
+            self._discard_oldest = False
+            self.counters.filtered += 1
+            return
+        if self._discard_oldest:
+            self._discard_oldest = False
+            if self:
+                self.popleft()
+            self.counters.overflow += 1
+        deque.append(self, item)
+        counters = self.counters
+        counters.packets += 1
+        counters.bytes += len(pkt)
+        if counters.first_time is None:
+            counters.first_time = timestamp
+        counters.last_time = timestamp
+        if len(self) > counters.max_queued:
+            counters.max_queued = len(self)
+
+    def pop(self, index=-1):
+        if index == 0:
+            if threading.current_thread() is self.dataplane:
+                self._discard_oldest = True
+                return None
+            return self.popleft()
+        if index == -1:
+            return deque.pop(self)
+        item = self[index]
+        del self[index]
+        return item
+
+    def snapshot(self):
+        """Get the queued packets as a list, safe against the appends of the dataplane thread."""
+        return list(deque.__iter__(self))
+
+    def __iter__(self):
+        # Iterating a deque while it is appended raises RuntimeError, unlike a list
+        return iter(self.snapshot())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.snapshot()[index]
+        return deque.__getitem__(self, index)
+
+    def take(self, count):
+        """Pop the count oldest packets."""
+        popleft = self.popleft
+        return [popleft() for _ in range(min(count, len(self)))]
+
+
+def install_packet_rings(dataplane):
+    """
+    Replace the packet queues of a PTF dataplane by PacketRing objects.
+
+    The queues of the ports added later and flushed are replaced too.
+    """
+    with dataplane.cvar:
+        for port_id, queue in list(dataplane.packet_queues.items()):
+            if not isinstance(queue, PacketRing):
+                dataplane.packet_queues[port_id] = PacketRing(dataplane, queue)
+
+    origin_port_add = dataplane.port_add
+
+    def port_add(interface_name, device_number, port_number):
+        origin_port_add(interface_name, device_number, port_number)
+        with dataplane.cvar:
+            queue = dataplane.packet_queues[(device_number, port_number)]
+            dataplane.packet_queues[(device_number, port_number)] = PacketRing(dataplane, queue)
+
+    def flush():
+        """Drop any queued packets."""
+        with dataplane.cvar:
+            for queue in dataplane.packet_queues.values():
+                queue.clear()
+
+    dataplane.port_add = port_add
+    dataplane.flush = flush
+
+
+def _stream(ring_index, ring):
+    for position, (pkt, timestamp) in enumerate(ring.snapshot()):
+        yield timestamp, ring_index, position, pkt
+
+
+def _take(rings, count):
+    """Pop the count oldest packets of some rings, [(port_id, ring)], in the order of their reception."""
+    if len(rings) == 1:
+        port_id, ring = rings[0]
+        return [RxPacket(port_id[1], pkt, timestamp) for pkt, timestamp in ring.take(count)]
+    merged = heapq.merge(*[_stream(ring_index, ring) for ring_index, (_, ring) in enumerate(rings)])
+    taken = [0] * len(rings)
+    packets = []
+    for timestamp, ring_index, _, pkt in merged:
+        if len(packets) >= count:
+            break
+        packets.append(RxPacket(rings[ring_index][0][1], pkt, timestamp))
+        taken[ring_index] += 1
+    for (_, ring), ring_taken in zip(rings, taken):
+        ring.take(ring_taken)
+    return packets
+
+
+def recv_batch(dataplane, port_ids=None, count=None, timeout=0):
+    """
+    Receive the queued packets of some ports of a dataplane with PacketRing queues.
+
+    Args:
+        dataplane: PTF dataplane, see install_packet_rings().
+        port_ids (list): (device, port) of the ports, all the ports by default.
+        count (int): Max number of packets to receive, all the queued packets by default.
+        timeout (float): Seconds to wait for count packets, or for one packet if count is None.
+
+    Returns:
+        list: RxPacket(port, packet bytes, time) in the order of their reception, the packets of the ports after the
+            timeout if less packets were received.
+    """
+    with dataplane.cvar:
+        if port_ids is None:
+            port_ids = list(dataplane.packet_queues.keys())
+        rings = [(port_id, dataplane.packet_queues[port_id]) for port_id in port_ids]
+        wanted = count or 1
+
+        def grab():
+            if sum(len(ring) for _, ring in rings) >= wanted:
+                return True
+            return None
+
+        if timeout:
+            ptfutils.timed_wait(dataplane.cvar, grab, timeout=timeout)
+        queued = sum(len(ring) for _, ring in rings)
+        return _take(rings, queued if count is None else min(count, queued))
+
+
+def port_socket(dataplane, port_id):
+    """Get the socket of a port of the dataplane to attach a BPF filter, None for the ports without one."""
+    sock = getattr(dataplane.ports[port_id], "socket", None)
+    return sock if isinstance(sock, socket.socket) else None
+
+
+def set_rx_filter(dataplane, rx_filter, port_ids=None, kernel=True):
+    """
+    Filter the packets received on some ports of a dataplane with PacketRing queues.
+
+    Args:
+        rx_filter (RxFilter): The filter, None to remove the filter.
+        port_ids (list): (device, port) of the ports, all the ports by default.
+        kernel (bool): Attach the filter as a BPF program to the sockets of the ports which have one, when the filter
+            is kernel safe. The packets rejected by the kernel are not counted as filtered.
+
+    Returns:
+        list: (device, port) of the ports filtered in the kernel.
+    """
+    in_kernel = []
+    with dataplane.cvar:
+        if port_ids is None:
+            port_ids = list(dataplane.packet_queues.keys())
+        for port_id in port_ids:
+            ring = dataplane.packet_queues[port_id]
+            sock = port_socket(dataplane, port_id)
+            if sock is not None:
+                detach_filter(sock)
+            if rx_filter is not None and kernel and sock is not None and rx_filter.kernel_safe:
+                rx_filter.attach(sock)
+                ring.rx_filter = None
+                in_kernel.append(port_id)
+            else:
+                ring.rx_filter = rx_filter
+    return in_kernel
+
+
+def rx_stats(dataplane, port_ids=None, reset=False):
+    """Get the PortCounters snapshots of some ports of a dataplane with PacketRing queues, {(device, port): dict}."""
+    with dataplane.cvar:
+        if port_ids is None:
+            port_ids = list(dataplane.packet_queues.keys())
+        stats = {}
+        for port_id in port_ids:
+            ring = dataplane.packet_queues[port_id]
+            stats[port_id] = ring.counters.snapshot(len(ring))
+            if reset:
+                ring.counters.reset()
+        return stats
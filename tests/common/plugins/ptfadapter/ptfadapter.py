@@ -8,7 +8,9 @@ import ptf.mask as mask
 from ptf.base_tests import BaseTest
 from ptf.dataplane import DataPlane, DataPlanePortNN
 from tests.common.utilities import wait_until
+from .packet_ring import RxFilter, install_packet_rings, recv_batch, rx_stats, set_rx_filter
 import logging
+import time
 
 
 class PtfAgent:
@@ -129,6 +131,7 @@ class PtfTestAdapter(BaseTest):
                 packet
             )
         self.dataplane = ptf.dataplane_instance
+        install_packet_rings(self.dataplane)
         self._attach_cleanup_helpers()
 
     def _attach_cleanup_helpers(self):
@@ -163,6 +166,84 @@ class PtfTestAdapter(BaseTest):
         dp.drain = drain
         dp.clear_masks = clear_masks
 
+    def _port_ids(self, ports):
+        """Get the (device, port) of port numbers or (device, port) tuples, all the ports if ports is None"""
+        if ports is None:
+            return None
+        if isinstance(ports, (int, tuple)):
+            ports = [ports]
+        return [port if isinstance(port, tuple) else self.dataplane.port_to_tuple(port) for port in ports]
+
+    def recv_batch(self, ports=None, count=None, timeout=0):
+        """Receive the queued packets of some ports in one call, without decoding them.
+
+        Args:
+            ports: Port number, (device, port) or list of them, all the ports by default.
+            count (int): Max number of packets to receive, all the queued packets by default.
+            timeout (float): Seconds to wait for count packets, or for one packet if count is None.
+
+        Returns:
+            list: RxPacket(port, packet bytes, time) in the order of their reception.
+        """
+        return recv_batch(self.dataplane, self._port_ids(ports), count=count, timeout=timeout)
+
+    def count_packets(self, exp_pkt, ports=None, count=None, timeout=None):
+        """Count the packets matching an expected packet received on some ports.
+
+        The packets are received in batches and matched like ptf.testutils.verify_packet does, the received packets
+        are consumed, matching or not.
+
+        Args:
+            exp_pkt: Expected packet, ptf.mask.Mask or scapy packet.
+            ports: Port number, (device, port) or list of them, all the ports by default.
+            count (int): Return once count packets matched, else wait for the whole timeout.
+            timeout (float): Seconds to wait, ptf default timeout by default.
+
+        Returns:
+            dict: {port number: number of matching packets}
+        """
+        port_ids = self._port_ids(ports)
+        matcher = RxFilter.from_packet(self.update_payload(exp_pkt))
+        counts = {port_id[1]: 0 for port_id in (port_ids or self.dataplane.packet_queues.keys())}
+        deadline = time.time() + (ptfutils.default_timeout if timeout is None else timeout)
+        matched = 0
+        while True:
+            remaining = max(0, deadline - time.time())
+            for rx_pkt in recv_batch(self.dataplane, port_ids, timeout=remaining):
+                if matcher.match(rx_pkt.packet):
+                    counts[rx_pkt.port] += 1
+                    matched += 1
+            if (count is not None and matched >= count) or remaining <= 0:
+                return counts
+
+    def set_rx_filter(self, pkt, ports=None, length=None, kernel=True):
+        """Only queue the packets received on some ports which match an expected packet.
+
+        The filter is attached as a BPF program to the sockets of the ports which have one, else it is run by the
+        dataplane thread before queuing the packets (ports of ptf_nn_agent).
+
+        Args:
+            pkt: Expected packet (ptf.mask.Mask, scapy packet or bytes) or RxFilter, None to remove the filter.
+            ports: Port number, (device, port) or list of them, all the ports by default.
+            length (int): Only match the first bytes of the expected packet, e.g. the headers.
+            kernel (bool): Allow to run the filter in the kernel.
+
+        Returns:
+            list: (device, port) of the ports filtered in the kernel.
+        """
+        if pkt is not None and not isinstance(pkt, RxFilter):
+            pkt = RxFilter.from_packet(self.update_payload(pkt), length=length)
+        return set_rx_filter(self.dataplane, pkt, self._port_ids(ports), kernel=kernel)
+
+    def rx_stats(self, ports=None, reset=False):
+        """Get the receive counters and rates of some ports, see packet_ring.PortCounters.snapshot.
+
+        Returns:
+            dict: {port number: counters}
+        """
+        return {port_id[1]: stats for port_id, stats in rx_stats(self.dataplane, self._port_ids(ports),
+                                                                 reset=reset).items()}
+
     def kill(self):
         """ Close dataplane socket and kill data plane thread """
         if self.connected:
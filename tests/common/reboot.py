@@ -14,6 +14,8 @@ from .platform.interface_utils import check_interface_status_of_up_ports
 from .platform.processes_utils import wait_critical_processes
 from .plugins.loganalyzer.utils import support_ignore_loganalyzer
 from .utilities import wait_until, get_plt_reboot_ctrl, is_ipv6_address
+from tests.common.connections.ssh_control_pool import SshControlPool
+from tests.common.helpers.structured_show import reset_unavailable_sources
 from tests.common.helpers.dut_utils import ignore_t2_syslog_msgs, create_duthost_console, creds_on_dut
 from tests.common.fixtures.conn_graph_facts import get_graph_facts
 
@@ -229,6 +231,13 @@ def wait_for_startup(duthost, localhost, delay, timeout, port=SONIC_SSH_PORT):
 
     logger.info('ssh has started up on {}'.format(hostname))
 
+    # The master SSH connection to the DUT opened before the reboot is dead, close it so the next module
+    # calls open a new one instead of hanging on it
+    ssh_control_pool = SshControlPool.get_instance()
+    ssh_control = getattr(duthost, "_ssh_control", None)
+    if ssh_control_pool is not None and ssh_control is not None:
+        ssh_control_pool.reset_host(ssh_control.address)
+
 
 def perform_reboot(duthost, pool, reboot_command, reboot_helper=None, reboot_kwargs=None, reboot_type='cold',
                    invocation_type="cli_based", localhost=None, ptf_gnoi=None):
@@ -436,6 +445,8 @@ def reboot(duthost, localhost, reboot_type='cold', delay=10,
     # pre-reboot cached interpreter value, we need to clear the cached facts so that they are
     # re-gathered on next use.
     duthost.meta("clear_facts")
+    # The structured sources of the show helpers found unsupported by the previous image may work now
+    reset_unavailable_sources(hostname)
 
     if return_after_reconnect:
         return
@@ -0,0 +1,219 @@
+"""
+DbEventStore keeps the updates of a gNMI sonic-db subscription for the waiters of sonic_db.py.
+
+The subscription thread puts the events into the store (it is a drop-in replacement of the event queue given to
+subscribe_gnmi), and the store:
+    - keeps the key updates in a bounded ring buffer, the oldest are dropped when the waiters fall behind,
+    - indexes the latest value of each key per table, so the updates dropped from the ring buffer are not lost,
+    - feeds each update to the registered waiters and wakes them up with a condition variable, instead of the
+      waiters polling a queue in a sleep loop,
+    - counts the updates received and dropped and the depth of the ring buffer (the updates not consumed yet by a
+      waiter), see stats().
+
+Like with the event queue, a waiter consumes the updates: the next waiter starts from the update after the one
+which completed the previous waiter.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from itertools import islice
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CAPACITY = 100000
+# Separators of the table name in the sonic-db keys, e.g. 'SAI_OBJECT_TYPE_ACL_ENTRY:oid:0x...' or 'PORT|Ethernet0'
+TABLE_SEPARATORS = (':', '|')
+
+
+def table_of(key):
+    """Get the table name of a sonic-db key."""
+    end = len(key)
+    for separator in TABLE_SEPARATORS:
+        index = key.find(separator)
+        if 0 <= index < end:
+            end = index
+    return key[:end]
+
+
+def merge_value(old, new):
+    """
+    Merge an update of a key into its previous value.
+
+    gNMI sends the fields of a key in several updates, the update with the most fields has all the data.
+    """
+    if isinstance(old, dict) and isinstance(new, dict) and len(new) < len(old):
+        merged = dict(old)
+        merged.update(new)
+        return merged
+    return new
+
+
+class Waiter(object):
+    """
+    A waiter registered in a DbEventStore.
+
+    on_update(key, value) is called for each update consumed by the waiter, in order, and returns True when the
+    wait is complete. It is called by the subscription thread, so it must be fast and must not block.
+    """
+
+    def __init__(self, on_update):
+        self.on_update = on_update
+        self.done = False
+        self.error = None
+        self.last_seq = None
+
+
+class DbEventStore(object):
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, forward=None):
+        """
+        Args:
+            capacity (int): Max number of updates in the ring buffer.
+            forward: Optional queue.Queue the events are also put into, for the readers of the event queue.
+        """
+        self.capacity = capacity
+        self.forward = forward
+        self._cond = threading.Condition()
+        self._ring = deque(maxlen=capacity)
+        # {table: {key: [seq of the last update, merged value]}}
+        self._index = {}
+        self._waiters = []
+        self._seq = 0
+        self._consumed = 0
+        self.synced = False
+        self.stats_counters = {"events": 0, "updates": 0, "errors": 0, "dropped": 0, "max_depth": 0,
+                               "publish_time": 0.0}
+
+    def put(self, event, block=True, timeout=None):
+        """Add an event of the subscription, see subscribe_gnmi. Same signature as queue.Queue.put."""
+        start = time.time()
+        with self._cond:
+            self.stats_counters["events"] += 1
+            event_type = event.get("type")
+            if event_type == "update":
+                value = event.get("value")
+                if isinstance(value, dict):
+                    for key, key_value in value.items():
+                        self._publish(key, key_value)
+            elif event_type == "sync_response":
+                self.synced = True
+            elif event_type == "error":
+                self.stats_counters["errors"] += 1
+                logger.debug(f"Subscription error event: {event.get('message')}")
+            self._cond.notify_all()
+            self.stats_counters["publish_time"] += time.time() - start
+        if self.forward is not None:
+            self.forward.put(event)
+
+    def _publish(self, key, value):
+        self._seq += 1
+        seq = self._seq
+        if len(self._ring) == self.capacity and self._ring[0][0] > self._consumed:
+            self.stats_counters["dropped"] += 1
+        self._ring.append((seq, key, value))
+        self.stats_counters["updates"] += 1
+        depth = min(seq - self._consumed, len(self._ring))
+        if depth > self.stats_counters["max_depth"]:
+            self.stats_counters["max_depth"] = depth
+
+        table = self._index.setdefault(table_of(key), {})
+        entry = table.get(key)
+        if entry is None:
+            table[key] = [seq, value]
+        else:
+            entry[0] = seq
+            entry[1] = merge_value(entry[1], value)
+
+        for waiter in self._waiters:
+            self._feed(waiter, seq, key, value)
+
+    @staticmethod
+    def _feed(waiter, seq, key, value):
+        if waiter.done:
+            return
+        waiter.last_seq = seq
+        try:
+            waiter.done = bool(waiter.on_update(key, value))
+        except Exception as e:
+            # Raised to the waiting thread, not to the subscription thread
+            waiter.error = e
+            waiter.done = True
+
+    def _pending(self):
+        """Get the (seq, key, value) of the updates not consumed yet, in order."""
+        oldest = self._ring[0][0] if self._ring else self._seq + 1
+        pending = []
+        if oldest > self._consumed + 1:
+            # Updates dropped from the ring buffer, replayed from the index with the latest value of their key
+            pending = sorted((entry[0], key, entry[1]) for table in self._index.values()
+                             for key, entry in table.items() if self._consumed < entry[0] < oldest)
+        start = max(0, len(self._ring) - (self._seq - self._consumed))
+        pending.extend(islice(self._ring, start, None))
+        return pending
+
+    def wait(self, on_update, timeout=None):
+        """
+        Wait until on_update returns True, for the updates not consumed yet and then for the new updates.
+
+        Args:
+            on_update: Callable (key, value) -> bool, see Waiter.
+            timeout (float): Max seconds to wait, None to wait forever.
+
+        Returns:
+            bool: False if the timeout was reached.
+
+        Raises:
+            The exception raised by on_update.
+        """
+        waiter = Waiter(on_update)
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            for seq, key, value in self._pending():
+                self._feed(waiter, seq, key, value)
+                if waiter.done:
+                    break
+            if not waiter.done:
+                self._waiters.append(waiter)
+                try:
+                    while not waiter.done:
+                        remaining = None if deadline is None else deadline - time.time()
+                        if remaining is not None and remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiters.remove(waiter)
+            if waiter.last_seq is not None and waiter.last_seq > self._consumed:
+                self._consumed = waiter.last_seq
+        if waiter.error is not None:
+            raise waiter.error
+        return waiter.done
+
+    def get_value(self, key):
+        """Get the latest value of a key, None if the key was not updated."""
+        with self._cond:
+            entry = self._index.get(table_of(key), {}).get(key)
+            return None if entry is None else entry[1]
+
+    def get_table(self, table):
+        """Get the latest values of the keys of a table, {key: value}."""
+        with self._cond:
+            return {key: entry[1] for key, entry in self._index.get(table, {}).items()}
+
+    def stats(self):
+        """
+        Get the backpressure stats of the store.
+
+        Returns:
+            dict: 'events' and 'updates' received, subscription 'errors', 'depth' (updates not consumed yet in the
+                ring buffer) and 'max_depth', 'dropped' (updates dropped from the ring buffer before being consumed),
+                'publish_time' (seconds spent by the subscription thread in the store), 'waiters' and 'keys'.
+        """
+        with self._cond:
+            stats = dict(self.stats_counters)
+            stats["depth"] = min(self._seq - self._consumed, len(self._ring))
+            stats["waiters"] = len(self._waiters)
+            stats["keys"] = sum(len(table) for table in self._index.values())
+        if self.forward is not None:
+            stats["forward_depth"] = self.forward.qsize()
+        return stats
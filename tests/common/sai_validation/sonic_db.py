@@ -1,5 +1,4 @@
 import logging
-import concurrent.futures
 import queue
 import threading
 import time
@@ -9,6 +8,8 @@ from datetime import timedelta
 from enum import IntEnum
 from concurrent.futures import ThreadPoolExecutor
 
+from tests.common.sai_validation.db_event_store import DbEventStore
+
 logger = logging.getLogger(__name__)
 ORIGIN = 'sonic-db'
 
@@ -37,10 +38,13 @@ class MonitorContext:
     """
     MonitorContext is a context type that holds
     information required to stop gNMI subscription
-    and cancel the thread.
+    and cancel the thread, and the DbEventStore of the
+    subscription events.
     """
-    def __init__(self, path, gnmi_conn, stop_event, subscription_thread, cancel_thread, disabled=False):
+    def __init__(self, path, gnmi_conn, stop_event, subscription_thread, cancel_thread, disabled=False,
+                 event_store=None):
         self.gnmi_connection = gnmi_conn
+        self.event_store = event_store
         self.sai_validation_disabled = disabled
         self.stop_event = stop_event
         self.subscription_thread = subscription_thread
@@ -52,6 +56,13 @@ def start_db_monitor(executor: ThreadPoolExecutor,
                      gnmi_conn,
                      path: str,
                      event_queue: queue.Queue):
+    """
+    start_db_monitor subscribes to a sonic-db path and keeps its events
+    in a DbEventStore for the wait_* functions.
+
+    event_queue is the DbEventStore to use, or a queue.Queue the events
+    are also put into for the readers of the queue.
+    """
     if gnmi_conn is None:
         logger.debug("gNMI connection is None, disabling SAI validation.")
         return MonitorContext(None, None, None, None, None, disabled=True)
@@ -60,11 +71,12 @@ def start_db_monitor(executor: ThreadPoolExecutor,
     logger.debug(f"Starting gNMI subscribe for path: {path}")
     call = _gnmi_client.new_subscribe_call(gnmi_conn, [path], GnmiSubscriptionMode.STREAM)
     stop_event = threading.Event()
+    event_store = event_queue if isinstance(event_queue, DbEventStore) else DbEventStore(forward=event_queue)
     subscription_thread = executor.submit(_sonic_internal.run_subscription,
-                                          call, stop_event, event_queue)
+                                          call, stop_event, event_store)
     cancel_thread = executor.submit(_sonic_internal.cancel_on_event, call, stop_event)
     logger.debug("DB monitor started successfully.")
-    ctx = MonitorContext(path, gnmi_conn, stop_event, subscription_thread, cancel_thread)
+    ctx = MonitorContext(path, gnmi_conn, stop_event, subscription_thread, cancel_thread, event_store=event_store)
     return ctx
 
 
@@ -85,7 +97,14 @@ def stop_db_monitor(ctx: MonitorContext):
         ctx.subscription_thread: "subscription_thread"
     }
     _sonic_internal.wait_for_all_futures(futures, timeout=timedelta(seconds=5))
-    logger.debug("DB monitor stopped successfully.")
+    logger.debug(f"DB monitor stopped successfully, event store stats: {ctx.event_store.stats()}")
+
+
+def _get_event_store(ctx: MonitorContext, event_queue):
+    """Get the DbEventStore the subscription of the context puts its events into."""
+    if isinstance(event_queue, DbEventStore):
+        return event_queue
+    return ctx.event_store
 
 
 def wait_for_n_keys(ctx: MonitorContext, filter_path: str, event_queue: queue.Queue, n: int, timeout: timedelta = None):
@@ -95,7 +114,7 @@ def wait_for_n_keys(ctx: MonitorContext, filter_path: str, event_queue: queue.Qu
     Args:
         ctx: The context returned by start_db_monitor.
         filter_path: The path to filter the keys. (Required if path contains larger subset of keys)
-        event_queue: The queue to read events from.
+        event_queue: The queue given to start_db_monitor.
         n: The number of keys to wait for.
         timeout: The maximum time to wait (datetime.timedelta). If the value is None,
                 it will wait indefinitely.
@@ -116,43 +135,24 @@ def wait_for_n_keys(ctx: MonitorContext, filter_path: str, event_queue: queue.Qu
 
     logger.debug(f"Waiting for {n} keys with timeout: {timeout}")
     received_events = {}
-    start_time = time.time()
-    timeout_seconds = timeout.total_seconds() if timeout else None
-
-    while len(received_events) < n:
-        try:
-            if timeout_seconds:
-                remaining_time = timeout_seconds - (time.time() - start_time)
-                if remaining_time <= 0:
-                    logger.error(f"Timeout reached waiting for {n} keys.")
-                    raise TimeoutError(f"Timeout reached waiting for {n} keys.")
-                event = event_queue.get(timeout=remaining_time)
-            else:
-                logger.debug("Timer has expired, returning current received events")
-                break
-
-            # NOTE gNMI events are being sent in parts. Multiple events are sent
-            # for a single key with data distributed across events. The final event
-            # for a key will have all the data. Consolidate the results here.
-            logger.debug(f"Received event: {event}")
-            if event.get('type') != 'update':
-                logger.debug("Event type is not 'update', skipping.")
-                continue
-            ev_map = event.get('value')
-            for key_oid, value in ev_map.items():
-                if key_oid not in received_events:
-                    if filter_path is None or key_oid.startswith(filter_path):
-                        received_events[key_oid] = value
-                else:
-                    if len(value) >= len(received_events[key_oid]):
-                        received_events[key_oid] = value
-        except queue.Empty:
-            if timeout_seconds is None:
-                logger.debug("Queue is empty, but no timeout is set. Continuing to wait.")
-                continue  # if no timeout, keep waiting.
-            else:
-                logger.error(f"Timeout reached waiting for {n} keys.")
-                raise TimeoutError(f"Timeout reached waiting for {n} keys.")
+
+    def on_update(key_oid, value):
+        # NOTE gNMI events are being sent in parts. Multiple events are sent
+        # for a single key with data distributed across events. The final event
+        # for a key will have all the data. Consolidate the results here.
+        if key_oid not in received_events:
+            if filter_path is None or key_oid.startswith(filter_path):
+                received_events[key_oid] = value
+        elif len(value) >= len(received_events[key_oid]):
+            received_events[key_oid] = value
+        return len(received_events) >= n
+
+    if n > 0:
+        store = _get_event_store(ctx, event_queue)
+        if not store.wait(on_update, timeout.total_seconds() if timeout else None):
+            logger.error(f"Timeout reached waiting for {n} keys, received {len(received_events)} keys, "
+                         f"event store stats: {store.stats()}")
+            raise TimeoutError(f"Timeout reached waiting for {n} keys.")
 
     logger.debug('Receive complete, fetching incomplete events')
 
@@ -193,36 +193,41 @@ def wait_until_condition(ctx: MonitorContext,
     keys (format: {prefix}{keys[0]}, {prefix}{keys[1]...})
     until the callback returns true for all the keys in the list
     or the function times-out. Whichever comes first.
+
+    The callback is called by the subscription thread for each update,
+    it must not block.
     """
     if condition_cb is None:
         raise Exception('callback not set')
     if ctx.sai_validation_disabled:
         logger.debug("SAI validation is disabled, skipping wait until condition.")
         return True, 0.0
-    _ensure_imports()
-    executor = ThreadPoolExecutor(max_workers=3)
-    future = executor.submit(_sonic_internal._wait_until_condition,
-                             event_queue=event_queue,
-                             prefix=prefix,
-                             keys=keys,
-                             condition_cb=condition_cb)
+    start_time = time.perf_counter()
+    remaining_keys = set(f'{prefix}{k}' for k in keys) if prefix else set(keys)
+    logger.debug(f'wait until condition is true for keys {remaining_keys}')
+
+    def on_update(k, v):
+        # k: key matching the DB key
+        # v: value
+        # sometimes multiple events are sent for the same key, a key stays
+        # done once the condition is true.
+        if k in remaining_keys and condition_cb(k, v):
+            remaining_keys.discard(k)
+        return not remaining_keys
+
+    if not remaining_keys:
+        return True, 0.0
+    store = _get_event_store(ctx, event_queue)
     try:
         logger.debug(f'Wait until condition for {timeout.total_seconds()} seconds')
-        completed, actual_time = future.result(timeout=timeout.total_seconds())
-        return completed, actual_time
-    except concurrent.futures.TimeoutError:
-        logger.debug('wait_until_condition has timed out; cancelling the future')
-        future.cancel()
-        return False, 0.0
-    except concurrent.futures.CancelledError:
-        logger.debug('wait_until_condition has been cancelled')
+        if store.wait(on_update, timeout.total_seconds()):
+            return True, time.perf_counter() - start_time
+        logger.debug(f'wait_until_condition has timed out, keys {remaining_keys} not done, '
+                     f'event store stats: {store.stats()}')
         return False, 0.0
     except Exception as e:
         logger.error(f'wait_until_condition has failed with exception {e}')
-        future.cancel()
         return False, 0.0
-    finally:
-        executor.shutdown(wait=False)
 
 
 def wait_until_keys_match(ctx: MonitorContext,
@@ -254,34 +259,9 @@ def wait_until_keys_match(ctx: MonitorContext,
         value: The expected value for the specified key (e.g., 'Up', 'Down').
         timeout: The maximum time to wait for the condition to be met.
     """
-    if ctx.sai_validation_disabled:
-        logger.debug("SAI validation is disabled, skipping wait until keys match.")
-        return True, 0.0
-    _ensure_imports()
-    executor = ThreadPoolExecutor(max_workers=3)
-    future = executor.submit(_sonic_internal._wait_until_keys_match,
-                             event_queue,
-                             prefix,
-                             hashes,
-                             key,
-                             value)
-    try:
-        logger.debug(f'Waiting for {timeout.total_seconds()} seconds')
-        completed, actual_time = future.result(timeout=timeout.total_seconds())
-        return completed, actual_time
-    except concurrent.futures.TimeoutError:
-        logger.debug('wait_until_keys_match has timed out; cancelling the future')
-        future.cancel()
-        return False, 0.0
-    except concurrent.futures.CancelledError:
-        logger.debug('wait_until_keys_match has been cancelled')
-        return False, 0.0
-    except Exception as e:
-        logger.error(f'wait_until_keys_match has failed with exception {e}')
-        future.cancel()
-        return False, 0.0
-    finally:
-        executor.shutdown(wait=False)
+    return wait_until_condition(ctx, event_queue, prefix, hashes,
+                                condition_cb=lambda k, v: v.get(key) == value,
+                                timeout=timeout)
 
 
 def get_key(gnmi_connection, path):
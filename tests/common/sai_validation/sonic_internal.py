@@ -1,7 +1,6 @@
 import logging
 import queue
 import threading
-import time
 import concurrent.futures
 from datetime import timedelta
 
@@ -59,50 +58,3 @@ def wait_for_all_futures(futures, timeout: timedelta):
         for future in futures:
             if future not in done:
                 logger.debug(f"Task {futures[future]} not completed.")
-
-
-def _wait_until_condition(event_queue: queue.Queue,
-                          prefix: str,
-                          keys: list,
-                          condition_cb):
-    start_time = time.perf_counter()
-    keys_cp = []
-    if prefix:
-        keys_cp = [f'{prefix}{k}' for k in keys]
-    else:
-        keys_cp = keys.copy()
-    logger.debug(f'wait until condition is true for keys {keys_cp}')
-    while len(keys_cp) > 0:
-        try:
-            gnmi_message = event_queue.get(timeout=0.25)
-            logger.debug(f'Received message from event_queue: {gnmi_message}')
-        except queue.Empty:
-            logger.debug("event_queue is empty, continuing to wait...")
-            continue
-        kv_map = gnmi_message.get('value')
-        if not kv_map:
-            continue
-        for k, v in kv_map.items():
-            # k: key matching the DB key
-            # v: value
-            res = condition_cb(k, v)
-            logger.debug(f"condition_cb with k={k}, v={v}, res={res}")
-            if res:
-                # sometimes multiple events are sent for the same key
-                # so check to ensure remove doesn't fail with errors.
-                if k in keys_cp:
-                    logger.debug(f'Removing {k} from keys_cp = {keys_cp}')
-                    keys_cp.remove(k)
-
-    end_time = time.perf_counter()
-    return len(keys_cp) == 0, (end_time - start_time)
-
-
-def _wait_until_keys_match(q: queue.Queue,
-                           prefix: str,
-                           hashes: list,
-                           key: str,
-                           expected_value: str):
-
-    return _wait_until_condition(q=q, prefix=prefix, keys=hashes,
-                                 condition_cb=lambda k, v: v.get(key) == expected_value)
@@ -3,6 +3,7 @@ Testbed file related utilities.
 """
 
 import argparse
+import copy
 import csv
 import ipaddr as ipaddress
 import json
@@ -14,8 +15,175 @@ import logging
 from collections import defaultdict
 from collections import OrderedDict
 
+if __package__:
+    from tests.common.topo_utils import load_topo
+else:
+    # Loaded by path outside of the tests package, like by ansible/recover_server.py: load the topo_utils module
+    # next to it by path too, without changing sys.path
+    import importlib.util
+    _spec = importlib.util.spec_from_file_location(
+        "testbed_topo_utils", os.path.join(os.path.dirname(os.path.abspath(__file__)), "topo_utils.py"))
+    _topo_utils = importlib.util.module_from_spec(_spec)
+    _spec.loader.exec_module(_topo_utils)
+    load_topo = _topo_utils.load_topo
+
 logger = logging.getLogger(__name__)
 
+# Content of the topology files loaded in the process, key is the path of the topology file, value is
+# ((size, mtime) of the file, content of the file)
+_topo_file_cache = {}
+
+
+def load_topo_file(topo_file):
+    """Load a topology file, it is loaded once per process and shared by the testbeds using the topology.
+
+    Args:
+        topo_file (str): Path of the topology file.
+
+    Returns:
+        dict: Content of the topology file, a copy owned by the caller.
+    """
+    topo_file = os.path.abspath(topo_file)
+    stat = os.stat(topo_file)
+    signature = (stat.st_size, stat.st_mtime_ns)
+    cached = _topo_file_cache.get(topo_file)
+    if cached is None or cached[0] != signature:
+        cached = _topo_file_cache[topo_file] = (signature, load_topo(topo_file))
+    return copy.deepcopy(cached[1])
+
+
+def _restore_lazy_topo(items, topo_file, lazy_keys, parser_class):
+    topo = LazyTopo(parser_class.__new__(parser_class), topo_file, lazy_keys)
+    for key, value in items:
+        dict.__setitem__(topo, key, value)
+        topo._pending.discard(key)
+    return topo
+
+
+class LazyTopo(dict):
+    """Topology of a testbed, whose content is loaded on first access.
+
+    'name' and 'type' are set when the testbed file is read. 'properties' (the content of the topology file) and the
+    maps computed from it ('ptf_map', 'ptf_map_disabled', 'ptf_dut_intf_map') are only loaded when they are accessed,
+    or when the whole topology is iterated, copied or serialized.
+    """
+
+    LAZY_KEYS = ('properties', 'ptf_map', 'ptf_map_disabled', 'ptf_dut_intf_map')
+    NUT_LAZY_KEYS = ('properties',)
+
+    def __init__(self, parser, topo_file, lazy_keys=LAZY_KEYS):
+        """
+        Args:
+            parser (TestbedInfo): Computes the maps of the topology.
+            topo_file (str): Path of the topology file.
+            lazy_keys (tuple): Keys of the topology loaded on first access.
+        """
+        super(LazyTopo, self).__init__()
+        self._parser = parser
+        self._topo_file = topo_file
+        self._lazy_keys = lazy_keys
+        self._pending = set(lazy_keys)
+
+    def _load(self, key):
+        if key == 'properties':
+            value = load_topo_file(self._topo_file)
+        else:
+            tb = {'topo': self}
+            if key == 'ptf_map':
+                value = self._parser.calculate_ptf_index_map(tb)
+            elif key == 'ptf_map_disabled':
+                value = self._parser.calculate_ptf_index_map_disabled(tb)
+            else:
+                value = self._parser.calculate_ptf_dut_intf_map(tb)
+        if key in self._pending:
+            self._pending.discard(key)
+            dict.__setitem__(self, key, value)
+        return dict.__getitem__(self, key)
+
+    def _load_all(self):
+        for key in self._lazy_keys:
+            if key in self._pending:
+                self._load(key)
+
+    def __missing__(self, key):
+        if key in self._pending:
+            return self._load(key)
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        self._pending.discard(key)
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        if key in self._pending:
+            self._pending.discard(key)
+            return
+        dict.__delitem__(self, key)
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or key in self._pending
+
+    def __iter__(self):
+        self._load_all()
+        return dict.__iter__(self)
+
+    def __len__(self):
+        return dict.__len__(self) + len(self._pending)
+
+    def __eq__(self, other):
+        self._load_all()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        self._load_all()
+        return dict.__repr__(self)
+
+    def __reduce__(self):
+        # Keep the topology lazy when pickled, like when the TestbedInfo is stored in the facts cache
+        return (_restore_lazy_topo,
+                (list(dict.items(self)), self._topo_file, self._lazy_keys, type(self._parser)))
+
+    def __deepcopy__(self, memo):
+        self._load_all()
+        return copy.deepcopy(dict(dict.items(self)), memo)
+
+    def get(self, key, default=None):
+        if key in self._pending:
+            return self._load(key)
+        return dict.get(self, key, default)
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+        self[key] = default
+        return default
+
+    def pop(self, key, *args):
+        if key in self._pending:
+            self._load(key)
+        return dict.pop(self, key, *args)
+
+    def keys(self):
+        self._load_all()
+        return dict.keys(self)
+
+    def values(self):
+        self._load_all()
+        return dict.values(self)
+
+    def items(self):
+        self._load_all()
+        return dict.items(self)
+
+    def copy(self):
+        self._load_all()
+        return dict(dict.items(self))
+
 
 class TestbedInfo(object):
     """Parse the testbed file used to describe whole testbed info."""
@@ -378,25 +546,27 @@ class TestbedInfo(object):
         return map
 
     def parse_topo(self):
+        """Set the topology of the testbeds.
+
+        The topology files are loaded when the topology properties or PTF maps of a testbed are accessed, see
+        LazyTopo. Only the testbeds used by the run load their topology file.
+        """
         for tb_name, tb in list(self.testbed_topo.items()):
             topo = tb.pop("topo")
-            tb["topo"] = defaultdict()
-            tb["topo"]["name"] = topo
-            tb["topo"]["type"] = self.get_testbed_type(topo)
-
             if topo.startswith("nut-"):
                 topo_dir = os.path.join(os.path.dirname(__file__), self.NUT_TOPOLOGY_FILEPATH)
                 topo_file = os.path.join(topo_dir, "{}.yml".format(topo))
-                with open(topo_file, 'r') as fh:
-                    tb['topo']['properties'] = yaml.safe_load(fh)
+                lazy_keys = LazyTopo.NUT_LAZY_KEYS
             else:
                 topo_dir = os.path.join(os.path.dirname(__file__), self.TOPOLOGY_FILEPATH)
                 topo_file = os.path.join(topo_dir, "topo_{}.yml".format(topo))
-                with open(topo_file, 'r') as fh:
-                    tb['topo']['properties'] = yaml.safe_load(fh)
-                tb['topo']['ptf_map'] = self.calculate_ptf_index_map(tb)
-                tb['topo']['ptf_map_disabled'] = self.calculate_ptf_index_map_disabled(tb)
-                tb['topo']['ptf_dut_intf_map'] = self.calculate_ptf_dut_intf_map(tb)
+                lazy_keys = LazyTopo.LAZY_KEYS
+            if not os.path.isfile(topo_file):
+                raise IOError("Topology file {} of testbed {} does not exist".format(topo_file, tb_name))
+
+            tb["topo"] = LazyTopo(self, topo_file, lazy_keys)
+            tb["topo"]["name"] = topo
+            tb["topo"]["type"] = self.get_testbed_type(topo)
 
     def _normalize_topo_names(self):
         """Normalize topology names by removing the '-vpp' suffix if present."""
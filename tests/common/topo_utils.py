@@ -0,0 +1 @@
+../../ansible/module_utils/topo_utils.py
\ No newline at end of file
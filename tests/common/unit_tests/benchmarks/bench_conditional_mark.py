@@ -0,0 +1,204 @@
+"""
+Benchmark of the conditional_mark matching of the collected test cases against the real mark conditions files.
+
+The test case names are the test functions and methods found in the test scripts of the repository, plus a
+parametrized variant of some of them. The issue URLs of the conditions are resolved from a fixed table, so no
+network access is done.
+
+For each test case, find_all_matches is run with the compiled engine and with the original linear scan
+(re-implemented below), the marks found are compared and the time of both is reported.
+
+Usage:
+    python3 tests/common/unit_tests/benchmarks/bench_conditional_mark.py
+    python3 tests/common/unit_tests/benchmarks/bench_conditional_mark.py --asic_type mellanox --topo_type t1
+"""
+import argparse
+import ast
+import glob
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[4]
+sys.path.insert(0, str(REPO_ROOT))
+
+from tests.common.plugins import conditional_mark  # noqa: E402
+
+
+class FakeCache(object):
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key, default):
+        return self.data.get(key, default)
+
+    def set(self, key, value):
+        self.data[key] = value
+
+
+class FakeSession(object):
+
+    def __init__(self, conditions_files):
+        self.config = type("FakeConfig", (), {})()
+        self.config.cache = FakeCache()
+        self.config.option = type("FakeOption", (), {})()
+        self.config.option.mark_conditions_files = conditions_files
+
+
+def collect_nodeids(tests_dir):
+    nodeids = []
+    for path in sorted(glob.glob(os.path.join(tests_dir, "**", "test_*.py"), recursive=True)):
+        relpath = os.path.relpath(path, tests_dir)
+        try:
+            with open(path) as script:
+                tree = ast.parse(script.read())
+        except (SyntaxError, UnicodeDecodeError):
+            continue
+        for node in tree.body:
+            if isinstance(node, ast.FunctionDef) and node.name.startswith("test"):
+                nodeids.append("{}::{}".format(relpath, node.name))
+            elif isinstance(node, ast.ClassDef) and node.name.startswith("Test"):
+                for method in node.body:
+                    if isinstance(method, ast.FunctionDef) and method.name.startswith("test"):
+                        nodeids.append("{}::{}::{}".format(relpath, node.name, method.name))
+    # Some parametrized test cases
+    nodeids.extend(["{}[param-{}]".format(nodeid, index) for index, nodeid in enumerate(nodeids[::7])])
+    return nodeids
+
+
+def legacy_evaluate_conditions(dynamic_update_skip_reason, mark_details, conditions, basic_facts,
+                               conditions_logical_operator, session):
+    """The evaluation of the conditions before the compiled engine, without the compile and result caches"""
+    def _evaluate(condition):
+        if condition is None or condition.strip() == '':
+            return True
+        condition_str = conditional_mark.update_issue_status(condition, session)
+        try:
+            safe_globals = dict(basic_facts)
+            for var in ["asic_type", "platform", "hwsku", "asic_gen"]:
+                safe_globals.setdefault(var, None)
+            condition_result = bool(eval(condition_str, safe_globals))
+            if condition_result and dynamic_update_skip_reason:
+                mark_details['reason'].append(condition)
+            return condition_result
+        except Exception:
+            raise RuntimeError('Failed to evaluate condition, raw_condition={}, condition_str={}'.format(
+                condition, condition_str))
+
+    if dynamic_update_skip_reason:
+        mark_details['reason'] = []
+    if isinstance(conditions, list):
+        results = [_evaluate(c) for c in conditions]
+        return any(results) if conditions_logical_operator == 'OR' else all(results)
+    if conditions is None or conditions.strip() == '':
+        return True
+    return _evaluate(conditions)
+
+
+def legacy_find_all_matches(nodeid, conditions, session, dynamic_update_skip_reason, basic_facts):
+    """find_all_matches before the compiled engine: a linear scan of all the entries for each test case"""
+    all_matches = []
+    max_length = -1
+    conditional_marks = {}
+    matches = []
+
+    for condition in conditions:
+        condition_entry = list(condition.keys())[0]
+        condition_items = condition[condition_entry]
+        if "regex" in condition_items.keys():
+            match = re.search(condition_entry, nodeid) if condition_items["regex"] is True else None
+        elif "use_longest" in condition_items.keys():
+            if nodeid.startswith(condition_entry) and condition_items["use_longest"] is True:
+                all_matches = []
+            match = nodeid.startswith(condition_entry)
+        else:
+            match = nodeid.startswith(condition_entry)
+        if match:
+            all_matches.append(condition)
+
+    for match in all_matches:
+        case_starting_substring = list(match.keys())[0]
+        length = len(case_starting_substring)
+        for mark in match[case_starting_substring].keys():
+            if mark in ["regex", "use_longest"]:
+                continue
+            mark_details = match[case_starting_substring][mark]
+            condition_value = legacy_evaluate_conditions(
+                dynamic_update_skip_reason, mark_details, mark_details.get('conditions'), basic_facts,
+                mark_details.get('conditions_logical_operator', 'AND').upper(), session)
+            if condition_value:
+                if mark not in conditional_marks or length >= max_length:
+                    conditional_marks[mark] = {case_starting_substring: {mark: mark_details}}
+                    max_length = length
+
+    for condition in list(conditional_marks.values()):
+        if condition not in matches:
+            matches.append(condition)
+    return matches
+
+
+def run(find_all_matches, nodeids, conditions, session, basic_facts):
+    results = []
+    start = time.time()
+    for nodeid in nodeids:
+        try:
+            matches = find_all_matches(nodeid, conditions, session, False, basic_facts)
+            results.append(sorted((list(match.keys())[0], list(list(match.values())[0].keys())[0])
+                                  for match in matches))
+        except RuntimeError as e:
+            results.append(str(e))
+    return time.time() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--asic_type", default="broadcom")
+    parser.add_argument("--topo_type", default="t0")
+    parser.add_argument("--topo_name", default="t0")
+    parser.add_argument("--skip_legacy", action="store_true", help="Do not run the original linear scan")
+    args = parser.parse_args()
+
+    tests_dir = str(REPO_ROOT / "tests")
+    os.chdir(tests_dir)
+    session = FakeSession([])
+
+    start = time.time()
+    conditions = conditional_mark.load_conditions(session)
+    print("Loaded {} conditions entries in {:.2f}s".format(len(conditions), time.time() - start))
+
+    # Resolve all the issues from a fixed table
+    issues = sorted(conditional_mark.find_issues(conditions))
+    conditional_mark._session_issue_status.update({url: index % 2 == 0 for index, url in enumerate(issues)})
+
+    basic_facts = {
+        "asic_type": args.asic_type, "asic_gen": "th2", "asic_subtype": "", "platform": "x86_64-generic",
+        "hwsku": "Generic-HwSku", "topo_type": args.topo_type, "topo_name": args.topo_name, "release": "master",
+        "branch": "master", "build_version": "master.1-abcdef", "num_asic": 1, "is_multi_asic": False,
+        "is_chassis": False, "is_chassis_config_absent": True, "is_smartswitch": False, "is_mgmt_ipv6_only": False,
+        "macsec_en": False, "switch_type": "", "type": "ToRRouter", "eth_mgmt_ctrl_available": True,
+        "feature_status": {}, "switch": {}, "minigraph_interfaces": [], "minigraph_portchannels": {},
+        "minigraph_portchannel_interfaces": [], "constants": conditional_mark.MARK_CONDITIONS_CONSTANTS,
+    }
+    nodeids = collect_nodeids(tests_dir)
+    print("Test cases: {}".format(len(nodeids)))
+
+    elapsed, results = run(conditional_mark.find_all_matches, nodeids, conditions, session, basic_facts)
+    print("Compiled engine: {:.2f}s ({:.1f} us/test case), {} test cases marked, {} failed to evaluate".format(
+        elapsed, elapsed * 1e6 / len(nodeids), sum(1 for result in results if isinstance(result, list) and result),
+        sum(1 for result in results if isinstance(result, str))))
+
+    if not args.skip_legacy:
+        legacy_elapsed, legacy_results = run(legacy_find_all_matches, nodeids, conditions, session, basic_facts)
+        print("Linear scan: {:.2f}s ({:.1f} us/test case), speedup {:.1f}x".format(
+            legacy_elapsed, legacy_elapsed * 1e6 / len(nodeids), legacy_elapsed / elapsed))
+        differences = [nodeid for nodeid, result, legacy_result in zip(nodeids, results, legacy_results)
+                       if result != legacy_result]
+        assert not differences, "Marks differ for {} test cases, e.g. {}".format(len(differences), differences[:5])
+        print("Marks are identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark of the matching of the packets of a PTF buffer (tests/common/pkt_filter/filter_pkt_in_buffer.py).
+
+A synthetic buffer of TCP packets is indexed by PacketBufferIndex, then queried for several expected packets. The
+same queries are run with the original scan of the buffer (re-implemented below), which converts every packet of
+the buffer to dictionary for each query. The matches are compared and the time of both is reported.
+
+Requires ptf and scapy.
+
+Usage:
+    python3 tests/common/unit_tests/benchmarks/bench_filter_pkt_in_buffer.py
+    python3 tests/common/unit_tests/benchmarks/bench_filter_pkt_in_buffer.py --packets 50000 --queries 10
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[4]
+sys.path.insert(0, str(REPO_ROOT))
+
+import ptf.packet as packet  # noqa: E402
+import ptf.testutils as testutils  # noqa: E402
+
+from tests.common.pkt_filter.filter_pkt_in_buffer import PacketBufferIndex, convert_pkt_to_dict  # noqa: E402
+
+MATCH_FIELDS = [("802.1Q", "vlan"), ("Ethernet", "src"), ("Ethernet", "dst"), ("IP", "src"), ("IP", "dst"),
+                ("TCP", "dport")]
+
+
+def tcp_packet(index):
+    return testutils.simple_tcp_packet(eth_dst="00:11:22:33:44:55", eth_src="00:66:77:88:99:aa",
+                                       dl_vlan_enable=True, vlan_vid=100 + index % 4,
+                                       ip_src="10.{}.{}.{}".format(index >> 16 & 0xff, index >> 8 & 0xff, index & 0xff),
+                                       ip_dst="192.168.0.1", tcp_dport=80 + index % 16)
+
+
+def legacy_find(buffer, exp_dict):
+    matches = []
+    for position, pkt in enumerate(buffer):
+        packet_dict = convert_pkt_to_dict(packet.Ether(pkt[0]))
+        for field, value in MATCH_FIELDS:
+            try:
+                if packet_dict[field][value] != exp_dict[field][value]:
+                    break
+            except KeyError:
+                break
+        else:
+            matches.append(position)
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--packets", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=5)
+    parser.add_argument("--skip_legacy", action="store_true", help="Do not run the original scan")
+    args = parser.parse_args()
+
+    buffer = [(bytes(tcp_packet(index)), 0.0) for index in range(args.packets)]
+    exp_dicts = [convert_pkt_to_dict(tcp_packet(index * args.packets // args.queries))
+                 for index in range(args.queries)]
+    criteria = [[(field, exp_dict[field[0]][field[1]]) for field in MATCH_FIELDS] for exp_dict in exp_dicts]
+
+    start = time.time()
+    index = PacketBufferIndex()
+    index.sync(buffer)
+    decode_time = time.time() - start
+    start = time.time()
+    results = [index.find(query) for query in criteria]
+    query_time = time.time() - start
+    print("Index: {} packets decoded in {:.2f}s, {} queries in {:.4f}s".format(
+        args.packets, decode_time, args.queries, query_time))
+
+    if not args.skip_legacy:
+        start = time.time()
+        legacy_results = [legacy_find(buffer, exp_dict) for exp_dict in exp_dicts]
+        legacy_time = time.time() - start
+        print("Original scan: {} queries in {:.2f}s ({:.2f}s per query), speedup {:.1f}x".format(
+            args.queries, legacy_time, legacy_time / args.queries, legacy_time / (decode_time + query_time)))
+        assert results == legacy_results, "Matches differ"
+        print("Matches are identical")
+
+
+if __name__ == "__main__":
+    main()
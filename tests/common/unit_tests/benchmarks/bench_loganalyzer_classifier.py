@@ -0,0 +1,104 @@
+"""
+Benchmark of the loganalyzer MessageClassifier against the combined regex classification.
+
+The real common match/ignore/expect rule files are used to analyze a synthetic syslog. The
+synthetic syslog mixes regular messages with messages built from the literals of the ignore
+rules, so all the classifier stages (expect, match and ignore) are exercised.
+
+Usage:
+    python3 tests/common/unit_tests/benchmarks/bench_loganalyzer_classifier.py --lines 1000000
+    python3 tests/common/unit_tests/benchmarks/bench_loganalyzer_classifier.py --lines 20000 --legacy
+
+The legacy classification is slow (about a millisecond per line with the common rules),
+run it with a smaller number of lines. When both are run, the results are compared.
+"""
+import argparse
+import importlib.util
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+LOGANALYZER_DIR = Path(__file__).resolve().parents[2] / "plugins/loganalyzer"
+RUN_ID = "bench_loganalyzer_classifier"
+
+PROCESSES = ["swss#orchagent", "syncd#syncd", "bgp#bgpd", "pmon#xcvrd", "kernel:", "systemd[1]:",
+             "snmp#snmpd", "teamd#teamsyncd", "lldp#lldpmgrd", "monit[123]:"]
+SEVERITIES = ["INFO", "INFO", "INFO", "NOTICE", "WARNING", "ERR", "DEBUG"]
+WORDS = ["port", "Ethernet8", "oid:0x1000000000002", "set", "get", "failed", "status", "done", "queue", "crash"]
+
+
+def load_loganalyzer():
+    spec = importlib.util.spec_from_file_location("bench_system_msg_handler",
+                                                  LOGANALYZER_DIR / "system_msg_handler.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def generate_syslog(path, lines, literals, seed):
+    rand = random.Random(seed)
+    with open(path, "w") as log_file:
+        log_file.write("Jan 01 00:00:00.000000 sonic INFO start-LogAnalyzer-{}\n".format(RUN_ID))
+        for _ in range(lines):
+            header = "Jan 01 12:{:02d}:{:02d}.{:06d} sonic {} {}: ".format(
+                rand.randint(0, 59), rand.randint(0, 59), rand.randint(0, 999999),
+                rand.choice(SEVERITIES), rand.choice(PROCESSES))
+            if literals and rand.random() < 0.1:
+                message = rand.choice(literals)
+            else:
+                message = " ".join(rand.choice(WORDS) for _ in range(8))
+            log_file.write(header + message + "\n")
+        log_file.write("Jan 01 23:59:59.000000 sonic INFO end-LogAnalyzer-{}\n".format(RUN_ID))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=1000000, help="Number of lines of the synthetic syslog")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic syslog generator")
+    parser.add_argument("--legacy", action="store_true", help="Also run the combined regex classification")
+    args = parser.parse_args()
+
+    loganalyzer = load_loganalyzer()
+    analyzer = loganalyzer.AnsibleLogAnalyzer(RUN_ID, False)
+    match_regex = analyzer.create_msg_regex([str(LOGANALYZER_DIR / "loganalyzer_common_match.txt")])[1]
+    ignore_regex = analyzer.create_msg_regex([str(LOGANALYZER_DIR / "loganalyzer_common_ignore.txt")])[1]
+    expect_regex = analyzer.create_msg_regex([str(LOGANALYZER_DIR / "loganalyzer_common_expect.txt")])[1]
+
+    literals = []
+    for regex in ignore_regex:
+        literals.extend(loganalyzer.MessageClassifier.get_required_literals(regex) or [])
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_path = os.path.join(tmp_dir, "syslog")
+        generate_syslog(log_path, args.lines, literals, args.seed)
+        print("Rules: match {} ignore {} expect {}, syslog: {} lines, {:.1f} MB".format(
+            len(match_regex), len(ignore_regex), len(expect_regex), args.lines, os.path.getsize(log_path) / 2**20))
+
+        start = time.time()
+        classifier = analyzer.create_classifier(match_regex, ignore_regex, expect_regex)
+        print("Classifier build: {:.3f}s".format(time.time() - start))
+
+        start = time.time()
+        result = analyzer.analyze_file_list([log_path], None, None, None, classifier=classifier)
+        elapsed = time.time() - start
+        matches, expected = result[log_path]
+        print("Classifier: {:.2f}s ({:.1f} us/line), matches {}, expected {}, unused expect {}".format(
+            elapsed, elapsed * 1e6 / args.lines, len(matches), len(expected),
+            len(classifier.get_unused_expect_regexes())))
+
+        if args.legacy:
+            analyzer.streaming = False
+            combined = [loganalyzer.re.compile("|".join(regexes)) if regexes else None
+                        for regexes in (match_regex, ignore_regex, expect_regex)]
+            start = time.time()
+            legacy_result = analyzer.analyze_file_list([log_path], *combined)
+            elapsed = time.time() - start
+            print("Combined regex: {:.2f}s ({:.1f} us/line)".format(elapsed, elapsed * 1e6 / args.lines))
+            assert legacy_result == result, "Classifier and combined regex results differ"
+            print("Results are identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Benchmark of the batch mode of the PTF fib_test and hash_test (ansible/roles/test/files/ptftests/probe_batch.py)
+on veth pairs.
+
+A router process forwards the IPv4 packets between the other ends of the veth pairs to the members of an ECMP
+group, like a DUT. The packets of a balancing test are checked:
+    - sequential: one packet at a time like FibTest.check_ip_route, send_packet then verify_packet_any_port then
+      a sleep of 0.02s,
+    - batch: all the packets built up front, sent in bursts by ProbeBatch and matched by their signature.
+The hit count of each port is compared with the egress port selected by the router for each flow.
+
+Requires root, iproute2, ptf and scapy. The veth pairs are deleted at the end.
+
+Usage:
+    sudo python3 tests/common/unit_tests/benchmarks/bench_ptf_probe_batch.py
+    sudo python3 tests/common/unit_tests/benchmarks/bench_ptf_probe_batch.py --ports 8 --packets 5000 --burst 256
+"""
+import argparse
+import importlib.util
+import logging
+import multiprocessing
+import select
+import socket
+import sys
+import time
+import zlib
+from pathlib import Path
+
+import ptf
+import ptf.mask as mask
+import ptf.packet as packet
+import ptf.testutils as testutils
+from ptf.dataplane import DataPlane
+
+REPO_ROOT = Path(__file__).resolve().parents[4]
+sys.path.insert(0, str(REPO_ROOT))
+
+from tests.common.unit_tests.ptf_helpers import FakePtfTest, create_veths, delete_veths, veth_names  # noqa: E402
+
+# Loaded from its file, like PTF loads it from the ptftests directory
+_spec = importlib.util.spec_from_file_location(
+    "probe_batch", str(REPO_ROOT / "ansible/roles/test/files/ptftests/probe_batch.py"))
+probe_batch = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(probe_batch)
+
+VETH_PREFIX = "ptfprobe"
+ROUTER_MAC = "00:aa:bb:cc:dd:01"
+PTF_MAC = "00:00:00:00:00:01"
+SRC_PORT = 0
+SO_RCVBUFFORCE = getattr(socket, "SO_RCVBUFFORCE", 33)
+RCVBUF_SIZE = 16 * 1024 * 1024
+
+
+def ecmp_port(raw, ecmp_ports):
+    # Addresses and TCP ports of an untagged IPv4 packet without options
+    return ecmp_ports[zlib.crc32(raw[26:38]) % len(ecmp_ports)]
+
+
+def route(ports, ecmp_ports, ready):
+    """Forward the IPv4 packets to the router mac, rewriting the macs and decrementing the TTL"""
+    router_mac = bytes.fromhex(ROUTER_MAC.replace(":", ""))
+    ptf_mac = bytes.fromhex(PTF_MAC.replace(":", ""))
+    sockets = {}
+    for port in ports:
+        sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(0x0003))
+        sock.setsockopt(socket.SOL_SOCKET, SO_RCVBUFFORCE, RCVBUF_SIZE)
+        sock.bind((veth_names(VETH_PREFIX, port)[1], 0))
+        sockets[port] = sock
+    ready.set()
+    while True:
+        readable, _, _ = select.select(list(sockets.values()), [], [])
+        for sock in readable:
+            raw, address = sock.recvfrom(9216)
+            if address[2] == socket.PACKET_OUTGOING or raw[:6] != router_mac or raw[12:14] != b"\x08\x00":
+                continue
+            header = bytearray(raw[14:34])
+            header[8] -= 1
+            header[10:12] = b"\x00\x00"
+            checksum = sum(int.from_bytes(header[i:i + 2], "big") for i in range(0, 20, 2))
+            checksum = (checksum & 0xffff) + (checksum >> 16)
+            header[10:12] = (~((checksum & 0xffff) + (checksum >> 16)) & 0xffff).to_bytes(2, "big")
+            sockets[ecmp_port(raw, ecmp_ports)].send(ptf_mac + router_mac + raw[12:14] + bytes(header) + raw[34:])
+
+
+def route_pkts(index, pktlen, masks={}):
+    """Packet of a flow and its masked expected packet, like FibTest.create_ipv4_pkts and FibTest.mask_exp_pkt"""
+    sport = 1024 + index % 60000
+    dport = 1 + index // 60000
+    pkt = testutils.simple_tcp_packet(pktlen=pktlen, eth_dst=ROUTER_MAC, eth_src=PTF_MAC, ip_src="30.0.0.1",
+                                      ip_dst="192.168.0.1", tcp_sport=sport, tcp_dport=dport, ip_ttl=64)
+    exp_pkt = testutils.simple_tcp_packet(pktlen=pktlen, ip_src="30.0.0.1", ip_dst="192.168.0.1",
+                                          tcp_sport=sport, tcp_dport=dport, ip_ttl=63)
+    masked_exp_pkt = mask.Mask(exp_pkt)
+    if pktlen not in masks:
+        masked_exp_pkt.set_do_not_care_packet(packet.Ether, "dst")
+        masked_exp_pkt.set_do_not_care_packet(packet.Ether, "src")
+        masks[pktlen] = masked_exp_pkt.mask
+    masked_exp_pkt.mask = list(masks[pktlen])
+    return pkt, masked_exp_pkt
+
+
+def run_sequential(test, args, ecmp_ports):
+    hit_count_map = {}
+    for index in range(args.packets):
+        pkt, masked_exp_pkt = route_pkts(index, args.pktlen)
+        testutils.send_packet(test, SRC_PORT, pkt)
+        port_index, _ = testutils.verify_packet_any_port(test, masked_exp_pkt, ecmp_ports, timeout=args.timeout)
+        hit_count_map[ecmp_ports[port_index]] = hit_count_map.get(ecmp_ports[port_index], 0) + 1
+        time.sleep(0.02)
+    return hit_count_map
+
+
+def run_batch(test, args, ecmp_ports):
+    batch = probe_batch.ProbeBatch(test, burst_size=args.burst, timeout=args.timeout)
+    start = time.time()
+    for index in range(args.packets):
+        pkt, masked_exp_pkt = route_pkts(index, args.pktlen)
+        batch.add(SRC_PORT, pkt, masked_exp_pkt, ecmp_ports)
+    build_time = time.time() - start
+    batch.run()
+    return batch.hit_count_map(), build_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ports", type=int, default=4, help="Number of ECMP ports")
+    parser.add_argument("--packets", type=int, default=2000)
+    parser.add_argument("--pktlen", type=int, default=1514)
+    parser.add_argument("--burst", type=int, default=probe_batch.ProbeBatch.DEFAULT_BURST_SIZE)
+    parser.add_argument("--timeout", type=float, default=10)
+    parser.add_argument("--sequential_packets", type=int, default=200,
+                        help="Number of packets of the sequential mode, the time is extrapolated to --packets")
+    args = parser.parse_args()
+    # verify_packet_any_port warns for each poll without port number
+    logging.getLogger("dataplane").setLevel(logging.ERROR)
+    ptf.config["relax"] = True
+
+    ecmp_ports = list(range(1, args.ports + 1))
+    ports = [SRC_PORT] + ecmp_ports
+    create_veths(VETH_PREFIX, ports)
+    router = None
+    dataplane = None
+    try:
+        ready = multiprocessing.Event()
+        router = multiprocessing.Process(target=route, args=(ports, ecmp_ports, ready), daemon=True)
+        router.start()
+        ready.wait()
+        dataplane = DataPlane(config={"platform": "local", "qlen": 2000})
+        for port in ports:
+            dataplane.port_add(veth_names(VETH_PREFIX, port)[0], 0, port)
+            dataplane.ports[(0, port)].socket.setsockopt(socket.SOL_SOCKET, SO_RCVBUFFORCE, RCVBUF_SIZE)
+        test = FakePtfTest(dataplane)
+        expected = {}
+        for index in range(args.packets):
+            port = ecmp_port(bytes(route_pkts(index, 60)[0]), ecmp_ports)
+            expected[port] = expected.get(port, 0) + 1
+
+        sequential_args = argparse.Namespace(**vars(args))
+        sequential_args.packets = min(args.sequential_packets, args.packets)
+        start = time.time()
+        run_sequential(test, sequential_args, ecmp_ports)
+        sequential_time = (time.time() - start) * args.packets / sequential_args.packets
+        print("sequential {:6} packets in {:7.2f}s (extrapolated from {} packets)".format(
+            args.packets, sequential_time, sequential_args.packets))
+
+        start = time.time()
+        hit_count_map, build_time = run_batch(test, args, ecmp_ports)
+        batch_time = time.time() - start
+        print("batch      {:6} packets in {:7.2f}s ({:.2f}s to build the packets), speedup {:.1f}x, "
+              "hit count map {}".format(args.packets, batch_time, build_time, sequential_time / batch_time,
+                                        sorted(hit_count_map.items())))
+        assert hit_count_map == expected, "Hit count map differs from the router, expected {}".format(expected)
+    finally:
+        if dataplane:
+            dataplane.kill()
+        if router:
+            router.terminate()
+        delete_veths(VETH_PREFIX, ports)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmark of the receive path of PtfTestAdapter (tests/common/plugins/ptfadapter/packet_ring.py) on veth pairs.
+
+A PTF dataplane captures the packets on one end of veth pairs, while a sender process injects test packets mixed
+with noise packets (LLDP) on the other ends. The test packets are counted with a PTF mask, like a hashing test
+counting the packets of the flows:
+    - list: the original list queues of PTF and one dataplane.poll per packet, as verify_packet_any_port does,
+    - ring: the PacketRing queues and recv_batch, matching the packets with RxFilter,
+    - ring+bpf: same, with the noise packets dropped by a BPF filter attached to the capture sockets.
+
+Requires root, iproute2, ptf and scapy. The veth pairs are deleted at the end.
+
+Usage:
+    sudo python3 tests/common/unit_tests/benchmarks/bench_ptfadapter_batch_rx.py
+    sudo python3 tests/common/unit_tests/benchmarks/bench_ptfadapter_batch_rx.py --ports 8 --packets 50000 --noise 2
+"""
+import argparse
+import importlib.util
+import logging
+import multiprocessing
+import socket
+import sys
+import time
+from pathlib import Path
+
+import ptf
+import ptf.mask as mask
+import ptf.packet as packet
+import ptf.testutils as testutils
+from ptf.dataplane import DataPlane
+
+REPO_ROOT = Path(__file__).resolve().parents[4]
+sys.path.insert(0, str(REPO_ROOT))
+
+from tests.common.unit_tests.ptf_helpers import create_veths, delete_veths, veth_names  # noqa: E402
+
+# Loaded from its file, the ptfadapter package requires nnpy to connect to ptf_nn_agent
+_spec = importlib.util.spec_from_file_location(
+    "packet_ring", str(REPO_ROOT / "tests/common/plugins/ptfadapter/packet_ring.py"))
+packet_ring = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(packet_ring)
+
+VETH_PREFIX = "ptfbench"
+RCVBUF_SIZE = 64 * 1024 * 1024
+# The receive buffer is not limited by net.core.rmem_max with SO_RCVBUFFORCE
+SO_RCVBUFFORCE = getattr(socket, "SO_RCVBUFFORCE", 33)
+
+
+def test_packet(index):
+    return testutils.simple_tcp_packet(eth_dst="00:11:22:33:44:55", eth_src="00:66:77:88:99:aa",
+                                       ip_src="10.{}.{}.{}".format(index >> 16 & 0xff, index >> 8 & 0xff,
+                                                                   index & 0xff),
+                                       ip_dst="192.168.0.1", tcp_sport=1024 + index % 50000, tcp_dport=80)
+
+
+def expected_packet():
+    exp_pkt = mask.Mask(test_packet(0))
+    exp_pkt.set_do_not_care_packet(packet.IP, "src")
+    exp_pkt.set_do_not_care_packet(packet.IP, "chksum")
+    exp_pkt.set_do_not_care_packet(packet.TCP, "sport")
+    exp_pkt.set_do_not_care_packet(packet.TCP, "chksum")
+    return exp_pkt
+
+
+def send_packets(ports, pkts, noise, start_event):
+    """Send the test packets round robin on the ports, each one followed by noise packets."""
+    lldp = bytes(packet.Ether(dst="01:80:c2:00:00:0e", src="00:66:77:88:99:bb", type=0x88cc) / (b"\x00" * 60))
+    sockets = []
+    for index in range(ports):
+        sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW)
+        sock.bind((veth_names(VETH_PREFIX, index)[0], 0))
+        sockets.append(sock)
+    start_event.wait()
+    for index, pkt in enumerate(pkts):
+        sock = sockets[index % ports]
+        sock.send(pkt)
+        for _ in range(noise):
+            sock.send(lldp)
+
+
+def run(mode, args, pkts):
+    ptf.config["relax"] = True
+    dataplane = DataPlane(config={"platform": "local", "qlen": args.packets * (args.noise + 1)})
+    try:
+        for index in range(args.ports):
+            dataplane.port_add(veth_names(VETH_PREFIX, index)[1], 0, index)
+            dataplane.ports[(0, index)].socket.setsockopt(socket.SOL_SOCKET, SO_RCVBUFFORCE, RCVBUF_SIZE)
+        exp_pkt = expected_packet()
+        if mode != "list":
+            packet_ring.install_packet_rings(dataplane)
+        if mode == "ring+bpf":
+            packet_ring.set_rx_filter(dataplane, packet_ring.RxFilter.from_packet(exp_pkt))
+
+        start_event = multiprocessing.Event()
+        sender = multiprocessing.Process(target=send_packets, args=(args.ports, pkts, args.noise, start_event))
+        sender.start()
+        time.sleep(0.5)
+        start = time.time()
+        start_event.set()
+        deadline = start + args.timeout
+        counts = {index: 0 for index in range(args.ports)}
+        matched = 0
+        if mode == "list":
+            while matched < args.packets:
+                result = dataplane.poll(device_number=0, timeout=max(0, deadline - time.time()), exp_pkt=exp_pkt)
+                if not isinstance(result, dataplane.PollSuccess):
+                    break
+                counts[result.port] += 1
+                matched += 1
+        else:
+            matcher = packet_ring.RxFilter.from_packet(exp_pkt)
+            while matched < args.packets and time.time() < deadline:
+                for rx_pkt in packet_ring.recv_batch(dataplane, timeout=max(0, deadline - time.time())):
+                    if matcher.match(rx_pkt.packet):
+                        counts[rx_pkt.port] += 1
+                        matched += 1
+        elapsed = time.time() - start
+        sender.join()
+        stats = {}
+        if mode != "list":
+            stats = packet_ring.rx_stats(dataplane)
+        queued = sum(stat["packets"] for stat in stats.values())
+        print("{:9} {:7} packets matched in {:6.2f}s, {:8.0f} pps, {} packets queued, per port {}".format(
+            mode, matched, elapsed, matched / elapsed if elapsed else 0, queued or "-",
+            sorted(counts.values())))
+    finally:
+        dataplane.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ports", type=int, default=4)
+    parser.add_argument("--packets", type=int, default=20000, help="Number of test packets")
+    parser.add_argument("--noise", type=int, default=1, help="Number of noise packets after each test packet")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--modes", nargs="+", default=["list", "ring", "ring+bpf"])
+    args = parser.parse_args()
+    # dataplane.poll warns for each poll without port number
+    logging.getLogger("dataplane").setLevel(logging.ERROR)
+
+    pkts = [bytes(test_packet(index)) for index in range(args.packets)]
+    create_veths(VETH_PREFIX, range(args.ports))
+    try:
+        for mode in args.modes:
+            run(mode, args, pkts)
+    finally:
+        delete_veths(VETH_PREFIX, range(args.ports))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark of the parser of the tabulated show command outputs (tests/common/helpers/show_parser.py).
+
+The output of 'show mac' is synthetic by default, or read from a file recorded on a DUT. The output is parsed with
+the compiled layout parser, in list and stream modes and with a typed schema, and with the original parser of
+SonicHost._parse_show (re-implemented below). The parsed items are compared and the time of each is reported.
+
+Usage:
+    python3 tests/common/unit_tests/benchmarks/bench_show_parser.py
+    python3 tests/common/unit_tests/benchmarks/bench_show_parser.py --lines 10000 --rounds 5
+    python3 tests/common/unit_tests/benchmarks/bench_show_parser.py --output-file show_mac.txt
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[4]
+sys.path.insert(0, str(REPO_ROOT))
+
+from tests.common.helpers import show_parser  # noqa: E402
+
+
+def generate_show_mac(lines):
+    output = [
+        "  No.    Vlan  MacAddress         Port             Type",
+        "-----  ------  -----------------  ---------------  -------",
+    ]
+    for index in range(1, lines + 1):
+        mac = ":".join("{:02X}".format((index >> shift) & 0xff) for shift in (0, 8, 16, 24, 32, 40))
+        output.append("{:>5}  {:>6}  {}  {:<15}  {}".format(
+            index, 1000 + index % 8, mac, "Ethernet{}".format(index % 64 * 4), "Dynamic" if index % 5 else "Static"))
+    output.append("Total number of entries {}".format(lines))
+    return output
+
+
+def legacy_parse_column_positions(sep_line, sep_char='-'):
+    prev = ' ',
+    positions = []
+    for pos, char in enumerate(sep_line + ' '):
+        if char == sep_char:
+            if char != prev:
+                left = pos
+        else:
+            if char != prev:
+                right = pos
+                positions.append((left, right))
+        prev = char
+    return positions
+
+
+def legacy_parse_show(output_lines, header_len=1):
+    """SonicHost._parse_show before the compiled layouts"""
+    result = []
+    sep_line_pattern = re.compile(r"^( *-+ *)+$")
+    for idx, line in enumerate(output_lines):
+        if sep_line_pattern.match(line):
+            header_lines = output_lines[idx - header_len:idx]
+            sep_line = output_lines[idx]
+            content_lines = output_lines[idx + 1:]
+            break
+    else:
+        return result
+
+    positions = legacy_parse_column_positions(sep_line)
+    headers = []
+    for (left, right) in positions:
+        headers.append(" ".join([header_line[left:right].strip().lower() for header_line in header_lines]).strip())
+
+    for content_line in content_lines:
+        if len(content_line) == 0:
+            break
+        item = {}
+        for idx, (left, right) in enumerate(positions):
+            item[headers[idx]] = content_line[left:right].strip()
+        result.append(item)
+    return result
+
+
+def measure(func, rounds):
+    best = None
+    for _ in range(rounds):
+        start = time.time()
+        result = func()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=100000, help="Number of entries of the synthetic output")
+    parser.add_argument("--output-file", help="Recorded output of a show command, instead of the synthetic one")
+    parser.add_argument("--header-len", type=int, default=1)
+    parser.add_argument("--rounds", type=int, default=3, help="Best time of the rounds is reported")
+    args = parser.parse_args()
+
+    if args.output_file:
+        with open(args.output_file) as f:
+            output = f.read().splitlines()
+    else:
+        output = generate_show_mac(args.lines)
+    print("Output: {} lines".format(len(output)))
+
+    legacy_elapsed, legacy_items = measure(lambda: legacy_parse_show(output, args.header_len), args.rounds)
+    print("Original parser: {:.3f}s".format(legacy_elapsed))
+
+    elapsed, items = measure(lambda: show_parser.parse_show(output, args.header_len), args.rounds)
+    print("Compiled layout: {:.3f}s, speedup {:.1f}x".format(elapsed, legacy_elapsed / elapsed))
+    assert items == legacy_items, "Parsed items differ from the original parser"
+    print("Parsed items are identical, {} items".format(len(items)))
+
+    def _stream():
+        count = 0
+        for _ in show_parser.iter_show(iter(output), args.header_len):
+            count += 1
+        return count
+
+    elapsed, count = measure(_stream, args.rounds)
+    print("Compiled layout, stream mode: {:.3f}s, {} items".format(elapsed, count))
+
+    if not args.output_file:
+        schema = {"no.": int, "vlan": int}
+        elapsed, _ = measure(lambda: show_parser.parse_show(output, args.header_len, schema=schema), args.rounds)
+        print("Compiled layout, typed schema {}: {:.3f}s".format(sorted(schema), elapsed))
+    print("Layout cache: {}".format(show_parser.compile_layout.cache_info()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark of the construction of TestbedInfo from a testbed file, with the topologies loaded lazily.
+
+Reported times:
+    - construction: TestbedInfo() with no topology loaded.
+    - one testbed: construction and access to the topology properties and PTF maps of one testbed, like a test run.
+    - all testbeds: construction and access to the topology of all the testbeds, which is what the construction did
+      before the topologies were loaded lazily.
+    - warm construction: construction and access to one testbed again in the same process, the topology file is
+      not parsed again.
+
+Usage:
+    python3 tests/common/unit_tests/benchmarks/bench_testbed_info.py
+    python3 tests/common/unit_tests/benchmarks/bench_testbed_info.py --testbed vms-kvm-t0
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[4]
+sys.path.insert(0, str(REPO_ROOT))
+
+from tests.common import testbed  # noqa: E402
+
+
+def load_topo(tb):
+    return (tb["topo"]["properties"], tb["topo"].get("ptf_map"), tb["topo"].get("ptf_map_disabled"),
+            tb["topo"].get("ptf_dut_intf_map"))
+
+
+def measure(testbed_file, testbed_name=None, all_testbeds=False, warm=False):
+    if not warm:
+        testbed._topo_file_cache.clear()
+    start = time.time()
+    tbinfo = testbed.TestbedInfo(testbed_file)
+    if all_testbeds:
+        for tb in tbinfo.testbed_topo.values():
+            load_topo(tb)
+    elif testbed_name:
+        load_topo(tbinfo.testbed_topo[testbed_name])
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--testbed_file", default=str(REPO_ROOT / "ansible" / "testbed.yaml"))
+    parser.add_argument("--testbed", default=None, help="Testbed used for 'one testbed', default is the first one")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    testbed_names = list(testbed.TestbedInfo(args.testbed_file).testbed_topo.keys())
+    testbed_name = args.testbed or testbed_names[0]
+    print("Testbed file {}: {} testbeds, 'one testbed' is {}".format(
+        args.testbed_file, len(testbed_names), testbed_name))
+
+    results = [
+        ("construction", lambda: measure(args.testbed_file)),
+        ("one testbed", lambda: measure(args.testbed_file, testbed_name)),
+        ("all testbeds", lambda: measure(args.testbed_file, all_testbeds=True)),
+        ("warm construction", lambda: measure(args.testbed_file, testbed_name, warm=True)),
+    ]
+    for name, run in results:
+        elapsed = min(run() for _ in range(args.rounds))
+        print("{:<20}{:.3f}s".format(name, elapsed))
+
+
+if __name__ == "__main__":
+    main()
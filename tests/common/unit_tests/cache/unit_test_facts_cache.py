@@ -0,0 +1,230 @@
+"""Unit test for the storage and the cached decorator of ``tests/common/cache/facts_cache.py``.
+
+Run with::
+
+    python3 -m pytest --noconftest \\
+        tests/common/unit_tests/cache/unit_test_facts_cache.py -v
+"""
+import json
+import multiprocessing
+import os
+import pickle
+import time
+
+import pytest
+
+from tests.common.cache import facts_cache
+from tests.common.cache.facts_cache import CACHE_FILE_HEADER, FactsCache, Singleton, cached, get_call_argument
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """FactsCache instance on a temporary location, also used by the cached decorator."""
+    instance = FactsCache.__new__(FactsCache)
+    instance.__init__(str(tmp_path / "_cache"))
+    monkeypatch.setitem(Singleton._instances, FactsCache, instance)
+    return instance
+
+
+def _new_instance(cache):
+    instance = FactsCache.__new__(FactsCache)
+    instance.__init__(cache._cache_location)
+    return instance
+
+
+def test_write_is_atomic_and_versioned(cache):
+    assert cache.write("dut1", "basic_facts", {"hwsku": "sku"})
+    zone_dir = os.path.join(cache._cache_location, "dut1")
+    assert sorted(os.listdir(zone_dir)) == ["basic_facts.pickle"]
+    with open(os.path.join(zone_dir, "basic_facts.pickle"), "rb") as f:
+        assert f.readline() == CACHE_FILE_HEADER
+    assert _new_instance(cache).read("dut1", "basic_facts") == {"hwsku": "sku"}
+
+
+def test_unsupported_or_corrupted_files_are_ignored(cache, monkeypatch):
+    zone_dir = os.path.join(cache._cache_location, "dut1")
+    os.makedirs(zone_dir)
+    # Cache file without header, written before the header was added
+    with open(os.path.join(zone_dir, "legacy.pickle"), "wb") as f:
+        pickle.dump({"a": 1}, f)
+    cache.write("dut1", "old_version", {"a": 1})
+    monkeypatch.setattr(facts_cache, "CACHE_FILE_HEADER", CACHE_FILE_HEADER.replace(b" 1\n", b" 2\n"))
+    with open(os.path.join(zone_dir, "truncated.pickle"), "wb") as f:
+        f.write(facts_cache.CACHE_FILE_HEADER + pickle.dumps({"a": 1})[:5])
+
+    reader = _new_instance(cache)
+    start = time.time()
+    for key in ("legacy", "old_version", "truncated"):
+        assert reader.read("dut1", key) is FactsCache.NOTEXIST
+    assert time.time() - start < 1
+
+
+def _gather(counter_file):
+    @cached(name="slow_facts", zone_getter=lambda *args: "dut1")
+    def gather_facts():
+        with open(counter_file, "a") as f:
+            f.write("gathered\n")
+        time.sleep(0.5)
+        return {"pid": os.getpid()}
+    return gather_facts()
+
+
+def _gather_in_process(counter_file, results):
+    results.put(_gather(counter_file)["pid"])
+
+
+def test_facts_gathered_once_across_processes(cache, tmp_path):
+    counter_file = str(tmp_path / "counter")
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    processes = [context.Process(target=_gather_in_process, args=(counter_file, results)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    pids = [results.get(timeout=30) for _ in processes]
+    for process in processes:
+        process.join(30)
+
+    with open(counter_file) as f:
+        assert f.read().count("gathered") == 1
+    assert len(set(pids)) == 1
+    assert _gather(counter_file) == {"pid": pids[0]}
+
+
+def _write_entries(cache, zone, keys):
+    for key in keys:
+        assert cache.write(zone, key, {"key": key})
+        # Distinct access times
+        time.sleep(0.01)
+
+
+def _cached_keys(cache):
+    return sorted((zone, f[:-len(".pickle")]) for zone in os.listdir(cache._cache_location)
+                  if not zone.startswith(".") for f in os.listdir(os.path.join(cache._cache_location, zone))
+                  if f.endswith(".pickle"))
+
+
+def test_usage_is_indexed(cache):
+    _write_entries(cache, "dut1", ["a", "b"])
+    cache.write("dut1", "a", {"key": "a" * 1000})
+    cache.write("dut2", "c", {})
+    sizes = sum(os.path.getsize(cache._facts_file(zone, key)) for zone, key in _cached_keys(cache))
+    assert cache.usage() == {"size": sizes, "entries": 3}
+
+    cache.cleanup("dut1", "a")
+    cache.cleanup("dut2")
+    assert cache.usage()["entries"] == 1
+
+    # The index is rebuilt from the cache files
+    os.remove(os.path.join(cache._cache_location, facts_cache.INDEX_FILE))
+    assert _new_instance(cache).usage() == {"size": os.path.getsize(cache._facts_file("dut1", "b")), "entries": 1}
+
+
+def test_least_recently_used_entries_are_evicted(cache, monkeypatch):
+    monkeypatch.setattr(facts_cache, "ENTRY_LIMIT", 4)
+    _write_entries(cache, "dut1", ["k0", "k1", "k2", "k3"])
+    assert _new_instance(cache).read("dut1", "k0") == {"key": "k0"}
+    time.sleep(0.01)
+
+    # Down to 90% of the limit: the 2 least recently used entries are evicted
+    assert cache.write("dut1", "k4", {})
+    assert _cached_keys(cache) == [("dut1", "k0"), ("dut1", "k3"), ("dut1", "k4")]
+    assert cache.usage()["entries"] == 3
+
+    monkeypatch.setattr(facts_cache, "SIZE_LIMIT", 10)
+    assert not cache.write("dut1", "too_big", {"key": "x" * 100})
+    assert cache.usage()["entries"] == 3
+
+
+def test_evict_zone_by_age(cache):
+    _write_entries(cache, "dut1", ["old"])
+    _write_entries(cache, "dut2", ["old"])
+    time.sleep(0.2)
+    _write_entries(cache, "dut1", ["new"])
+
+    assert cache.evict(zone="dut1", max_age=0.1) == [("dut1", "old")]
+    assert _cached_keys(cache) == [("dut1", "new"), ("dut2", "old")]
+    assert cache.read("dut1", "old") is FactsCache.NOTEXIST
+
+
+class FakeHost(object):
+
+    def __init__(self, hostname):
+        self.hostname = hostname
+        self.calls = 0
+
+    def get_facts(self, namespace=None, disable_cache=True):
+        self.calls += 1
+        return {"hostname": self.hostname, "namespace": namespace}
+
+
+def test_get_call_argument():
+    def function(a, b=2, *args, c=3, **kargs):
+        pass
+
+    assert get_call_argument(function, (1,), {}, "a") == 1
+    assert get_call_argument(function, (1,), {}, "b") == 2
+    assert get_call_argument(function, (1, 5), {}, "b") == 5
+    assert get_call_argument(function, (1,), {"b": 6, "c": 7}, "c") == 7
+    assert get_call_argument(function, (1,), {}, "c") == 3
+    assert get_call_argument(function, (1,), {"d": 8}, "d") == 8
+    assert get_call_argument(function, (1,), {}, "d") is None
+
+
+def test_cached_stats_and_disable_cache(cache):
+    get_facts = cached(name="facts")(FakeHost.get_facts)
+    host = FakeHost("dut1")
+
+    # disable_cache is True by default
+    get_facts(host)
+    assert host.calls == 1 and get_facts.cache_stats.summary()["misses"] == 0
+
+    assert get_facts(host, disable_cache=False) == {"hostname": "dut1", "namespace": None}
+    assert get_facts(host, None, False) == {"hostname": "dut1", "namespace": None}
+    assert get_facts(host, "asic0", False) == {"hostname": "dut1", "namespace": "asic0"}
+    assert host.calls == 3
+    assert sorted(os.listdir(cache._cache_location)) == [".index.sqlite", "dut1", "dut1-asic0"]
+
+    # A new process loads the facts from the cache files
+    cache._cache.clear()
+    assert get_facts(host, disable_cache=False) == {"hostname": "dut1", "namespace": None}
+    summary = get_facts.cache_stats.summary()
+    assert (summary["memory_hits"], summary["disk_hits"], summary["misses"]) == (1, 1, 2)
+    assert summary["avg_miss_time"] > 0
+    assert facts_cache.get_cache_stats()[
+        "{}.FakeHost.get_facts".format(__name__)]["name"] == "facts"
+
+    stats_file = os.path.join(cache._cache_location, "stats.json")
+    facts_cache.dump_cache_stats(stats_file)
+    with open(stats_file) as f:
+        assert json.load(f)["{}.FakeHost.get_facts".format(__name__)]["disk_hits"] == 1
+
+
+def _atime(cache, zone, key):
+    with cache._index() as conn:
+        return conn.execute('SELECT atime FROM entries WHERE zone = ? AND key = ?', (zone, key)).fetchone()[0]
+
+
+def test_memory_hits_update_last_access_time(cache, monkeypatch):
+    monkeypatch.setattr(facts_cache, "TOUCH_INTERVAL", 0.2)
+    monkeypatch.setattr(facts_cache, "ENTRY_LIMIT", 4)
+    get_facts = cached(name="facts")(FakeHost.get_facts)
+    host = FakeHost("dut1")
+    get_facts(host, disable_cache=False)
+    _write_entries(cache, "dut1", ["k0", "k1", "k2"])
+    written = _atime(cache, "dut1", "k0")
+
+    # Throttled: the memory hits within the interval do not update the index
+    for _ in range(100):
+        assert cache.read("dut1", "k0") == {"key": "k0"}
+        get_facts(host, disable_cache=False)
+    assert _atime(cache, "dut1", "k0") == written
+
+    time.sleep(0.2)
+    assert cache.read("dut1", "k0") == {"key": "k0"}
+    get_facts(host, disable_cache=False)
+    assert _atime(cache, "dut1", "k0") > written
+    assert host.calls == 1
+
+    # The hottest entries, only read from memory, are not evicted
+    assert cache.write("dut1", "k3", {})
+    assert _cached_keys(cache) == [("dut1", "facts"), ("dut1", "k0"), ("dut1", "k3")]
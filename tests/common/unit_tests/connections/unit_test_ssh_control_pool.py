@@ -0,0 +1,111 @@
+"""Unit test for ``tests/common/connections/ssh_control_pool.py``.
+
+The master connections are stood in by unix sockets, and 'ssh -O' by a script which answers for the sockets
+with a listener.
+
+Run with::
+
+    python3 -m pytest --noconftest \\
+        tests/common/unit_tests/connections/unit_test_ssh_control_pool.py -v
+"""
+import os
+import socket
+import stat
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+
+from tests.common.connections.ssh_control_pool import SshControlPool
+
+
+FAKE_SSH = """#!{python}
+import socket
+import sys
+
+# ssh -O <command> -o ControlPath=<path> ...
+command = sys.argv[2]
+path = sys.argv[4].split("=", 1)[1]
+try:
+    sock = socket.socket(socket.AF_UNIX)
+    sock.connect(path)
+    sock.close()
+except OSError:
+    sys.exit(255)
+if command == "exit":
+    import os
+    os.remove(path)
+"""
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    fake_ssh = tmp_path / "ssh"
+    fake_ssh.write_text(FAKE_SSH.format(python=sys.executable))
+    fake_ssh.chmod(fake_ssh.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setattr(SshControlPool, "ssh_command", str(fake_ssh))
+    pool = SshControlPool.enable(str(tmp_path / "cp"))
+    yield pool
+    SshControlPool.disable()
+
+
+def _master(path):
+    sock = socket.socket(socket.AF_UNIX)
+    sock.bind(path)
+    sock.listen(1)
+    return sock
+
+
+def _host(hostname, host_vars, become=True):
+    host = MagicMock()
+    host.hostname = hostname
+    inventory_host = MagicMock()
+    inventory_host.vars = host_vars
+    host.host.options = {"inventory_manager": MagicMock(), "become": become}
+    host.host.options["inventory_manager"].get_host.return_value = inventory_host
+    return host, inventory_host
+
+
+def test_attach_pins_control_path(pool):
+    host, inventory_host = _host("dut1", {"ansible_host": "10.0.0.1", "ansible_user": "admin"})
+    entry = pool.attach(host)
+    assert entry.key == ("10.0.0.1", "admin", True)
+    inventory_host.set_variable.assert_called_once_with("ansible_control_path", entry.control_path)
+    assert len(os.path.basename(entry.control_path)) < 20 and "%" not in entry.control_path
+
+    # Same (host, user, become) shares the master, become or another user does not
+    assert pool.attach(_host("dut1", {"ansible_host": "10.0.0.1", "ansible_user": "admin"})[0]) is entry
+    assert pool.attach(_host("dut1", {"ansible_host": "10.0.0.1", "ansible_user": "admin"}, False)[0]) is not entry
+    assert pool.attach(_host("dut1", {"ansible_host": "10.0.0.1", "ansible_user": "root"})[0]) is not entry
+
+    assert pool.attach(_host("eos", {"ansible_host": "10.0.0.2", "ansible_connection": "network_cli"})[0]) is None
+    assert pool.attach(_host("dut2", {"ansible_host": "10.0.0.3", "ansible_control_path": "/tmp/x"})[0]) is None
+
+
+def test_metrics_and_reset_after_reboot(pool):
+    host, _ = _host("dut1", {"ansible_host": "10.0.0.1", "ansible_user": "admin"})
+    entry = pool.attach(host)
+
+    pool.record_call(entry)
+    master = _master(entry.control_path)
+    pool.record_call(entry)
+    pool.record_call(entry)
+    assert entry.metrics() == {"calls": 3, "handshakes_saved": 2, "connects": 1, "resets": 0}
+    assert pool.is_alive(entry)
+
+    pool.reset_host("10.0.0.1")
+    master.close()
+    assert not os.path.exists(entry.control_path)
+    assert entry.resets == 1
+
+
+def test_health_check_closes_stale_masters(pool):
+    alive = pool.get_entry("10.0.0.1", "admin", True)
+    stale = pool.get_entry("10.0.0.2", "admin", True)
+    master = _master(alive.control_path)
+    # Socket left over by a dead master process
+    _master(stale.control_path).close()
+
+    assert pool.health_check() == [stale.key]
+    assert os.path.exists(alive.control_path) and not os.path.exists(stale.control_path)
+    master.close()
@@ -0,0 +1,76 @@
+"""Unit test for ``AnsibleHostBase.batch`` in ``tests/common/devices/base.py``.
+
+The shell_cmds module is replaced by a local implementation running the commands with /bin/sh.
+
+Run with::
+
+    python3 -m pytest --noconftest \\
+        tests/common/unit_tests/devices/unit_test_module_batch.py -v
+"""
+import subprocess
+
+import pytest
+
+from tests.common.devices.base import AnsibleHostBase, ModuleBatch
+from tests.common.errors import RunAnsibleModuleFail
+
+
+class LocalHost(AnsibleHostBase):
+
+    def __init__(self):
+        self.hostname = "localhost"
+        self.shell_cmds_calls = []
+
+    def shell_cmds(self, cmds, continue_on_fail=True, timeout=0, module_ignore_errors=False):
+        self.shell_cmds_calls.append(cmds)
+        results = []
+        for cmd in cmds:
+            proc = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+            results.append(dict(cmd=cmd, rc=proc.returncode, stdout=proc.stdout, stderr=proc.stderr,
+                                start="", end=""))
+            if proc.returncode != 0 and not continue_on_fail:
+                break
+        return {"results": results, "failed": any(res["rc"] != 0 for res in results)}
+
+
+def test_batch_runs_in_one_task(tmp_path):
+    host = LocalHost()
+    with host.batch() as batch:
+        echo = batch.shell("echo one; echo two >&2")
+        pipe = batch.shell("printf 'a\\nb\\n' | wc -l")
+        quoted = batch.command("printf '%s|' 'a b' c")
+        in_dir = batch.shell("pwd", chdir=str(tmp_path))
+
+    assert len(host.shell_cmds_calls) == 1
+    assert echo["stdout"] == "one" and echo["stderr_lines"] == ["two"]
+    assert echo["cmd"] == "echo one; echo two >&2"
+    assert pipe["stdout_lines"] == ["2"]
+    assert quoted["stdout"] == "a b|c|"
+    assert in_dir["stdout"] == str(tmp_path)
+    assert not echo.result.is_failed
+
+
+def test_batch_failure():
+    host = LocalHost()
+    with pytest.raises(RunAnsibleModuleFail):
+        with host.batch() as batch:
+            ignored = batch.shell("exit 3", module_ignore_errors=True)
+            failed = batch.command("false")
+            last = batch.shell("echo last")
+    assert ignored["rc"] == 3 and ignored["failed"]
+    assert failed["rc"] != 0
+    assert last["stdout"] == "last"
+
+    with pytest.raises(RunAnsibleModuleFail):
+        with host.batch(continue_on_fail=False) as batch:
+            batch.command("false")
+            skipped = batch.shell("echo skipped")
+    with pytest.raises(RuntimeError):
+        skipped["stdout"]
+
+
+def test_batch_rejects_other_modules():
+    batch = ModuleBatch(LocalHost())
+    with pytest.raises(AttributeError):
+        batch.copy(content="x", dest="/tmp/x")
+    assert batch.run() == []
@@ -0,0 +1,97 @@
+"""Unit test for the module call tracing of ``AnsibleHostBase._run`` in ``tests/common/devices/base.py``.
+
+Run with::
+
+    python3 -m pytest --noconftest \\
+        tests/common/unit_tests/devices/unit_test_module_call_stats.py -v
+"""
+import json
+import logging
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_ansible.results import ModuleResult
+
+from tests.common.devices.base import AnsibleHostBase, ModuleCallStats
+
+
+class FakeHost(AnsibleHostBase):
+
+    def __init__(self):
+        self.hostname = "dut"
+        self.host = MagicMock()
+        self.host.has_module.return_value = True
+        self.host.command.return_value = {"dut": ModuleResult(rc=0, stdout="", failed=False)}
+
+
+@pytest.fixture
+def stats():
+    ModuleCallStats.reset()
+    ModuleCallStats.enable()
+    yield ModuleCallStats
+    ModuleCallStats.enable(False)
+    ModuleCallStats.reset()
+
+
+def helper_calling_command(host):
+    return host.command("show version")
+
+
+def test_stats_per_module_and_caller(stats, tmp_path):
+    host = FakeHost()
+    for _ in range(3):
+        helper_calling_command(host)
+
+    summary = stats.dump(str(tmp_path / "stats.json"))
+    assert summary["modules"]["command"]["count"] == 3
+    assert sum(summary["modules"]["command"]["histogram"]) == 3
+    callers = list(summary["callers"])
+    assert len(callers) == 1 and callers[0].endswith("::helper_calling_command command")
+    with open(str(tmp_path / "stats.json")) as stats_file:
+        assert json.load(stats_file)["modules"]["command"]["count"] == 3
+
+
+def test_histogram_buckets(stats):
+    for elapsed in (0.05, 0.3, 100):
+        stats.record("shell", "caller", elapsed)
+    stats_shell = stats.summary()["modules"]["shell"]
+    histogram = stats_shell["histogram"]
+    assert histogram[0] == 1 and histogram[2] == 1 and histogram[-1] == 1
+    assert stats_shell["max"] == 100
+
+
+def test_debug_log_has_caller(caplog):
+    host = FakeHost()
+    with caplog.at_level(logging.DEBUG, logger="tests.common.devices.base"):
+        helper_calling_command(host)
+    assert "::helper_calling_command#" in caplog.records[0].getMessage()
+
+
+def test_no_stats_when_disabled():
+    ModuleCallStats.reset()
+    helper_calling_command(FakeHost())
+    assert ModuleCallStats.summary()["modules"] == {}
+
+
+def test_async_call_records_completion_time(stats):
+    host = FakeHost()
+    release = threading.Event()
+
+    def slow_command(*args, **kwargs):
+        release.wait()
+        time.sleep(0.3)
+        return {"dut": ModuleResult(rc=0, stdout="", failed=False)}
+
+    host.host.command.side_effect = slow_command
+    pool, result = host.command("sleep 1", module_async=True)
+    assert stats.summary()["modules"] == {}
+
+    release.set()
+    result.get()
+    pool.close()
+    pool.join()
+    command_stats = stats.summary()["modules"]["command"]
+    assert command_stats["count"] == 1
+    assert command_stats["total"] >= 0.3
@@ -0,0 +1,132 @@
+"""Unit test for the inventory index of ``tests/common/helpers/inventory_utils.py``.
+
+Run with::
+
+    python3 -m pytest --noconftest \\
+        tests/common/unit_tests/helpers/unit_test_inventory_index.py -v
+"""
+import pytest
+from ansible.inventory.manager import InventoryManager
+from ansible.parsing.dataloader import DataLoader
+
+from tests.common.cache.facts_cache import FactsCache
+from tests.common import utilities
+from tests.common.helpers import inventory_utils
+
+
+INVENTORY = """
+[servers]
+server_1 ansible_host=10.0.0.1 ptf_ip=10.0.0.10
+
+[vms_1]
+VM0100 ansible_host=10.0.0.100
+VM0101 ansible_host=10.0.0.101
+
+[server_1:children]
+vms_1
+servers
+
+[sonic]
+vlab-01 ansible_host=10.250.0.101 hwsku=Force10-S6000
+"""
+
+
+@pytest.fixture
+def inventory(tmp_path, monkeypatch):
+    cache = FactsCache.__new__(FactsCache)
+    cache.__init__(str(tmp_path / "_cache"))
+    monkeypatch.setattr(inventory_utils, "cache", cache)
+    monkeypatch.setattr(inventory_utils, "_inventory_indexes", {})
+    monkeypatch.setattr(inventory_utils, "_checked_inventory_hashes", {})
+    monkeypatch.setattr(utilities, "_inventory_vars", {})
+    inv_file = tmp_path / "lab"
+    inv_file.write_text(INVENTORY)
+    return str(inv_file)
+
+
+def _inventory_manager(inv_files):
+    return InventoryManager(loader=DataLoader(), sources=inv_files)
+
+
+def _no_inventory_manager(inv_files):
+    raise AssertionError("The inventory files should not be parsed")
+
+
+def test_index_matches_inventory_manager(inventory):
+    index = inventory_utils.get_inventory_index([inventory], _inventory_manager)
+    im = _inventory_manager([inventory])
+    for hostname in ("server_1", "VM0100", "vlab-01"):
+        assert index.get_host_vars(hostname) == im.get_host(hostname).vars
+    assert index.get_host_vars("unknown") is None
+    assert set(index.get_group_hosts("server_1")) == {"server_1", "VM0100", "VM0101"}
+    assert index.get_group_hosts("unknown") is None
+
+    # Returned variables are copies
+    index.get_host_vars("vlab-01")["hwsku"] = "other"
+    assert index.get_host_vars("vlab-01")["hwsku"] == "Force10-S6000"
+
+
+def test_index_is_loaded_by_other_processes(inventory, monkeypatch):
+    index = inventory_utils.get_inventory_index(inventory, _inventory_manager)
+
+    # Another process loads the index from the facts cache
+    monkeypatch.setattr(inventory_utils, "_inventory_indexes", {})
+    inventory_utils.cache._cache.clear()
+    loaded = inventory_utils.get_inventory_index([inventory], _no_inventory_manager)
+    assert loaded is not index and loaded.hosts == index.hosts
+
+
+def test_index_is_rebuilt_when_inventory_changes(inventory, monkeypatch):
+    monkeypatch.setattr(inventory_utils, "INVENTORY_HASH_CHECK_INTERVAL", 0)
+    inventory_hash = inventory_utils.get_inventory_hash([inventory])
+    inventory_utils.get_inventory_index([inventory], _inventory_manager)
+
+    with open(inventory, "a") as f:
+        f.write("vlab-02 ansible_host=10.250.0.102\n")
+    assert inventory_utils.get_inventory_hash([inventory]) != inventory_hash
+    index = inventory_utils.get_inventory_index([inventory], _inventory_manager)
+    assert index.get_host_vars("vlab-02")["ansible_host"] == "10.250.0.102"
+
+
+def test_inventory_is_checked_once_per_interval(inventory, monkeypatch):
+    inventory_hash = inventory_utils.get_inventory_hash([inventory])
+    with open(inventory, "a") as f:
+        f.write("vlab-02 ansible_host=10.250.0.102\n")
+
+    def no_stat(inv_file):
+        raise AssertionError("The inventory files should not be checked again")
+
+    source_files = inventory_utils._inventory_source_files
+    monkeypatch.setattr(inventory_utils, "_inventory_source_files", no_stat)
+    assert inventory_utils.get_inventory_hash([inventory]) == inventory_hash
+
+    monkeypatch.setattr(inventory_utils, "_inventory_source_files", source_files)
+    monkeypatch.setattr(inventory_utils, "INVENTORY_HASH_CHECK_INTERVAL", 0)
+    assert inventory_utils.get_inventory_hash([inventory]) != inventory_hash
+
+
+def test_host_vars_are_memoized(inventory, monkeypatch):
+    monkeypatch.setattr(utilities, "get_inventory_manager", _inventory_manager)
+    host_vars = utilities.get_host_vars([inventory], "vlab-01")
+    server_vars = utilities.get_test_server_vars([inventory], "server_1")
+    assert host_vars["hwsku"] == "Force10-S6000"
+    assert server_vars["ptf_ip"] == "10.0.0.10"
+
+    monkeypatch.setattr(utilities, "get_inventory_index", _no_inventory_manager)
+    host_vars["hwsku"] = "other"
+    assert utilities.get_host_vars([inventory], "vlab-01")["hwsku"] == "Force10-S6000"
+    assert utilities.get_test_server_vars([inventory], "server_1") == server_vars
+
+    # The memo is keyed by the content of the inventory
+    monkeypatch.setattr(utilities, "get_inventory_index", inventory_utils.get_inventory_index)
+    monkeypatch.setattr(inventory_utils, "INVENTORY_HASH_CHECK_INTERVAL", 0)
+    with open(inventory, "a") as f:
+        f.write("vlab-02 ansible_host=10.250.0.102 hwsku=Mellanox-SN2700\n")
+    assert utilities.get_host_vars([inventory], "vlab-02")["hwsku"] == "Mellanox-SN2700"
+
+
+def test_inventory_managers_are_not_shared(inventory):
+    im = utilities.get_inventory_manager([inventory])
+    im.add_host("added", group="sonic")
+    assert utilities.get_inventory_manager([inventory]).get_host("added") is None
+    assert utilities.get_variable_manager([inventory])._inventory is not im
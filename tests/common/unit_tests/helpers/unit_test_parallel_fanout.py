@@ -0,0 +1,96 @@
+"""Unit test for the parallel fan-out in ``tests/common/helpers/multi_thread_utils.py``.
+
+Run with::
+
+    python3 -m pytest --noconftest \\
+        tests/common/unit_tests/helpers/unit_test_parallel_fanout.py -v
+"""
+import importlib.util
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+
+MODULE_PATH = Path(__file__).resolve().parents[2] / "helpers/multi_thread_utils.py"
+
+
+@pytest.fixture(scope="module")
+def multi_thread_utils():
+    spec = importlib.util.spec_from_file_location("unit_target_multi_thread_utils", MODULE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def fanout(multi_thread_utils):
+    yield multi_thread_utils.ParallelFanout.enable(4)
+    multi_thread_utils.ParallelFanout.disable()
+
+
+def test_serial_when_disabled(multi_thread_utils):
+    threads = []
+
+    def call(item):
+        threads.append(threading.current_thread())
+        return item * 2
+
+    assert multi_thread_utils.fanout_map(call, [1, 2, 3]) == [2, 4, 6]
+    assert set(threads) == {threading.current_thread()}
+
+
+def test_ordered_results_run_concurrently(multi_thread_utils, fanout):
+    barrier = threading.Barrier(4, timeout=5)
+
+    def call(item):
+        # Only passes if the 4 calls are running at the same time
+        barrier.wait()
+        time.sleep(0.01 * (4 - item))
+        return item
+
+    assert multi_thread_utils.fanout_map(call, [0, 1, 2, 3]) == [0, 1, 2, 3]
+
+
+def test_nested_fanout_does_not_deadlock(multi_thread_utils, fanout):
+    def node(item):
+        return multi_thread_utils.fanout_map(lambda asic: (item, asic), range(3))
+
+    assert multi_thread_utils.fanout_map(node, range(8)) == [[(n, a) for a in range(3)] for n in range(8)]
+
+
+def test_concurrency_is_capped(multi_thread_utils, fanout):
+    lock = threading.Lock()
+    running = [0, 0]
+
+    def call(item):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+
+    multi_thread_utils.fanout_map(call, range(20))
+    # 4 pool workers plus the thread doing the fan-out
+    assert running[1] <= 5
+
+
+def test_errors_are_aggregated(multi_thread_utils, fanout):
+    called = []
+
+    def call(item):
+        called.append(item)
+        if item in ("dut2", "dut3"):
+            raise ValueError(item)
+        return item
+
+    with pytest.raises(ValueError, match="dut2") as excinfo:
+        multi_thread_utils.fanout_map(call, ["dut1", "dut2", "dut3", "dut4"])
+
+    # All the calls are run, the first failure is raised with all the failures chained as its cause
+    assert sorted(called) == ["dut1", "dut2", "dut3", "dut4"]
+    cause = excinfo.value.__cause__
+    assert isinstance(cause, multi_thread_utils.FanoutError)
+    assert list(cause.errors) == ["dut2", "dut3"]
@@ -0,0 +1,69 @@
+"""Unit test for ``tests/common/helpers/show_parser.py``.
+
+Run with::
+
+    python3 -m pytest --noconftest \\
+        tests/common/unit_tests/helpers/unit_test_show_parser.py -v
+"""
+from tests.common.helpers import show_parser
+
+
+SHOW_INTERFACE_STATUS = """\
+      Interface            Lanes    Speed    MTU    FEC    Alias             Vlan    Oper    Admin
+---------------  ---------------  -------  -----  -----  -------  ---------------  ------  -------
+      Ethernet0          0,1,2,3      40G   9100    N/A     etp1  PortChannel0002      up       up
+      Ethernet4          4,5,6,7      40G    N/A    N/A     etp2           routed    down       up
+
+Some text after the table
+""".splitlines()
+
+SHOW_MAC = """\
+  No.    Vlan  MacAddress         Port       Type
+-----  ------  -----------------  ---------  -------
+    1    1000  00:11:22:33:44:55  Ethernet4  Dynamic
+Total number of entries 1
+""".splitlines()
+
+
+def test_parse_show():
+    items = show_parser.parse_show(SHOW_INTERFACE_STATUS)
+    assert items == [
+        {"interface": "Ethernet0", "lanes": "0,1,2,3", "speed": "40G", "mtu": "9100", "fec": "N/A",
+         "alias": "etp1", "vlan": "PortChannel0002", "oper": "up", "admin": "up"},
+        {"interface": "Ethernet4", "lanes": "4,5,6,7", "speed": "40G", "mtu": "N/A", "fec": "N/A",
+         "alias": "etp2", "vlan": "routed", "oper": "down", "admin": "up"},
+    ]
+    assert show_parser.parse_show(SHOW_INTERFACE_STATUS[2:]) == []
+
+
+def test_multi_line_headers_and_leading_spaces():
+    lines = [
+        "  Port   Rx",
+        "         Bytes",
+        "  -----  -----",
+        "  Eth0   10",
+    ]
+    assert show_parser.parse_show(lines, header_len=2) == [{"port": "Eth0", "rx bytes": "10"}]
+    assert show_parser.parse_column_positions(lines[2]) == [(2, 7), (9, 14)]
+
+
+def test_layout_is_compiled_once():
+    show_parser.compile_layout.cache_clear()
+    show_parser.parse_show(SHOW_MAC)
+    show_parser.parse_show(SHOW_MAC)
+    info = show_parser.compile_layout.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_stream_and_schema():
+    items = show_parser.iter_show(iter(SHOW_INTERFACE_STATUS), schema={"mtu": int, "no such column": int})
+    assert next(items)["mtu"] == 9100
+    # The values which can not be converted are kept
+    assert next(items)["mtu"] == "N/A"
+    assert next(items, None) is None
+
+    # The rows after the table are still parsed until an empty line, like before
+    items = show_parser.parse_show(SHOW_MAC, schema={"no.": int, "vlan": int})
+    assert len(items) == 2
+    assert items[0] == {"no.": 1, "vlan": 1000, "macaddress": "00:11:22:33:44:55", "port": "Ethernet4",
+                        "type": "Dynamic"}
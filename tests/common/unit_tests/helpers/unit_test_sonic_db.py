@@ -0,0 +1,223 @@
+"""Unit test for the bulk HGETALL of ``tests/common/helpers/sonic_db.py``.
+
+The DUT is stood in by a host running the shell commands locally, with a sonic-db-cli script emulating the EVAL
+of the bulk HGETALL and the SCAN page scripts over dbs in json files. When redis-server and redis-cli are
+installed, the scripts are also run by a local redis-server.
+
+Run with::
+
+    python3 -m pytest --noconftest \\
+        tests/common/unit_tests/helpers/unit_test_sonic_db.py -v
+"""
+import json
+import os
+import shutil
+import stat
+import subprocess
+import sys
+import time
+
+import pytest
+
+from tests.common.helpers import sonic_db
+from tests.common.helpers.sonic_db import AsicDbCli, SonicDbCli, SonicDbNoCommandOutput
+
+
+FAKE_SONIC_DB_CLI = """#!{python}
+import fnmatch
+import json
+import os
+import sys
+
+args = sys.argv[1:]
+if args[0] == "-n":
+    args = args[2:]
+db, command, script, numkeys = args[:4]
+assert command == "EVAL" and "cjson.encode" in script
+keys = args[4:4 + int(numkeys)]
+with open(os.path.join(os.environ["FAKE_REDIS_DIR"], db + ".json")) as db_file:
+    content = json.load(db_file)
+if "'SCAN'" in script:
+    cursor, pattern, count = args[4 + int(numkeys):]
+    start, end = int(cursor), int(cursor) + int(count)
+    page = [key for key in sorted(content)[start:end] if fnmatch.fnmatchcase(key, pattern)]
+    print(json.dumps([str(end) if end < len(content) else "0", page or {{}}]))
+else:
+    assert "SCAN" not in script and not args[4 + int(numkeys):]
+    print(json.dumps({{key: content[key] for key in keys if isinstance(content.get(key), dict)}}))
+"""
+
+REDIS_SONIC_DB_CLI = """#!/bin/sh
+db=$1
+shift
+case $db in
+    APPL_DB) index=0 ;;
+    ASIC_DB) index=1 ;;
+esac
+exec redis-cli -s {socket} -n $index "$@"
+"""
+
+
+class FakeSonicHost(object):
+
+    def __init__(self, bin_dir, redis_dir=None):
+        self.hostname = "dut"
+        self.env = dict(os.environ, PATH="{}:{}".format(bin_dir, os.environ["PATH"]))
+        if redis_dir:
+            self.env["FAKE_REDIS_DIR"] = redis_dir
+        self.commands = []
+
+    def shell(self, cmd, module_ignore_errors=False, verbose=True):
+        self.commands.append(cmd)
+        res = subprocess.run(cmd, shell=True, env=self.env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                             universal_newlines=True)
+        assert res.returncode == 0 or module_ignore_errors, res.stderr
+        return {"rc": res.returncode, "stdout": res.stdout.rstrip("\n"), "stdout_lines": res.stdout.splitlines(),
+                "stderr": res.stderr}
+
+
+def _write_script(bin_dir, content):
+    script = bin_dir / "sonic-db-cli"
+    script.write_text(content)
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+
+
+ASIC_DB = {
+    "ASIC_STATE:SAI_OBJECT_TYPE_LAG:oid:0x2000000000a01": {"SAI_LAG_ATTR_SYSTEM_PORT_AGGREGATE_ID": "1"},
+    "ASIC_STATE:SAI_OBJECT_TYPE_LAG:oid:0x2000000000a02": {"SAI_LAG_ATTR_SYSTEM_PORT_AGGREGATE_ID": "2"},
+    "ASIC_STATE:SAI_OBJECT_TYPE_LAG_MEMBER:oid:0x1b000000000a03": {
+        "SAI_LAG_MEMBER_ATTR_LAG_ID": "oid:0x2000000000a01", "SAI_LAG_MEMBER_ATTR_EGRESS_DISABLE": "true"},
+    "ASIC_STATE:SAI_OBJECT_TYPE_PORT:oid:0x1000000000002": {
+        "SAI_PORT_ATTR_MTU": "9122", "SAI_PORT_ATTR_DESCRIPTION": "line 1\nline \"2\""},
+    "VIDCOUNTER": "1",
+}
+
+
+@pytest.fixture
+def asicdb(tmp_path):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    _write_script(bin_dir, FAKE_SONIC_DB_CLI.format(python=sys.executable))
+    redis_dir = tmp_path / "redis"
+    redis_dir.mkdir()
+    (redis_dir / "ASIC_DB.json").write_text(json.dumps(ASIC_DB))
+    return AsicDbCli(FakeSonicHost(str(bin_dir), str(redis_dir)))
+
+
+def test_hget_all_bulk_keys(asicdb):
+    keys = [key for key in ASIC_DB if "LAG" in key] + ["ASIC_STATE:SAI_OBJECT_TYPE_LAG:oid:0xdead", "VIDCOUNTER"]
+    hashes = asicdb.hget_all_bulk(keys=keys)
+    assert hashes == {key: value for key, value in ASIC_DB.items() if "LAG" in key}
+    assert hashes.evals == 1
+    assert hashes.payload_size > 0
+    assert hashes.elapsed >= 0
+    assert len(asicdb.host.commands) == 1
+
+
+def test_hget_all_bulk_chunks(asicdb, monkeypatch):
+    monkeypatch.setattr(sonic_db, "BULK_KEYS_PER_EVAL", 2)
+    hashes = asicdb.hget_all_bulk(keys=list(ASIC_DB))
+    assert hashes == {key: value for key, value in ASIC_DB.items() if isinstance(value, dict)}
+    assert hashes.evals == 3
+    # All the runs of the script are done by one DUT invocation
+    assert len(asicdb.host.commands) == 1
+
+
+def test_hget_all_bulk_many_long_keys(tmp_path):
+    # The keys of the queues of a large ASIC_DB, more than the 128KB of a single argument of /bin/sh -c
+    queues = {"ASIC_STATE:SAI_OBJECT_TYPE_QUEUE:oid:0x15{:014x}".format(index): {
+        "SAI_QUEUE_ATTR_TYPE": "SAI_QUEUE_TYPE_UNICAST", "SAI_QUEUE_ATTR_INDEX": str(index % 8)}
+        for index in range(2500)}
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    _write_script(bin_dir, FAKE_SONIC_DB_CLI.format(python=sys.executable))
+    redis_dir = tmp_path / "redis"
+    redis_dir.mkdir()
+    (redis_dir / "ASIC_DB.json").write_text(json.dumps(queues))
+    asicdb = AsicDbCli(FakeSonicHost(str(bin_dir), str(redis_dir)))
+
+    hashes = asicdb.hget_all_bulk(keys=list(queues))
+    assert hashes == queues
+    assert hashes.evals == 5
+    assert hashes.invocations == len(asicdb.host.commands) > 1
+    assert all(len(cmd) <= sonic_db.BULK_MAX_CMD_SIZE for cmd in asicdb.host.commands)
+
+
+def test_hget_all_bulk_pattern(asicdb):
+    hashes = asicdb.hget_all_bulk(pattern="ASIC_STATE:SAI_OBJECT_TYPE_PORT:*")
+    assert hashes == {"ASIC_STATE:SAI_OBJECT_TYPE_PORT:oid:0x1000000000002":
+                      ASIC_DB["ASIC_STATE:SAI_OBJECT_TYPE_PORT:oid:0x1000000000002"]}
+    assert sorted(asicdb.scan_keys("ASIC_STATE:SAI_OBJECT_TYPE_LAG:*")) == sorted(
+        key for key in ASIC_DB if key.startswith("ASIC_STATE:SAI_OBJECT_TYPE_LAG:"))
+
+
+def test_scan_keys_pages(asicdb, monkeypatch):
+    monkeypatch.setattr(sonic_db, "BULK_SCAN_COUNT", 2)
+    # The keys of any type are returned, one DUT invocation per page
+    assert sorted(asicdb.scan_keys("*")) == sorted(ASIC_DB)
+    assert len(asicdb.host.commands) == 3
+    assert asicdb.scan_keys("NO_SUCH_TABLE:*") == []
+
+    # The hashes of the pages are fetched by runs of the bulk HGETALL script, which does not SCAN
+    del asicdb.host.commands[:]
+    hashes = asicdb.hget_all_bulk(pattern="ASIC_STATE:*")
+    assert hashes == {key: value for key, value in ASIC_DB.items() if isinstance(value, dict)}
+    assert hashes.invocations == 4 and hashes.evals == 1
+    assert all("SCAN" not in command for command in asicdb.host.commands[3:])
+
+
+def test_hget_all_bulk_arguments(asicdb):
+    assert asicdb.hget_all_bulk(keys=[]) == {}
+    assert asicdb.host.commands == []
+    with pytest.raises(ValueError):
+        asicdb.hget_all_bulk()
+    with pytest.raises(ValueError):
+        asicdb.hget_all_bulk(keys=["a"], pattern="*")
+
+
+def test_hget_all_bulk_no_output(tmp_path):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    _write_script(bin_dir, "#!/bin/sh\ntrue\n")
+    with pytest.raises(SonicDbNoCommandOutput):
+        SonicDbCli(FakeSonicHost(str(bin_dir)), "ASIC_DB").hget_all_bulk(keys=["a"])
+
+
+@pytest.fixture
+def redis_host(tmp_path):
+    if not shutil.which("redis-server") or not shutil.which("redis-cli"):
+        pytest.skip("redis-server is not installed")
+    socket = str(tmp_path / "redis.sock")
+    server = subprocess.Popen(["redis-server", "--port", "0", "--unixsocket", socket, "--save", "",
+                               "--dir", str(tmp_path)], stdout=subprocess.DEVNULL)
+    try:
+        for _ in range(100):
+            if os.path.exists(socket):
+                break
+            time.sleep(0.05)
+        bin_dir = tmp_path / "bin"
+        bin_dir.mkdir()
+        _write_script(bin_dir, REDIS_SONIC_DB_CLI.format(socket=socket))
+        for key, value in ASIC_DB.items():
+            if isinstance(value, dict):
+                args = [item for field in value.items() for item in field]
+                subprocess.check_call(["redis-cli", "-s", socket, "-n", "1", "HSET", key] + args,
+                                      stdout=subprocess.DEVNULL)
+            else:
+                subprocess.check_call(["redis-cli", "-s", socket, "-n", "1", "SET", key, value],
+                                      stdout=subprocess.DEVNULL)
+        yield FakeSonicHost(str(bin_dir))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def test_hget_all_bulk_redis_server(redis_host, monkeypatch):
+    asicdb = AsicDbCli(redis_host)
+    expected = {key: value for key, value in ASIC_DB.items() if isinstance(value, dict)}
+    assert asicdb.hget_all_bulk(pattern="ASIC_STATE:*") == expected
+    assert sorted(asicdb.scan_keys("*")) == sorted(ASIC_DB)
+    monkeypatch.setattr(sonic_db, "BULK_KEYS_PER_EVAL", 2)
+    hashes = asicdb.hget_all_bulk(keys=list(ASIC_DB) + ["ASIC_STATE:SAI_OBJECT_TYPE_LAG:oid:0xdead"])
+    assert hashes == expected
+    assert hashes.evals == 3
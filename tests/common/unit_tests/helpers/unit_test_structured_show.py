@@ -0,0 +1,167 @@
+"""Unit test for ``tests/common/helpers/structured_show.py`` and the SonicHost helpers using it.
+
+Run with::
+
+    python3 -m pytest --noconftest \\
+        tests/common/unit_tests/helpers/unit_test_structured_show.py -v
+"""
+import json
+
+import pytest
+
+from tests.common.devices.sonic import SonicHost
+from tests.common.helpers import structured_show
+from tests.common.helpers.structured_show import ShowSource, StructuredShowStats, run_show_sources, text_source
+
+
+class FakeHost(object):
+
+    def __init__(self, outputs, hostname="dut"):
+        self.hostname = hostname
+        self.outputs = outputs
+        self.cmds = []
+
+    def shell(self, cmd, module_ignore_errors=False):
+        self.cmds.append(cmd)
+        rc, stdout = self.outputs[cmd]
+        if rc != 0 and not module_ignore_errors:
+            raise RuntimeError("'{}' failed".format(cmd))
+        return {"rc": rc, "stdout": stdout, "stdout_lines": stdout.splitlines()}
+
+
+@pytest.fixture(autouse=True)
+def stats():
+    structured_show.reset_unavailable_sources()
+    StructuredShowStats.reset()
+    StructuredShowStats.enable()
+    yield StructuredShowStats
+    StructuredShowStats.enable(False)
+    StructuredShowStats.reset()
+    structured_show.reset_unavailable_sources()
+
+
+SOURCES = [
+    ShowSource("json", "show x --json", lambda result: json.loads(result["stdout"])["x"]),
+    text_source("show x", lambda result: result["stdout_lines"][0])
+]
+
+
+def test_structured_source_is_preferred(stats):
+    host = FakeHost({"show x --json": (0, '{"x": "structured"}'), "show x": (0, "text")})
+    assert run_show_sources(host, "get_x", SOURCES) == "structured"
+    assert host.cmds == ["show x --json"]
+    assert stats.summary()["get_x"]["json"]["count"] == 1
+
+
+def test_unsupported_structured_source_is_skipped(stats):
+    host = FakeHost({"show x --json": (2, "Error: No such option: --json"), "show x": (0, "text")})
+    assert run_show_sources(host, "get_x", SOURCES) == "text"
+    assert run_show_sources(host, "get_x", SOURCES) == "text"
+    assert host.cmds == ["show x --json", "show x", "show x"]
+    assert stats.summary()["get_x"]["text"] == {"count": 2, "total": pytest.approx(0, abs=1), "fallbacks": 1}
+
+    # Other hosts still try it
+    other_host = FakeHost({"show x --json": (0, '{"x": "structured"}')}, hostname="dut2")
+    assert run_show_sources(other_host, "get_x", SOURCES) == "structured"
+
+
+@pytest.mark.parametrize("rc, stdout", [
+    (127, "/bin/sh: 1: sonic-db-dump: not found"),
+    (1, "% Unknown command: show ip bgp summary json"),
+    (2, "Usage: show x [OPTIONS]\nError: No such command 'x'."),
+])
+def test_unsupported_failures(rc, stdout):
+    host = FakeHost({"show x --json": (rc, stdout), "show x": (0, "text")})
+    assert run_show_sources(host, "get_x", SOURCES) == "text"
+    assert structured_show.is_source_unavailable("dut", "get_x", SOURCES[0])
+
+
+@pytest.mark.parametrize("rc, stdout", [
+    (1, "Error: Could not connect to Redis at 127.0.0.1:6379: Connection refused"),
+    (1, "bgpd is not running"),
+    (-9, ""),
+])
+def test_transient_failure_falls_back_once(rc, stdout):
+    host = FakeHost({"show x --json": (rc, stdout), "show x": (0, "text")})
+    assert run_show_sources(host, "get_x", SOURCES) == "text"
+    assert not structured_show.is_source_unavailable("dut", "get_x", SOURCES[0])
+    host.outputs["show x --json"] = (0, '{"x": "structured"}')
+    assert run_show_sources(host, "get_x", SOURCES) == "structured"
+
+
+def test_unusable_structured_output_falls_back_once():
+    host = FakeHost({"show x --json": (0, '{"y": 1}'), "show x": (0, "text")})
+    assert run_show_sources(host, "get_x", SOURCES) == "text"
+    host.outputs["show x --json"] = (0, '{"x": "structured"}')
+    assert run_show_sources(host, "get_x", SOURCES) == "structured"
+
+
+def test_last_source_errors_are_raised():
+    host = FakeHost({"show x --json": (1, ""), "show x": (1, "")})
+    with pytest.raises(RuntimeError):
+        run_show_sources(host, "get_x", SOURCES)
+    # No source worked, so the structured one is not known to be unsupported
+    assert not structured_show.is_source_unavailable("dut", "get_x", SOURCES[0])
+
+
+CRM_SHOW_RESOURCES = """
+
+  Resource Name           Used Count    Available Count
+--------------------  ------------  -----------------
+ipv4_route                    6375              25857
+fdb_entry                       11              32756
+
+
+Stage    Bind Point    Resource Name      Used Count    Available Count
+-------  ------------  ---------------  ------------  -----------------
+INGRESS  PORT          acl_group                  16                240
+INGRESS  PORT          acl_table                   2                  2
+EGRESS   LAG           acl_group                   0                256
+
+
+Table ID         Resource Name      Used Count    Available Count
+---------------  ---------------  ------------  -----------------
+0x7000000000e52  acl_entry                   2               1022
+0x7000000000e52  acl_counter                 2               1278
+"""
+
+CRM_DUMP = {
+    "CRM:STATS": {"type": "hash", "value": {
+        "crm_stats_ipv4_route_used": "6375", "crm_stats_ipv4_route_available": "25857",
+        "crm_stats_fdb_entry_used": "11", "crm_stats_fdb_entry_available": "32756"}},
+    "CRM:ACL_STATS:EGRESS:LAG": {"type": "hash", "value": {
+        "crm_stats_acl_group_used": "0", "crm_stats_acl_group_available": "256"}},
+    "CRM:ACL_STATS:INGRESS:PORT": {"type": "hash", "value": {
+        "crm_stats_acl_group_used": "16", "crm_stats_acl_group_available": "240",
+        "crm_stats_acl_table_used": "2", "crm_stats_acl_table_available": "2"}},
+    "CRM:ACL_TABLE_STATS:0x7000000000e52": {"type": "hash", "value": {
+        "crm_stats_acl_entry_used": "2", "crm_stats_acl_entry_available": "1022",
+        "crm_stats_acl_counter_used": "2", "crm_stats_acl_counter_available": "1278"}},
+}
+
+
+def test_crm_resources_db_and_text_are_identical():
+    host = SonicHost.__new__(SonicHost)
+    text = host._parse_crm_resources_text({"stdout_lines": CRM_SHOW_RESOURCES.splitlines()})
+    assert text["main_resources"]["ipv4_route"] == {"used": 6375, "available": 25857}
+    assert host._parse_crm_resources_db({"stdout": json.dumps(CRM_DUMP)}) == text
+
+    with pytest.raises(ValueError):
+        host._parse_crm_resources_db({"stdout": "{}"})
+
+
+def test_bgp_state_idle_json():
+    host = SonicHost.__new__(SonicHost)
+
+    def _summaries(v4_peers, v6_peers):
+        return {"stdout": "{}\n{}\n".format(json.dumps({"ipv4Unicast": {"peers": v4_peers}}),
+                                            json.dumps({"ipv6Unicast": {"peers": v6_peers}}))}
+
+    admin_down = {"state": "Idle", "peerState": "Admin", "desc": "ARISTA01T1"}
+    monitor = {"state": "Active", "peerState": "OK", "desc": "BGPMonitor"}
+    assert host._parse_bgp_state_idle_json(_summaries({"10.0.0.1": admin_down, "10.0.0.9": monitor},
+                                                      {"fc00::1": admin_down}))
+    established = {"state": "Established", "peerState": "OK", "desc": "ARISTA02T1"}
+    assert not host._parse_bgp_state_idle_json(_summaries({"10.0.0.1": admin_down, "10.0.0.3": established}, {}))
+    with pytest.raises(ValueError):
+        host._parse_bgp_state_idle_json({"stdout": "% Unknown command"})
@@ -0,0 +1,277 @@
+"""Unit test for ``tests/common/pkt_filter/filter_pkt_in_buffer.py``.
+
+The PTF dataplane is stood in by a fake with the packet buffers and the condition variable of ptf DataPlane, fed
+by a thread like the PTF dataplane thread.
+
+Run with::
+
+    python3 -m pytest --noconftest \\
+        tests/common/unit_tests/pkt_filter/unit_test_filter_pkt_in_buffer.py -v
+"""
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("ptf.mask")
+
+import ptf.packet as packet  # noqa: E402
+import ptf.testutils as testutils  # noqa: E402
+
+from tests.common.pkt_filter import filter_pkt_in_buffer  # noqa: E402
+from tests.common.pkt_filter.filter_pkt_in_buffer import (  # noqa: E402
+    INDEXED_FIELDS, FilterPktBuffer, PacketBufferIndex, convert_pkt_to_dict, decode_fields, decode_fields_raw,
+    get_packet_index)
+
+MATCH_FIELDS = [("802.1Q", "vlan"), ("Ethernet", "src"), ("Ethernet", "dst"), ("IP", "src"), ("IP", "dst"),
+                ("TCP", "dport")]
+
+
+class FakeDataPlane(object):
+
+    def __init__(self, ports):
+        self.cvar = threading.Condition()
+        self.packet_queues = {(0, port): [] for port in ports}
+
+    def receive(self, port, pkt):
+        with self.cvar:
+            self.packet_queues[(0, port)].append((bytes(pkt), time.time()))
+            self.cvar.notify_all()
+
+    def flush(self):
+        for port_id in list(self.packet_queues.keys()):
+            self.packet_queues[port_id] = []
+
+
+class FakePtfAdapter(object):
+
+    def __init__(self, ports):
+        self.dataplane = FakeDataPlane(ports)
+
+
+def tcp_packet(index, vlan=100, dport=80):
+    return testutils.simple_tcp_packet(eth_dst="00:11:22:33:44:55", eth_src="00:66:77:88:99:aa",
+                                       dl_vlan_enable=True, vlan_vid=vlan, ip_src="10.0.{}.{}".format(
+                                           index // 256 % 256, index % 256),
+                                       ip_dst="192.168.0.1", ip_ttl=64, tcp_dport=dport)
+
+
+def legacy_matches(packet_dicts, exp_pkt, match_fields):
+    """The matching of the packets of the buffer before the index, packet_dicts are the converted packets"""
+    exp_dict = convert_pkt_to_dict(exp_pkt)
+    matches = []
+    for position, packet_dict in enumerate(packet_dicts):
+        for field, value in match_fields:
+            try:
+                if packet_dict[field][value] != exp_dict[field][value]:
+                    break
+            except KeyError:
+                break
+        else:
+            matches.append(position)
+    return matches
+
+
+@pytest.fixture
+def ptfadapter():
+    return FakePtfAdapter([1, 2])
+
+
+def test_decode_fields():
+    pkt = packet.Ether(bytes(tcp_packet(5)))
+    fields = [("Ethernet", "src"), ("802.1Q", "vlan"), ("IP", "src"), ("IP", "ttl"), ("TCP", "dport"),
+              ("UDP", "dport"), ("IP", "unknown")]
+    pkt_dict = convert_pkt_to_dict(pkt)
+    assert decode_fields(pkt, fields) == ("00:66:77:88:99:aa", pkt_dict["802.1Q"]["vlan"], "10.0.0.5", "64", "80",
+                                          None, None)
+
+
+def test_decode_fields_inner_layer():
+    # Like convert_pkt_to_dict, the inner layer wins when there are several layers of the same name
+    pkt = packet.Ether(bytes(testutils.simple_ipv4ip_packet(ip_src="1.1.1.1", ip_dst="2.2.2.2",
+                                                            inner_frame=packet.IP(src="3.3.3.3", dst="4.4.4.4"))))
+    assert decode_fields(pkt, [("IP", "src"), ("IP", "dst")]) == ("3.3.3.3", "4.4.4.4")
+    assert convert_pkt_to_dict(pkt)["IP"]["src"] == "3.3.3.3"
+
+
+def various_packets():
+    qinq = testutils.simple_qinq_tcp_packet(dl_vlan_outer=10, vlan_vid=20)
+    fragment = testutils.simple_tcp_packet(ip_src="10.0.0.9")
+    fragment["IP"].frag = 10
+    return [
+        ("tcp", testutils.simple_tcp_packet(ip_src="10.0.0.1", tcp_sport=1234, tcp_dport=443), True),
+        ("vlan udp", testutils.simple_udp_packet(dl_vlan_enable=True, vlan_vid=300, udp_dport=5000), True),
+        ("qinq", qinq, True),
+        ("tcpv6", testutils.simple_tcpv6_packet(ipv6_src="2001:db8::1", ipv6_dst="fc00::a:0:1"), True),
+        ("udpv6", testutils.simple_udpv6_packet(dl_vlan_enable=True, vlan_vid=7), True),
+        ("icmp", testutils.simple_icmp_packet(icmp_type=8, icmp_data=b"x" * 10), False),
+        ("vxlan", testutils.simple_vxlan_packet(inner_frame=testutils.simple_tcp_packet(ip_src="3.3.3.3")), False),
+        ("ipinip", testutils.simple_ipv4ip_packet(inner_frame=packet.IP(src="4.4.4.4") / packet.TCP()), False),
+        ("fragment", fragment, False),
+        ("arp", testutils.simple_arp_packet(), False),
+        ("truncated", packet.Ether(bytes(testutils.simple_tcp_packet())[:30]), False),
+    ]
+
+
+def test_decode_fields_raw():
+    for name, pkt, decoded_raw in various_packets():
+        raw = bytes(pkt)
+        values = decode_fields_raw(raw, INDEXED_FIELDS)
+        assert (values is not None) == decoded_raw, name
+        if values is not None:
+            assert values == decode_fields(packet.Ether(raw), INDEXED_FIELDS), name
+
+
+def test_index_matches_legacy_scan():
+    buffer = [(bytes(tcp_packet(index, vlan=100 + index % 3, dport=80 + index % 2)), 0) for index in range(300)]
+    buffer.extend((bytes(pkt), 0) for _, pkt, _ in various_packets())
+    index = PacketBufferIndex()
+    index.sync(buffer)
+    packet_dicts = [convert_pkt_to_dict(packet.Ether(pkt[0])) for pkt in buffer]
+    exp_pkts = [tcp_packet(exp_index, vlan=100 + exp_index % 3, dport=80 + exp_index % 2)
+                for exp_index in (0, 7, 299)]
+    exp_pkts.extend(pkt for _, pkt, _ in various_packets())
+    for exp_pkt in exp_pkts:
+        for match_fields in (MATCH_FIELDS, MATCH_FIELDS[:3], [("802.1Q", "vlan")], [("IP", "src")], []):
+            criteria = [(field, convert_pkt_to_dict(exp_pkt).get(field[0], {}).get(field[1]))
+                        for field in match_fields]
+            assert index.find(criteria) == legacy_matches(packet_dicts, exp_pkt, match_fields)
+
+
+def test_index_follows_buffer():
+    buffer = [(bytes(tcp_packet(index)), 0) for index in range(10)]
+    index = PacketBufferIndex()
+    index.sync(buffer)
+    criteria = [(("IP", "dst"), "192.168.0.1")]
+    assert index.find(criteria) == list(range(10))
+
+    # Packets added and polled from the head of the buffer
+    buffer.extend((bytes(tcp_packet(index)), 0) for index in range(10, 15))
+    del buffer[:8]
+    index.sync(buffer)
+    assert index.find(criteria) == list(range(7))
+    assert index.packet(0)["IP"].src == "10.0.0.8"
+    assert index.find([(("IP", "src"), "10.0.0.3")]) == []
+    assert index.find([(("IP", "src"), "10.0.0.14")]) == [6]
+
+    # Buffer replaced by a flush
+    flushed = [(bytes(tcp_packet(20)), 0)]
+    index.sync(flushed)
+    assert index.find(criteria) == [0]
+    assert index.packet(0)["IP"].src == "10.0.0.20"
+    index.sync([])
+    assert index.find(criteria) == []
+
+
+def test_index_decodes_each_packet_once(monkeypatch):
+    decoded = []
+    original = filter_pkt_in_buffer.decode_fields_raw
+
+    def counting_decode_fields_raw(raw, fields):
+        decoded.append(raw)
+        return original(raw, fields)
+
+    monkeypatch.setattr(filter_pkt_in_buffer, "decode_fields_raw", counting_decode_fields_raw)
+    buffer = [(bytes(tcp_packet(index)), 0) for index in range(20)]
+    index = PacketBufferIndex()
+    index.sync(buffer)
+    index.sync(buffer)
+    buffer.append((bytes(tcp_packet(20)), 0))
+    index.sync(buffer)
+    assert len(decoded) == 21
+
+
+def test_get_packet_index_extra_fields(ptfadapter):
+    ptfadapter.dataplane.receive(1, tcp_packet(1))
+    index = get_packet_index(ptfadapter.dataplane, 1)
+    assert get_packet_index(ptfadapter.dataplane, 1, [("IP", "src")]) is index
+    extended = get_packet_index(ptfadapter.dataplane, 1, [("IP", "ttl")])
+    assert extended is not index
+    assert extended.find([(("IP", "ttl"), "64")]) == [0]
+
+
+def test_filter_pkt_in_buffer(ptfadapter):
+    exp_pkt = tcp_packet(3)
+    for index in range(50):
+        ptfadapter.dataplane.receive(2, tcp_packet(index))
+    ptfadapter.dataplane.receive(2, tcp_packet(3))
+    pkt_filter = FilterPktBuffer(ptfadapter=ptfadapter, exp_pkt=exp_pkt, dst_port_numbers=[1, 2],
+                                 match_fields=MATCH_FIELDS, ignore_fields=[], settle_time=0.05)
+    start = time.time()
+    assert pkt_filter.filter_pkt_in_buffer() is True
+    # Returns once the buffers stop growing, without waiting for the timeout
+    assert time.time() - start < 1
+    assert pkt_filter.matched_index == {1: 0, 2: 2}
+    assert pkt_filter.count_pkt_in_buffer() == {1: 0, 2: 2}
+
+
+def test_filter_pkt_in_buffer_waits_for_packets(ptfadapter):
+    exp_pkt = tcp_packet(3)
+
+    def receive():
+        time.sleep(0.2)
+        for index in range(5):
+            ptfadapter.dataplane.receive(1, tcp_packet(3))
+
+    thread = threading.Thread(target=receive)
+    thread.start()
+    pkt_filter = FilterPktBuffer(ptfadapter=ptfadapter, exp_pkt=exp_pkt, dst_port_numbers=1,
+                                 match_fields=MATCH_FIELDS, timeout=10, settle_time=0.05)
+    start = time.time()
+    assert pkt_filter.filter_pkt_in_buffer() is True
+    thread.join()
+    assert time.time() - start < 5
+    assert pkt_filter.matched_index == {1: 5}
+
+
+def receive_in_bursts(ptfadapter, bursts, gap):
+    """Receive bursts of matching packets on ports 1 and 2, separated by a gap longer than the settle time"""
+    for burst in range(bursts):
+        if burst:
+            time.sleep(gap)
+        for port in (1, 2):
+            ptfadapter.dataplane.receive(port, tcp_packet(3))
+
+
+@pytest.mark.parametrize("settle_time, expected_count, max_time", [(None, None, 5), (0.05, 6, 0.9)])
+def test_filter_pkt_in_buffer_counts_late_packets(ptfadapter, settle_time, expected_count, max_time):
+    thread = threading.Thread(target=receive_in_bursts, args=(ptfadapter, 3, 0.3))
+    thread.start()
+    pkt_filter = FilterPktBuffer(ptfadapter=ptfadapter, exp_pkt=tcp_packet(3), dst_port_numbers=[1, 2],
+                                 match_fields=MATCH_FIELDS, timeout=1, settle_time=settle_time,
+                                 expected_count=expected_count)
+    start = time.time()
+    assert pkt_filter.filter_pkt_in_buffer() is True
+    thread.join()
+    assert 0.6 <= time.time() - start < max_time
+    assert pkt_filter.matched_index == {1: 3, 2: 3}
+
+
+def test_filter_pkt_in_buffer_settles_early(ptfadapter):
+    thread = threading.Thread(target=receive_in_bursts, args=(ptfadapter, 3, 0.3))
+    thread.start()
+    pkt_filter = FilterPktBuffer(ptfadapter=ptfadapter, exp_pkt=tcp_packet(3), dst_port_numbers=[1, 2],
+                                 match_fields=MATCH_FIELDS, timeout=5, settle_time=0.05)
+    assert pkt_filter.filter_pkt_in_buffer() is True
+    thread.join()
+    # The settle time is shorter than the gap between the bursts: the late bursts are not counted
+    assert pkt_filter.matched_index == {1: 1, 2: 1}
+
+
+def test_filter_pkt_in_buffer_diff(ptfadapter):
+    received = tcp_packet(3)
+    received["IP"].ttl = 63
+    ptfadapter.dataplane.receive(1, received)
+    pkt_filter = FilterPktBuffer(ptfadapter=ptfadapter, exp_pkt=tcp_packet(3), dst_port_numbers=1,
+                                 match_fields=MATCH_FIELDS, ignore_fields=[("IP", "chksum")], settle_time=0.05)
+    diff = pkt_filter.filter_pkt_in_buffer()
+    assert "IP ttl=63" in diff
+
+
+def test_filter_pkt_in_buffer_not_found(ptfadapter):
+    ptfadapter.dataplane.receive(1, tcp_packet(1))
+    pkt_filter = FilterPktBuffer(ptfadapter=ptfadapter, exp_pkt=tcp_packet(3), dst_port_numbers=[1],
+                                 match_fields=MATCH_FIELDS, timeout=0.2)
+    start = time.time()
+    assert pkt_filter.filter_pkt_in_buffer() is False
+    assert 0.2 <= time.time() - start < 2
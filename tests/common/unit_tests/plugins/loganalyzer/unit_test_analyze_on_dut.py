@@ -0,0 +1,74 @@
+import os
+import shlex
+import subprocess
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+
+from tests.common.plugins.loganalyzer.loganalyzer import LogAnalyzer, ANSIBLE_LOGANALYZER_MODULE
+
+
+MARKER = "unit_test_analyze_on_dut"
+
+
+class LocalHost(MagicMock):
+    """Ansible host stand-in which runs the DUT side of the loganalyzer locally."""
+
+    def command(self, cmd, module_ignore_errors=False):
+        args = shlex.split(cmd)
+        args[0] = sys.executable
+        proc = subprocess.run(args, capture_output=True, text=True)
+        return {"rc": proc.returncode, "stdout": proc.stdout, "stderr": proc.stderr}
+
+    def copy(self, src=None, dest=None, content=None):
+        if content is None:
+            with open(src) as f:
+                content = f.read()
+        with open(dest, "w") as f:
+            f.write(content)
+
+
+@pytest.fixture
+def analyzer(tmp_path):
+    host = LocalHost()
+    host.hostname = "dut"
+    analyzer = LogAnalyzer(ansible_host=host, marker_prefix=MARKER, dut_run_dir=str(tmp_path))
+    host.copy(src=ANSIBLE_LOGANALYZER_MODULE, dest=str(tmp_path / "loganalyzer.py"))
+    with open(analyzer.extracted_syslog, "w") as f:
+        f.write("Jan 01 sonic INFO start-LogAnalyzer-{}\n".format(MARKER))
+        f.write("Jan 01 sonic ERR swss#orchagent: failed to set port\n")
+        f.write("Jan 01 sonic ERR swss#orchagent: ignored failure\n")
+        f.write("Jan 01 sonic NOTICE portmgrd: Ethernet0 link down\n")
+        f.write("Jan 01 sonic INFO end-LogAnalyzer-{}\n".format(MARKER))
+    analyzer.match_regex = [" ERR "]
+    analyzer.ignore_regex = [".*ignored failure.*"]
+    analyzer.expect_regex = [".*link down.*", ".*link up.*"]
+    return analyzer
+
+
+def test_analyze_on_dut(analyzer):
+    extracted_files = {analyzer.extracted_syslog: "/tmp/syslog.dut.1"}
+
+    result, unused = analyzer._analyze_on_dut(MARKER, extracted_files)
+
+    assert result == {"/tmp/syslog.dut.1": [["Jan 01 sonic ERR swss#orchagent: failed to set port\n"],
+                                            ["Jan 01 sonic NOTICE portmgrd: Ethernet0 link down\n"]]}
+    assert unused == [".*link up.*"]
+
+
+def test_rules_pushed_once(analyzer):
+    extracted_files = {analyzer.extracted_syslog: "/tmp/syslog.dut.1"}
+    rules_file, _ = analyzer._get_rules_file()
+
+    analyzer._analyze_on_dut(MARKER, extracted_files)
+    assert os.path.isfile(rules_file)
+    mtime = os.stat(rules_file).st_mtime_ns
+
+    analyzer._analyze_on_dut(MARKER, extracted_files)
+    assert os.stat(rules_file).st_mtime_ns == mtime
+
+    analyzer.ignore_regex.append(".*failed to set port.*")
+    result, _ = analyzer._analyze_on_dut(MARKER, extracted_files)
+    assert analyzer._get_rules_file()[0] != rules_file
+    assert result["/tmp/syslog.dut.1"][0] == []
@@ -0,0 +1,166 @@
+import importlib.util
+import json
+from pathlib import Path
+
+import pytest
+
+
+LOGANALYZER_DIR = Path(__file__).resolve().parents[3] / "plugins/loganalyzer"
+RUN_ID = "unit_test_streaming"
+START = "start-LogAnalyzer-" + RUN_ID
+END = "end-LogAnalyzer-" + RUN_ID
+
+
+def _line(message):
+    return "Jan  1 00:00:00.000000 sonic {}\n".format(message)
+
+
+ERR_BEFORE = _line("ERR swss#orchagent: :- doTask: failed before the start marker")
+ERR_IN = _line("ERR swss#orchagent: :- doTask: failed")
+ERR_IGNORED_RULE = _line("ERR snmp#snmp-subagent [ax_interface] ERROR: a ignored message")
+INFO_IN = _line("INFO swss#orchagent: :- setPort: done")
+EXPECTED = _line("NOTICE swss#portmgrd: Ethernet0 link down")
+ERR_AFTER = _line("ERR swss#orchagent: :- doTask: failed after the end marker")
+MARKERS_LOG = [ERR_BEFORE, _line("INFO " + START), ERR_IN, ERR_IGNORED_RULE, INFO_IN, EXPECTED,
+               _line("INFO " + END), ERR_AFTER]
+IGNORE_MARKERS_LOG = [
+    _line("INFO " + START),
+    _line("ERR swss#orchagent: :- doTask: failed 1"),
+    _line("INFO start-ignore-LogAnalyzer-first"),
+    _line("ERR swss#orchagent: :- doTask: failed in ignore 1"),
+    _line("INFO end-ignore-LogAnalyzer-first"),
+    _line("ERR swss#orchagent: :- doTask: failed 2"),
+    _line("INFO start-ignore-LogAnalyzer-second"),
+    _line("ERR swss#orchagent: :- doTask: failed in ignore 2"),
+    EXPECTED,
+    _line("INFO end-ignore-LogAnalyzer-second"),
+    _line("ERR swss#orchagent: :- doTask: failed 3"),
+    _line("INFO " + END),
+]
+NESTED_IGNORE_MARKERS_LOG = [
+    _line("INFO " + START),
+    _line("INFO start-ignore-LogAnalyzer-outer"),
+    _line("INFO start-ignore-LogAnalyzer-inner"),
+    ERR_IN,
+    _line("INFO end-ignore-LogAnalyzer-inner"),
+    _line("INFO end-ignore-LogAnalyzer-outer"),
+    _line("INFO " + END),
+]
+SAIREDIS_LOG = [
+    "2024-01-01.00:00:00.000000|c|SAI_OBJECT_TYPE_ROUTE_ENTRY:{}|SAI_ROUTE_ENTRY_ATTR_PACKET_ACTION=ERR\n".format(
+        "x" * 2000),
+    "2024-01-01.00:00:00.000001|E|SAI_OBJECT_TYPE_PORT:oid:0x1000000000002|SAI_STATUS_FAILURE .ERR\n",
+    "2024-01-01.00:00:00.000002|s|SAI_OBJECT_TYPE_PORT:oid:0x1000000000002|link down\n",
+]
+
+# -- name of the log file, content of the log file
+CASES = {
+    "markers": ("syslog", "".join(MARKERS_LOG)),
+    "missing_end_marker": ("syslog", "".join(MARKERS_LOG[:-2])),
+    "missing_start_marker": ("syslog", "".join(MARKERS_LOG[2:])),
+    "ignore_markers": ("syslog", "".join(IGNORE_MARKERS_LOG)),
+    "nested_ignore_markers": ("syslog", "".join(NESTED_IGNORE_MARKERS_LOG)),
+    "crlf": ("syslog", "".join(MARKERS_LOG).replace("\n", "\r\n")),
+    "sairedis_rec": ("sairedis.rec", "".join(SAIREDIS_LOG)),
+    "empty": ("syslog", ""),
+    "empty_sairedis_rec": ("sairedis.rec", ""),
+}
+
+
+@pytest.fixture(scope="module")
+def loganalyzer():
+    """Load the loganalyzer module shipped to the DUT, without the pytest plugin package."""
+    spec = importlib.util.spec_from_file_location("unit_target_system_msg_handler",
+                                                  LOGANALYZER_DIR / "system_msg_handler.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def rules_files(tmp_path):
+    expect_file = tmp_path / "expect.txt"
+    expect_file.write_text('r, ".*link down.*"\nr, "never logged"\n')
+    return [str(LOGANALYZER_DIR / "loganalyzer_common_match.txt"),
+            str(LOGANALYZER_DIR / "loganalyzer_common_ignore.txt"), str(expect_file)]
+
+
+def _analyze(loganalyzer, log_file, rules_files, mode):
+    """Analyze a log file, return the json result of the analysis or the exit code of the analyzer."""
+    analyzer = loganalyzer.AnsibleLogAnalyzer(RUN_ID, False, streaming=(mode != "legacy"))
+    regexes, messages = zip(*[analyzer.create_msg_regex([rules_file]) for rules_file in rules_files])
+    classifier = analyzer.create_classifier(*messages)
+    try:
+        if mode == "classifier":
+            result = analyzer.analyze_file_list([log_file], None, None, None, classifier=classifier)
+        else:
+            result = analyzer.analyze_file_list([log_file], *regexes)
+    except SystemExit as e:
+        return e.code
+    if mode != "classifier":
+        # -- Count the expect rules hit by the expected lines, like the classifier does while analyzing
+        for _, expected_lines in result.values():
+            for line in expected_lines:
+                classifier.classify(line)
+    return loganalyzer.get_json_result(result, classifier)
+
+
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_streaming_matches_legacy(tmp_path, loganalyzer, rules_files, case):
+    file_name, content = CASES[case]
+    log_file = tmp_path / file_name
+    log_file.write_bytes(content.encode())
+
+    legacy = _analyze(loganalyzer, str(log_file), rules_files, "legacy")
+    assert _analyze(loganalyzer, str(log_file), rules_files, "streaming") == legacy
+    assert _analyze(loganalyzer, str(log_file), rules_files, "classifier") == legacy
+
+
+def test_streaming_results(tmp_path, loganalyzer, rules_files):
+    """The cases above are not vacuous: they find lines, expected lines and marker errors."""
+    results = {}
+    for case, (file_name, content) in CASES.items():
+        log_file = tmp_path / case / file_name
+        log_file.parent.mkdir()
+        log_file.write_bytes(content.encode())
+        results[case] = _analyze(loganalyzer, str(log_file), rules_files, "streaming")
+
+    markers = results["markers"]["files"]
+    assert list(markers.values()) == [{"match": [ERR_IN], "expect": [EXPECTED]}]
+    assert list(results["crlf"]["files"].values()) == list(markers.values())
+    assert results["markers"]["unused_expected_regexp"] == ["never logged"]
+    assert list(results["ignore_markers"]["files"].values())[0]["match"] == [
+        _line("ERR swss#orchagent: :- doTask: failed {}".format(index)) for index in (1, 2, 3)]
+    assert results["missing_end_marker"] == loganalyzer.err_no_end_marker
+    assert results["missing_start_marker"] == loganalyzer.err_no_start_marker
+    assert results["nested_ignore_markers"] == loganalyzer.err_end_ignore_marker
+    assert results["empty"] == loganalyzer.err_no_start_marker
+    assert list(results["sairedis_rec"]["files"].values()) == [
+        {"match": [SAIREDIS_LOG[1]], "expect": [SAIREDIS_LOG[2]]}]
+    assert results["empty_sairedis_rec"]["total"] == {"match": 0, "expected_match": 0,
+                                                      "expected_missing_match": 2}
+
+
+@pytest.mark.parametrize("no_streaming", [False, True])
+def test_cli_no_streaming(tmp_path, loganalyzer, monkeypatch, capsys, no_streaming):
+    """--no_streaming makes the analyze_extracted action use the legacy analyzer, with the same result."""
+    log_file = tmp_path / "syslog"
+    log_file.write_text("".join(MARKERS_LOG[1:-1]))
+    rules_file = tmp_path / "rules.json"
+    rules_file.write_text('{"match": [" ERR "], "ignore": [".*a ignored message.*"],'
+                          ' "expect": [".*link down.*", "never logged"]}')
+    unused = "analyze_file_streaming" if no_streaming else "analyze_file"
+
+    def fail(*args, **kwargs):
+        raise AssertionError("{} called".format(unused))
+
+    monkeypatch.setattr(loganalyzer.AnsibleLogAnalyzer, unused, fail)
+    argv = ["-a", "analyze_extracted", "-r", RUN_ID, "-l", str(log_file), "--rules_file", str(rules_file)]
+    if no_streaming:
+        argv.append("--no_streaming")
+
+    assert loganalyzer.main(argv) == 0
+
+    result = json.loads(capsys.readouterr().out)
+    assert list(result["files"].values()) == [{"match": [ERR_IN], "expect": [EXPECTED]}]
+    assert result["unused_expected_regexp"] == ["never logged"]
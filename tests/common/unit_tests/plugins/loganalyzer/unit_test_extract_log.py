@@ -0,0 +1,142 @@
+import gzip
+import importlib.util
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+
+REPO_ROOT = Path(__file__).resolve().parents[5]
+MARKER = "start-LogAnalyzer-unit_test_marker_position.2024-01-01-00:00:00"
+
+
+def _load(name, path):
+    spec = importlib.util.spec_from_file_location(name, REPO_ROOT / path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="module")
+def extract_log_module():
+    return _load("unit_target_extract_log", "ansible/library/extract_log.py")
+
+
+@pytest.fixture(scope="module")
+def loganalyzer_module():
+    return _load("unit_target_system_msg_handler", "tests/common/plugins/loganalyzer/system_msg_handler.py")
+
+
+@pytest.fixture(autouse=True)
+def default_locale(monkeypatch):
+    # The legacy scan restores the current locale, which may not be installed on the test host
+    monkeypatch.setattr("locale.getlocale", lambda *args: (None, None))
+
+
+def _write_lines(path, start, count):
+    with open(path, "a") as f:
+        for i in range(start, start + count):
+            f.write("Jan  1 00:00:{:02d}.000000 sonic INFO process: message {}\n".format(i % 60, i))
+
+
+def _rotate(log_dir):
+    """Rotate like logrotate with delaycompress: syslog.N.gz -> syslog.N+1.gz,
+    syslog.1 -> syslog.2.gz, syslog -> syslog.1"""
+    names = sorted((name for name in os.listdir(log_dir) if name.endswith(".gz")), reverse=True)
+    for name in names:
+        index = int(name.split(".")[1])
+        os.rename(os.path.join(log_dir, name), os.path.join(log_dir, "syslog.{}.gz".format(index + 1)))
+    if os.path.exists(os.path.join(log_dir, "syslog.1")):
+        with open(os.path.join(log_dir, "syslog.1"), "rb") as src, \
+                gzip.open(os.path.join(log_dir, "syslog.2.gz"), "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(os.path.join(log_dir, "syslog.1"))
+    os.rename(os.path.join(log_dir, "syslog"), os.path.join(log_dir, "syslog.1"))
+    open(os.path.join(log_dir, "syslog"), "w").close()
+
+
+@pytest.mark.parametrize("rotations", [0, 1, 2, 3])
+def test_extract_from_recorded_position(tmp_path, extract_log_module, loganalyzer_module, rotations):
+    log_dir = tmp_path / "log"
+    log_dir.mkdir()
+    syslog = str(log_dir / "syslog")
+    state_file = str(tmp_path / "state.json")
+    _write_lines(syslog, 0, 100)
+    _rotate(str(log_dir))
+    _write_lines(syslog, 100, 100)
+
+    analyzer = loganalyzer_module.AnsibleLogAnalyzer("unit_test", False, state_file=state_file)
+    analyzer.record_marker_position(syslog, MARKER)
+    with open(syslog, "a") as f:
+        f.write("Jan  1 00:01:00.000000 sonic INFO {}\n".format(MARKER))
+    for i in range(rotations):
+        _write_lines(syslog, 200 + i * 100, 100)
+        _rotate(str(log_dir))
+    _write_lines(syslog, 1000, 10)
+
+    expected = str(tmp_path / "expected")
+    extract_log_module.extract_log(str(log_dir), "syslog", MARKER, expected)
+    position = extract_log_module.load_marker_position(state_file, str(log_dir), "syslog", MARKER)
+    assert position is not None
+    extracted = str(tmp_path / "extracted")
+    assert extract_log_module.extract_log_from_position(str(log_dir), "syslog", MARKER, extracted, state_file)
+
+    with open(expected) as f1, open(extracted) as f2:
+        expected_content = f1.read()
+        assert expected_content.startswith("Jan  1 00:01:00.000000 sonic INFO {}\n".format(MARKER))
+        assert f2.read() == expected_content
+
+
+def test_extract_falls_back_without_position(tmp_path, extract_log_module):
+    log_dir = tmp_path / "log"
+    log_dir.mkdir()
+    syslog = str(log_dir / "syslog")
+    _write_lines(syslog, 0, 10)
+    with open(syslog, "a") as f:
+        f.write("Jan  1 00:01:00.000000 sonic INFO {}\n".format(MARKER))
+    _write_lines(syslog, 10, 10)
+
+    extracted = str(tmp_path / "extracted")
+    assert not extract_log_module.extract_log_from_position(str(log_dir), "syslog", MARKER, extracted,
+                                                            str(tmp_path / "missing.json"))
+    extract_log_module.extract_log(str(log_dir), "syslog", MARKER, extracted,
+                                   state_file=str(tmp_path / "missing.json"))
+    with open(extracted) as f:
+        assert len(f.readlines()) == 11
+
+
+@pytest.mark.parametrize("content", [b"", b'{"start-LogAnalyzer-unit_test', b"\x00\xff garbage", b"[]",
+                                     b'{"start-LogAnalyzer-unit_test_marker_position.2024-01-01-00:00:00": 1}'])
+def test_extract_falls_back_with_corrupted_state_file(tmp_path, extract_log_module, content):
+    log_dir = tmp_path / "log"
+    log_dir.mkdir()
+    syslog = str(log_dir / "syslog")
+    _write_lines(syslog, 0, 10)
+    with open(syslog, "a") as f:
+        f.write("Jan  1 00:01:00.000000 sonic INFO {}\n".format(MARKER))
+    _write_lines(syslog, 10, 10)
+    state_file = tmp_path / "state.json"
+    state_file.write_bytes(content)
+
+    assert extract_log_module.load_marker_position(str(state_file), str(log_dir), "syslog", MARKER) is None
+    extracted = str(tmp_path / "extracted")
+    extract_log_module.extract_log(str(log_dir), "syslog", MARKER, extracted, state_file=str(state_file))
+    with open(extracted) as f:
+        assert len(f.readlines()) == 11
+
+
+@pytest.mark.parametrize("content", [b"", b"\x00\xff garbage", b"[]", b"[1, 2]", b"1", b"null", b'"marker"',
+                                     b'{"start-LogAnalyzer-unit_test_other": 1}'])
+def test_record_position_resets_corrupted_state_file(tmp_path, extract_log_module, loganalyzer_module, content):
+    log_dir = tmp_path / "log"
+    log_dir.mkdir()
+    syslog = str(log_dir / "syslog")
+    _write_lines(syslog, 0, 10)
+    state_file = tmp_path / "state.json"
+    state_file.write_bytes(content)
+
+    analyzer = loganalyzer_module.AnsibleLogAnalyzer("unit_test", False, state_file=str(state_file))
+    analyzer.record_marker_position(syslog, MARKER)
+    position = extract_log_module.load_marker_position(str(state_file), str(log_dir), "syslog", MARKER)
+    assert position["offset"] == os.path.getsize(syslog)
@@ -0,0 +1,76 @@
+import importlib.util
+import re
+from pathlib import Path
+
+import pytest
+
+
+LOGANALYZER_DIR = Path(__file__).resolve().parents[3] / "plugins/loganalyzer"
+
+
+@pytest.fixture(scope="module")
+def loganalyzer():
+    """Load the loganalyzer module shipped to the DUT, without the pytest plugin package."""
+    spec = importlib.util.spec_from_file_location("unit_target_system_msg_handler",
+                                                  LOGANALYZER_DIR / "system_msg_handler.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="module")
+def common_rules(loganalyzer):
+    analyzer = loganalyzer.AnsibleLogAnalyzer("unit_test", False)
+    return [analyzer.create_msg_regex([str(LOGANALYZER_DIR / "loganalyzer_common_{}.txt".format(kind))])[1]
+            for kind in ("match", "ignore")]
+
+
+@pytest.mark.parametrize("regex, literals", [
+    (".* ERR syncd\\d*#syncd:.*SAI_LOG.*", [" ERR syncd"]),
+    ("kernel:.*Oops", ["kernel:"]),
+    (".*(?:ntpd|chronyd) failed.*", [" failed"]),
+    ("(?:sonic_syncd|orchagent) restarted", [" restarted"]),
+    ("(?:sonic_syncd|orchagent)", ["orchagent", "sonic_syncd"]),
+    ("(?i)kernel panic", None),
+    ("\\d+", None),
+])
+def test_get_required_literals(loganalyzer, regex, literals):
+    assert loganalyzer.MessageClassifier.get_required_literals(regex) == literals
+
+
+def test_classify_matches_combined_regex(loganalyzer, common_rules):
+    match_regex, ignore_regex = common_rules
+    analyzer = loganalyzer.AnsibleLogAnalyzer("unit_test", False)
+    classifier = analyzer.create_classifier(match_regex, ignore_regex, [])
+    combined_match = re.compile("|".join(match_regex))
+    combined_ignore = re.compile("|".join(ignore_regex))
+
+    lines = [
+        "Jan 01 00:00:01.000000 sonic ERR swss#orchagent: :- doTask: failed\n",
+        "Jan 01 00:00:01.000000 sonic ERR snmp#snmp-subagent [ax_interface] ERROR\n",
+        "Jan 01 00:00:01.000000 sonic INFO kernel: [1.0] Oops: 0000 [#1] SMP\n",
+        "Jan 01 00:00:01.000000 sonic NOTICE swss#orchagent: :- setPort: done\n",
+        "Jan 01 00:00:01.000000 sonic ERR monit[123]: 'routeCheck' status failed (255)\n",
+    ]
+    for line in lines:
+        _, match_ids, ignore_ids = classifier.classify(line)
+        expected = analyzer.line_matches(line, combined_match, combined_ignore)
+        assert (bool(match_ids) and not ignore_ids) == expected, line
+
+
+def test_unused_expect_regexes(loganalyzer):
+    analyzer = loganalyzer.AnsibleLogAnalyzer("unit_test", False)
+    classifier = analyzer.create_classifier([" ERR "], [], [".*link down.*", ".*link up.*", "reboot"])
+
+    assert classifier.classify("sonic ERR portmgrd: Ethernet0 link down\n") == ([0], [], [])
+    assert classifier.classify("sonic ERR portmgrd: Ethernet0 admin down\n") == ([], [0], [])
+    assert classifier.hit_counts[classifier.EXPECT] == [1, 0, 0]
+    assert classifier.get_unused_expect_regexes() == [".*link up.*", "reboot"]
+
+
+def test_expect_match_start_for_advanced_reboot(loganalyzer):
+    analyzer = loganalyzer.AnsibleLogAnalyzer("test_advanced_reboot_test_1", False)
+    classifier = analyzer.create_classifier([], [], ["link down"])
+
+    assert classifier.classify("sonic portmgrd: link down\n")[0] == []
+    assert classifier.classify("link down on Ethernet0\n")[0] == [0]
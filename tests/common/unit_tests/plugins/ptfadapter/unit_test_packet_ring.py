@@ -0,0 +1,245 @@
+"""Unit test for ``tests/common/plugins/ptfadapter/packet_ring.py``.
+
+A real PTF dataplane thread receives the packets of ports built on unix datagram socket pairs (a custom PTF port
+class), so the BPF filters run in the kernel like on the sockets of local interfaces.
+
+The module is loaded from its file, the ptfadapter package requires nnpy to connect to ptf_nn_agent.
+
+Run with::
+
+    python3 -m pytest --noconftest \\
+        tests/common/unit_tests/plugins/ptfadapter/unit_test_packet_ring.py -v
+"""
+import importlib.util
+import os
+import select
+import socket
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("ptf.mask")
+
+import ptf  # noqa: E402
+import ptf.mask as mask  # noqa: E402
+import ptf.packet as packet  # noqa: E402
+import ptf.testutils as testutils  # noqa: E402
+from ptf.dataplane import DataPlane, match_exp_pkt  # noqa: E402
+
+from tests.common.unit_tests.ptf_helpers import FakePtfTest, SocketPairPort  # noqa: E402
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../../.."))
+_spec = importlib.util.spec_from_file_location(
+    "packet_ring", os.path.join(REPO_ROOT, "tests/common/plugins/ptfadapter/packet_ring.py"))
+packet_ring = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(packet_ring)
+
+RxFilter = packet_ring.RxFilter
+
+
+@pytest.fixture
+def dataplane():
+    dp = DataPlane(config={"platform": "socketpair", "dataplane": {"portclass": SocketPairPort}, "qlen": 1000})
+    for port in range(4):
+        dp.port_add("port{}".format(port), 0, port)
+    packet_ring.install_packet_rings(dp)
+    try:
+        yield dp
+    finally:
+        dp.kill()
+
+
+def inject(dp, port, pkts, wait=True):
+    """Inject packets to a port and wait until the dataplane thread read them."""
+    for pkt in pkts:
+        dp.ports[(0, port)].inject(pkt)
+    deadline = time.time() + 5
+    while wait and time.time() < deadline:
+        readable, _, _ = select.select([dp.ports[(0, port)].socket], [], [], 0)
+        if not readable:
+            break
+        time.sleep(0.01)
+    # The dataplane thread queues the packets it read under the condition variable
+    with dp.cvar:
+        pass
+
+
+def tcp_packet(index, **kwargs):
+    return testutils.simple_tcp_packet(ip_src="10.0.{}.{}".format(index // 256, index % 256), ip_dst="192.168.0.1",
+                                       tcp_dport=80 + index % 4, **kwargs)
+
+
+def expected_packets():
+    masked = mask.Mask(tcp_packet(1))
+    masked.set_do_not_care_packet(packet.IP, "src")
+    masked.set_do_not_care_packet(packet.IP, "chksum")
+    masked.set_do_not_care_packet(packet.TCP, "chksum")
+    headers = mask.Mask(tcp_packet(2), ignore_extra_bytes=True)
+    headers.set_do_not_care_packet(packet.Ether, "dst")
+    vlan = mask.Mask(tcp_packet(3, dl_vlan_enable=True, vlan_vid=100))
+    vlan.set_do_not_care_packet(packet.IP, "ttl")
+    vlan.set_do_not_care_packet(packet.IP, "chksum")
+    return [tcp_packet(5), masked, headers, vlan, packet.Ether(dst="00:11:22:33:44:55", type=0x88cc) / b"lldp"]
+
+
+def candidate_packets():
+    pkts = [tcp_packet(index) for index in range(8)]
+    pkts.append(tcp_packet(2) / b"extra")
+    pkts.append(tcp_packet(3, dl_vlan_enable=True, vlan_vid=100, ip_ttl=10))
+    pkts.append(tcp_packet(3, dl_vlan_enable=True, vlan_vid=200))
+    pkts.append(packet.Ether(dst="00:11:22:33:44:55", type=0x88cc) / b"lldp")
+    pkts.append(packet.Ether(dst="00:11:22:33:44:55", type=0x88cc) / b"lldp" / (b"\x00" * 40))
+    pkts.append(bytes(tcp_packet(5))[:20])
+    return [bytes(pkt) for pkt in pkts]
+
+
+def test_rx_filter_matches_like_ptf():
+    for exp_pkt in expected_packets():
+        rx_filter = RxFilter.from_packet(exp_pkt)
+        for pkt in candidate_packets():
+            assert rx_filter.match(pkt) == match_exp_pkt(exp_pkt, pkt)
+
+
+def test_rx_filter_headers_only():
+    # The Ethernet header only
+    rx_filter = RxFilter.from_packet(tcp_packet(1), length=14)
+    assert rx_filter.match(bytes(tcp_packet(1) / b"more payload"))
+    assert rx_filter.match(bytes(tcp_packet(2)))
+    assert not rx_filter.match(bytes(tcp_packet(1, eth_dst="00:11:22:33:44:55")))
+    assert not rx_filter.match(bytes(tcp_packet(1))[:10])
+
+
+def test_rx_filter_bpf_program():
+    for exp_pkt in expected_packets():
+        rx_filter = RxFilter.from_packet(exp_pkt)
+        receiver, sender = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        with receiver, sender:
+            rx_filter.attach(receiver)
+            receiver.setblocking(False)
+            for pkt in candidate_packets():
+                sender.send(pkt)
+            received = []
+            while True:
+                try:
+                    received.append(receiver.recv(9216))
+                except BlockingIOError:
+                    break
+        assert received == [pkt for pkt in candidate_packets() if rx_filter.match(pkt)]
+
+
+def test_rx_filter_kernel_safe():
+    assert RxFilter.from_packet(tcp_packet(1)).kernel_safe
+    assert RxFilter(b"\x00\x11\x22\x33\x44\x55").kernel_safe
+    assert not RxFilter.from_packet(tcp_packet(1, dl_vlan_enable=True, vlan_vid=10)).kernel_safe
+    dont_care_type = mask.Mask(tcp_packet(1))
+    dont_care_type.set_do_not_care_packet(packet.Ether, "type")
+    assert not RxFilter.from_packet(dont_care_type).kernel_safe
+
+
+def test_ring_overflow(dataplane):
+    dataplane.set_qlen(5)
+    inject(dataplane, 1, [tcp_packet(index) for index in range(8)])
+    ring = dataplane.packet_queues[(0, 1)]
+    assert isinstance(ring, packet_ring.PacketRing)
+    assert [pkt for pkt, _ in ring] == [bytes(tcp_packet(index)) for index in range(3, 8)]
+    stats = packet_ring.rx_stats(dataplane, [(0, 1)])[(0, 1)]
+    assert (stats["packets"], stats["overflow"], stats["queued"], stats["max_queued"]) == (8, 3, 5, 5)
+
+    # A packet rejected by the filter does not discard a queued packet
+    packet_ring.set_rx_filter(dataplane, RxFilter.from_packet(tcp_packet(9)), [(0, 1)], kernel=False)
+    inject(dataplane, 1, [tcp_packet(10), tcp_packet(9)])
+    assert [pkt for pkt, _ in ring] == [bytes(tcp_packet(index)) for index in (4, 5, 6, 7, 9)]
+    stats = packet_ring.rx_stats(dataplane, [(0, 1)], reset=True)[(0, 1)]
+    assert (stats["filtered"], stats["overflow"]) == (1, 4)
+    assert packet_ring.rx_stats(dataplane, [(0, 1)])[(0, 1)]["packets"] == 0
+
+
+def test_ptf_testutils_on_rings(dataplane, monkeypatch):
+    monkeypatch.setitem(ptf.config, "relax", True)
+    test = FakePtfTest(dataplane)
+    inject(dataplane, 0, [tcp_packet(index) for index in range(3)])
+    inject(dataplane, 2, [tcp_packet(7)])
+    testutils.verify_packet(test, tcp_packet(1), 0, timeout=1)
+    # The packets before the matching one were discarded by the poll
+    assert [pkt for pkt, _ in dataplane.packet_queues[(0, 0)]] == [bytes(tcp_packet(2))]
+    assert dataplane.packet_queues[(0, 0)][:] == [(bytes(tcp_packet(2)), dataplane.packet_queues[(0, 0)][0][1])]
+    assert testutils.verify_packet_any_port(test, tcp_packet(7), [1, 2], timeout=1) == (1, bytes(tcp_packet(7)))
+    testutils.verify_no_packet(test, tcp_packet(7), 2, timeout=0.1)
+    inject(dataplane, 0, [tcp_packet(1)])
+    dataplane.flush()
+    assert len(dataplane.packet_queues[(0, 0)]) == 0
+    assert isinstance(dataplane.packet_queues[(0, 0)], packet_ring.PacketRing)
+
+
+def test_port_add(dataplane):
+    dataplane.port_add("port9", 0, 9)
+    assert isinstance(dataplane.packet_queues[(0, 9)], packet_ring.PacketRing)
+    inject(dataplane, 9, [tcp_packet(1)])
+    assert [rx_pkt.port for rx_pkt in packet_ring.recv_batch(dataplane, [(0, 9)])] == [9]
+
+
+def test_recv_batch(dataplane):
+    for index in range(12):
+        inject(dataplane, index % 3, [tcp_packet(index)])
+    assert packet_ring.recv_batch(dataplane, [(0, 3)]) == []
+
+    batch = packet_ring.recv_batch(dataplane, [(0, 0), (0, 1), (0, 2)], count=5)
+    assert [(rx_pkt.port, rx_pkt.packet) for rx_pkt in batch] == [
+        (index % 3, bytes(tcp_packet(index))) for index in range(5)]
+    batch = packet_ring.recv_batch(dataplane)
+    assert [(rx_pkt.port, rx_pkt.packet) for rx_pkt in batch] == [
+        (index % 3, bytes(tcp_packet(index))) for index in range(5, 12)]
+    assert all(len(queue) == 0 for queue in dataplane.packet_queues.values())
+
+
+def test_recv_batch_waits(dataplane):
+    def send():
+        for index in range(10):
+            time.sleep(0.02)
+            inject(dataplane, 1, [tcp_packet(index)], wait=False)
+
+    thread = threading.Thread(target=send)
+    thread.start()
+    start = time.time()
+    batch = packet_ring.recv_batch(dataplane, [(0, 1)], count=10, timeout=10)
+    thread.join()
+    assert len(batch) == 10
+    assert time.time() - start < 5
+
+    start = time.time()
+    assert packet_ring.recv_batch(dataplane, [(0, 1)], count=1, timeout=0.2) == []
+    assert time.time() - start >= 0.2
+
+
+@pytest.mark.parametrize("kernel", [True, False])
+def test_set_rx_filter(dataplane, kernel):
+    exp_pkt = mask.Mask(tcp_packet(0))
+    exp_pkt.set_do_not_care_packet(packet.IP, "src")
+    exp_pkt.set_do_not_care_packet(packet.IP, "chksum")
+    exp_pkt.set_do_not_care_packet(packet.TCP, "chksum")
+    exp_pkt.set_do_not_care_packet(packet.TCP, "dport")
+    in_kernel = packet_ring.set_rx_filter(dataplane, RxFilter.from_packet(exp_pkt), [(0, 1)], kernel=kernel)
+    assert in_kernel == ([(0, 1)] if kernel else [])
+    noise = packet.Ether(dst="01:80:c2:00:00:0e", type=0x88cc) / (b"\x00" * 50)
+    inject(dataplane, 1, [noise, tcp_packet(1), noise, tcp_packet(2), testutils.simple_udp_packet()])
+    assert [rx_pkt.packet for rx_pkt in packet_ring.recv_batch(dataplane, [(0, 1)])] == [
+        bytes(tcp_packet(1)), bytes(tcp_packet(2))]
+    assert packet_ring.rx_stats(dataplane, [(0, 1)])[(0, 1)]["filtered"] == (0 if kernel else 3)
+
+    packet_ring.set_rx_filter(dataplane, None, [(0, 1)])
+    inject(dataplane, 1, [noise])
+    assert len(packet_ring.recv_batch(dataplane, [(0, 1)])) == 1
+
+
+def test_rx_stats_rates():
+    counters = packet_ring.PortCounters()
+    assert counters.snapshot()["pps"] == 0.0
+    ring = packet_ring.PacketRing(None)
+    for index in range(11):
+        ring.append((b"x" * 100, 10.0 + index * 0.1))
+    stats = ring.counters.snapshot(len(ring))
+    assert stats["packets"] == 11
+    assert stats["bytes"] == 1100
+    assert stats["pps"] == pytest.approx(10.0)
+    assert stats["bps"] == pytest.approx(8800.0)
@@ -0,0 +1,77 @@
+"""Helpers of the unit tests and benchmarks running a real PTF dataplane without a testbed.
+
+The ports of the dataplane are unix datagram socket pairs (SocketPairPort, a custom PTF port class), or veth pairs
+with the local platform of PTF. Creating veth pairs requires root and iproute2.
+"""
+import socket
+import subprocess
+import time
+
+from ptf.base_tests import BaseTest
+
+PTF_MAC = "00:00:00:00:00:01"
+
+
+class SocketPairPort(object):
+    """
+    PTF port on a unix datagram socket pair.
+
+    The packets sent by the dataplane are received on the peer socket, the packets injected into the peer socket
+    are received by the dataplane. Use it with the config
+    {"platform": "socketpair", "dataplane": {"portclass": SocketPairPort}}.
+    """
+
+    def __init__(self, interface_name, device_number, port_number, config={}):
+        self.device_number = device_number
+        self.port_number = port_number
+        self.socket, self.peer = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+
+    def fileno(self):
+        return self.socket.fileno()
+
+    def recv(self):
+        return (self.device_number, self.port_number, self.socket.recv(9216), time.time())
+
+    def get_packet_source(self):
+        return self
+
+    def send(self, pkt):
+        return self.socket.send(pkt)
+
+    def inject(self, pkt):
+        self.peer.send(bytes(pkt))
+
+    def mac(self):
+        return PTF_MAC
+
+
+class FakePtfTest(BaseTest):
+    """PTF test sending and verifying the packets on a dataplane, for the testutils functions."""
+
+    def __init__(self, dataplane):
+        self.runTest = lambda: None
+        super(FakePtfTest, self).__init__()
+        self.dataplane = dataplane
+
+
+def veth_names(prefix, port):
+    """Names of the two ends of the veth pair of a port."""
+    return "{}{}a".format(prefix, port), "{}{}b".format(prefix, port)
+
+
+def create_veths(prefix, ports):
+    """Create the veth pairs of the ports, replacing the leftovers of a previous run."""
+    for port in ports:
+        names = veth_names(prefix, port)
+        subprocess.run(["ip", "link", "del", names[0]], stderr=subprocess.DEVNULL)
+        subprocess.check_call(["ip", "link", "add", names[0], "type", "veth", "peer", "name", names[1]])
+        for name in names:
+            # No IPv6 neighbor discovery or router solicitation on the test ports
+            subprocess.run(["sysctl", "-qw", "net.ipv6.conf.{}.disable_ipv6=1".format(name)],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            subprocess.check_call(["ip", "link", "set", name, "up"])
+
+
+def delete_veths(prefix, ports):
+    for port in ports:
+        subprocess.run(["ip", "link", "del", veth_names(prefix, port)[0]], stderr=subprocess.DEVNULL)
@@ -0,0 +1,288 @@
+"""Unit test for ``ansible/roles/test/files/ptftests/probe_batch.py``.
+
+A real PTF dataplane sends and receives the probes, a router emulated by a thread forwards them between the other
+ends of the ports to the members of an ECMP group. The ports are unix datagram socket pairs (a custom PTF port
+class), or veth pairs with the local platform of PTF when run as root.
+
+The module is loaded from its file, like PTF loads it from the ptftests directory.
+
+Run with::
+
+    python3 -m pytest --noconftest \\
+        tests/common/unit_tests/ptftests/unit_test_probe_batch.py -v
+"""
+import importlib.util
+import os
+import select
+import shutil
+import socket
+import threading
+import time
+import zlib
+
+import pytest
+
+pytest.importorskip("ptf.mask")
+
+import ptf.mask as mask  # noqa: E402
+import ptf.packet as packet  # noqa: E402
+import ptf.testutils as testutils  # noqa: E402
+from ptf.dataplane import DataPlane  # noqa: E402
+
+from tests.common.unit_tests.ptf_helpers import (  # noqa: E402
+    PTF_MAC, FakePtfTest, SocketPairPort, create_veths, delete_veths, veth_names)
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../.."))
+_spec = importlib.util.spec_from_file_location(
+    "probe_batch", os.path.join(REPO_ROOT, "ansible/roles/test/files/ptftests/probe_batch.py"))
+probe_batch = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(probe_batch)
+
+ProbeBatch = probe_batch.ProbeBatch
+
+ROUTER_MAC = "00:aa:bb:cc:dd:01"
+SRC_PORT = 0
+ECMP_PORTS = [1, 2, 3]
+VETH_PREFIX = "ptfprobe"
+
+
+class FakeRouter(threading.Thread):
+    """Routes the IP packets received on any socket to the ECMP port selected by a hash of the flow."""
+
+    def __init__(self, sockets):
+        super(FakeRouter, self).__init__()
+        self.daemon = True
+        self.sockets = sockets
+        self.stopped = False
+        self.received = 0
+        self.lost = set()
+        self.dropped_dst = set()
+        self.egress = {}
+
+    def stop(self):
+        self.stopped = True
+        self.join()
+
+    def run(self):
+        ports = {sock: port for port, sock in self.sockets.items()}
+        while not self.stopped:
+            readable, _, _ = select.select(list(ports), [], [], 0.05)
+            for sock in readable:
+                raw, address = sock.recvfrom(9216)
+                # The packet sockets of the veth also capture the packets sent on them
+                if isinstance(address, tuple) and address[2] == socket.PACKET_OUTGOING:
+                    continue
+                self.forward(raw)
+
+    def forward(self, raw):
+        pkt = packet.Ether(raw)
+        if pkt.dst != ROUTER_MAC or (packet.IP not in pkt and packet.IPv6 not in pkt):
+            return
+        self.received += 1
+        if self.received in self.lost:
+            return
+        if packet.IP in pkt:
+            layer = pkt[packet.IP]
+            layer.ttl -= 1
+            del layer.chksum
+        else:
+            layer = pkt[packet.IPv6]
+            layer.hlim -= 1
+        if layer.dst in self.dropped_dst:
+            return
+        flow = (layer.src, layer.dst)
+        if packet.TCP in pkt:
+            flow += (pkt[packet.TCP].sport, pkt[packet.TCP].dport)
+        port = ECMP_PORTS[zlib.crc32(repr(flow).encode()) % len(ECMP_PORTS)]
+        self.egress[flow] = port
+        pkt.src = ROUTER_MAC
+        pkt.dst = PTF_MAC
+        self.sockets[port].send(bytes(pkt))
+
+
+@pytest.fixture
+def socketpair_setup():
+    dp = DataPlane(config={"platform": "socketpair", "dataplane": {"portclass": SocketPairPort}, "qlen": 1000})
+    for port in [SRC_PORT] + ECMP_PORTS:
+        dp.port_add("port{}".format(port), 0, port)
+    router = FakeRouter({port: dp.ports[(0, port)].peer for port in [SRC_PORT] + ECMP_PORTS})
+    router.start()
+    try:
+        yield FakePtfTest(dp), router
+    finally:
+        router.stop()
+        dp.kill()
+
+
+@pytest.fixture
+def veth_setup():
+    if os.geteuid() != 0 or shutil.which("ip") is None:
+        pytest.skip("Requires root and iproute2 to create veth pairs")
+    ports = [SRC_PORT] + ECMP_PORTS
+    create_veths(VETH_PREFIX, ports)
+    dp = None
+    router = None
+    try:
+        sockets = {}
+        for port in ports:
+            sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(0x0003))
+            sock.bind((veth_names(VETH_PREFIX, port)[1], 0))
+            sockets[port] = sock
+        router = FakeRouter(sockets)
+        router.start()
+        dp = DataPlane(config={"platform": "local", "qlen": 1000})
+        for port in ports:
+            dp.port_add(veth_names(VETH_PREFIX, port)[0], 0, port)
+        yield FakePtfTest(dp), router
+    finally:
+        if router:
+            router.stop()
+        if dp:
+            dp.kill()
+        delete_veths(VETH_PREFIX, ports)
+
+
+def route_pkts(index, ipv6=False, pktlen=200):
+    """Packet to the router and masked expected packet, built like FibTest.create_ipv4_pkts"""
+    sport = 1024 + index
+    if ipv6:
+        pkt = testutils.simple_tcpv6_packet(pktlen=pktlen, eth_dst=ROUTER_MAC, eth_src=PTF_MAC,
+                                            ipv6_src="2000:30::1", ipv6_dst="2001:db8::1", tcp_sport=sport,
+                                            tcp_dport=80, ipv6_hlim=64)
+        exp_pkt = testutils.simple_tcpv6_packet(pktlen=pktlen, ipv6_src="2000:30::1", ipv6_dst="2001:db8::1",
+                                                tcp_sport=sport, tcp_dport=80, ipv6_hlim=63)
+    else:
+        pkt = testutils.simple_tcp_packet(pktlen=pktlen, eth_dst=ROUTER_MAC, eth_src=PTF_MAC, ip_src="30.0.0.1",
+                                          ip_dst="192.168.0.1", tcp_sport=sport, tcp_dport=80, ip_ttl=64)
+        exp_pkt = testutils.simple_tcp_packet(pktlen=pktlen, ip_src="30.0.0.1", ip_dst="192.168.0.1",
+                                              tcp_sport=sport, tcp_dport=80, ip_ttl=63)
+    masked_exp_pkt = mask.Mask(exp_pkt)
+    masked_exp_pkt.set_do_not_care_packet(packet.Ether, "dst")
+    masked_exp_pkt.set_do_not_care_packet(packet.Ether, "src")
+    return pkt, masked_exp_pkt
+
+
+def add_probes(batch, count, ipv6=False):
+    for index in range(count):
+        pkt, masked_exp_pkt = route_pkts(index, ipv6=ipv6)
+        batch.add(SRC_PORT, pkt, masked_exp_pkt, ECMP_PORTS, context=index)
+
+
+def check_probes(batch, router, count):
+    probes = batch.run()
+    assert len(probes) == count
+    for probe in probes:
+        layer = packet.Ether(probe.rcvd_pkt).payload
+        flow = (layer.src, layer.dst, probe.pkt[packet.TCP].sport, probe.pkt[packet.TCP].dport)
+        assert probe.rcvd_port == router.egress[flow]
+        assert packet.Ether(probe.rcvd_pkt).src == ROUTER_MAC
+    hit_count_map = batch.hit_count_map()
+    assert sum(hit_count_map.values()) == count
+    assert set(hit_count_map) == set(ECMP_PORTS)
+
+
+def test_stamp_signature():
+    signature = b"\x01" * probe_batch.SIGNATURE_SIZE
+    pkts = [testutils.simple_tcp_packet(pktlen=100), testutils.simple_tcpv6_packet(pktlen=100),
+            testutils.simple_tcp_packet(pktlen=100, dl_vlan_enable=True, vlan_vid=10),
+            testutils.simple_ipv4ip_packet(inner_frame=testutils.simple_tcp_packet(pktlen=100)[packet.IP])]
+    for pkt in pkts:
+        length = len(pkt)
+        probe_batch.stamp_signature(pkt, signature)
+        raw = bytes(pkt)
+        assert len(raw) == length
+        assert raw.count(signature) == 1
+        assert packet.Ether(raw)[packet.TCP].load.startswith(signature)
+    with pytest.raises(ValueError):
+        probe_batch.stamp_signature(packet.Ether() / packet.IP() / packet.TCP(), signature)
+
+
+def test_probe_match_like_mask():
+    pkt, masked_exp_pkt = route_pkts(1)
+    headers = mask.Mask(route_pkts(1)[1].exp_pkt, ignore_extra_bytes=True)
+    probes = [probe_batch.Probe(0, SRC_PORT, pkt, exp_pkt, ECMP_PORTS)
+              for exp_pkt in (masked_exp_pkt, headers, masked_exp_pkt.exp_pkt)]
+    forwarded = packet.Ether(bytes(masked_exp_pkt.exp_pkt))
+    forwarded.src = ROUTER_MAC
+    ttl = forwarded.copy()
+    ttl[packet.IP].ttl = 10
+    candidates = [bytes(masked_exp_pkt.exp_pkt), bytes(forwarded), bytes(ttl), bytes(forwarded) + b"extra",
+                  bytes(forwarded)[:60], bytes(route_pkts(2)[1].exp_pkt), bytes(pkt)]
+    for probe in probes:
+        for candidate in candidates:
+            expected = probe.exp_pkt.pkt_match(candidate) if isinstance(probe.exp_pkt, mask.Mask) \
+                else candidate == bytes(probe.exp_pkt)
+            assert probe.match(candidate) == expected
+
+
+def test_batch_receives_all_probes(socketpair_setup):
+    test, router = socketpair_setup
+    batch = ProbeBatch(test, burst_size=64)
+    add_probes(batch, 300)
+    add_probes(batch, 100, ipv6=True)
+    check_probes(batch, router, 400)
+    assert batch.duplicates == 0
+    assert batch.unexpected == []
+    assert all(probe.sent == 1 for probe in batch.probes)
+
+
+def test_batch_sends_lost_probes_again(socketpair_setup):
+    test, router = socketpair_setup
+    router.lost = {5, 50, 51}
+    batch = ProbeBatch(test, burst_size=32, timeout=0.5)
+    add_probes(batch, 100)
+    check_probes(batch, router, 100)
+    assert sorted(probe.index for probe in batch.probes if probe.sent == 2) == [4, 49, 50]
+
+
+def test_batch_missing_probes(socketpair_setup):
+    test, router = socketpair_setup
+    router.dropped_dst = {"192.168.0.1"}
+    batch = ProbeBatch(test, burst_size=16, timeout=0.3, retries=1)
+    add_probes(batch, 20)
+    start = time.time()
+    with pytest.raises(AssertionError, match="20 of 20 probes were not received"):
+        batch.run()
+    assert time.time() - start < 5
+    assert all(probe.sent == 2 for probe in batch.probes)
+    assert batch.hit_count_map() == {}
+
+
+def test_batch_expected_drop(socketpair_setup):
+    test, router = socketpair_setup
+    router.dropped_dst = {"192.168.0.1"}
+    batch = ProbeBatch(test, negative_timeout=0.2)
+    add_probes(batch, 20)
+    batch.run(expect_received=False)
+    assert all(probe.sent == 1 for probe in batch.probes)
+
+    router.dropped_dst = set()
+    batch = ProbeBatch(test, negative_timeout=0.2)
+    add_probes(batch, 20)
+    with pytest.raises(AssertionError, match="20 of 20 probes were received while expected to be dropped"):
+        batch.run(expect_received=False)
+
+
+def test_batch_ignores_other_packets(socketpair_setup):
+    test, router = socketpair_setup
+    # Probes of another batch and packets without signature, received before the batch
+    other = ProbeBatch(test)
+    add_probes(other, 10)
+    for probe in other.probes:
+        test.dataplane.ports[(0, 1)].peer.send(probe.raw)
+    noise = bytes(packet.Ether(dst=PTF_MAC, type=0x88cc) / (b"\x00" * 60))
+    test.dataplane.ports[(0, 2)].peer.send(noise)
+    batch = ProbeBatch(test, burst_size=8)
+    add_probes(batch, 50)
+    test.dataplane.ports[(0, 3)].peer.send(noise)
+    check_probes(batch, router, 50)
+    assert batch.unexpected == []
+
+
+def test_batch_on_veth_pairs(veth_setup):
+    test, router = veth_setup
+    batch = ProbeBatch(test, burst_size=128)
+    add_probes(batch, 400)
+    add_probes(batch, 100, ipv6=True)
+    check_probes(batch, router, 500)
+    assert batch.unexpected == []
@@ -0,0 +1,283 @@
+"""Unit test for ``tests/common/sai_validation/db_event_store.py`` and the waiters of ``sonic_db.py``.
+
+The gNMI subscription is stood in by a fake stream generating the events of subscribe_gnmi, run by the real
+subscription thread of start_db_monitor.
+
+Run with::
+
+    python3 -m pytest --noconftest \\
+        tests/common/unit_tests/sai_validation/unit_test_db_event_store.py -v
+"""
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pytest
+
+from tests.common.sai_validation import sonic_db, sonic_internal
+from tests.common.sai_validation.db_event_store import DbEventStore, merge_value, table_of
+
+
+def acl_entry(index):
+    return "SAI_OBJECT_TYPE_ACL_ENTRY:oid:0x8000000000{:04x}".format(index)
+
+
+def acl_entry_fields(index):
+    return {"SAI_ACL_ENTRY_ATTR_TABLE_ID": "oid:0x7000000000a01", "SAI_ACL_ENTRY_ATTR_PRIORITY": str(index),
+            "SAI_ACL_ENTRY_ATTR_ACTION_PACKET_ACTION": "SAI_PACKET_ACTION_DROP"}
+
+
+def acl_updates(indexes, parts=False):
+    """Events of ACL entries created in ASIC_DB, with parts the fields of a key are first sent partially."""
+    for index in indexes:
+        fields = acl_entry_fields(index)
+        yield {"SAI_OBJECT_TYPE_ACL_COUNTER:oid:0x9000000000{:04x}".format(index): {
+            "SAI_ACL_COUNTER_ATTR_TABLE_ID": fields["SAI_ACL_ENTRY_ATTR_TABLE_ID"]}}
+        if parts:
+            yield {acl_entry(index): {"SAI_ACL_ENTRY_ATTR_TABLE_ID": fields["SAI_ACL_ENTRY_ATTR_TABLE_ID"]}}
+        yield {acl_entry(index): fields}
+
+
+class FakeGnmiStream(object):
+    """Generator of the events of a gNMI subscription, fed by the test and read by the subscription thread."""
+
+    def __init__(self):
+        self.values = queue.Queue()
+        self.cancelled = threading.Event()
+
+    def send(self, values):
+        for value in values:
+            self.values.put(value)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def __iter__(self):
+        yield {"type": "sync_response", "message": "Synchronization complete."}
+        while not self.cancelled.is_set():
+            try:
+                value = self.values.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            if value is None:
+                yield {"type": "error", "message": "gNMI Subscribe: fake error"}
+            else:
+                yield {"type": "update", "path": "ASIC_DB/localhost/ASIC_STATE", "value": value,
+                       "value_type": "JSON_IETF"}
+
+
+class FakeGnmiClient(object):
+    """The functions of gnmi_client used by sonic_db and sonic_internal, over a FakeGnmiStream."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.get_paths = []
+
+    def new_subscribe_call(self, stub, paths, subscription_mode=1, origin="sonic-db"):
+        return self.stream
+
+    def subscribe_gnmi(self, call, stop_event=None, event_queue=None):
+        for event in call:
+            if stop_event and stop_event.is_set():
+                break
+            event_queue.put(event)
+
+    def get_gnmi_path(self, path_str):
+        return path_str
+
+    def get_request(self, stub, path):
+        self.get_paths.append(path)
+        return [acl_entry_fields(int(path[-4:], 16))]
+
+
+@pytest.fixture
+def stream(monkeypatch):
+    stream = FakeGnmiStream()
+    client = FakeGnmiClient(stream)
+    monkeypatch.setattr(sonic_db, "_sonic_internal", sonic_internal)
+    monkeypatch.setattr(sonic_db, "_gnmi_client", client)
+    monkeypatch.setattr(sonic_internal, "_gnmi_client", client)
+    return stream
+
+
+@pytest.fixture
+def monitor(stream):
+    store = DbEventStore()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        ctx = sonic_db.start_db_monitor(executor, object(), "ASIC_DB/localhost/ASIC_STATE", store)
+        try:
+            yield ctx, store
+        finally:
+            sonic_db.stop_db_monitor(ctx)
+
+
+def test_table_of():
+    assert table_of("SAI_OBJECT_TYPE_ACL_ENTRY:oid:0x1") == "SAI_OBJECT_TYPE_ACL_ENTRY"
+    assert table_of("default|default|10.0.0.1") == "default"
+    assert table_of("PORT_TABLE:Ethernet0|x") == "PORT_TABLE"
+    assert table_of("VIDCOUNTER") == "VIDCOUNTER"
+
+
+def test_merge_value():
+    assert merge_value({"a": "1", "b": "2"}, {"a": "3"}) == {"a": "3", "b": "2"}
+    assert merge_value({"a": "1"}, {"a": "3", "b": "2"}) == {"a": "3", "b": "2"}
+    assert merge_value({"a": "1"}, "x") == "x"
+
+
+def test_wait_for_n_keys(monitor, stream):
+    ctx, store = monitor
+    stream.send(acl_updates(range(50), parts=True))
+    events = sonic_db.wait_for_n_keys(ctx, "SAI_OBJECT_TYPE_ACL_ENTRY", store, 50, timedelta(seconds=10))
+    assert events == {acl_entry(index): acl_entry_fields(index) for index in range(50)}
+    assert store.synced
+    assert store.get_table("SAI_OBJECT_TYPE_ACL_ENTRY") == events
+    assert store.get_value(acl_entry(3)) == acl_entry_fields(3)
+
+
+def test_wait_for_n_keys_consumes_updates(monitor, stream):
+    ctx, store = monitor
+    stream.send(acl_updates(range(10)))
+    stream.send(acl_updates(range(10, 15)))
+    first = sonic_db.wait_for_n_keys(ctx, "SAI_OBJECT_TYPE_ACL_ENTRY", store, 10, timedelta(seconds=10))
+    assert sorted(first) == [acl_entry(index) for index in range(10)]
+    # The next wait starts after the update which completed the previous one, like with a queue
+    second = sonic_db.wait_for_n_keys(ctx, "SAI_OBJECT_TYPE_ACL_ENTRY", store, 5, timedelta(seconds=10))
+    assert sorted(second) == [acl_entry(index) for index in range(10, 15)]
+    assert second[acl_entry(10)] == acl_entry_fields(10)
+
+
+def test_wait_for_n_keys_timeout(monitor, stream):
+    ctx, store = monitor
+    stream.send(acl_updates(range(3)))
+    start = time.time()
+    with pytest.raises(TimeoutError):
+        sonic_db.wait_for_n_keys(ctx, "SAI_OBJECT_TYPE_ACL_ENTRY", store, 4, timedelta(seconds=0.3))
+    assert time.time() - start < 5
+
+
+def test_wait_for_n_keys_incomplete_key(monitor, stream):
+    ctx, store = monitor
+    stream.send([{acl_entry(0): {"SAI_ACL_ENTRY_ATTR_TABLE_ID": "oid:0x7000000000a01"}},
+                 {acl_entry(1): acl_entry_fields(1)}])
+    events = sonic_db.wait_for_n_keys(ctx, "SAI_OBJECT_TYPE_ACL_ENTRY", store, 2, timedelta(seconds=10))
+    # The key with less fields than the others is completed with a gNMI get
+    assert events[acl_entry(0)] == acl_entry_fields(0)
+    assert sonic_db._gnmi_client.get_paths == ["ASIC_DB/localhost/ASIC_STATE/" + acl_entry(0)]
+
+
+def test_wait_until_keys_match(monitor, stream):
+    ctx, store = monitor
+    prefix = "BFD_SESSION_TABLE|default|default|"
+    neighbors = ["10.0.0.{}".format(index) for index in range(8)]
+    stream.send([{prefix + neighbor: {"state": "Down"}} for neighbor in neighbors])
+
+    def bring_up():
+        time.sleep(0.1)
+        stream.send([{prefix + neighbor: {"state": "Up"}} for neighbor in neighbors])
+
+    thread = threading.Thread(target=bring_up)
+    thread.start()
+    completed, elapsed = sonic_db.wait_until_keys_match(ctx, store, prefix, neighbors, "state", "Up",
+                                                        timedelta(seconds=10))
+    thread.join()
+    assert completed is True
+    assert elapsed > 0
+
+    completed, elapsed = sonic_db.wait_until_condition(ctx, store, prefix, neighbors[:1],
+                                                       condition_cb=lambda k, v: v.get("state") == "Down",
+                                                       timeout=timedelta(seconds=0.3))
+    assert (completed, elapsed) == (False, 0.0)
+
+
+def test_wait_until_condition_callback_error(monitor, stream):
+    ctx, store = monitor
+
+    def condition_cb(key, value):
+        raise RuntimeError("bad callback")
+
+    stream.send([{"PORT|Ethernet0": {"oper_status": "up"}}])
+    assert sonic_db.wait_until_condition(ctx, store, "PORT|", ["Ethernet0"], condition_cb,
+                                         timedelta(seconds=10)) == (False, 0.0)
+    # The subscription thread is not affected by the error of the callback
+    stream.send(acl_updates([1]))
+    assert sonic_db.wait_for_n_keys(ctx, "SAI_OBJECT_TYPE_ACL_ENTRY", store, 1, timedelta(seconds=10))
+
+
+def test_error_events(monitor, stream):
+    ctx, store = monitor
+    stream.send([None])
+    stream.send(acl_updates([1]))
+    sonic_db.wait_for_n_keys(ctx, "SAI_OBJECT_TYPE_ACL_ENTRY", store, 1, timedelta(seconds=10))
+    assert store.stats()["errors"] == 1
+
+
+def test_ring_buffer_overflow():
+    store = DbEventStore(capacity=10)
+    for values in acl_updates(range(20), parts=True):
+        store.put({"type": "update", "value": values})
+    stats = store.stats()
+    assert stats["updates"] == 60
+    assert stats["dropped"] == 50
+    assert stats["depth"] == 10
+    assert stats["max_depth"] == 10
+    assert stats["keys"] == 40
+
+    # The keys dropped from the ring buffer are replayed from the index
+    received = {}
+
+    def on_update(key, value):
+        received.setdefault(key, []).append(value)
+
+    assert not store.wait(on_update, timeout=0)
+    assert len(received) == 40
+    # The replayed keys have their latest value, the keys still in the ring buffer have all their updates
+    assert {key: values[-1] for key, values in received.items() if table_of(key) == "SAI_OBJECT_TYPE_ACL_ENTRY"} \
+        == {acl_entry(index): acl_entry_fields(index) for index in range(20)}
+    updated_keys = sorted(key for key, values in received.items() if len(values) > 1)
+    assert updated_keys == [acl_entry(17), acl_entry(18), acl_entry(19)]
+    assert store.stats()["depth"] == 0
+
+
+def test_wait_is_woken_up_by_updates():
+    store = DbEventStore()
+    keys = []
+
+    def publish():
+        for index in range(100):
+            store.put({"type": "update", "value": {acl_entry(index): acl_entry_fields(index)}})
+
+    def on_update(key, value):
+        keys.append(key)
+        return len(keys) == 100
+
+    thread = threading.Thread(target=publish)
+    thread.start()
+    assert store.wait(on_update, timeout=10)
+    thread.join()
+    assert keys == [acl_entry(index) for index in range(100)]
+    assert store.stats()["waiters"] == 0
+    assert not store.wait(lambda key, value: True, timeout=0.05)
+
+
+def test_forward_to_queue(stream):
+    event_queue = queue.Queue()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        ctx = sonic_db.start_db_monitor(executor, object(), "ASIC_DB/localhost/ASIC_STATE", event_queue)
+        try:
+            stream.send(acl_updates([1]))
+            events = sonic_db.wait_for_n_keys(ctx, "SAI_OBJECT_TYPE_ACL_ENTRY", event_queue, 1,
+                                              timedelta(seconds=10))
+            assert list(events) == [acl_entry(1)]
+        finally:
+            sonic_db.stop_db_monitor(ctx)
+    assert ctx.event_store.stats()["forward_depth"] == 3
+    assert event_queue.get_nowait()["type"] == "sync_response"
+
+
+def test_disabled():
+    ctx = sonic_db.start_db_monitor(None, None, "ASIC_DB/localhost/ASIC_STATE", DbEventStore())
+    assert sonic_db.wait_for_n_keys(ctx, None, None, 2) == {0: None, 1: None}
+    assert sonic_db.wait_until_keys_match(ctx, None, "", ["a"], "state", "Up", timedelta(seconds=1)) == (True, 0.0)
+    sonic_db.stop_db_monitor(ctx)
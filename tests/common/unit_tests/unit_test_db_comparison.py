@@ -0,0 +1,178 @@
+"""Unit test for ``tests/common/db_comparison.py``.
+
+The DUT is stood in by a host running the shell commands locally, with a redis-dump script dumping the dbs from
+json files.
+
+Run with::
+
+    python3 -m pytest --noconftest \\
+        tests/common/unit_tests/unit_test_db_comparison.py -v
+"""
+import io
+import json
+import os
+import shutil
+import stat
+import subprocess
+import sys
+
+import pytest
+
+from tests.common import db_comparison
+from tests.common.db_comparison import DBType, SnapshotDiff, SonicRedisDBSnapshotter
+
+
+FAKE_REDIS_DUMP = """#!{python}
+import argparse
+import os
+import shutil
+
+parser = argparse.ArgumentParser()
+parser.add_argument("-d", type=int)
+parser.add_argument("-o")
+args = parser.parse_args()
+shutil.copyfile(os.path.join(os.environ["FAKE_REDIS_DIR"], "{{}}.json".format(args.d)), args.o)
+"""
+
+
+class FakeDutHost(object):
+
+    def __init__(self, bin_dir, redis_dir):
+        self.hostname = "dut"
+        self.env = dict(os.environ, PATH="{}:{}".format(bin_dir, os.environ["PATH"]), FAKE_REDIS_DIR=redis_dir)
+
+    def shell(self, cmd, module_ignore_errors=False):
+        res = subprocess.run(cmd, shell=True, env=self.env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                             universal_newlines=True)
+        assert res.returncode == 0 or module_ignore_errors, res.stderr
+        return {"rc": res.returncode, "stdout": res.stdout, "stderr": res.stderr}
+
+    def fetch(self, src, dest, flat=False):
+        shutil.copy(src, dest)
+        return {"dest": os.path.join(dest, os.path.basename(src))}
+
+
+def _entry(**values):
+    return {"expireat": 1700000000.0, "ttl": -0.001, "type": "hash", "value": values}
+
+
+def _state_db(pid_base, extra):
+    db = {
+        "PROCESS_STATS|{}".format(pid_base): _entry(CMD="/usr/bin/orchagent", CPU="1.0"),
+        "PROCESS_STATS|{}".format(pid_base + 1): _entry(CMD="/usr/bin/syncd", CPU="2.0"),
+        "TEMPERATURE_INFO|CPU": _entry(temperature="40", warning_status="False"),
+        "NEIGH_STATE_TABLE|10.0.0.1": _entry(state="Reachable"),
+    }
+    db.update(extra)
+    return db
+
+
+@pytest.fixture
+def dut(tmp_path):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    redis_dump = bin_dir / "redis-dump"
+    redis_dump.write_text(FAKE_REDIS_DUMP.format(python=sys.executable))
+    redis_dump.chmod(redis_dump.stat().st_mode | stat.S_IEXEC)
+    redis_dir = tmp_path / "redis"
+    redis_dir.mkdir()
+    return FakeDutHost(str(bin_dir), str(redis_dir)), redis_dir
+
+
+def _load(redis_dir, dbs):
+    for db, content in dbs.items():
+        (redis_dir / "{}.json".format(db.value)).write_text(json.dumps(content))
+
+
+def test_match_key():
+    patterns = {"CPU", "setup.pid", "TABLE\\|\\d+$", "[invalid"}
+    assert db_comparison.match_key("CPU%", patterns)
+    assert db_comparison.match_key("setup_pid", patterns)
+    assert db_comparison.match_key("TABLE|12", patterns)
+    assert db_comparison.match_key("[invalid_prefix", patterns)
+    assert not db_comparison.match_key("TABLE|12a", patterns)
+    assert not db_comparison.match_key("MEM", patterns)
+
+
+def test_iter_json_object_small_chunks():
+    content = {"a": {"value": {"x": "1"}}, 'b"c': [1, 2.5, None, True], "d": 12345, "e": {}, "f": "\\u00e9"}
+    text = json.dumps(content, indent=1)
+    assert dict(db_comparison.iter_json_object(io.StringIO(text), chunk_size=3)) == content
+    assert list(db_comparison.iter_json_object(io.StringIO(" { } "))) == []
+    with pytest.raises(ValueError):
+        list(db_comparison.iter_json_object(io.StringIO('{"a": 1'), chunk_size=2))
+    with pytest.raises(ValueError):
+        list(db_comparison.iter_json_object(io.StringIO('[1, 2]')))
+
+
+def test_snapshot_file_buckets(tmp_path):
+    content = {"KEY|{}".format(index): _entry(index=str(index)) for index in range(100)}
+    path = str(tmp_path / "APPL.snapshot.gz")
+    assert db_comparison.write_snapshot(path, DBType.APPL, content.items(), buckets=8) == 100
+    buckets = list(db_comparison.read_snapshot_buckets(path))
+    assert [index for index, _ in buckets] == list(range(8))
+    for index, bucket in buckets:
+        assert all(db_comparison.snapshot_bucket(key, 8) == index for key in bucket)
+    assert db_comparison.read_snapshot(path) == content
+
+
+def test_bucketed_diff_is_the_same_as_whole_diff():
+    a = _state_db(100, {"PORT_TABLE|Ethernet{}".format(i): _entry(oper_status="up") for i in range(50)})
+    b = _state_db(200, {"PORT_TABLE|Ethernet{}".format(i): _entry(oper_status="up" if i % 7 else "down")
+                        for i in range(10, 60)})
+    b["PROCESS_STATS|300"] = _entry(CMD="/usr/bin/bgpd", CPU="0.1")
+    b["TEMPERATURE_INFO|CPU"]["value"]["temperature"] = "45"
+
+    whole = SnapshotDiff(DBType.STATE, a, b, label_a="warm", label_b="cold")
+
+    def _buckets(db, count):
+        result = [{} for _ in range(count)]
+        for key, content in db.items():
+            result[db_comparison.snapshot_bucket(key, count)][key] = content
+        return result
+
+    bucketed = SnapshotDiff.from_buckets(DBType.STATE, zip(_buckets(a, 4), _buckets(b, 4)),
+                                         label_a="warm", label_b="cold")
+    assert bucketed.diff == whole.diff
+    assert bucketed.metrics == whole.metrics
+    assert whole.diff["PROCESS_STATS|*"] == {"value": {"CMD0": {"warm": None, "cold": "/usr/bin/bgpd"}}}
+    # Volatile values are not diffed and not in the content of the keys only in one snapshot
+    assert "TEMPERATURE_INFO|CPU" not in whole.diff
+    assert whole.diff["PORT_TABLE|Ethernet0"] == {"warm": {"type": "hash", "value": {"oper_status": "up"}},
+                                                  "cold": None}
+    assert whole.metrics.num_overall_differing_keys == 20
+
+
+def test_take_and_diff_snapshots(dut, tmp_path):
+    duthost, redis_dir = dut
+    appl = {"ROUTE_TABLE:10.0.0.0/24": _entry(nexthop="10.0.0.1"), "LLDP_ENTRY_TABLE:Ethernet0": _entry(
+        lldp_rem_time_mark="1", lldp_rem_sys_name="T1")}
+    config = {"PORT|Ethernet0": _entry(admin_status="up")}
+    _load(redis_dir, {DBType.APPL: appl, DBType.CONFIG: config, DBType.STATE: _state_db(100, {}),
+                      DBType.ASIC: {}})
+
+    snapshotter = SonicRedisDBSnapshotter(duthost, str(tmp_path / "snapshots"))
+    dbs = [DBType.APPL, DBType.CONFIG, DBType.STATE, DBType.ASIC]
+    snapshotter.take_snapshot("unit_test_before", dbs)
+    assert sorted(os.listdir(str(tmp_path / "snapshots" / "unit_test_before"))) == [
+        "APPL.snapshot.gz", "ASIC.snapshot.gz", "CONFIG.snapshot.gz", "STATE.snapshot.gz"]
+    assert not os.path.exists("/tmp/unit_test_before_APPL.json.gz")
+
+    appl["LLDP_ENTRY_TABLE:Ethernet0"]["value"]["lldp_rem_time_mark"] = "2"
+    config["PORT|Ethernet0"]["value"]["admin_status"] = "down"
+    _load(redis_dir, {DBType.APPL: appl, DBType.CONFIG: config, DBType.STATE: _state_db(200, {})})
+    snapshotter.take_snapshot("unit_test_after", dbs)
+
+    diff = snapshotter.diff_snapshots("unit_test_before", "unit_test_after")
+    assert set(diff) == {DBType.APPL, DBType.CONFIG, DBType.STATE}
+    assert diff[DBType.APPL].diff == {}
+    assert diff[DBType.STATE].diff == {}
+    assert diff[DBType.CONFIG].diff == {"PORT|Ethernet0": {"value": {"admin_status": {
+        "unit_test_before": "up", "unit_test_after": "down"}}}}
+
+
+def test_failed_dump(dut, tmp_path):
+    duthost, _ = dut
+    snapshotter = SonicRedisDBSnapshotter(duthost, str(tmp_path / "snapshots"))
+    with pytest.raises(AssertionError):
+        snapshotter.take_snapshot("unit_test_failed", [DBType.APPL])
@@ -0,0 +1,120 @@
+"""Unit test for the lazy topology loading of ``tests/common/testbed.py``.
+
+Run with::
+
+    python3 -m pytest --noconftest \\
+        tests/common/unit_tests/unit_test_testbed.py -v
+"""
+import copy
+import importlib.util
+import json
+import pickle
+import sys
+
+import pytest
+
+from tests.common import testbed
+
+
+TESTBED = """
+- conf-name: vms-t0-a
+  group-name: vms1
+  topo: t0
+  ptf_image_name: docker-ptf
+  ptf: ptf-01
+  ptf_ip: 10.255.0.180/24
+  ptf_ipv6:
+  server: server_1
+  vm_base: VM0100
+  dut:
+    - vlab-01
+  inv_name: veos_vtb
+  auto_recover: 'False'
+  comment: Test
+
+- conf-name: vms-t0-b
+  group-name: vms2
+  topo: t0
+  ptf_image_name: docker-ptf
+  ptf: ptf-02
+  ptf_ip: 10.255.0.181/24
+  ptf_ipv6:
+  server: server_1
+  vm_base: VM0104
+  dut:
+    - vlab-02
+  inv_name: veos_vtb
+  auto_recover: 'False'
+  comment: Test
+
+- conf-name: vms-t1
+  group-name: vms3
+  topo: t1-lag
+  ptf_image_name: docker-ptf
+  ptf: ptf-03
+  ptf_ip: 10.255.0.182/24
+  ptf_ipv6:
+  server: server_1
+  vm_base: VM0108
+  dut:
+    - vlab-03
+  inv_name: veos_vtb
+  auto_recover: 'False'
+  comment: Test
+"""
+
+
+@pytest.fixture
+def testbed_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(testbed, "_topo_file_cache", {})
+    path = tmp_path / "testbed.yaml"
+    path.write_text(TESTBED)
+    return str(path)
+
+
+def test_topology_is_loaded_on_access(testbed_file):
+    tbinfo = testbed.TestbedInfo(testbed_file)
+    assert testbed._topo_file_cache == {}
+    topo = tbinfo.testbed_topo["vms-t0-a"]["topo"]
+    assert topo["name"] == "t0" and topo["type"] == "t0"
+    assert "properties" in topo and "ptf_map" in topo and len(topo) == 6
+    assert testbed._topo_file_cache == {}
+
+    assert topo["properties"]["topology"]["VMs"]
+    assert topo.get("ptf_map")["0"] == tbinfo.calculate_ptf_index_map({"topo": topo})["0"]
+    assert topo["ptf_dut_intf_map"] == tbinfo.calculate_ptf_dut_intf_map({"topo": topo})
+    with pytest.raises(KeyError):
+        topo["unknown"]
+
+    # Testbeds of the same topology share the parsed topology file, each has its own copy
+    other_topo = tbinfo.testbed_topo["vms-t0-b"]["topo"]
+    assert other_topo["properties"] == topo["properties"]
+    assert other_topo["properties"] is not topo["properties"]
+    assert len(testbed._topo_file_cache) == 1
+
+
+def test_topology_serialization(testbed_file):
+    tbinfo = testbed.TestbedInfo(testbed_file)
+    topo = tbinfo.testbed_topo["vms-t1"]["topo"]
+    assert set(json.loads(json.dumps(topo))) == \
+        {"name", "type", "properties", "ptf_map", "ptf_map_disabled", "ptf_dut_intf_map"}
+    assert isinstance(copy.deepcopy(topo), dict) and copy.deepcopy(topo) == topo
+
+    # Pickled testbeds keep the topologies not loaded yet lazy
+    restored = pickle.loads(pickle.dumps(tbinfo))
+    restored_topo = restored.testbed_topo["vms-t0-a"]["topo"]
+    assert dict.__len__(restored_topo) == 2
+    assert restored_topo["ptf_map"] == tbinfo.testbed_topo["vms-t0-a"]["topo"]["ptf_map"]
+    assert dict(restored.testbed_topo["vms-t1"]["topo"].items()) == dict(topo.items())
+
+
+def test_loaded_by_path_outside_of_tests_package(testbed_file):
+    # Like ansible/recover_server.py, which loads the module by path
+    sys_path = list(sys.path)
+    spec = importlib.util.spec_from_file_location("testbed", testbed.__file__)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    assert sys.path == sys_path
+    assert module.load_topo.__module__ == "testbed_topo_utils"
+    topo = module.TestbedInfo(testbed_file).testbed_topo["vms-t0-a"]["topo"]
+    assert topo["properties"]["topology"]["VMs"]
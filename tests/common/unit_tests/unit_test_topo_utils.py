@@ -0,0 +1,129 @@
+"""Unit test for ``ansible/module_utils/topo_utils.py`` (``tests/common/topo_utils.py``).
+
+Run with::
+
+    python3 -m pytest --noconftest \\
+        tests/common/unit_tests/unit_test_topo_utils.py -v
+"""
+import os
+import pickle
+import stat
+
+import pytest
+import yaml
+
+from tests.common import topo_utils
+
+
+TOPO = """
+topology:
+  host_interfaces:
+    - 0
+    - 1
+  VMs:
+    ARISTA01T1:
+      vlans:
+        - 28
+      vm_offset: 0
+configuration_properties:
+  common:
+    dut_asn: 65100
+"""
+
+
+@pytest.fixture
+def topo_file(tmp_path):
+    path = tmp_path / "vars" / "topo_t0-test.yml"
+    path.parent.mkdir()
+    path.write_text(TOPO)
+    return str(path)
+
+
+def _artifacts(cache_dir):
+    return sorted(os.listdir(cache_dir))
+
+
+def test_artifact_is_reused(topo_file, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    topo = topo_utils.load_topo(topo_file, cache_dir=cache_dir)
+    assert topo == yaml.safe_load(TOPO)
+    artifacts = _artifacts(cache_dir)
+    assert len(artifacts) == 1 and artifacts[0].startswith("topo_t0-test.")
+
+    def _no_parse(*args, **kwargs):
+        raise AssertionError("The topology file should not be parsed")
+
+    monkeypatch.setattr(topo_utils.yaml, "load", _no_parse)
+    loaded = topo_utils.load_topo(topo_file, cache_dir=cache_dir)
+    assert loaded == topo and loaded is not topo
+
+
+def test_artifact_is_refreshed_when_topology_changes(topo_file, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    topo_utils.load_topo(topo_file, cache_dir=cache_dir)
+    old_artifacts = _artifacts(cache_dir)
+
+    with open(topo_file, "a") as f:
+        f.write("    dut_type: ToRRouter\n")
+    topo = topo_utils.load_topo(topo_file, cache_dir=cache_dir)
+    assert topo["configuration_properties"]["common"]["dut_type"] == "ToRRouter"
+    new_artifacts = _artifacts(cache_dir)
+    assert len(new_artifacts) == 1 and new_artifacts != old_artifacts
+
+
+def test_corrupted_artifact_and_disabled_cache(topo_file, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    topo_utils.load_topo(topo_file, cache_dir=cache_dir)
+    artifact = os.path.join(cache_dir, _artifacts(cache_dir)[0])
+    with open(artifact, "wb") as f:
+        f.write(b"\x80")
+    assert topo_utils.load_topo(topo_file, cache_dir=cache_dir) == yaml.safe_load(TOPO)
+
+    monkeypatch.setenv(topo_utils.TOPO_CACHE_DIR_ENV, "")
+    os.remove(artifact)
+    assert topo_utils.load_topo(topo_file) == yaml.safe_load(TOPO)
+    assert _artifacts(cache_dir) == []
+
+
+def test_compile_topos(topo_file, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    assert topo_utils.compile_topos(os.path.dirname(topo_file), cache_dir=cache_dir) == [topo_file]
+    assert len(_artifacts(cache_dir)) == 1
+
+
+def test_default_cache_dir_is_per_user(monkeypatch):
+    monkeypatch.delenv(topo_utils.TOPO_CACHE_DIR_ENV, raising=False)
+    assert topo_utils.get_topo_cache_dir().startswith(os.path.expanduser("~") + os.sep)
+
+
+def test_cache_dir_is_private(topo_file, tmp_path):
+    cache_dir = str(tmp_path / "cache" / "topo")
+    topo_utils.load_topo(topo_file, cache_dir=cache_dir)
+    assert stat.S_IMODE(os.stat(cache_dir).st_mode) == 0o700
+    artifact = os.path.join(cache_dir, _artifacts(cache_dir)[0])
+    assert not os.stat(artifact).st_mode & (stat.S_IRWXG | stat.S_IRWXO)
+
+
+def _plant_artifact(cache_dir):
+    # An artifact replaced by another user, which would be returned if it was unpickled
+    artifact = os.path.join(cache_dir, _artifacts(cache_dir)[0])
+    with open(artifact, "wb") as f:
+        pickle.dump({"planted": True}, f)
+    return artifact
+
+
+def test_shared_cache_dir_is_not_used(topo_file, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    topo_utils.load_topo(topo_file, cache_dir=cache_dir)
+    _plant_artifact(cache_dir)
+    os.chmod(cache_dir, 0o777)
+    assert topo_utils.load_topo(topo_file, cache_dir=cache_dir) == yaml.safe_load(TOPO)
+
+
+def test_artifact_of_another_user_is_not_used(topo_file, tmp_path):
+    if os.getuid() != 0:
+        pytest.skip("Changing the owner of a file requires root")
+    cache_dir = str(tmp_path / "cache")
+    topo_utils.load_topo(topo_file, cache_dir=cache_dir)
+    os.chown(_plant_artifact(cache_dir), 65534, 65534)
+    assert topo_utils.load_topo(topo_file, cache_dir=cache_dir) == yaml.safe_load(TOPO)
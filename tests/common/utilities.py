@@ -3,7 +3,6 @@ Utility functions can re-used in testing scripts.
 """
 import collections
 import contextlib
-import inspect
 import ipaddress
 import json
 import logging
@@ -34,6 +33,8 @@ from ansible.vars.manager import VariableManager
 from tests.common import constants
 from tests.common.cache import cached
 from tests.common.cache import FactsCache
+from tests.common.cache import get_call_argument
+from tests.common.helpers.inventory_utils import get_inventory_hash, get_inventory_index
 from tests.common.helpers.constants import UPSTREAM_NEIGHBOR_MAP, UPSTREAM_ALL_NEIGHBOR_MAP
 from tests.common.helpers.constants import DOWNSTREAM_NEIGHBOR_MAP, DOWNSTREAM_ALL_NEIGHBOR_MAP
 from tests.common.helpers.assertions import pytest_assert
@@ -350,6 +351,10 @@ def join_all(threads, timeout):
                            [repr(thread) for thread in threads])
 
 
+# Results of get_host_vars and get_test_server_vars in the process, key is (function, inventory hash, name)
+_inventory_vars = {}
+
+
 def get_inventory_manager(inv_files):
     return InventoryManager(loader=DataLoader(), sources=inv_files)
 
@@ -374,8 +379,7 @@ def get_inventory_files(request):
 
 def _get_parameter(function, func_args, func_kargs, argname):
     """Get the parameter passed as argname to function."""
-    args_binding = inspect.getcallargs(function, *func_args, **func_kargs)
-    return args_binding.get(argname) or args_binding.get("kargs").get(argname)
+    return get_call_argument(function, func_args, func_kargs, argname)
 
 
 def zone_getter_factory(argname):
@@ -407,15 +411,11 @@ def _mark_inv_files_before_write(facts, function, func_args, func_kargs):
     return {"inv_files": inv_files, "vars": facts}
 
 
-@cached(
-    "host_vars",
-    zone_getter=zone_getter_factory("hostname"),
-    after_read=_check_inv_files_after_read,
-    before_write=_mark_inv_files_before_write
-)
 def get_host_vars(inv_files, hostname):
-    """Use ansible's InventoryManager to get value of variables defined for the specified host in the specified
-    inventory files.
+    """Get value of variables defined for the specified host in the specified inventory files.
+
+    The variables are looked up in the index of the inventory files, see get_inventory_index. ansible's
+    InventoryManager is only used for the hosts not in the index, like the implicit localhost.
 
     Args:
         inv_files (list or string): List of inventory file pathes, or string of a single inventory file path. In tests,
@@ -425,12 +425,17 @@ def get_host_vars(inv_files, hostname):
     Returns:
         dict or None: dict if the host is found, None if the host is not found.
     """
-    im = get_inventory_manager(inv_files)
-    host = im.get_host(hostname)
-    if not host:
-        logger.error("Unable to find host {} in {}".format(hostname, str(inv_files)))
-        return None
-    return host.vars.copy()
+    key = ("host_vars", get_inventory_hash(inv_files), hostname)
+    if key not in _inventory_vars:
+        host_vars = get_inventory_index(inv_files, get_inventory_manager).get_host_vars(hostname)
+        if host_vars is None:
+            host = get_inventory_manager(inv_files).get_host(hostname)
+            if not host:
+                logger.error("Unable to find host {} in {}".format(hostname, str(inv_files)))
+                return None
+            host_vars = host.vars.copy()
+        _inventory_vars[key] = host_vars
+    return _inventory_vars[key].copy()
 
 
 @cached(
@@ -509,12 +514,6 @@ def get_test_server_host(inv_files, server):
     return None
 
 
-@cached(
-    "test_server_vars",
-    zone_getter=zone_getter_factory("server"),
-    after_read=_check_inv_files_after_read,
-    before_write=_mark_inv_files_before_write
-)
 def get_test_server_vars(inv_files, server):
     """Use ansible's VariableManager and InventoryManager to get value of variables of test server belong to specified
     server group.
@@ -532,11 +531,20 @@ def get_test_server_vars(inv_files, server):
     Returns:
         dict or None: dict if the host is found, None if the host is not found.
     """
-    host = get_test_server_host(inv_files, server)
-    if not host:
-        logger.error("Unable to find test server host under group {}".format(server))
-        return None
-    return host.vars.copy()
+    key = ("test_server_vars", get_inventory_hash(inv_files), server)
+    if key not in _inventory_vars:
+        index = get_inventory_index(inv_files, get_inventory_manager)
+        group_hosts = index.get_group_hosts(server)
+        if group_hosts is None:
+            logger.error("Unable to find group {} in {}".format(server, str(inv_files)))
+        for hostname in group_hosts or []:
+            if not re.match(r'VM\d+', hostname):   # This must be the test server host
+                _inventory_vars[key] = index.get_host_vars(hostname)
+                break
+        else:
+            logger.error("Unable to find test server host under group {}".format(server))
+            return None
+    return _inventory_vars[key].copy()
 
 
 @cached(
@@ -70,6 +70,7 @@ from tests.common.helpers.dut_utils import is_supervisor_node, is_frontend_node,
     is_enabled_nat_for_dpu, get_dpu_names_and_ssh_ports, enable_nat_for_dpus, is_macsec_capable_node, \
     get_supervisor_for_linecard, create_linecard_console
 from tests.common.cache import FactsCache
+from tests.common.cache.facts_cache import CACHE_MAX_AGE, dump_cache_stats
 from tests.common.config_reload import config_reload
 from tests.common.helpers.assertions import pytest_assert as pt_assert
 from pytest_ansible.errors import AnsibleConnectionFailure
@@ -143,6 +144,20 @@ def pytest_addoption(parser):
     parser.addoption("--testbed_file", action="store", default=None, help="testbed file name")
     parser.addoption("--ipv6_only_mgmt", action="store_true", default=False,
                      help="Use IPv6-only management network. DUT mgmt_ip will be set to IPv6 address.")
+    parser.addoption("--fanout_workers", action="store", default=0, type=int,
+                     help="Run the module calls on all the DUTs (duthosts.<module>) and on all the ASICs "
+                          "(asic_index='all') concurrently, using a session wide pool of this many threads. "
+                          "0 (default) runs them one after another.")
+    parser.addoption("--module_call_stats", action="store", default=None, type=str,
+                     help="Record call counts and latency histograms of the ansible module calls per module and "
+                          "per caller, log the top ones at session end and save all of them to this json file. "
+                          "The stats of the facts cache are saved next to it.")
+    parser.addoption("--facts_cache_max_age", action="store", default=CACHE_MAX_AGE, type=int,
+                     help="Evict the cached facts not accessed for more than this many seconds at session start. "
+                          "0 disables the eviction.")
+    parser.addoption("--ssh_control_pool", action="store_true", default=False,
+                     help="Pin and manage the master SSH connections of the hosts per (host, user, become): "
+                          "health check, reset after DUT reboot and metrics of the SSH handshakes saved.")
     parser.addoption("--uhd_config", action="store", help="Enable UHD config mode")
     parser.addoption("--save_uhd_config", action="store_true", help="Save UHD config mode")
     parser.addoption("--npu_dpu_startup", action="store_true", help="Startup NPU and DPUs and install configurations")
@@ -556,6 +571,83 @@ def ipv6_only_mgmt_enabled(request):
     return enabled
 
 
+@pytest.fixture(scope="session", autouse=True)
+def module_call_stats(request):
+    """
+    Fixture to record the stats of the ansible module calls when --module_call_stats is set.
+
+    The module calls on all the hosts are counted per module and per caller, with their latency
+    histograms. The stats are logged and saved to the json file given by the option at session end.
+    The path taken (structured or text output) and the time spent by the SonicHost show helpers are
+    saved next to it, in <file name>_show_paths.json, and the hit/miss counters of the facts cache in
+    <file name>_facts_cache.json.
+    """
+    from tests.common.devices.base import ModuleCallStats
+    from tests.common.helpers.structured_show import StructuredShowStats
+
+    stats_file = request.config.getoption("module_call_stats", default=None)
+    if not stats_file:
+        yield
+        return
+    ModuleCallStats.reset()
+    ModuleCallStats.enable()
+    StructuredShowStats.reset()
+    StructuredShowStats.enable()
+    yield
+    ModuleCallStats.enable(False)
+    ModuleCallStats.dump(stats_file)
+    StructuredShowStats.enable(False)
+    StructuredShowStats.dump(os.path.splitext(stats_file)[0] + "_show_paths.json")
+    dump_cache_stats(os.path.splitext(stats_file)[0] + "_facts_cache.json")
+
+
+@pytest.fixture(scope="session")
+def ssh_control_pool(request):
+    """
+    Fixture to enable the SSH control pool when --ssh_control_pool is set.
+
+    The hosts created after this fixture use a pinned master SSH connection per
+    (host, user, become), which is shared by all the module calls of the session
+    and reset after the DUT is rebooted. The stale master connections are closed
+    and the metrics of the pool are logged at session end.
+
+    Returns:
+        SshControlPool: the pool, or None if it is not enabled.
+    """
+    from tests.common.connections.ssh_control_pool import SshControlPool
+
+    if not request.config.getoption("ssh_control_pool", default=False):
+        yield None
+        return
+    pool = SshControlPool.enable()
+    yield pool
+    pool.health_check()
+    SshControlPool.disable()
+
+
+@pytest.fixture(scope="session")
+def parallel_fanout(request):
+    """
+    Fixture to enable the parallel fan-out of the module calls on all the DUTs and ASICs.
+
+    When --fanout_workers is set to a positive number, duthosts.<module>(...) and
+    duthost.<module>(..., asic_index="all") call the nodes/ASICs concurrently using a
+    session wide pool of that many threads. The results are returned in the same order
+    as before.
+
+    Returns:
+        ParallelFanout: the shared pool, or None if the fan-out is not enabled.
+    """
+    from tests.common.helpers.multi_thread_utils import ParallelFanout
+
+    max_workers = request.config.getoption("fanout_workers", default=0)
+    if not max_workers or max_workers <= 0:
+        yield None
+        return
+    yield ParallelFanout.enable(max_workers)
+    ParallelFanout.disable()
+
+
 @pytest.fixture(scope="session", autouse=True)
 def enhance_inventory(request, tbinfo):
     """
@@ -640,8 +732,11 @@ def get_tbinfo(request):
 
     testbedinfo = cache.read(tbname, 'tbinfo')
     if testbedinfo is cache.NOTEXIST:
-        testbedinfo = TestbedInfo(tbfile)
-        cache.write(tbname, 'tbinfo', testbedinfo)
+        with cache.lock(tbname, 'tbinfo'):
+            testbedinfo = cache.read(tbname, 'tbinfo')
+            if testbedinfo is cache.NOTEXIST:
+                testbedinfo = TestbedInfo(tbfile)
+                cache.write(tbname, 'tbinfo', testbedinfo)
 
     return tbname, testbedinfo.testbed_topo.get(tbname, {})
 
@@ -724,6 +819,16 @@ def pytest_sessionstart(session):
         logger.debug("reset existing key: {}".format(key))
         session.config.cache.set(key, None)
 
+    # Evict the stale cached facts once, from the controller of the xdist workers if any
+    max_age = session.config.getoption("facts_cache_max_age")
+    if max_age > 0 and not hasattr(session.config, "workerinput"):
+        try:
+            evicted = cache.evict(max_age=max_age)
+            if evicted:
+                logger.info("Evicted {} cached facts not accessed for {}s".format(len(evicted), max_age))
+        except Exception as e:
+            logger.warning("Failed to evict the stale cached facts: {}".format(repr(e)))
+
 
 def pytest_sessionfinish(session, exitstatus):
     if (session.config.cache.get("duthosts_fixture_failed", None) or
@@ -746,7 +851,8 @@ def pytest_sessionfinish(session, exitstatus):
 
 
 @pytest.fixture(name="duthosts", scope="session")
-def fixture_duthosts(enhance_inventory, ansible_adhoc, tbinfo, request, ipv6_only_mgmt_enabled):
+def fixture_duthosts(enhance_inventory, ansible_adhoc, tbinfo, request, ipv6_only_mgmt_enabled, parallel_fanout,
+                     ssh_control_pool):
     """
     @summary: fixture to get DUT hosts defined in testbed.
     @param enhance_inventory: fixture to enhance the capability of parsing the value of pytest cli argument
@@ -756,6 +862,8 @@ def fixture_duthosts(enhance_inventory, ansible_adhoc, tbinfo, request, ipv6_onl
     @param tbinfo: fixture provides information about testbed.
     @param request: pytest request object
     @param ipv6_only_mgmt_enabled: fixture to configure IPv6-only management mode before DUT initialization
+    @param parallel_fanout: fixture to enable the concurrent module calls on all the DUTs and ASICs
+    @param ssh_control_pool: fixture to enable the SSH control pool before the DUT hosts are created
     """
     try:
         host = DutHosts(ansible_adhoc, tbinfo, request, get_specified_duts(request),
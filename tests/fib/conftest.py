@@ -0,0 +1,29 @@
+"""
+    Pytest configuration used by the fib tests.
+"""
+import pytest
+
+# Default number of packets of a burst in batch mode, ProbeBatch.DEFAULT_BURST_SIZE of the ptftests
+DEFAULT_PTF_BATCH_SIZE = 128
+
+
+def pytest_addoption(parser):
+    parser.addoption("--ptf_batch_mode", action="store_true", default=False,
+                     help="Run the FibTest and HashTest PTF tests in batch mode: the packets are built up front, "
+                          "sent in bursts and matched back by a signature, instead of one packet at a time")
+    parser.addoption("--ptf_batch_size", action="store", type=int, default=DEFAULT_PTF_BATCH_SIZE,
+                     help="Number of packets of a burst in batch mode")
+
+
+@pytest.fixture(scope="module")
+def ptf_batch_params(request):
+    """
+    The batch mode params of the FibTest and HashTest PTF tests, from the --ptf_batch_mode and --ptf_batch_size
+    options. Empty when the batch mode is disabled, so the PTF tests keep their defaults.
+    """
+    if not request.config.getoption("--ptf_batch_mode"):
+        return {}
+    batch_size = request.config.getoption("--ptf_batch_size")
+    if batch_size <= 0:
+        pytest.fail("--ptf_batch_size must be positive, got {}".format(batch_size))
+    return {"batch_mode": True, "batch_size": batch_size}
@@ -56,6 +56,11 @@ DEFAULT_MUX_SERVER_PORT = 8080
 PTF_TEST_PORT_MAP = '/root/ptf_test_port_map.json'
 
 
+def get_ptf_qlen(ptf_batch_params):
+    """The --qlen of the PTF tests, the receive queue of each port must hold a burst of the batch mode."""
+    return max(PTF_QLEN, ptf_batch_params.get("batch_size", 0))
+
+
 # Helper Functions
 def check_default_route_from_fib_info(ptfhost, file_path):
     """
@@ -292,7 +297,7 @@ def test_basic_fib(duthosts, ptfhost, tbinfo, ipv4, ipv6, mtu,
                    ignore_ttl, single_fib_for_duts,                     # noqa: F401, F811
                    duts_running_config_facts, duts_minigraph_facts,
                    validate_active_active_dualtor_setup,                # noqa: F401, F811
-                   request):                                            # noqa: F811
+                   ptf_batch_params, request):                          # noqa: F811
 
     if 'dualtor' in updated_tbinfo['topo']['name']:
         wait(30, 'Wait some time for mux active/standby state to be stable after toggled mux state')
@@ -335,10 +340,11 @@ def test_basic_fib(duthosts, ptfhost, tbinfo, ipv4, ipv6, mtu,
             "single_fib_for_duts": single_fib_for_duts,
             "switch_type": switch_type,
             "asic_type": asic_type,
-            "topo_type": updated_tbinfo['topo']['type']
+            "topo_type": updated_tbinfo['topo']['type'],
+            **ptf_batch_params
         },
         log_file=log_file,
-        qlen=PTF_QLEN,
+        qlen=get_ptf_qlen(ptf_batch_params),
         socket_recv_size=16384,
         is_python3=True
     )
@@ -542,7 +548,7 @@ def test_hash(add_default_route_to_dut, duthosts, tbinfo, setup_vlan,      # noq
               hash_keys, ptfhost, ipver, toggle_all_simulator_ports_to_rand_selected_tor_m,     # noqa: F811
               updated_tbinfo, mux_server_url, mux_status_from_nic_simulator, ignore_ttl,        # noqa: F811
               single_fib_for_duts, duts_running_config_facts, duts_minigraph_facts,             # noqa: F811
-              setup_active_active_ports, active_active_ports, request):                         # noqa: F811
+              setup_active_active_ports, active_active_ports, ptf_batch_params, request):       # noqa: F811
 
     if 'dualtor' in updated_tbinfo['topo']['name']:
         wait(30, 'Wait some time for mux active/standby state to be stable after toggled mux state')
@@ -589,9 +595,10 @@ def test_hash(add_default_route_to_dut, duthosts, tbinfo, setup_vlan,      # noq
             "topo_name": updated_tbinfo['topo']['name'],
             "topo_type": updated_tbinfo['topo']['type'],
             "is_v6_topo": is_ipv6_only_topology(updated_tbinfo),
+            **ptf_batch_params
         },
         log_file=log_file,
-        qlen=PTF_QLEN,
+        qlen=get_ptf_qlen(ptf_batch_params),
         socket_recv_size=16384,
         is_python3=True
     )
@@ -833,7 +840,7 @@ def test_ecmp_group_member_flap(
     mux_status_from_nic_simulator, ignore_ttl,
     single_fib_for_duts,  # noqa: F401, F811
     duts_running_config_facts, duts_minigraph_facts,
-    validate_active_active_dualtor_setup, request  # noqa: F401, F811
+    validate_active_active_dualtor_setup, ptf_batch_params, request  # noqa: F401, F811
 ):
     """Test ECMP group member flap handling."""
 
@@ -904,9 +911,10 @@ def test_ecmp_group_member_flap(
             "skip_src_ports": filtered_ports,
             "topo_name": updated_tbinfo['topo']['name'],
             "topo_type": updated_tbinfo['topo']['type'],
+            **ptf_batch_params
         },
         log_file=log_file,
-        qlen=PTF_QLEN,
+        qlen=get_ptf_qlen(ptf_batch_params),
         socket_recv_size=16384,
         is_python3=True
     )
@@ -962,9 +970,10 @@ def test_ecmp_group_member_flap(
             "skip_src_ports": filtered_ports,
             "topo_name": updated_tbinfo['topo']['name'],
             "topo_type": updated_tbinfo['topo']['type'],
+            **ptf_batch_params
         },
         log_file=member_down_log_file,
-        qlen=PTF_QLEN,
+        qlen=get_ptf_qlen(ptf_batch_params),
         socket_recv_size=16384,
         is_python3=True
     )
@@ -1014,9 +1023,10 @@ def test_ecmp_group_member_flap(
             "skip_src_ports": filtered_ports,
             "topo_name": updated_tbinfo['topo']['name'],
             "topo_type": updated_tbinfo['topo']['type'],
+            **ptf_batch_params
         },
         log_file=member_up_log_file,
-        qlen=PTF_QLEN,
+        qlen=get_ptf_qlen(ptf_batch_params),
         socket_recv_size=16384,
         is_python3=True
     )
@@ -401,7 +401,9 @@ def generate_and_verify_balancing_traffic(duthost, ptfhost, ptfadapter, src_port
                                  exp_pkt=exp_pkt,
                                  dst_port_numbers=dst_port_numbers,
                                  match_fields=[("Ethernet", "src"), ("IP", "dst"), ('TCP', "dport")],
-                                 ignore_fields=ignore_fields)
+                                 ignore_fields=ignore_fields,
+                                 settle_time=None,
+                                 expected_count=BALANCING_TEST_TIMES * len(dst_port))
 
     pkt_in_buffer = pkt_filter.filter_pkt_in_buffer()
 
@@ -1,7 +1,6 @@
 import sys
 import time
 import threading
-import yaml
 import json
 import random
 import logging
@@ -19,6 +18,7 @@ import pytest
 from tests.common.fixtures.ptfhost_utils import copy_ptftests_directory  # noqa: F401
 from tests.common.fixtures.ptfhost_utils import change_mac_addresses  # noqa: F401
 from tests.ptf_runner import ptf_runner
+from tests.common.topo_utils import load_topo
 from tests.common.utilities import wait_until
 from tests.common.reboot import reboot
 from tests.common.helpers.assertions import pytest_assert
@@ -599,8 +599,7 @@ def setup_vrf(
         duthost.shell("sonic-clear nd")
         duthost.shell("sonic-clear fdb all")
 
-        with open("../ansible/vars/topo_{}.yml".format(tbinfo["topo"]["name"]), "r") as fh:
-            g_vars["topo_properties"] = yaml.safe_load(fh)
+        g_vars["topo_properties"] = load_topo("../ansible/vars/topo_{}.yml".format(tbinfo["topo"]["name"]))
 
         g_vars["props"] = g_vars["topo_properties"]["configuration_properties"]["common"]
 